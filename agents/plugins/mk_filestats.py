@@ -83,6 +83,17 @@ described by the following four phases:
       Monitor a single file and send its metrics. If a input_pattern of a .cfg section
       matches multiple files, the agent sents one subsection per file.
 
+Two more options affect the performance only, they are usually set in the
+'[DEFAULT]' section:
+    * ``cache_directories: yes''
+      Remember the files and subdirectories of the scanned directories in
+      the file 'filestats.cache' in $MK_VARDIR. Directories whose mtime did
+      not change since the last run are not listed again. Files which are
+      only filtered by their path and counted are not stat'ed at all.
+    * ``parallel_sections: number''
+      Process up to this number of sections in parallel threads. The output
+      is written in the order of the sections anyway.
+
 You should find an example configuration file at
 '../cfg_examples/filestats.cfg' relative to this file.
 """
@@ -97,8 +108,9 @@ import os
 import re
 import shlex
 import sys
+import threading
 import time
-from stat import S_ISDIR, S_ISREG
+from stat import S_ISDIR, S_ISLNK, S_ISREG
 
 # NOTE: The tool 3to2 runs when the agent is configured for python 2.5/2.6
 #       and converts the import automatically to 'ConfigParser'.
@@ -144,8 +156,14 @@ def ensure_text(s):
     return s
 
 
+def is_enabled(value):
+    return value is not None and value.strip().lower() in ("yes", "on", "true", "1")
+
+
 DEFAULT_CFG_FILE = os.path.join(os.getenv('MK_CONFDIR', ''), "filestats.cfg")
 
+DEFAULT_CACHE_FILE = os.path.join(os.getenv('MK_VARDIR', ''), "filestats.cache")
+
 DEFAULT_CFG_SECTION = {"output": "file_stats", "subgroups_delimiter": "@"}
 
 FILTER_SPEC_PATTERN = re.compile('(?P<operator>[<>=]+)(?P<value>.+)')
@@ -190,6 +208,9 @@ class FileStat(object):  # pylint: disable=useless-object-inheritance
         super(FileStat, self).__init__()
         LOGGER.debug("Creating FileStat(%r)", path)
         self.path = ensure_text(path)
+        self._stat()
+
+    def _stat(self):
         self.stat_status = 'ok'
         self.size = None
         self.age = None
@@ -237,6 +258,28 @@ class FileStat(object):  # pylint: disable=useless-object-inheritance
         return repr(data)
 
 
+class LazyFileStat(FileStat):
+    """FileStat of a path which is known to be a regular file
+
+    os.stat is only called once one of the stat results is needed, e.g. not at all for
+    counting files which are only filtered by their path.
+    """
+    _STAT_ATTRIBUTES = ('stat_status', 'size', 'age', '_m_time')
+
+    def __init__(self, path):  # pylint: disable=super-init-not-called
+        LOGGER.debug("Creating LazyFileStat(%r)", path)
+        self.path = ensure_text(path)
+        self.isfile = True
+        self.isdir = False
+
+    def __getattr__(self, name):
+        # only called for attributes which are not set yet
+        if name not in self._STAT_ATTRIBUTES:
+            raise AttributeError(name)
+        self._stat()
+        return getattr(self, name)
+
+
 #.
 #   .--Input---------------------------------------------------------------.
 #   |                      ___                   _                         |
@@ -250,17 +293,149 @@ class FileStat(object):  # pylint: disable=useless-object-inheritance
 #   '----------------------------------------------------------------------'
 
 
+class DirectoryCache(object):  # pylint: disable=useless-object-inheritance
+    """Persistent cache of the directory contents, keyed by the mtime of the directories
+
+    Adding, removing or renaming an entry of a directory changes its mtime, so the cached
+    files and subdirectories of an unchanged directory can be used without listing and
+    stat'ing all of its entries again. Symbolic links (their target may change at any time)
+    and entries which can not be stat'ed are not classified.
+    """
+
+    # Directories modified within this number of seconds before they are listed are not
+    # cached: a modification right after listing them may not change their mtime.
+    RACY_INTERVAL = 2
+
+    def __init__(self, path):
+        super(DirectoryCache, self).__init__()
+        self._path = path
+        self._cache = {}  # type: typing.Dict[str, typing.Any]
+        self._used = {}  # type: typing.Dict[str, typing.Any]
+
+    @staticmethod
+    def _import_json():
+        """The json module is missing on Python 2.5, the cache is not used there"""
+        try:
+            import json  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            try:
+                import simplejson as json  # type: ignore  # pylint: disable=import-outside-toplevel
+            except ImportError:
+                return None
+        return json
+
+    def load(self):
+        json = self._import_json()
+        if json is None:
+            LOGGER.info("not using directory cache %r: json module not available", self._path)
+            return
+        try:
+            with open(self._path) as cache_file:
+                cache = json.load(cache_file)
+        except (IOError, OSError, ValueError) as exc:
+            LOGGER.info("not using directory cache %r: %s", self._path, exc)
+            return
+        if sys.version_info[0] < 3:
+            cache = dict((ensure_str(path), (mtime, [ensure_str(n)
+                                                     for n in names], kinds))
+                         for path, (mtime, names, kinds) in cache.items())
+        self._cache = cache
+
+    def save(self):
+        """Write the directories used in this run"""
+        json = self._import_json()
+        if json is None:
+            return
+        tmp_path = "%s.new" % self._path
+        try:
+            with open(tmp_path, "w") as cache_file:
+                json.dump(self._used, cache_file, separators=(',', ':'))
+            os.rename(tmp_path, self._path)
+        except (IOError, OSError, ValueError, UnicodeError) as exc:
+            LOGGER.warning("cannot save directory cache %r: %s", self._path, exc)
+
+    def _scan(self, path):
+        """Return the entries of a directory and their kinds
+
+        The kind is "f" for files, "d" for directories and "?" for unclassified entries.
+        Like the glob '*', entries starting with a dot are ignored.
+        """
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return [], ""
+
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            LOGGER.debug("using cached contents of %r", path)
+            self._used[path] = cached
+            return cached[1], cached[2]
+
+        LOGGER.debug("scanning %r", path)
+        scan_time = time.time()
+        try:
+            listed_names = os.listdir(path)
+        except OSError:
+            return [], ""
+
+        names, kinds = [], []  # type: typing.Tuple[typing.List[str], typing.List[str]]
+        for name in listed_names:
+            if name.startswith('.'):
+                continue
+            try:
+                mode = os.lstat(os.path.join(path, name)).st_mode
+            except OSError:
+                mode = None
+            if mode is None or S_ISLNK(mode):
+                kind = "?"
+            elif S_ISREG(mode):
+                kind = "f"
+            elif S_ISDIR(mode):
+                kind = "d"
+            else:
+                continue
+            names.append(name)
+            kinds.append(kind)
+
+        entries = names, "".join(kinds)
+        if scan_time - mtime >= self.RACY_INTERVAL:
+            self._used[path] = (mtime,) + entries
+        return entries
+
+    def iter_files(self, path):
+        """Recursively iterate over all files below a directory"""
+        names, kinds = self._scan(path)
+        for name, kind in zip(names, kinds):
+            item = os.path.join(path, name)
+            if kind == "f":
+                yield LazyFileStat(item)
+                continue
+            if kind == "?":
+                filestat = FileStat(item)
+                if filestat.isfile:
+                    yield filestat
+                    continue
+                if not filestat.isdir:
+                    continue
+            for filestat in self.iter_files(item):
+                yield filestat
+
+
 class PatternIterator(object):  # pylint: disable=useless-object-inheritance
     """Recursively iterate over all files"""
-    def __init__(self, pattern_list):
+    def __init__(self, pattern_list, directory_cache=None):
         super(PatternIterator, self).__init__()
         self._patterns = [os.path.abspath(os.path.expanduser(p)) for p in pattern_list]
+        self._directory_cache = directory_cache
 
     def _iter_files(self, pattern):
         for item in glob.iglob(pattern):
             filestat = FileStat(item)
             if filestat.isfile:
                 yield filestat
+            elif filestat.isdir and self._directory_cache is not None:
+                for filestat in self._directory_cache.iter_files(item):
+                    yield filestat
             elif filestat.isdir:
                 for filestat in self._iter_files(os.path.join(item, '*')):
                     yield filestat
@@ -272,7 +447,7 @@ class PatternIterator(object):  # pylint: disable=useless-object-inheritance
                 yield filestat
 
 
-def get_file_iterator(config):
+def get_file_iterator(config, directory_cache=None):
     """get a FileStat iterator"""
     input_specs = [(k[6:], v) for k, v in config.items() if k.startswith('input_')]
     if not input_specs:
@@ -283,7 +458,9 @@ def get_file_iterator(config):
     if variety != "patterns":
         raise ValueError("unknown input type: %r" % variety)
     patterns = shlex.split(spec_string)
-    return PatternIterator(patterns)
+    if not is_enabled(config.get("cache_directories")):
+        directory_cache = None
+    return PatternIterator(patterns, directory_cache)
 
 
 #.
@@ -637,28 +814,101 @@ def iter_config_section_dicts(cfg_file=None):
         yield consolidated_cfg_section_name, parsed_option
 
 
+def process_config_section(config_section_name, config, directory_cache=None):
+    #1 input
+    files_iter = get_file_iterator(config, directory_cache)
+
+    #2 filtering
+    filters = get_file_filters(config)
+    filtered_files = iter_filtered_files(filters, files_iter)
+
+    #3 grouping
+    grouping_conditions = config.get('grouping')
+    grouper = get_grouper(grouping_conditions)
+    groups = grouper(config_section_name, filtered_files, grouping_conditions)
+
+    #4 output
+    output_aggregator = get_output_aggregator(config)
+    return groups, output_aggregator
+
+
+def get_parallel_sections(config_sections):
+    """The number of config sections to process in parallel
+
+    The option is meant to be set in the DEFAULT section, so all sections share it.
+    """
+    values = [config.get("parallel_sections") for _name, config in config_sections]
+    try:
+        return max([int(value) for value in values if value is not None] or [1])
+    except ValueError:
+        raise ValueError("invalid 'parallel_sections' spec: %r" % values)
+
+
+def _collect_section_output(config_section_name, config, directory_cache):
+    try:
+        groups, output_aggregator = process_config_section(config_section_name, config,
+                                                           directory_cache)
+        lines = []
+        for group_name, group_files_iter in groups:
+            lines.extend(output_aggregator(group_name, group_files_iter))
+        return lines, None
+    except Exception as exc:  # pylint: disable=broad-except
+        return None, exc
+
+
+def write_output_parallel(config_sections, num_threads, directory_cache=None):
+    """Process the config sections in threads, write their output in order
+
+    Scanning the file system mostly waits for system calls, which release the GIL.
+    """
+    results = [None] * len(config_sections)  # type: typing.List[typing.Any]
+    pending = list(enumerate(config_sections))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                index, (config_section_name, config) = pending.pop(0)
+            results[index] = _collect_section_output(config_section_name, config, directory_cache)
+
+    threads = [threading.Thread(target=worker) for _ in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for lines, exc in results:
+        if exc is not None:
+            raise exc
+        for line in lines:
+            sys.stdout.write("%s\n" % line)
+
+
 def main():
 
     args = parse_arguments()
 
     sys.stdout.write('<<<filestats:sep(0)>>>\n')
-    for config_section_name, config in iter_config_section_dicts(args['cfg_file']):
-
-        #1 input
-        files_iter = get_file_iterator(config)
+    config_sections = list(iter_config_section_dicts(args['cfg_file']))
 
-        #2 filtering
-        filters = get_file_filters(config)
-        filtered_files = iter_filtered_files(filters, files_iter)
+    directory_cache = None
+    if any(is_enabled(config.get("cache_directories")) for _name, config in config_sections):
+        directory_cache = DirectoryCache(DEFAULT_CACHE_FILE)
+        directory_cache.load()
 
-        #3 grouping
-        grouping_conditions = config.get('grouping')
-        grouper = get_grouper(grouping_conditions)
-        groups = grouper(config_section_name, filtered_files, grouping_conditions)
+    num_threads = min(get_parallel_sections(config_sections), len(config_sections))
+    if num_threads > 1:
+        write_output_parallel(config_sections, num_threads, directory_cache)
+    else:
+        for config_section_name, config in config_sections:
+            groups, output_aggregator = process_config_section(config_section_name, config,
+                                                               directory_cache)
+            write_output(groups, output_aggregator)
 
-        #4 output
-        output_aggregator = get_output_aggregator(config)
-        write_output(groups, output_aggregator)
+    if directory_cache is not None:
+        directory_cache.save()
 
 
 if __name__ == "__main__":
@@ -28,6 +28,7 @@ if sys.version_info < (2, 6):
     sys.exit(1)
 
 import io
+import bisect
 import glob
 import logging
 import os
@@ -78,6 +79,10 @@ TTY_COLORS = {
 
 CONFIG_ERROR_PREFIX = "CANNOT READ CONFIG FILE: "  # detected by check plugin
 
+# Patterns containing one of these constructs may match a single line, but not the same line
+# within a block of lines (or refer to groups by number). They can not be combined to a prefilter.
+PREFILTER_UNSAFE_REGEX = re.compile(r"\\[1-9AZ]|\(\?(?:[=!]|<[=!]|P=|[aiLmsux-]+\))")
+
 PY2 = sys.version_info[0] == 2
 PY3 = sys.version_info[0] == 3
 
@@ -385,11 +390,15 @@ class LogLinesIter(object):  # pylint: disable=useless-object-inheritance
     # this is supposed to become a proper iterator.
     # for now, we need a persistent buffer to fix things
     BLOCKSIZE = 8192
+    # used when lines can be skipped by the prefilter
+    CHUNKSIZE = 1024 * 1024
 
-    def __init__(self, logfile, encoding):
+    def __init__(self, logfile, encoding, prefilter=None):
         super(LogLinesIter, self).__init__()
         self._fd = os.open(logfile, os.O_RDONLY)
         self._lines = []  # List[Text]
+        self._may_match = []  # List[bool]
+        self._index = 0  # index of the next line in self._lines
         self._buffer = b''
         self._reached_end = False  # used for optimization only
         self._enc = encoding or self._get_encoding()
@@ -397,6 +406,11 @@ class LogLinesIter(object):  # pylint: disable=useless-object-inheritance
         # for Windows we need a bit special processing. It is difficult to fit this processing
         # in current architecture smoothly
         self._utf16 = self._enc == "utf_16"
+        # The prefilter is applied to the decoded text of many lines at once, which requires
+        # that the lines are separated by a single b'\n'.
+        self._prefilter = prefilter if self._nl.encode(self._enc) == b'\n' else None
+        self._blocksize = (LogLinesIter.BLOCKSIZE
+                           if self._prefilter is None else LogLinesIter.CHUNKSIZE)
 
     def __enter__(self):
         return self
@@ -438,7 +452,7 @@ class LogLinesIter(object):  # pylint: disable=useless-object-inheritance
         """
         binary_nl = self._nl.encode(self._enc)
         while binary_nl not in self._buffer:
-            new_bytes = os.read(self._fd, LogLinesIter.BLOCKSIZE)
+            new_bytes = os.read(self._fd, self._blocksize)
             if not new_bytes:
                 break
             self._buffer += new_bytes
@@ -446,13 +460,48 @@ class LogLinesIter(object):  # pylint: disable=useless-object-inheritance
         # in case of decoding error, replace with U+FFFD REPLACEMENT CHARACTER
         raw_lines = self._buffer.decode(self._enc, "replace").split(self._nl)
         self._buffer = raw_lines.pop().encode(self._enc)  # unfinished line
-        self._lines.extend(l + self._nl for l in raw_lines)
+        self._lines = [l + self._nl for l in raw_lines]
+        self._may_match = self._find_candidates(raw_lines)
+        self._index = 0
+
+    def _find_candidates(self, raw_lines):
+        """
+        Determine which of the lines may be matched by one of the patterns.
+        Instead of applying the prefilter to each line, it is applied to the text of all
+        lines. Only the lines in which it finds a match have to be checked one by one.
+        """
+        if self._prefilter is None or not raw_lines:
+            return [True] * len(raw_lines)
+
+        may_match = [False] * len(raw_lines)
+        text = self._nl.join(raw_lines)
+        line_starts = []
+        pos = 0
+        for raw_line in raw_lines:
+            line_starts.append(pos)
+            pos += len(raw_line) + 1
+
+        pos = 0
+        while True:
+            match = self._prefilter.search(text, pos)
+            if match is None:
+                break
+            index = bisect.bisect_right(line_starts, match.start()) - 1
+            may_match[index] = True
+            # A match spanning multiple lines must not hide a match in one of the following
+            # lines, so continue with the next line.
+            if index + 1 >= len(line_starts):
+                break
+            pos = line_starts[index + 1]
+        return may_match
 
     def set_position(self, position):
         if position is None:
             return
         self._buffer = b''
         self._lines = []
+        self._may_match = []
+        self._index = 0
         os.lseek(self._fd, position, os.SEEK_SET)
 
     def get_position(self):
@@ -460,29 +509,68 @@ class LogLinesIter(object):  # pylint: disable=useless-object-inheritance
         Return the position where we want to continue next time
         """
         pointer_pos = os.lseek(self._fd, 0, os.SEEK_CUR)
-        bytes_unused = sum((len(l.encode(self._enc)) for l in self._lines), len(self._buffer))
+        bytes_unused = sum((len(l.encode(self._enc)) for l in self._lines[self._index:]),
+                           len(self._buffer))
         return pointer_pos - bytes_unused
 
     def skip_remaining(self):
         os.lseek(self._fd, 0, os.SEEK_END)
         self._buffer = b''
         self._lines = []
+        self._may_match = []
+        self._index = 0
 
     def push_back_line(self, line):
-        self._lines.insert(0, line)
+        if self._index > 0:
+            self._index -= 1
+            self._lines[self._index] = line
+            self._may_match[self._index] = True
+        else:
+            self._lines.insert(0, line)
+            self._may_match.insert(0, True)
 
     def next_line(self):
+        return self.next_line_with_hint()[0]
+
+    def next_line_with_hint(self):
+        """
+        Return the next line and False in case the line is known not to match any pattern.
+        """
         if self._reached_end:  # optimization only
-            return None
+            return None, False
 
-        if not self._lines:
+        if self._index >= len(self._lines):
             self._update_lines()
 
-        if self._lines:
-            return self._lines.pop(0)
+        if self._index < len(self._lines):
+            self._index += 1
+            return self._lines[self._index - 1], self._may_match[self._index - 1]
 
         self._reached_end = True
-        return None
+        return None, False
+
+    def skip_unmatched_lines(self, limit):
+        """
+        Skip up to limit lines, as long as they are known not to match any pattern.
+        Returns the number of skipped lines.
+        """
+        skipped = 0
+        while skipped < limit and not self._reached_end:
+            if self._index >= len(self._lines):
+                self._update_lines()
+                if not self._lines:
+                    break
+
+            end = min(len(self._lines), self._index + limit - skipped)
+            try:
+                end = self._may_match.index(True, self._index, end)
+            except ValueError:
+                pass
+            skipped += end - self._index
+            self._index = end
+            if end < len(self._lines):
+                break
+        return skipped
 
 
 def is_inode_capable(path):
@@ -506,9 +594,12 @@ def process_logfile(section, filestate, debug):
     In case the file has never been seen before returns a list of logfile lines
     and None in case the logfile cannot be opened.
     """
+    # Lines are only truncated after reading them, the prefilter would see the complete line
+    prefilter = section.prefilter if section.options.maxlinesize is None else None
+
     # TODO: Make use of the ContextManager feature of LogLinesIter
     try:
-        log_iter = LogLinesIter(section.name_fs, section.options.encoding)
+        log_iter = LogLinesIter(section.name_fs, section.options.encoding, prefilter)
     except OSError:
         if debug:
             raise
@@ -559,23 +650,35 @@ def process_logfile(section, filestate, debug):
         warnings_and_errors = []
         lines_parsed = 0
         start_time = time.time()
+        # The options are looked up for every line
+        maxlinesize = section.options.maxlinesize
+        maxlines = section.options.maxlines
+        maxtime = section.options.maxtime
+        nocontext = section.options.nocontext
 
         while True:
-            line = log_iter.next_line()
+            skipped = 0
+            if nocontext:
+                # Lines not matching any pattern are not part of the output
+                skipped = log_iter.skip_unmatched_lines(
+                    10000 if maxlines is None else max(0, min(10000, maxlines - lines_parsed)))
+                lines_parsed += skipped
+
+            line, may_match = log_iter.next_line_with_hint()
             if line is None:
                 break  # End of file
 
             # Handle option maxlinesize
-            if section.options.maxlinesize is not None and len(line) > section.options.maxlinesize:
-                line = line[:section.options.maxlinesize] + u"[TRUNCATED]\n"
+            if maxlinesize is not None and len(line) > maxlinesize:
+                line = line[:maxlinesize] + u"[TRUNCATED]\n"
 
             lines_parsed += 1
             # Check if maximum number of new log messages is exceeded
-            if section.options.maxlines is not None and lines_parsed > section.options.maxlines:
+            if maxlines is not None and lines_parsed > maxlines:
                 warnings_and_errors.append(
                     u"%s Maximum number (%d) of new log messages exceeded.\n" % (
                         section.options.overflow,
-                        section.options.maxlines,
+                        maxlines,
                     ))
                 worst = max(worst, section.options.overflow_level)
                 log_iter.skip_remaining()
@@ -583,19 +686,20 @@ def process_logfile(section, filestate, debug):
 
             # Check if maximum processing time (per file) is exceeded. Check only
             # every 100'th line in order to save system calls
-            if section.options.maxtime is not None and lines_parsed % 100 == 10 \
-                    and time.time() - start_time > section.options.maxtime:
+            if maxtime is not None and (skipped or lines_parsed % 100 == 10) \
+                    and time.time() - start_time > maxtime:
                 warnings_and_errors.append(
                     u"%s Maximum parsing time (%.1f sec) of this log file exceeded.\n" % (
                         section.options.overflow,
-                        section.options.maxtime,
+                        maxtime,
                     ))
                 worst = max(worst, section.options.overflow_level)
                 log_iter.skip_remaining()
                 break
 
             level = "."
-            for lev, pattern, cont_patterns, replacements in section.compiled_patterns:
+            for lev, pattern, cont_patterns, replacements in (section.compiled_patterns
+                                                              if may_match else ()):
 
                 matches = pattern.search(line[:-1])
                 if matches:
@@ -636,7 +740,7 @@ def process_logfile(section, filestate, debug):
 
             if level == "I":
                 level = "."
-            if section.options.nocontext and level == '.':
+            if nocontext and level == '.':
                 continue
 
             out_line = "%s %s" % (level, line[:-1])
@@ -874,6 +978,7 @@ class LogfileSection(object):  # pylint: disable=useless-object-inheritance
         self.options = Options()
         self.patterns = []
         self._compiled_patterns = None
+        self._prefilter = False
 
     @property
     def compiled_patterns(self):
@@ -892,6 +997,31 @@ class LogfileSection(object):  # pylint: disable=useless-object-inheritance
         self._compiled_patterns = compiled_patterns
         return self._compiled_patterns
 
+    @property
+    def prefilter(self):
+        """
+        Combine all patterns to a single one, which matches at least all the lines matched
+        by one of the patterns. The lines not matched by it do not need to be checked against
+        each pattern. It is None in case the patterns can not be combined.
+        """
+        if self._prefilter is not False:
+            return self._prefilter
+
+        self._prefilter = None
+        raw_patterns = []
+        for _level, pattern, _cont_list, _rewrite_list in self.compiled_patterns:
+            if pattern.flags & ~re.UNICODE or PREFILTER_UNSAFE_REGEX.search(pattern.pattern):
+                return None
+            raw_patterns.append(u"(?:%s)" % pattern.pattern)
+
+        if raw_patterns:
+            try:
+                self._prefilter = re.compile(u"|".join(raw_patterns), re.UNICODE | re.MULTILINE)
+            except (re.error, AssertionError):
+                # Python 2 raises an AssertionError if there are more than 100 groups
+                pass
+        return self._prefilter
+
 
 def parse_sections(logfiles_config):
     """
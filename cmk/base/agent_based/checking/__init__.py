@@ -199,6 +199,8 @@ def _execute_checkmk_checks(
                 dry_run=dry_run,
                 show_perfdata=show_perfdata,
             )
+            if not dry_run:
+                broker.store_parse_results()
 
             if run_plugin_names is EVERYTHING:
                 inventory.do_inventory_actions_during_checking_for(
@@ -331,8 +333,11 @@ def check_host_services(
     plugins_missing_data: Set[CheckPluginName] = set()
 
     with plugin_contexts.current_host(host_config.hostname):
-        with value_store.load_host_value_store(host_config.hostname,
-                                               store_changes=not dry_run) as value_store_manager:
+        with value_store.load_host_value_store(
+                host_config.hostname,
+                store_changes=not dry_run,
+                shared_store=config.get_shared_value_store(),
+        ) as value_store_manager:
             for service in _filter_services_to_check(
                     services=services,
                     run_plugin_names=run_plugin_names,
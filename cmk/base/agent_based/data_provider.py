@@ -4,6 +4,9 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import logging
+import pickle
+from pathlib import Path
 from typing import (
     Any,
     Dict,
@@ -12,6 +15,7 @@ from typing import (
     Iterator,
     List,
     Mapping,
+    MutableMapping,
     NamedTuple,
     Optional,
     Sequence,
@@ -22,6 +26,7 @@ from typing import (
 
 from cmk.utils.exceptions import OnError
 from cmk.utils.log import console
+import cmk.utils.paths
 import cmk.utils.piggyback
 import cmk.utils.tty as tty
 from cmk.utils.type_defs import (
@@ -68,15 +73,24 @@ class ResolvedResult(NamedTuple):
 
 class SectionsParser:
     """Call the sections parse function and return the parsing result.
+
+    If a `parse_result_store` is given, the results of pure parse functions
+    are reused across check cycles as long as the raw section is unchanged.
+    They are kept pickled, as the check functions may modify the parsed data.
     """
     def __init__(
         self,
         host_sections: HostSections,
+        *,
+        parse_result_store: Optional[cache.ParseResultStore] = None,
     ) -> None:
         super().__init__()
         self._host_sections = host_sections
+        self._parse_result_store = parse_result_store
         self._parsing_errors: List[str] = []
         self._memoized_results: Dict[SectionName, Optional[ParsingResult]] = {}
+        self._stored_parse_results: Optional[MutableMapping[SectionName, Tuple[str, bytes]]] = None
+        self._parse_results_changed = False
 
     def __repr__(self) -> str:
         return "%s(host_sections=%r)" % (type(self).__name__, self._host_sections)
@@ -109,12 +123,58 @@ class SectionsParser:
         for section_name in raw_section_names:
             self._memoized_results[section_name] = None
 
+    def store_parse_results(self) -> None:
+        """Persist the parse results of pure parse functions
+
+        Only the entries of sections present in this run are kept.
+        """
+        if (self._parse_result_store is None or self._stored_parse_results is None or
+                not self._parse_results_changed):
+            return
+
+        self._parse_result_store.store({
+            section_name: entry
+            for section_name, entry in self._stored_parse_results.items()
+            if section_name in self._host_sections.sections
+        })
+        self._parse_results_changed = False
+
     def _parse_raw_data(self, section: SectionPlugin) -> Any:  # yes *ANY*
         try:
             raw_data = self._host_sections.sections[section.name]
         except KeyError:
             return None
 
+        if self._parse_result_store is None or not section.pure_parse_function:
+            return self._call_parse_function(section, raw_data)
+
+        if self._stored_parse_results is None:
+            self._stored_parse_results = self._parse_result_store.load()
+
+        digest = self._parse_result_store.digest(raw_data)
+        stored_digest, stored_result = self._stored_parse_results.get(section.name, ("", b""))
+        if stored_digest == digest:
+            try:
+                return pickle.loads(stored_result)
+            except Exception:
+                # Outdated entry, e.g. a parse result referencing a class that is gone.
+                pass
+
+        parsed = self._call_parse_function(section, raw_data)
+        if parsed is None:
+            return None
+
+        try:
+            pickled = pickle.dumps(parsed)
+        except Exception:
+            # The parse result must be picklable.  We simply do not store it otherwise.
+            self._stored_parse_results.pop(section.name, None)
+        else:
+            self._stored_parse_results[section.name] = (digest, pickled)
+        self._parse_results_changed = True
+        return parsed
+
+    def _call_parse_function(self, section: SectionPlugin, raw_data: Any) -> Any:
         try:
             return section.parse_function(raw_data)
         except Exception:
@@ -283,6 +343,10 @@ class ParsedSectionsBroker(Mapping[HostKey, Tuple[ParsedSectionsResolver, Sectio
             start=[],
         )
 
+    def store_parse_results(self) -> None:
+        for _resolver, parser in self._providers.values():
+            parser.store_parse_results()
+
 
 def _collect_host_sections(
     *,
@@ -401,6 +465,17 @@ def make_broker(
                 agent_based_register.get_section_plugin(section_name)
                 for section_name in host_sections.sections
             ],),
-            SectionsParser(host_sections=host_sections),
+            SectionsParser(
+                host_sections=host_sections,
+                parse_result_store=_make_parse_result_store(host_key),
+            ),
         ) for host_key, host_sections in collected_host_sections.items()
     }), results
+
+
+def _make_parse_result_store(host_key: HostKey) -> cache.ParseResultStore:
+    return cache.ParseResultStore(
+        Path(cmk.utils.paths.var_dir) / "persisted_sections" / "parse_results" /
+        host_key.source_type.name.lower() / host_key.hostname,
+        logger=logging.getLogger("cmk.base"),
+    )
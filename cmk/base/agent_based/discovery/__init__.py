@@ -4,8 +4,10 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
 from contextlib import suppress
 import itertools
+import multiprocessing
 from pathlib import Path
 import socket
 import time
@@ -15,6 +17,7 @@ from typing import (
     Counter,
     Dict,
     Iterable,
+    Iterator,
     List,
     Mapping,
     Optional,
@@ -664,11 +667,22 @@ class _AutodiscoveryQueue:
         except FileNotFoundError:
             return []
 
+    def _ls_by_age(self) -> List[Tuple[float, Path]]:
+        marks = []
+        for file_path in self._ls():
+            with suppress(FileNotFoundError):
+                marks.append((file_path.stat().st_mtime, file_path))
+        return sorted(marks)
+
     def oldest(self) -> Optional[float]:
         return min((f.stat().st_mtime for f in self._ls()), default=None)
 
     def queued_hosts(self) -> Iterable[HostName]:
-        return (self._host_name(f) for f in self._ls())
+        """The queued hosts, the ones waiting for the longest time first"""
+        return (self._host_name(f) for _mtime, f in self._ls_by_age())
+
+    def __len__(self) -> int:
+        return len(self._ls())
 
     def add(self, host_name: HostName) -> None:
         self._dir.mkdir(parents=True, exist_ok=True)
@@ -706,19 +720,42 @@ def discover_marked_hosts(core: MonitoringCore) -> None:
 
     activation_required = False
     rediscovery_reference_time = time.time()
+    num_queued = len(autodiscovery_queue)
+    num_processed = 0
+    console.verbose(f"  {num_queued} hosts queued, the oldest one for "
+                    f"{rediscovery_reference_time - oldest_queued:.0f} seconds\n")
 
     with TimeLimitFilter(limit=120, grace=10, label="hosts") as time_limited:
-        for host_name in time_limited(autodiscovery_queue.queued_hosts()):
-            if host_name not in process_hosts:
-                continue
+        host_names = (host_name for host_name in time_limited(autodiscovery_queue.queued_hosts())
+                      if host_name in process_hosts)
 
-            activation_required |= _discover_marked_host(
+        if config.autodiscovery_max_processes > 1:
+            results: Iterable[bool] = _discover_marked_hosts_concurrently(
+                host_names,
+                max_processes=config.autodiscovery_max_processes,
+                autodiscovery_queue=autodiscovery_queue,
+                reference_time=rediscovery_reference_time,
+                oldest_queued=oldest_queued,
+            )
+        else:
+            results = (_discover_marked_host(
                 config_cache=config_cache,
                 host_config=config_cache.get_host_config(host_name),
                 autodiscovery_queue=autodiscovery_queue,
                 reference_time=rediscovery_reference_time,
                 oldest_queued=oldest_queued,
-            )
+            ) for host_name in host_names)
+
+        for host_activation_required in results:
+            activation_required |= host_activation_required
+            num_processed += 1
+
+    oldest_remaining = autodiscovery_queue.oldest()
+    console.verbose(
+        f"\nProcessed {num_processed} hosts in {time.time() - rediscovery_reference_time:.1f} "
+        f"seconds, {len(autodiscovery_queue)} hosts remaining in queue" +
+        ("" if oldest_remaining is None else
+         f", the oldest one for {time.time() - oldest_remaining:.0f} seconds") + "\n")
 
     if not activation_required:
         return
@@ -741,6 +778,63 @@ def discover_marked_hosts(core: MonitoringCore) -> None:
             config.get_config_cache().initialize()
 
 
+def _discover_marked_hosts_concurrently(
+    host_names: Iterable[HostName],
+    *,
+    max_processes: int,
+    autodiscovery_queue: _AutodiscoveryQueue,
+    reference_time: float,
+    oldest_queued: float,
+) -> Iterator[bool]:
+    """Discover the hosts in a pool of worker processes
+
+    The workers are forked from this process, so they share the already initialized config
+    cache. Hosts are handed out one by one in the given order, which means that the time
+    limit of the caller is checked whenever a worker becomes available. The hosts which are
+    in progress when the time limit is reached are finished before returning.
+    """
+    pending: Set[Future] = set()
+    with ProcessPoolExecutor(
+            max_workers=max_processes,
+            mp_context=multiprocessing.get_context("fork"),
+    ) as executor:
+        try:
+            for host_name in host_names:
+                if len(pending) >= max_processes:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from (future.result() for future in done)
+
+                pending.add(
+                    executor.submit(
+                        _discover_marked_host_by_name,
+                        host_name,
+                        autodiscovery_queue=autodiscovery_queue,
+                        reference_time=reference_time,
+                        oldest_queued=oldest_queued,
+                    ))
+        finally:
+            done, pending = wait(pending)
+            yield from (future.result() for future in done)
+
+
+def _discover_marked_host_by_name(
+    host_name: HostName,
+    *,
+    autodiscovery_queue: _AutodiscoveryQueue,
+    reference_time: float,
+    oldest_queued: float,
+) -> bool:
+    """Entry point of the autodiscovery worker processes"""
+    config_cache = config.get_config_cache()
+    return _discover_marked_host(
+        config_cache=config_cache,
+        host_config=config_cache.get_host_config(host_name),
+        autodiscovery_queue=autodiscovery_queue,
+        reference_time=reference_time,
+        oldest_queued=oldest_queued,
+    )
+
+
 def _get_up_hosts() -> Optional[Set[HostName]]:
     query = "GET hosts\nColumns: name state"
     try:
@@ -1143,7 +1237,11 @@ def get_check_preview(
         on_error,
     )
 
-    with load_host_value_store(host_name, store_changes=False) as value_store_manager:
+    with load_host_value_store(
+            host_name,
+            store_changes=False,
+            shared_store=config.get_shared_value_store(),
+    ) as value_store_manager:
         table = [
             _check_preview_table_row(
                 host_config=host_config,
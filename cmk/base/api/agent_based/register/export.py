@@ -57,6 +57,7 @@ def agent_section(
     host_label_ruleset_name: Optional[str] = None,
     host_label_ruleset_type: RuleSetType = RuleSetType.MERGED,
     supersedes: Optional[List[str]] = None,
+    pure_parse_function: bool = False,
 ) -> None:
     """Register an agent section to checkmk
 
@@ -99,6 +100,10 @@ def agent_section(
                            section will be parsed to something that is not `None` (see above) all
                            superseded section will not be considered at all.
 
+      pure_parse_function: Set this to `True` if the result of the parse function only depends on
+                           its argument and can be pickled. The parsing result of cached sections
+                           will then be reused as long as the raw data does not change.
+
     """
     section_plugin = create_agent_section_plugin(
         name=name,
@@ -109,6 +114,7 @@ def agent_section(
         host_label_ruleset_name=host_label_ruleset_name,
         host_label_ruleset_type=host_label_ruleset_type,
         supersedes=supersedes,
+        pure_parse_function=pure_parse_function,
         module=get_validated_plugin_module_name(),
     )
 
@@ -131,6 +137,7 @@ def snmp_section(
     host_label_ruleset_name: Optional[str] = None,
     host_label_ruleset_type: RuleSetType = RuleSetType.MERGED,
     supersedes: Optional[List[str]] = None,
+    pure_parse_function: bool = False,
 ) -> None:
     pass
 
@@ -148,6 +155,7 @@ def snmp_section(
     host_label_ruleset_name: Optional[str] = None,
     host_label_ruleset_type: RuleSetType = RuleSetType.MERGED,
     supersedes: Optional[List[str]] = None,
+    pure_parse_function: bool = False,
 ) -> None:
     pass
 
@@ -164,6 +172,7 @@ def snmp_section(
     host_label_ruleset_name: Optional[str] = None,
     host_label_ruleset_type: RuleSetType = RuleSetType.MERGED,
     supersedes: Optional[List[str]] = None,
+    pure_parse_function: bool = False,
 ) -> None:
     """Register an snmp section to checkmk
 
@@ -219,6 +228,10 @@ def snmp_section(
                            section will be parsed to something that is not `None` (see above) all
                            superseded section will not be considered at all.
 
+      pure_parse_function: Set this to `True` if the result of the parse function only depends on
+                           its argument and can be pickled. The parsing result of cached sections
+                           will then be reused as long as the raw data does not change.
+
     """
     section_plugin = create_snmp_section_plugin(
         name=name,
@@ -231,6 +244,7 @@ def snmp_section(
         detect_spec=detect,
         fetch=fetch,
         supersedes=supersedes,
+        pure_parse_function=pure_parse_function,
         module=get_validated_plugin_module_name(),
     )
 
@@ -223,6 +223,7 @@ def create_agent_section_plugin(
     host_label_ruleset_name: Optional[str] = None,
     host_label_ruleset_type: RuleSetType = RuleSetType.MERGED,
     supersedes: Optional[List[str]] = None,
+    pure_parse_function: bool = False,
     module: Optional[str] = None,
     validate_creation_kwargs: bool = True,
 ) -> AgentSectionPlugin:
@@ -261,6 +262,7 @@ def create_agent_section_plugin(
                                  if host_label_ruleset_type is RuleSetType.MERGED else "all"),
         supersedes=_create_supersedes(section_name, supersedes),
         module=module,
+        pure_parse_function=pure_parse_function,
     )
 
 
@@ -276,6 +278,7 @@ def create_snmp_section_plugin(
     host_label_ruleset_name: Optional[str] = None,
     host_label_ruleset_type: RuleSetType = RuleSetType.MERGED,
     supersedes: Optional[List[str]] = None,
+    pure_parse_function: bool = False,
     module: Optional[str] = None,
     validate_creation_kwargs: bool = True,
 ) -> SNMPSectionPlugin:
@@ -326,6 +329,7 @@ def create_snmp_section_plugin(
         detect_spec=detect_spec,
         trees=tree_list,
         module=module,
+        pure_parse_function=pure_parse_function,
     )
 
 
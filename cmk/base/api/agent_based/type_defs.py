@@ -129,6 +129,7 @@ class AgentSectionPlugin(NamedTuple):
     host_label_ruleset_type: RuleSetTypeName
     supersedes: Set[SectionName]
     module: Optional[str]  # not available for auto migrated plugins.
+    pure_parse_function: bool = False
 
 
 class SNMPSectionPlugin(NamedTuple):
@@ -143,6 +144,7 @@ class SNMPSectionPlugin(NamedTuple):
     trees: Sequence[SNMPTreeTuple]
     supersedes: Set[SectionName]
     module: Optional[str]  # not available for auto migrated plugins.
+    pure_parse_function: bool = False
 
 
 SectionPlugin = Union[AgentSectionPlugin, SNMPSectionPlugin]
@@ -42,13 +42,21 @@ the check function is called.
 
 .. autoclass:: ValueStoreManager
 
+
+.. autoclass:: SharedValueStore
+
+
+.. autofunction:: get_shared_value_store
+
 """
 
-from ._utils import ValueStoreManager
+from ._utils import get_shared_value_store, SharedValueStore, ValueStoreManager
 from ._global_state import get_value_store, load_host_value_store
 
 __all__ = [
+    "get_shared_value_store",
     "get_value_store",
     "load_host_value_store",
+    "SharedValueStore",
     "ValueStoreManager",
 ]
@@ -12,7 +12,7 @@ from typing import Any, Generator, MutableMapping, Optional
 from cmk.utils.exceptions import MKGeneralException
 from cmk.utils.type_defs import HostName
 
-from ._utils import ValueStoreManager
+from ._utils import SharedValueStore, ValueStoreManager
 
 _active_host_value_store: Optional[ValueStoreManager] = None
 
@@ -37,15 +37,20 @@ def load_host_value_store(
     host_name: HostName,
     *,
     store_changes: bool,
+    shared_store: Optional[SharedValueStore] = None,
 ) -> Generator[ValueStoreManager, None, None]:
-    """Create and load the value store for the host"""
+    """Create and load the value store for the host
+
+    The values are kept in the shared store, if one is given. Otherwise they are kept in
+    one file per host.
+    """
     global _active_host_value_store
 
     pushed_back_store = _active_host_value_store
 
     try:
 
-        _active_host_value_store = ValueStoreManager(host_name)
+        _active_host_value_store = ValueStoreManager(host_name, shared_store=shared_store)
         yield _active_host_value_store
 
         if store_changes:
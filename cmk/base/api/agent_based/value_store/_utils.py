@@ -4,6 +4,9 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import abc
+import atexit
+import sqlite3
 from ast import literal_eval
 from contextlib import contextmanager
 from pathlib import Path
@@ -13,6 +16,7 @@ from typing import (
     Container,
     Dict,
     Final,
+    List,
     Hashable,
     Iterable,
     Iterator,
@@ -68,7 +72,22 @@ class _DynamicDiskSyncedMapping(Dict[_TKey, _TValue]):
         return super().pop(key, *args)
 
 
-class _StaticDiskSyncedMapping(Mapping[_TKey, _TValue]):
+class _StaticMapping(Mapping[_TKey, _TValue]):
+    """Represents the values stored persistently
+
+    The only way to modify the values is the disksync method.
+    """
+    @abc.abstractmethod
+    def disksync(
+            self,
+            *,
+            removed: Container[_TKey] = (),
+            updated: Iterable[Tuple[_TKey, _TValue]] = (),
+    ) -> None:
+        """Write the changes of the stored values"""
+
+
+class _StaticDiskSyncedMapping(_StaticMapping[_TKey, _TValue]):
     """Represents the values stored on disk
 
     This class provides a Mapping-interface for the values stored
@@ -143,6 +162,163 @@ class _StaticDiskSyncedMapping(Mapping[_TKey, _TValue]):
             store.release_lock(self._path)
 
 
+class SharedValueStore:
+    """Keeps the values of all hosts in one SQLite database
+
+    This is an alternative to one file per host, which has to be locked, read and rewritten
+    completely after every check of the host. The database is memory-mapped and written
+    in WAL mode, which is crash-safe without synchronous writes after every transaction.
+
+    The changes made during the check of a host are collected in memory and written in one
+    transaction at the end of the check. Other processes may check the same host next, so
+    pending changes are never kept beyond that: They are also written before the values of
+    another host are loaded, and when the process terminates.
+    """
+    STORAGE_PATH = Path(cmk.utils.paths.counters_dir).parent / "value_stores.sqlite"
+
+    def __init__(self, path: Path) -> None:
+        self._path: Final = path
+        self._connection: Optional[sqlite3.Connection] = None
+        # host name -> key -> repr of the value, None meaning the key has been removed
+        self._pending: Dict[HostName, Dict[_ValueStoreKey, Optional[str]]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(str(self._path), timeout=30, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("PRAGMA mmap_size=268435456")
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS value_stores (
+                host TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (host, key)
+            ) WITHOUT ROWID""")
+        return self._connection
+
+    def close(self) -> None:
+        self.commit()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def load(self, host_name: HostName) -> Dict[_ValueStoreKey, Any]:
+        if self._pending.keys() - {host_name}:
+            self.commit()
+
+        data = {
+            literal_eval(key): literal_eval(value) for key, value in self._connect().execute(
+                "SELECT key, value FROM value_stores WHERE host = ?", (host_name,))
+        }
+        for key, value in self._pending.get(host_name, {}).items():
+            if value is None:
+                data.pop(key, None)
+            else:
+                data[key] = literal_eval(value)
+        return data
+
+    def update(
+            self,
+            host_name: HostName,
+            *,
+            removed: Iterable[_ValueStoreKey] = (),
+            updated: Iterable[Tuple[_ValueStoreKey, Any]] = (),
+    ) -> None:
+        pending = self._pending.setdefault(host_name, {})
+        pending.update((key, None) for key in removed)
+        pending.update((key, repr(value)) for key, value in updated)
+
+    def commit(self) -> None:
+        if not self._pending:
+            return
+
+        removed: List[Tuple[str, str]] = []
+        updated: List[Tuple[str, str, str]] = []
+        for host_name, changes in self._pending.items():
+            for key, value in changes.items():
+                if value is None:
+                    removed.append((host_name, repr(key)))
+                else:
+                    updated.append((host_name, repr(key), value))
+
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany("DELETE FROM value_stores WHERE host = ? AND key = ?", removed)
+            connection.executemany(
+                "INSERT OR REPLACE INTO value_stores (host, key, value) VALUES (?, ?, ?)", updated)
+            connection.execute("COMMIT")
+        except Exception as exc:
+            connection.execute("ROLLBACK")
+            raise MKGeneralException("Cannot write value stores: %s" % exc) from exc
+        self._pending.clear()
+
+    def remove_host(self, host_name: HostName) -> bool:
+        """Remove all values of a host, return whether it had any"""
+        removed = self._pending.pop(host_name, None) is not None
+        if self._path.exists():
+            removed |= self._connect().execute("DELETE FROM value_stores WHERE host = ?",
+                                               (host_name,)).rowcount > 0
+        return removed
+
+
+class _StaticSharedMapping(_StaticMapping[_ValueStoreKey, Any]):
+    """Represents the values of one host stored in the shared value store"""
+    def __init__(
+        self,
+        *,
+        shared_store: SharedValueStore,
+        host_name: HostName,
+        log_debug: Callable[[str], None],
+    ) -> None:
+        self._shared_store: Final = shared_store
+        self._host_name: Final = host_name
+        self._log_debug = log_debug
+        self._log_debug("loading from shared store")
+        self._data: Dict[_ValueStoreKey, Any] = shared_store.load(host_name)
+
+    def __getitem__(self, key: _ValueStoreKey) -> Any:
+        return self._data.__getitem__(key)
+
+    def __iter__(self) -> Iterator[_ValueStoreKey]:
+        return self._data.__iter__()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def disksync(
+            self,
+            *,
+            removed: Container[_ValueStoreKey] = (),
+            updated: Iterable[Tuple[_ValueStoreKey, Any]] = (),
+    ) -> None:
+        removed_keys = [k for k in self._data if k in removed]
+        updated = list(updated)
+        if not removed_keys and not updated:
+            return
+        self._log_debug("writing to shared store")
+        self._shared_store.update(self._host_name, removed=removed_keys, updated=updated)
+        for key in removed_keys:
+            del self._data[key]
+        self._data.update(updated)
+
+
+_shared_value_stores: Dict[Path, SharedValueStore] = {}
+
+
+def get_shared_value_store() -> SharedValueStore:
+    """Return the shared value store of this process
+
+    The pending changes are written when the process terminates.
+    """
+    path = SharedValueStore.STORAGE_PATH
+    if path not in _shared_value_stores:
+        _shared_value_stores[path] = SharedValueStore(path)
+        atexit.register(_shared_value_stores[path].close)
+    return _shared_value_stores[path]
+
+
 class _DiskSyncedMapping(MutableMapping[_TKey, _TValue]):  # pylint: disable=too-many-ancestors
     """Implements the overlay logic between dynamic and static value store"""
     @classmethod
@@ -168,7 +344,7 @@ class _DiskSyncedMapping(MutableMapping[_TKey, _TValue]):  # pylint: disable=too
         self,
         *,
         dynamic: _DynamicDiskSyncedMapping[_TKey, _TValue],
-        static: _StaticDiskSyncedMapping[_TKey, _TValue],
+        static: _StaticMapping[_TKey, _TValue],
     ) -> None:
         self._dynamic = dynamic
         self.static = static
@@ -272,13 +448,30 @@ class ValueStoreManager:
     """
     STORAGE_PATH = Path(cmk.utils.paths.counters_dir)
 
-    def __init__(self, host_name: HostName) -> None:
-        self._value_store: _DiskSyncedMapping[_ValueStoreKey, Any] = _DiskSyncedMapping.make(
-            path=self.STORAGE_PATH / str(host_name),
-            log_debug=lambda x: logger.debug("value store: %s", x),
-            serializer=repr,
-            deserializer=literal_eval,
-        )
+    def __init__(
+        self,
+        host_name: HostName,
+        *,
+        shared_store: Optional[SharedValueStore] = None,
+    ) -> None:
+        self._value_store: _DiskSyncedMapping[_ValueStoreKey, Any]
+        self._shared_store = shared_store
+        if shared_store is None:
+            self._value_store = _DiskSyncedMapping.make(
+                path=self.STORAGE_PATH / str(host_name),
+                log_debug=lambda x: logger.debug("value store: %s", x),
+                serializer=repr,
+                deserializer=literal_eval,
+            )
+        else:
+            self._value_store = _DiskSyncedMapping(
+                dynamic=_DynamicDiskSyncedMapping(),
+                static=_StaticSharedMapping(
+                    shared_store=shared_store,
+                    host_name=host_name,
+                    log_debug=lambda x: logger.debug("value store: %s", x),
+                ),
+            )
         self.active_service_interface: Optional[_ValueStore] = None
 
     @contextmanager
@@ -298,3 +491,5 @@ class ValueStoreManager:
         """Write all current values of this host to disk"""
         if isinstance(self._value_store, _DiskSyncedMapping):
             self._value_store.commit()
+        if self._shared_store is not None:
+            self._shared_store.commit()
@@ -6,7 +6,9 @@
 """Caring about persistance of the discovered services (aka autochecks)"""
 
 from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union, NamedTuple
+import ast
 import logging
+import marshal
 from pathlib import Path
 
 from six import ensure_str
@@ -188,19 +190,40 @@ def _autochecks_path_for(hostname: HostName) -> Path:
     return Path(cmk.utils.paths.autochecks_dir, hostname + ".mk")
 
 
+def _autochecks_cache_path_for(hostname: HostName) -> Path:
+    return Path(cmk.utils.paths.tmp_dir, "autochecks_cache", hostname + ".marshal")
+
+
 def has_autochecks(hostname: HostName) -> bool:
     return _autochecks_path_for(hostname).exists()
 
 
+# Increase this when changing the format of the cached autochecks
+_AUTOCHECKS_CACHE_VERSION = 1
+
+
 def _load_raw_autochecks(
     *,
     path: Path,
     check_variables: Optional[Dict[str, Any]],
 ) -> Union[List[Dict[str, Any]], Tuple]:
-    """Read raw autochecks and resolve parameters"""
-    if not path.exists():
+    """Read raw autochecks and resolve parameters
+
+    Without check variables, the autochecks files are parsed as plain literals. The result is
+    cached in a marshalled file, which is used as long as the autochecks file is not changed.
+    """
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
         return []
 
+    cache_path = _autochecks_cache_path_for(path.stem)
+    cache_key = (_AUTOCHECKS_CACHE_VERSION, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    if check_variables is None:
+        cached = _load_cached_raw_autochecks(cache_path, cache_key)
+        if cached is not None:
+            return cached
+
     logger.debug("Loading autochecks from %s", path)
     with path.open(encoding="utf-8") as f:
         raw_file_content = f.read()
@@ -208,6 +231,14 @@ def _load_raw_autochecks(
     if not raw_file_content.strip():
         return []
 
+    if check_variables is None:
+        try:
+            raw_autochecks = ast.literal_eval(raw_file_content)
+        except ValueError:
+            raise _pre_17_autochecks_error("Reference to a variable or non-literal value", path)
+        _save_cached_raw_autochecks(cache_path, cache_key, raw_autochecks)
+        return raw_autochecks
+
     try:
         # This evaluation was needed to resolve references to variables in the autocheck
         # default parameters and to evaluate data structure declarations containing references to
@@ -215,14 +246,36 @@ def _load_raw_autochecks(
         # Since Checkmk 2.0 we have a better API and need it only for compatibility. The parameters
         # are resolved now *before* they are written to the autochecks file, and earlier autochecks
         # files are resolved during cmk-update-config.
-        return eval(raw_file_content, check_variables or {}, check_variables or {})  # pylint: disable=eval-used
+        return eval(raw_file_content, check_variables, check_variables)  # pylint: disable=eval-used
     except NameError as exc:
-        raise MKGeneralException(
-            "%s in an autocheck entry of host '%s' (%s). This entry is in pre Checkmk 1.7 "
-            "format and needs to be converted. This is normally done by "
-            "\"cmk-update-config -v\" during \"omd update\". Please execute "
-            "\"cmk-update-config -v\" for converting the old configuration." %
-            (str(exc).capitalize(), path.stem, path))
+        raise _pre_17_autochecks_error(str(exc).capitalize(), path)
+
+
+def _pre_17_autochecks_error(problem: str, path: Path) -> MKGeneralException:
+    return MKGeneralException(
+        "%s in an autocheck entry of host '%s' (%s). This entry is in pre Checkmk 1.7 "
+        "format and needs to be converted. This is normally done by "
+        "\"cmk-update-config -v\" during \"omd update\". Please execute "
+        "\"cmk-update-config -v\" for converting the old configuration." %
+        (problem, path.stem, path))
+
+
+def _load_cached_raw_autochecks(cache_path: Path, cache_key: Tuple) -> Optional[Any]:
+    try:
+        cached_key, raw_autochecks = marshal.loads(store.load_bytes_from_file(cache_path))
+    except Exception:
+        # Missing, outdated or broken: Will be replaced
+        return None
+    return raw_autochecks if cached_key == cache_key else None
+
+
+def _save_cached_raw_autochecks(cache_path: Path, cache_key: Tuple, raw_autochecks: Any) -> None:
+    try:
+        content = marshal.dumps((cache_key, raw_autochecks))
+    except ValueError:
+        return  # not marshallable, should not happen with literals
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    store.save_bytes_to_file(cache_path, content)
 
 
 def parse_autochecks_file(
@@ -408,10 +461,11 @@ def save_autochecks_file(
 
 
 def remove_autochecks_file(hostname: HostName) -> None:
-    try:
-        _autochecks_path_for(hostname).unlink()
-    except OSError:
-        pass
+    for path in [_autochecks_path_for(hostname), _autochecks_cache_path_for(hostname)]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
 
 
 def remove_autochecks_of_host(hostname: HostName, remove_hostname: HostName,
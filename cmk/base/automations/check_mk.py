@@ -67,6 +67,7 @@ from cmk.core_helpers import factory
 from cmk.core_helpers.type_defs import Mode, NO_SELECTION
 
 import cmk.base.api.agent_based.register as agent_based_register
+from cmk.base.api.agent_based import value_store
 import cmk.base.agent_based.checking as checking
 import cmk.base.agent_based.discovery as discovery
 import cmk.base.check_api as check_api
@@ -438,6 +439,16 @@ class AutomationRenameHosts(Automation):
         if self._rename_host_dir(var_dir + "/inventory_archive", oldname, newname):
             actions.append("invarch")
 
+        # Stored parse results of the sections, per data source
+        parse_results_dir = var_dir + "/persisted_sections/parse_results/"
+        have_renamed_parse_results = False
+        if os.path.exists(parse_results_dir):
+            for source_type in os.listdir(parse_results_dir):
+                if self._rename_host_file(parse_results_dir + source_type, oldname, newname):
+                    have_renamed_parse_results = True
+        if have_renamed_parse_results:
+            actions.append("parse-results")
+
         # Baked agents
         baked_agents_dir = var_dir + "/agents/"
         have_renamed_agent = False
@@ -814,6 +825,10 @@ class AutomationDeleteHosts(Automation):
         ]:
             self._delete_if_exists(path)
 
+        shared_value_store = value_store.SharedValueStore(value_store.SharedValueStore.STORAGE_PATH)
+        shared_value_store.remove_host(hostname)
+        shared_value_store.close()
+
         try:
             ds_directories = os.listdir(data_source_cache_dir)
         except OSError as e:
@@ -826,6 +841,11 @@ class AutomationDeleteHosts(Automation):
             filename = "%s/%s/%s" % (data_source_cache_dir, data_source_name, hostname)
             self._delete_if_exists(filename)
 
+        parse_results_dir = var_dir + "/persisted_sections/parse_results/"
+        if os.path.exists(parse_results_dir):
+            for source_type in os.listdir(parse_results_dir):
+                self._delete_if_exists("%s%s/%s" % (parse_results_dir, source_type, hostname))
+
         # softlinks for baked agents. obsolete packages are removed upon next bake action
         # TODO: Move to bakery code
         baked_agents_dir = var_dir + "/agents/"
@@ -105,6 +105,7 @@ import cmk.core_helpers.config_path
 from cmk.core_helpers.config_path import LATEST_CONFIG, ConfigPath
 
 import cmk.base.api.agent_based.register as agent_based_register
+from cmk.base.api.agent_based import value_store
 import cmk.base.autochecks as autochecks
 import cmk.base.check_utils
 import cmk.base.default_config as default_config
@@ -1288,6 +1289,13 @@ def get_service_translations(hostname: HostName) -> cmk.utils.translations.Trans
     return translations
 
 
+def get_shared_value_store() -> Optional[value_store.SharedValueStore]:
+    """The shared value store of this process, if the value stores are not kept in files"""
+    if value_store_backend != "shared":
+        return None
+    return value_store.get_shared_value_store()
+
+
 def get_http_proxy(http_proxy: Tuple[str, str]) -> Optional[str]:
     """Returns proxy URL to be used for HTTP requests
 
@@ -6,10 +6,14 @@
 """Code for support of Nagios (and compatible) cores"""
 
 import base64
+import itertools
+import multiprocessing
 import os
 import py_compile
+import re
 import socket
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from io import StringIO
 from pathlib import Path
 from typing import Any, Dict, IO, Iterable, List, Optional, Set, Tuple, Union
@@ -62,6 +66,13 @@ CHECK_INFO_BY_MIGRATED_NAME = {
     k: config.check_info[v] for k, v in config.legacy_check_plugin_names.items()
 }
 
+# Hosts and host checks are only processed in worker processes if there are at least this
+# many of them per process
+_MIN_HOSTS_PER_PROCESS = 100
+
+_HOSTCHECK_COMMAND_OF_HOST = re.compile(
+    r"^(define host \{\n(?:  .*\n)*?  check_command +)(check-mk-host-custom-\d+)$", re.MULTILINE)
+
 
 class NagiosCore(core_config.MonitoringCore):
     @classmethod
@@ -122,8 +133,40 @@ class NagiosConfig:
         # TODO: Something seems to be mixed up in our call sites...
         self._outfile.write(ensure_str(x))
 
+    def add_hostcheck_command(self, command_line: str) -> CoreCommand:
+        command = "check-mk-host-custom-%d" % (len(self.hostcheck_commands_to_define) + 1)
+        self.hostcheck_commands_to_define.append((command, command_line))
+        return command
+
+    def merge(self, other: "NagiosConfig") -> None:
+        """Append the objects written to and the definitions needed by another configuration
 
-def create_config(outfile: IO[str], hostnames: Optional[List[HostName]]) -> None:
+        The other configuration has to be written to a StringIO. Its custom host check commands
+        are renumbered to continue the numbering of this configuration."""
+        assert isinstance(other._outfile, StringIO)
+        objects = other._outfile.getvalue()
+
+        renamed = {
+            command_name: self.add_hostcheck_command(command_line)
+            for command_name, command_line in other.hostcheck_commands_to_define
+        }
+        if any(old != new for old, new in renamed.items()):
+            objects = _HOSTCHECK_COMMAND_OF_HOST.sub(
+                lambda m: m.group(1) + renamed.get(m.group(2), m.group(2)), objects)
+        self.write(objects)
+
+        self.hostgroups_to_define.update(other.hostgroups_to_define)
+        self.servicegroups_to_define.update(other.servicegroups_to_define)
+        self.contactgroups_to_define.update(other.contactgroups_to_define)
+        self.checknames_to_define.update(other.checknames_to_define)
+        self.active_checks_to_define.update(other.active_checks_to_define)
+        self.custom_commands_to_define.update(other.custom_commands_to_define)
+
+
+def create_config(outfile: IO[str],
+                  hostnames: Optional[List[HostName]],
+                  *,
+                  max_processes: Optional[int] = None) -> None:
     if config.host_notification_periods != []:
         core_config.warning(
             "host_notification_periods is not longer supported. Please use extra_host_conf['notification_period'] instead."
@@ -152,8 +195,13 @@ def create_config(outfile: IO[str], hostnames: Optional[List[HostName]]) -> None
 
     _output_conf_header(cfg)
 
-    for hostname in sorted(hostnames):
-        _create_nagios_config_host(cfg, config_cache, hostname)
+    _create_nagios_config_hosts(
+        cfg,
+        config_cache,
+        sorted(hostnames),
+        max(1,
+            multiprocessing.cpu_count() - 1) if max_processes is None else max_processes,
+    )
 
     _create_nagios_config_contacts(cfg, hostnames)
     _create_nagios_config_hostgroups(cfg)
@@ -175,6 +223,41 @@ def _output_conf_header(cfg: NagiosConfig) -> None:
 """)
 
 
+def _create_nagios_config_hosts(cfg: NagiosConfig, config_cache: ConfigCache,
+                                hostnames: List[HostName], max_processes: int) -> None:
+    """Creates the objects of the hosts and their services in a pool of worker processes
+
+    The workers are forked from this process, so they share the already loaded configuration.
+    Each worker creates the objects of a consecutive part of the hosts. The parts are merged in
+    the order of the hosts, which results in the same configuration as creating them here."""
+    processes = min(max_processes, len(hostnames) // _MIN_HOSTS_PER_PROCESS)
+    if processes <= 1:
+        for hostname in hostnames:
+            _create_nagios_config_host(cfg, config_cache, hostname)
+        return
+
+    chunk_size = -(-len(hostnames) // (processes * 4))
+    chunks = [hostnames[i:i + chunk_size] for i in range(0, len(hostnames), chunk_size)]
+    with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("fork"),
+    ) as executor:
+        for part, warnings in executor.map(_create_nagios_config_hosts_in_worker, chunks):
+            cfg.merge(part)
+            # The warnings have already been shown by the worker
+            core_config.g_configuration_warnings.extend(warnings)
+
+
+def _create_nagios_config_hosts_in_worker(
+        hostnames: List[HostName]) -> Tuple[NagiosConfig, core_config.ConfigurationWarnings]:
+    core_config.initialize_warnings()
+    config_cache = config.get_config_cache()
+    cfg = NagiosConfig(StringIO(), hostnames)
+    for hostname in hostnames:
+        _create_nagios_config_host(cfg, config_cache, hostname)
+    return cfg, core_config.g_configuration_warnings
+
+
 def _create_nagios_config_host(cfg: NagiosConfig, config_cache: ConfigCache,
                                hostname: HostName) -> None:
     cfg.write("\n# ----------------------------------------------------\n")
@@ -216,21 +299,17 @@ def _create_nagios_host_spec(cfg: NagiosConfig, config_cache: ConfigCache, hostn
             host_spec[key] = value
 
     def host_check_via_service_status(service: ServiceName) -> CoreCommand:
-        command = "check-mk-host-custom-%d" % (len(cfg.hostcheck_commands_to_define) + 1)
         service_with_hostname = replace_macros_in_str(
             service,
             {'$HOSTNAME$': host_config.hostname},
         )
-        cfg.hostcheck_commands_to_define.append((
-            command,
+        return cfg.add_hostcheck_command(
             'echo "$SERVICEOUTPUT:%s:%s$" && exit $SERVICESTATEID:%s:%s$' % (
                 host_config.hostname,
                 service_with_hostname,
                 host_config.hostname,
                 service_with_hostname,
-            ),
-        ),)
-        return command
+            ))
 
     def host_check_via_custom_check(command_name: CoreCommandName,
                                     command: CoreCommand) -> CoreCommand:
@@ -724,7 +803,7 @@ def _create_nagios_config_commands(cfg: NagiosConfig) -> None:
         cfg.write("\n# ------------------------------------------------------------\n")
         cfg.write("# Dummy check commands and active check commands\n")
         cfg.write("# ------------------------------------------------------------\n\n")
-        for checkname in cfg.checknames_to_define:
+        for checkname in sorted(cfg.checknames_to_define):
             cfg.write(
                 _format_nagios_object(
                     "command", {
@@ -733,7 +812,7 @@ def _create_nagios_config_commands(cfg: NagiosConfig) -> None:
                     }))
 
     # active_checks
-    for acttype in cfg.active_checks_to_define:
+    for acttype in sorted(cfg.active_checks_to_define):
         act_info = config.active_check_info[acttype]
         cfg.write(
             _format_nagios_object(
@@ -743,7 +822,7 @@ def _create_nagios_config_commands(cfg: NagiosConfig) -> None:
                 }))
 
     # custom_checks
-    for command_name in cfg.custom_commands_to_define:
+    for command_name in sorted(cfg.custom_commands_to_define):
         cfg.write(
             _format_nagios_object("command", {
                 "command_name": command_name,
@@ -972,7 +1051,8 @@ class HostCheckStore:
         console.verbose(" ==> %s.\n", compiled_filename, stream=sys.stderr)
 
 
-def _precompile_hostchecks(config_path: VersionedConfigPath) -> None:
+def _precompile_hostchecks(config_path: VersionedConfigPath,
+                           max_processes: Optional[int] = None) -> None:
     console.verbose("Creating precompiled host check config...\n")
     config_cache = config.get_config_cache()
 
@@ -980,32 +1060,62 @@ def _precompile_hostchecks(config_path: VersionedConfigPath) -> None:
 
     console.verbose("Precompiling host checks...\n")
 
-    host_check_store = HostCheckStore()
-    for hostname in config_cache.all_active_hosts():
-        try:
-            console.verbose(
-                "%s%s%-16s%s:",
-                tty.bold,
-                tty.blue,
-                hostname,
-                tty.normal,
-                stream=sys.stderr,
-            )
-            host_check = _dump_precompiled_hostcheck(
-                config_cache,
-                config_path,
-                hostname,
-            )
-            if host_check is None:
-                console.verbose("(no Checkmk checks)\n")
-                continue
+    hostnames = sorted(config_cache.all_active_hosts())
+    if max_processes is None:
+        max_processes = max(1, multiprocessing.cpu_count() - 1)
+    processes = min(max_processes, len(hostnames) // _MIN_HOSTS_PER_PROCESS)
+    if processes <= 1:
+        for hostname in hostnames:
+            try:
+                _precompile_hostcheck(config_path, hostname)
+            except Exception as e:
+                _handle_precompile_error(hostname, e)
+        return
+
+    # The workers are forked from this process, so they share the already loaded configuration.
+    # The results are consumed in the order of the hosts to report the same error as above.
+    with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("fork"),
+    ) as executor:
+        results = executor.map(_precompile_hostcheck,
+                               itertools.repeat(config_path),
+                               hostnames,
+                               chunksize=max(1,
+                                             len(hostnames) // (processes * 4)))
+        for hostname in hostnames:
+            try:
+                next(results)
+            except Exception as e:
+                _handle_precompile_error(hostname, e)
+
+
+def _precompile_hostcheck(config_path: VersionedConfigPath, hostname: HostName) -> None:
+    console.verbose(
+        "%s%s%-16s%s:",
+        tty.bold,
+        tty.blue,
+        hostname,
+        tty.normal,
+        stream=sys.stderr,
+    )
+    host_check = _dump_precompiled_hostcheck(
+        config.get_config_cache(),
+        config_path,
+        hostname,
+    )
+    if host_check is None:
+        console.verbose("(no Checkmk checks)\n")
+        return
+
+    HostCheckStore().write(config_path, hostname, host_check)
+
 
-            host_check_store.write(config_path, hostname, host_check)
-        except Exception as e:
-            if cmk.utils.debug.enabled():
-                raise
-            console.error("Error precompiling checks for host %s: %s\n" % (hostname, e))
-            sys.exit(5)
+def _handle_precompile_error(hostname: HostName, e: Exception) -> None:
+    if cmk.utils.debug.enabled():
+        raise e
+    console.error("Error precompiling checks for host %s: %s\n" % (hostname, e))
+    sys.exit(5)
 
 
 def _dump_precompiled_hostcheck(
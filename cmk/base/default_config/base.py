@@ -46,10 +46,12 @@ fake_dns: _Optional[str] = None
 agent_simulator = False
 perfdata_format = "pnp"  # also possible: "standard"
 check_mk_perfdata_with_times = True
+value_store_backend = "files"  # also possible: "shared"
 # TODO: Remove these options?
 debug_log = False  # deprecated
 monitoring_host = None  # deprecated
 max_num_processes = 50
+autodiscovery_max_processes = 1  # number of hosts discovered in parallel by --discover-marked-hosts
 fallback_agent_output_encoding = 'latin-1'
 stored_passwords: _Dict = {}
 # Collection of predefined rule conditions. For the moment this setting is only stored
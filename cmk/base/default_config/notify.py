@@ -4,7 +4,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
-from typing import Any as _Any, Dict as _Dict, List as _List, Union as _Union
+from typing import Any as _Any, Dict as _Dict, List as _List, Tuple as _Tuple, Union as _Union
 
 import cmk.utils.version as cmk_version
 
@@ -38,6 +38,17 @@ if cmk_version.is_raw_edition():
 else:
     notification_spooling = "local"
 
+# How notifications for the asynchronous local delivery are spooled
+# "files" - One spool file per notification, delivered by the notification spooler
+# "queue" - Queue in var/check_mk/notify/queue.sqlite, delivered by "cmk --notify spooler"
+notification_spool_backend = "files"
+# Number of worker processes of "cmk --notify spooler", per notification plugin
+notification_spooler_default_workers = 4
+notification_spooler_plugin_workers: _List[_Tuple[str, int]] = []
+# Failed deliveries (plugin exit code 1) are retried with an exponential backoff
+notification_spooler_max_attempts = 10
+notification_spooler_retry_interval = 60
+
 # Legacy setting. The spool target is now specified in the
 # configuration of the spooler. notification_spool_to has
 # the tuple format (remote_host, tcp_port, also_local)
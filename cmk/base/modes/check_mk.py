@@ -61,6 +61,7 @@ from cmk.core_helpers.type_defs import Mode as FetchMode
 from cmk.core_helpers.type_defs import NO_SELECTION, SectionNameCollection
 
 import cmk.base.api.agent_based.register as agent_based_register
+from cmk.base.api.agent_based import value_store
 import cmk.base.backup
 import cmk.base.check_utils
 import cmk.base.config as config
@@ -76,6 +77,7 @@ import cmk.base.localize
 import cmk.base.obsolete_output as out
 import cmk.base.packaging
 import cmk.base.parent_scan
+import cmk.base.prediction
 import cmk.base.profiling as profiling
 from cmk.base.api.agent_based.type_defs import SNMPSectionPlugin
 from cmk.base.core_factory import create_core
@@ -788,6 +790,51 @@ modes.register(
         short_help="Cleanup outdated piggyback files",
     ))
 
+#.
+#   .--compute-predictions-------------------------------------------------.
+#   |                                       _  _        _                  |
+#   |                _ __   _ __   ___   __| |(_)  ___ | |_                |
+#   |               | '_ \ | '__| / _ \ / _` || | / __|| __|               |
+#   |               | |_) || |   |  __/| (_| || || (__ | |_                |
+#   |               | .__/ |_|    \___| \__,_||_| \___| \__|               |
+#   |               |_|                                                    |
+#   '----------------------------------------------------------------------'
+
+
+def mode_compute_predictions(options: Dict) -> None:
+    with store.try_locked(Path(cmk.utils.paths.var_dir, "prediction.lock")) as locked:
+        if not locked:
+            console.verbose("Predictions are already being computed\n")
+            return
+        num_computed = cmk.base.prediction.compute_requested_predictions(
+            workers=options.get("workers", 4))
+    console.verbose("Computed %d predictions\n" % num_computed)
+
+
+modes.register(
+    Mode(
+        long_option="compute-predictions",
+        handler_function=mode_compute_predictions,
+        needs_config=False,
+        needs_checks=False,
+        short_help="Compute the predictions requested by predictive levels",
+        long_help=[
+            "Checks with predictive levels request a new prediction when the time group "
+            "changes (e.g. at midnight) and keep using their previous one until it has been "
+            "computed by this mode. The predictions of several services are computed in "
+            "parallel. This mode is executed by cron every minute.",
+        ],
+        sub_options=[
+            Option(
+                long_option="workers",
+                argument=True,
+                argument_descr="N",
+                argument_conv=int,
+                short_help="Compute up to N predictions in parallel. Defaults to 4.",
+            ),
+        ],
+    ))
+
 #.
 #   .--scan-parents--------------------------------------------------------.
 #   |                                                         _            |
@@ -1013,6 +1060,12 @@ def mode_flush(hosts: List[HostName]) -> None:
         except OSError:
             pass
 
+        shared_value_store = value_store.SharedValueStore(value_store.SharedValueStore.STORAGE_PATH)
+        if shared_value_store.remove_host(host) and not flushed:
+            out.output(tty.bold + tty.blue + " counters")
+            flushed = True
+        shared_value_store.close()
+
         # cache files
         d = 0
         cache_dir = cmk.utils.paths.tcp_cache_dir
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Queue based asynchronous delivery of notifications
+
+Instead of writing one spool file per notification, the notifications for the asynchronous
+local delivery can be stored in a SQLite database. "cmk --notify spooler" delivers them with a
+pool of worker processes per notification plugin. The retry state (number of attempts, time of
+the next attempt and the last error) of failed deliveries is kept in the queue.
+"""
+
+import json
+import logging
+import multiprocessing
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional
+
+NotificationPluginNameStr = str
+PluginContext = Dict[str, str]
+
+# Exit codes of notification plugins
+_DELIVERED = 0
+_TEMPORARY_ERROR = 1
+
+QueueEntry = NamedTuple("QueueEntry", [
+    ("entry_id", int),
+    ("plugin", Optional[NotificationPluginNameStr]),
+    ("context", PluginContext),
+    ("attempts", int),
+])
+
+
+class NotificationQueue:
+    """Persistent queue of notifications waiting for their (next) delivery attempt
+
+    The queue may be accessed by several processes at once: the notification processes add
+    notifications while the spooler delivers them. A notification is claimed by the spooler
+    while it is being delivered. Claims of a crashed spooler expire after stale_after seconds.
+    """
+    def __init__(self, path: Path, *, stale_after: float = 3600.0) -> None:
+        super().__init__()
+        self._path = path
+        self._stale_after = stale_after
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            # Autocommit mode: Only claim() needs a transaction spanning multiple statements
+            self._connection = sqlite3.connect(str(self._path), timeout=30, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS notifications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                plugin TEXT,
+                context TEXT NOT NULL,
+                created REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL,
+                claimed REAL,
+                last_error TEXT
+            )""")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS notifications_due ON notifications (next_attempt)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS notifications_plugin_due"
+                                     " ON notifications (plugin, next_attempt)")
+        return self._connection
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def enqueue(self,
+                plugin: Optional[NotificationPluginNameStr],
+                context: PluginContext,
+                now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        self._connect().execute(
+            "INSERT INTO notifications (plugin, context, created, next_attempt)"
+            " VALUES (?, ?, ?, ?)", (plugin, json.dumps(context), now, now))
+
+    def claim(
+        self,
+        limit: int,
+        now: Optional[float] = None,
+        *,
+        plugin_limits: Optional[Mapping[Optional[NotificationPluginNameStr], int]] = None
+    ) -> List[QueueEntry]:
+        """Take the notifications which are due for delivery, the oldest ones first
+
+        At most limit notifications are taken per plugin, unless plugin_limits specifies another
+        number for the plugin. The notifications of the plugins without a limit left stay in
+        the queue.
+        """
+        now = time.time() if now is None else now
+        plugin_limits = plugin_limits or {}
+        due = "next_attempt <= ? AND (claimed IS NULL OR claimed < ?)"
+        due_args = (now, now - self._stale_after)
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            plugins = connection.execute("SELECT DISTINCT plugin FROM notifications WHERE " + due,
+                                         due_args).fetchall()
+            rows = []
+            for plugin, in plugins:
+                plugin_limit = plugin_limits.get(plugin, limit)
+                if plugin_limit <= 0:
+                    continue
+                rows += connection.execute(
+                    "SELECT id, plugin, context, attempts, next_attempt FROM notifications"
+                    " WHERE plugin IS ? AND " + due + " ORDER BY next_attempt, id LIMIT ?",
+                    (plugin,) + due_args + (plugin_limit,)).fetchall()
+            connection.executemany("UPDATE notifications SET claimed = ? WHERE id = ?",
+                                   [(now, row[0]) for row in rows])
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        rows.sort(key=lambda row: (row[4], row[0]))
+        return [
+            QueueEntry(entry_id, plugin, json.loads(context), attempts)
+            for entry_id, plugin, context, attempts, _next_attempt in rows
+        ]
+
+    def remove(self, entry_id: int) -> None:
+        self._connect().execute("DELETE FROM notifications WHERE id = ?", (entry_id,))
+
+    def defer(self, entry_id: int, next_attempt: float, error: str) -> None:
+        """Release a claimed notification for another delivery attempt"""
+        self._connect().execute(
+            "UPDATE notifications SET attempts = attempts + 1, next_attempt = ?, claimed = NULL,"
+            " last_error = ? WHERE id = ?", (next_attempt, error, entry_id))
+
+    def statistics(self, now: Optional[float] = None) -> Dict[str, float]:
+        now = time.time() if now is None else now
+        queued, due, deferred, oldest = self._connect().execute(
+            "SELECT COUNT(*), SUM(next_attempt <= ?), SUM(attempts > 0), MIN(created)"
+            " FROM notifications", (now,)).fetchone()
+        return {
+            "queued": queued,
+            "due": due or 0,
+            "deferred": deferred or 0,
+            "oldest_age": 0.0 if oldest is None else now - oldest,
+        }
+
+
+class SpoolerStatistics:
+    def __init__(self) -> None:
+        super().__init__()
+        self.started = time.time()
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+        self.delivered_per_plugin: Dict[str, int] = {}
+        self.duration_per_plugin: Dict[str, float] = {}
+
+    def add(self, plugin: str, exitcode: int, duration: float) -> None:
+        self.duration_per_plugin[plugin] = self.duration_per_plugin.get(plugin, 0.0) + duration
+        if exitcode == _DELIVERED:
+            self.delivered += 1
+            self.delivered_per_plugin[plugin] = self.delivered_per_plugin.get(plugin, 0) + 1
+
+    def throughput(self) -> float:
+        """Delivered notifications per second"""
+        return self.delivered / max(time.time() - self.started, 0.001)
+
+    def to_dict(self) -> Dict:
+        return {
+            "started": self.started,
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "failed": self.failed,
+            "throughput": self.throughput(),
+            "delivered_per_plugin": self.delivered_per_plugin,
+            "duration_per_plugin": self.duration_per_plugin,
+        }
+
+
+class NotificationSpooler:
+    """Deliver the queued notifications using a pool of worker processes per plugin
+
+    The workers are forked from the current process and call deliver(plugin, context), which
+    returns the exit code of the notification plugin: 0 means delivered, 1 is a temporary
+    error (the delivery is retried later on) and any other code a permanent error.
+    """
+    def __init__(
+        self,
+        queue: NotificationQueue,
+        *,
+        deliver: Callable[[Optional[NotificationPluginNameStr], PluginContext], int],
+        logger: logging.Logger,
+        default_workers: int = 4,
+        plugin_workers: Optional[Mapping[str, int]] = None,
+        max_attempts: int = 10,
+        retry_interval: float = 60.0,
+        max_retry_interval: float = 3600.0,
+        poll_interval: float = 1.0,
+    ) -> None:
+        super().__init__()
+        self._queue = queue
+        self._deliver = deliver
+        self._logger = logger
+        self._default_workers = default_workers
+        self._plugin_workers = plugin_workers or {}
+        self._max_attempts = max_attempts
+        self._retry_interval = retry_interval
+        self._max_retry_interval = max_retry_interval
+        self._poll_interval = poll_interval
+        self._executors: Dict[str, ProcessPoolExecutor] = {}
+        self.statistics = SpoolerStatistics()
+
+    def _workers(self, plugin: str) -> int:
+        return self._plugin_workers.get(plugin, self._default_workers)
+
+    def _executor(self, plugin: str) -> ProcessPoolExecutor:
+        if plugin not in self._executors:
+            self._executors[plugin] = ProcessPoolExecutor(
+                max_workers=self._workers(plugin),
+                mp_context=multiprocessing.get_context("fork"),
+            )
+        return self._executors[plugin]
+
+    def _claim_limits(
+        self,
+        running: Mapping[Future, QueueEntry],
+    ) -> Dict[Optional[NotificationPluginNameStr], int]:
+        """Number of notifications to claim per plugin
+
+        Each plugin gets up to two notifications per worker, so that a backlog of a slow plugin
+        does not hold back the notifications of the other plugins.
+        """
+        limits: Dict[Optional[NotificationPluginNameStr], int] = {
+            plugin: 2 * workers for plugin, workers in self._plugin_workers.items()
+        }
+        for entry in running.values():
+            limits[entry.plugin] = limits.get(entry.plugin,
+                                              2 * self._workers(entry.plugin or "")) - 1
+        return limits
+
+    def run(self, *, idle_timeout: float = 0.0) -> SpoolerStatistics:
+        """Deliver notifications until the queue has been idle for idle_timeout seconds
+
+        Notifications which have been deferred to a later time do not keep the spooler busy.
+        """
+        running: Dict[Future, QueueEntry] = {}
+        started: Dict[int, float] = {}
+        idle_since = time.time()
+        try:
+            while True:
+                # Keep a limited number of notifications per worker in the executors, so that
+                # the retries and newly queued notifications are handled in order
+                for entry in self._queue.claim(2 * self._default_workers,
+                                               plugin_limits=self._claim_limits(running)):
+                    executor = self._executor(entry.plugin or "")
+                    future = executor.submit(self._deliver, entry.plugin, entry.context)
+                    running[future] = entry
+                    started[entry.entry_id] = time.time()
+
+                if running:
+                    done, _not_done = wait(running,
+                                           timeout=self._poll_interval,
+                                           return_when=FIRST_COMPLETED)
+                    for future in done:
+                        entry = running.pop(future)
+                        self._finished(entry, future, time.time() - started.pop(entry.entry_id))
+                    idle_since = time.time()
+                    continue
+
+                if time.time() - idle_since >= idle_timeout:
+                    return self.statistics
+                time.sleep(self._poll_interval)
+        finally:
+            for executor in self._executors.values():
+                executor.shutdown(wait=True)
+            self._executors.clear()
+
+    def _finished(self, entry: QueueEntry, future: Future, duration: float) -> None:
+        plugin = entry.plugin or ""
+        try:
+            exitcode = future.result()
+        except Exception as e:
+            self._logger.error("Delivery of notification %d via %s crashed: %s", entry.entry_id,
+                               plugin or "plain email", e)
+            exitcode = _TEMPORARY_ERROR
+
+        self.statistics.add(plugin, exitcode, duration)
+        if exitcode == _DELIVERED:
+            self._queue.remove(entry.entry_id)
+            return
+
+        attempts = entry.attempts + 1
+        if exitcode == _TEMPORARY_ERROR and attempts < self._max_attempts:
+            retry_in = min(self._retry_interval * 2**entry.attempts, self._max_retry_interval)
+            self._logger.info(
+                "Delivery of notification %d via %s failed temporarily (attempt %d), "
+                "retrying in %d seconds", entry.entry_id, plugin or "plain email", attempts,
+                retry_in)
+            self.statistics.retried += 1
+            self._queue.defer(entry.entry_id, time.time() + retry_in, "exit code %d" % exitcode)
+            return
+
+        self._logger.error("Delivery of notification %d via %s failed (exit code %d), giving up",
+                           entry.entry_id, plugin or "plain email", exitcode)
+        self.statistics.failed += 1
+        self._queue.remove(entry.entry_id)
@@ -19,20 +19,38 @@
 import io
 import logging
 import os
+from pathlib import Path
 import re
+import runpy
 import signal
 import subprocess
 import sys
 import time
-from typing import Dict, Tuple, List, Any, Optional, FrozenSet, Set, Union, cast, Mapping
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+    cast,
+)
 import traceback
 import uuid
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
 
 from six import ensure_str
 
 import livestatus
 import cmk.utils.debug
 import cmk.utils.log as log
+from cmk.utils.caching import config_cache as _config_cache
 from cmk.utils.macros import replace_macros_in_str
 from cmk.utils.notify import (
     find_wato_folder,
@@ -58,6 +76,7 @@ import cmk.base.core
 import cmk.base.events as events
 import cmk.base.obsolete_output as out
 from cmk.base.events import EventContext
+from cmk.base.notification_spooler import NotificationQueue, NotificationSpooler
 
 try:
     import cmk.base.cee.keepalive as keepalive
@@ -84,6 +103,8 @@ NotifyAnalysisInfo = Tuple[List[NotifyRuleInfo], List[NotifyPluginInfo]]
 UUIDs = List[Tuple[float, str]]
 NotifyBulk = Tuple[str, float, Union[None, str, int], Union[None, str, int], int, UUIDs]
 NotifyBulks = List[NotifyBulk]
+# Bulk directory (relative to notification_bulkdir) -> notifications in this bulk
+NotifyBulkIndex = Dict[str, UUIDs]
 
 NotificationPluginNameStr = str
 PluginContext = Dict[str, str]
@@ -118,6 +139,10 @@ Notifications = Dict[NotificationKey, NotificationValue]
 notification_logdir = cmk.utils.paths.var_dir + "/notify"
 notification_spooldir = cmk.utils.paths.var_dir + "/notify/spool"
 notification_bulkdir = cmk.utils.paths.var_dir + "/notify/bulk"
+notification_bulk_index = notification_bulkdir + "/.index.mk"
+notification_bulk_index_rescan_interval = 600  # seconds
+notification_queue = cmk.utils.paths.var_dir + "/notify/queue.sqlite"
+notification_spooler_status = cmk.utils.paths.var_dir + "/notify/spooler_status.mk"
 notification_log = cmk.utils.paths.log_dir + "/notify.log"
 
 notification_log_template = \
@@ -203,6 +228,8 @@ Available commands:
     replay N                Uses the N'th recent notification from the backlog
                             and sends it again, counting from 0.
     send-bulks              Send out ripe bulk notifications
+    spooler                 Deliver the notifications from the notification
+                            queue (see notification_spool_backend)
 """)
 
 
@@ -228,7 +255,7 @@ def do_notify(options: Dict[str, bool], args: List[str]) -> Optional[int]:
         notify_mode = 'notify'
         if args:
             notify_mode = args[0]
-            if notify_mode not in ['stdin', 'spoolfile', 'replay', 'send-bulks']:
+            if notify_mode not in ['stdin', 'spoolfile', 'replay', 'send-bulks', 'spooler']:
                 console.error("ERROR: Invalid call to check_mk --notify.\n\n")
                 notify_usage()
                 sys.exit(1)
@@ -258,6 +285,8 @@ def do_notify(options: Dict[str, bool], args: List[str]) -> Optional[int]:
             notify_notify(events.raw_context_from_string(sys.stdin.read()))
         elif notify_mode == "send-bulks":
             send_ripe_bulks()
+        elif notify_mode == "spooler":
+            run_notification_spooler()
         else:
             notify_notify(raw_context_from_env(os.environ))
 
@@ -468,7 +497,18 @@ def notify_rulebased(raw_context: EventContext, analyse: bool = False) -> Notify
     num_rule_matches = 0
     rule_info = []
 
-    for rule in config.notification_rules + user_notification_rules():
+    rule_index = notification_rule_index()
+    candidates = rule_index.candidates(raw_context)
+    if analyse:
+        # Evaluate all rules to be able to tell the user why a rule did not match
+        rules = rule_index.rules
+        logger.info("Rule index: %d of %d rules pruned, %d candidates",
+                    len(rules) - len(candidates), len(rules), len(candidates))
+        candidate_ids = {id(rule) for rule in candidates}
+    else:
+        rules = candidates
+
+    for rule in rules:
         contact_info = _get_contact_info_text(rule)
 
         why_not = rbn_match_rule(rule, raw_context)
@@ -479,6 +519,8 @@ def notify_rulebased(raw_context: EventContext, analyse: bool = False) -> Notify
         else:
             logger.info(contact_info)
             logger.info(" -> matches!")
+            if analyse and id(rule) not in candidate_ids:
+                logger.warning(" -> rule has been pruned by the rule index, but matches")
             num_rule_matches += 1
 
             notifications, rule_info = _create_notifications(raw_context, rule, notifications,
@@ -489,6 +531,116 @@ def notify_rulebased(raw_context: EventContext, analyse: bool = False) -> Notify
     return rule_info, plugin_info
 
 
+class _RuleIndexDimension:
+    """Maps the values of one event attribute to the rules which may match them"""
+    def __init__(self) -> None:
+        super().__init__()
+        self._unrestricted: Set[int] = set()
+        self._restricted: Set[int] = set()
+        self._by_value: Dict[Hashable, Set[int]] = {}
+
+    def add(self, rule_id: int, values: Optional[Iterable[Hashable]]) -> None:
+        """Register a rule, values=None means the rule matches all values"""
+        if values is None:
+            self._unrestricted.add(rule_id)
+            return
+        self._restricted.add(rule_id)
+        for value in values:
+            self._by_value.setdefault(value, set()).add(rule_id)
+
+    def candidates(self, values: Optional[Iterable[Hashable]]) -> Set[int]:
+        """The rules matching one of the values, values=None means the value is unknown"""
+        if values is None:
+            return self._unrestricted | self._restricted
+        candidates = set(self._unrestricted)
+        for value in values:
+            candidates.update(self._by_value.get(value, ()))
+        return candidates
+
+
+class NotificationRuleIndex:
+    """Preselects the notification rules which may match an event
+
+    Only conditions which can be looked up cheaply are indexed: the event type, explicit host
+    names, contact groups, Event Console notifications and host/service labels. The candidate
+    rules still have to be checked with rbn_match_rule(), but all other rules are known not to
+    match and need not be evaluated.
+    """
+    def __init__(self, rules: List[EventRule]) -> None:
+        super().__init__()
+        self.rules = rules
+        self._enabled = {rule_id for rule_id, rule in enumerate(rules) if not rule.get("disabled")}
+        self._what = _RuleIndexDimension()
+        self._hosts = _RuleIndexDimension()
+        self._contactgroups = _RuleIndexDimension()
+        self._event_console = _RuleIndexDimension()
+        self._hostlabels = _RuleIndexDimension()
+        self._servicelabels = _RuleIndexDimension()
+
+        for rule_id, rule in enumerate(rules):
+            self._what.add(rule_id, self._rule_what(rule))
+            self._hosts.add(rule_id, rule.get("match_hosts"))
+            self._contactgroups.add(rule_id, rule.get("match_contactgroups"))
+            self._event_console.add(
+                rule_id, None if "match_ec" not in rule else [rule["match_ec"] is not False])
+            self._hostlabels.add(rule_id, self._rule_label(rule, "host"))
+            self._servicelabels.add(rule_id, self._rule_label(rule, "service"))
+
+    @staticmethod
+    def _rule_what(rule: EventRule) -> Optional[List[str]]:
+        if "match_services" in rule:
+            return ["SERVICE"]
+        if "match_host_event" in rule and "match_service_event" not in rule:
+            return ["HOST"]
+        if "match_service_event" in rule and "match_host_event" not in rule:
+            return ["SERVICE"]
+        return None
+
+    @staticmethod
+    def _rule_label(rule: EventRule, what: str) -> Optional[List[Tuple[str, str]]]:
+        # All labels of the rule are required, so it is enough to index one of them
+        labels = rule.get("match_%slabels" % what)
+        if not labels:
+            return None
+        return [sorted(labels.items())[0]]
+
+    @staticmethod
+    def _context_labels(context: EventContext, what: str) -> List[Tuple[str, str]]:
+        prefix = "%sLABEL_" % what.upper()
+        return [(variable[len(prefix):], value)
+                for variable, value in context.items()
+                if variable.startswith(prefix)]
+
+    def candidates(self, context: EventContext) -> List[EventRule]:
+        """The rules which may match the event, in the order of configuration"""
+        if context["WHAT"] == "SERVICE":
+            contactgroups = context.get("SERVICECONTACTGROUPNAMES")
+        else:
+            contactgroups = context.get("HOSTCONTACTGROUPNAMES")
+
+        rule_ids = self._enabled
+        for dimension, values in [
+            (self._what, [context["WHAT"]]),
+            (self._hosts, [context["HOSTNAME"]]),
+            (self._contactgroups, None if contactgroups is None else contactgroups.split(",")),
+            (self._event_console, ["EC_ID" in context]),
+            (self._hostlabels, self._context_labels(context, "host")),
+            (self._servicelabels, self._context_labels(context, "service")),
+        ]:
+            rule_ids = rule_ids & dimension.candidates(values)
+        return [self.rules[rule_id] for rule_id in sorted(rule_ids)]
+
+
+def notification_rule_index() -> NotificationRuleIndex:
+    """The index of the global and the user notification rules, built once per configuration"""
+    cache = _config_cache.get("notification_rule_index")
+    if "index" not in cache:
+        rules = config.notification_rules + user_notification_rules()
+        cache["index"] = NotificationRuleIndex(rules)
+        logger.debug("Built notification rule index for %d rules", len(rules))
+    return cache["index"]
+
+
 def _get_contact_info_text(rule: EventRule) -> str:
     if "contact" in rule:
         return "User %s's rule '%s'..." % (rule["contact"], rule["description"])
@@ -1107,24 +1259,32 @@ def rbn_groups_contacts(groups: List[str]) -> Set[str]:
     if not groups:
         return set()
 
-    query = "GET contactgroups\nColumns: members\n"
+    members = _contactgroup_members()
+    contacts: Set[ContactName] = set()
     for group in groups:
-        query += "Filter: name = %s\n" % group
-    query += "Or: %d\n" % len(groups)
+        contacts.update(members.get(group, []))
+    return contacts
 
-    try:
-        contacts: Set[ContactName] = set()
-        for contact_list in livestatus.LocalConnection().query_column(query):
-            contacts.update(contact_list)
-        return contacts
 
+def _contactgroup_members() -> Dict[str, List[ContactName]]:
+    """The members of all contact groups, fetched once per configuration"""
+    cache = _config_cache.get("contactgroup_members")
+    if "members" in cache:
+        return cache["members"]
+
+    try:
+        members = dict(livestatus.LocalConnection().query("GET contactgroups\n"
+                                                          "Columns: name members\n"))
     except livestatus.MKLivestatusNotFoundError:
-        return set()
+        return {}
 
     except Exception:
         if cmk.utils.debug.enabled():
             raise
-        return set()
+        return {}
+
+    cache["members"] = members
+    return members
 
 
 def rbn_emails_contacts(emails: List[str]) -> List[str]:
@@ -1579,6 +1739,16 @@ def clear_notification_timeout() -> None:
 
 
 def create_spoolfile(data: Any) -> None:
+    # Notifications to be forwarded are always handed over to the spooler (mknotifyd) by file
+    if "plugin" in data and config.notification_spool_backend == "queue":
+        logger.info("Adding notification to queue: %s", notification_queue)
+        queue = NotificationQueue(Path(notification_queue))
+        try:
+            queue.enqueue(data["plugin"], data["context"])
+        finally:
+            queue.close()
+        return
+
     if not os.path.exists(notification_spooldir):
         os.makedirs(notification_spooldir)
     file_path = "%s/%s" % (notification_spooldir, fresh_uuid())
@@ -1620,6 +1790,122 @@ def handle_spoolfile(spoolfile: str) -> int:
         return 2
 
 
+def run_notification_spooler() -> None:
+    """Deliver the notifications from the queue
+
+    Only one spooler may run at a time. It terminates after being idle for almost a minute, so
+    it can be started by cron every minute.
+    """
+    with store.try_locked(notification_queue + ".lock") as locked:
+        if not locked:
+            logger.info("Notification spooler is already running")
+            return
+
+        queue = NotificationQueue(Path(notification_queue),
+                                  stale_after=2 * config.notification_plugin_timeout)
+        spooler = NotificationSpooler(
+            queue,
+            deliver=_deliver_queued_notification,
+            logger=logger,
+            default_workers=config.notification_spooler_default_workers,
+            plugin_workers=dict(config.notification_spooler_plugin_workers),
+            max_attempts=config.notification_spooler_max_attempts,
+            retry_interval=config.notification_spooler_retry_interval,
+        )
+        try:
+            statistics = spooler.run(idle_timeout=50)
+            queue_statistics = queue.statistics()
+        finally:
+            queue.close()
+
+    logger.info(
+        "Notification spooler: %d delivered (%.1f/s), %d retried, %d failed. "
+        "Queue: %d notifications (%d deferred), oldest %.0f seconds", statistics.delivered,
+        statistics.throughput(), statistics.retried, statistics.failed, queue_statistics["queued"],
+        queue_statistics["deferred"], queue_statistics["oldest_age"])
+    store.save_object_to_file(notification_spooler_status, {
+        "spooler": statistics.to_dict(),
+        "queue": queue_statistics,
+    })
+
+
+def _deliver_queued_notification(plugin_name: Optional[NotificationPluginNameStr],
+                                 plugin_context: PluginContext) -> int:
+    """Executed in the worker processes of the notification spooler"""
+    logger.info("----------------------------------------------------------------------")
+    logger.info("Got queued notification (%s) for local delivery via %s",
+                events.find_host_service_in_context(plugin_context), (plugin_name or "plain mail"))
+    if plugin_name and (path := _python_notification_script(plugin_name)):
+        return _call_notification_script_in_process(plugin_name, path, plugin_context)
+    return call_notification_script(plugin_name, plugin_context)
+
+
+def _python_notification_script(plugin_name: NotificationPluginNameStr) -> Optional[str]:
+    """Path of a shipped notification script implemented in cmk.notification_plugins
+
+    These scripts can be executed in the process of the spooler worker, which saves starting
+    a new Python interpreter and importing the plugin for every notification."""
+    path = path_to_notification_script(plugin_name)
+    if path is None or Path(path).parent != cmk.utils.paths.notifications_dir:
+        return None
+    try:
+        with open(path, encoding="utf-8") as script:
+            source = script.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+    if not source.startswith("#!/usr/bin/env python3") or \
+       "from cmk.notification_plugins" not in source:
+        return None
+    return path
+
+
+def _call_notification_script_in_process(plugin_name: NotificationPluginNameStr, path: str,
+                                         plugin_context: PluginContext) -> int:
+    """Like call_notification_script(), but without starting a new process"""
+    _log_to_history(
+        notification_message(NotificationPluginName(plugin_name),
+                             NotificationContext(plugin_context)))
+
+    def plugin_log(s: str) -> None:
+        logger.info("     %s", s)
+
+    plugin_log("executing %s in process" % path)
+    output = io.StringIO()
+    environ = os.environ.copy()
+    os.environ.clear()
+    os.environ.update(notification_script_env(plugin_context))
+    try:
+        set_notification_timeout()
+        with redirect_stdout(output), redirect_stderr(output):
+            runpy.run_path(path, run_name="__main__")
+        exitcode = 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            exitcode = e.code or 0
+        else:
+            output.write("%s\n" % e.code)
+            exitcode = 1
+    except NotificationTimeout:
+        plugin_log("Notification plugin did not finish within %d seconds. Terminating." %
+                   config.notification_plugin_timeout)
+        exitcode = 1
+    except Exception:
+        output.write(traceback.format_exc())
+        exitcode = 1
+    finally:
+        clear_notification_timeout()
+        os.environ.clear()
+        os.environ.update(environ)
+
+    for line in output.getvalue().splitlines():
+        plugin_log("Output: %s" % line.rstrip())
+
+    if exitcode != 0:
+        plugin_log("Plugin exited with code %d" % exitcode)
+
+    return exitcode
+
+
 #.
 #   .--Bulk-Notifications--------------------------------------------------.
 #   |                         ____        _ _                              |
@@ -1728,6 +2014,12 @@ def do_bulk_notify(plugin_name: NotificationPluginNameStr, params: NotifyPluginP
     os.rename(filename + ".new", filename)  # We need an atomic creation!
     logger.info("        - stored in %s", filename)
 
+    entry = (os.stat(filename).st_mtime, notify_uuid)
+    with _update_bulk_index() as index:
+        uuids = index.setdefault(os.path.relpath(bulk_dirname, notification_bulkdir), [])
+        if entry not in uuids:  # Already there in case the index has just been created
+            uuids.append(entry)
+
 
 def create_bulk_dirname(bulk_path: List[str]) -> str:
     dirname = os.path.join(notification_bulkdir, bulk_path[0], bulk_path[1],
@@ -1804,14 +2096,18 @@ def remove_if_orphaned(bulk_dir: str, max_age: float, ref_time: Optional[float]
             logger.info("    -> Error removing it: %s", e)
 
 
-def find_bulks(only_ripe: bool) -> NotifyBulks:
-    if not os.path.exists(notification_bulkdir):
-        return []
+def scan_bulks() -> NotifyBulkIndex:
+    """Collect the bulked notifications from the bulk directories
 
+    This is needed in case the bulk index does not exist yet or has to be rebuilt. Empty bulk
+    directories are removed on the way."""
     def listdir_visible(path: str) -> List[str]:
         return [x for x in os.listdir(path) if not x.startswith(".")]
 
-    bulks: NotifyBulks = []
+    index: NotifyBulkIndex = {}
+    if not os.path.exists(notification_bulkdir):
+        return index
+
     now = time.time()
     for contact in listdir_visible(notification_bulkdir):
         contact_dir = os.path.join(notification_bulkdir, contact)
@@ -1820,63 +2116,109 @@ def find_bulks(only_ripe: bool) -> NotifyBulks:
             for bulk in listdir_visible(method_dir):
                 bulk_dir = os.path.join(method_dir, bulk)
 
-                uuids, oldest = bulk_uuids(bulk_dir)
+                uuids, _oldest = bulk_uuids(bulk_dir)
                 if not uuids:
                     remove_if_orphaned(bulk_dir, max_age=60, ref_time=now)
                     continue
-                age = now - oldest
+                index[os.path.relpath(bulk_dir, notification_bulkdir)] = uuids
+    return index
 
-                # e.g. 60,10,host,localhost OR timeperiod:late_night,1000,host,localhost
-                parts = bulk_parts(method_dir, bulk)
-                if parts is None:
-                    continue
-                interval, timeperiod, count = parts
 
-                if interval is not None:
-                    if age >= interval:
-                        logger.info("Bulk %s is ripe: age %d >= %d", bulk_dir, age, interval)
-                    elif len(uuids) >= count:
-                        logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, len(uuids), count)
-                    else:
-                        logger.info("Bulk %s is not ripe yet (age: %d, count: %d)!", bulk_dir, age,
-                                    len(uuids))
-                        if only_ripe:
-                            continue
+def _bulk_index_outdated(stored: Optional[Dict[str, Any]]) -> bool:
+    return (stored is None or
+            time.time() - stored.get("scan_time", 0) > notification_bulk_index_rescan_interval)
 
-                    bulks.append((bulk_dir, age, interval, 'n.a.', count, uuids))
-                else:
-                    try:
-                        active = cmk.base.core.timeperiod_active(str(timeperiod))
-                    except Exception:
-                        # This prevents sending bulk notifications if a
-                        # livestatus connection error appears. It also implies
-                        # that an ongoing connection error will hold back bulk
-                        # notifications.
-                        logger.info(
-                            "Error while checking activity of timeperiod %s: assuming active",
+
+def _load_bulk_index() -> NotifyBulkIndex:
+    stored = store.load_object_from_file(notification_bulk_index, default=None)
+    if _bulk_index_outdated(stored):
+        with _update_bulk_index() as index:
+            return index
+    return stored["bulks"]
+
+
+@contextmanager
+def _update_bulk_index() -> Iterator[NotifyBulkIndex]:
+    """Keeps the bulk index locked while it is being modified
+
+    The index is updated by all notification processes adding notifications to bulks and the
+    process sending the ripe bulks. It is rebuilt from the bulk directories every
+    notification_bulk_index_rescan_interval seconds. This way it does not drift away from the
+    files in case a process crashed between writing a notification and updating the index or
+    in case the files have been changed manually."""
+    try:
+        stored = store.load_object_from_file(notification_bulk_index, default=None, lock=True)
+        if _bulk_index_outdated(stored):
+            logger.info("Rebuilding bulk index %s", notification_bulk_index)
+            stored = {"scan_time": time.time(), "bulks": scan_bulks()}
+        yield stored["bulks"]
+        store.save_object_to_file(notification_bulk_index, stored)
+    finally:
+        store.release_lock(notification_bulk_index)
+
+
+def find_bulks(only_ripe: bool) -> NotifyBulks:
+    if not os.path.exists(notification_bulkdir):
+        return []
+
+    bulks: NotifyBulks = []
+    now = time.time()
+    for bulk_path, uuids in sorted(_load_bulk_index().items()):
+        if not uuids:
+            continue
+
+        bulk_dir = os.path.join(notification_bulkdir, bulk_path)
+        method_dir, bulk = os.path.split(bulk_dir)
+        age = now - min(uuids)[0]
+
+        # e.g. 60,10,host,localhost OR timeperiod:late_night,1000,host,localhost
+        parts = bulk_parts(method_dir, bulk)
+        if parts is None:
+            continue
+        interval, timeperiod, count = parts
+
+        if interval is not None:
+            if age >= interval:
+                logger.info("Bulk %s is ripe: age %d >= %d", bulk_dir, age, interval)
+            elif len(uuids) >= count:
+                logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, len(uuids), count)
+            else:
+                logger.info("Bulk %s is not ripe yet (age: %d, count: %d)!", bulk_dir, age,
+                            len(uuids))
+                if only_ripe:
+                    continue
+
+            bulks.append((bulk_dir, age, interval, 'n.a.', count, sorted(uuids)))
+        else:
+            try:
+                active = cmk.base.core.timeperiod_active(str(timeperiod))
+            except Exception:
+                # This prevents sending bulk notifications if a
+                # livestatus connection error appears. It also implies
+                # that an ongoing connection error will hold back bulk
+                # notifications.
+                logger.info("Error while checking activity of timeperiod %s: assuming active",
                             timeperiod)
-                        active = True
-
-                    if active is True and len(uuids) < count:
-                        # Only add a log entry every 10 minutes since timeperiods
-                        # can be very long (The default would be 10s).
-                        if now % 600 <= config.notification_bulk_interval:
-                            logger.info(
-                                "Bulk %s is not ripe yet (timeperiod %s: active, count: %d)",
+                active = True
+
+            if active is True and len(uuids) < count:
+                # Only add a log entry every 10 minutes since timeperiods
+                # can be very long (The default would be 10s).
+                if now % 600 <= config.notification_bulk_interval:
+                    logger.info("Bulk %s is not ripe yet (timeperiod %s: active, count: %d)",
                                 bulk_dir, timeperiod, len(uuids))
 
-                        if only_ripe:
-                            continue
-                    elif active is False:
-                        logger.info("Bulk %s is ripe: timeperiod %s has ended", bulk_dir,
-                                    timeperiod)
-                    elif len(uuids) >= count:
-                        logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, len(uuids), count)
-                    else:
-                        logger.info("Bulk %s is ripe: timeperiod %s is not known anymore", bulk_dir,
-                                    timeperiod)
+                if only_ripe:
+                    continue
+            elif active is False:
+                logger.info("Bulk %s is ripe: timeperiod %s has ended", bulk_dir, timeperiod)
+            elif len(uuids) >= count:
+                logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, len(uuids), count)
+            else:
+                logger.info("Bulk %s is ripe: timeperiod %s is not known anymore", bulk_dir,
+                            timeperiod)
 
-                    bulks.append((bulk_dir, age, 'n.a.', timeperiod, count, uuids))
+            bulks.append((bulk_dir, age, 'n.a.', timeperiod, count, sorted(uuids)))
     return bulks
 
 
@@ -1955,13 +2297,20 @@ def notify_bulk(dirname: str, uuids: UUIDs) -> None:
         logger.info("No valid notification file left. Skipping this bulk.")
 
     # Remove sent notifications
-    for mtime, notify_uuid in uuids:
-        if (mtime, notify_uuid) not in unhandled_uuids:
-            path = os.path.join(dirname, notify_uuid)
-            try:
-                os.remove(path)
-            except Exception as e:
-                logger.info("Cannot remove %s: %s", path, e)
+    sent_uuids = [entry for entry in uuids if entry not in unhandled_uuids]
+    for _mtime, notify_uuid in sent_uuids:
+        path = os.path.join(dirname, notify_uuid)
+        try:
+            os.remove(path)
+        except Exception as e:
+            logger.info("Cannot remove %s: %s", path, e)
+
+    with _update_bulk_index() as index:
+        bulk_path = os.path.relpath(dirname, notification_bulkdir)
+        sent = set(sent_uuids)
+        remaining = [entry for entry in index.pop(bulk_path, []) if entry not in sent]
+        if remaining:
+            index[bulk_path] = remaining
 
     # Repeat with unhandled uuids (due to different parameters)
     if unhandled_uuids:
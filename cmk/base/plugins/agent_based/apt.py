@@ -78,4 +78,5 @@ def parse_apt(string_table: StringTable) -> Optional[Section]:
 register.agent_section(
     name="apt",
     parse_function=parse_apt,
+    pure_parse_function=True,
 )
@@ -78,6 +78,7 @@ def check_zypper(params: Mapping[str, Any], section: Section) -> CheckResult:
 register.agent_section(
     name="zypper",
     parse_function=parse_zypper,
+    pure_parse_function=True,
 )
 
 register.check_plugin(
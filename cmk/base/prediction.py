@@ -9,6 +9,7 @@ import json
 import logging
 import math
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import (
     Callable,
     Final,
@@ -27,13 +28,14 @@ from cmk.utils.prediction import (
     DataStats,
     Timestamp,
     Timegroup,
+    TimeSeries,
     TimeSeriesValues,
     Seconds,
     TimeWindow,
-    RRDColumnFunction,
     PredictionData,
     PredictionInfo,
     PredictionParameters as _PredictionParameters,
+    PredictionRequest,
     PredictionStore,
     ConsolidationFunctionName,
     EstimatedLevels,
@@ -44,6 +46,10 @@ logger = logging.getLogger("cmk.prediction")
 _GroupByFunction = Callable[[Timestamp], Tuple[Timegroup, Timestamp]]
 _TimeSlices = List[Tuple[Timestamp, Timestamp]]
 
+# A check uses its previous prediction while waiting for "cmk --compute-predictions". It computes
+# the prediction itself if the request has not been handled within this time.
+_PREDICTION_REQUEST_TIMEOUT: Final = 900
+
 
 class _PeriodInfo(NamedTuple):
     slice: int
@@ -150,14 +156,15 @@ def _time_slices(
     return slices
 
 
-def _retrieve_grouped_data_from_rrd(
-    rrd_column: RRDColumnFunction,
+def _upsample_slices(
+    timeseries: List[TimeSeries],
     time_windows: _TimeSlices,
+    vectorized: bool = False,
 ) -> Tuple[TimeWindow, List[TimeSeriesValues]]:
-    "Collect all time slices and up-sample them to same resolution"
+    "Up-sample the time series of all time slices to the same resolution"
     from_time = time_windows[0][0]
 
-    slices = [(rrd_column(start, end), from_time - start) for start, end in time_windows]
+    slices = [(ts, from_time - start) for ts, (start, _end) in zip(timeseries, time_windows)]
 
     # The resolutions of the different time ranges differ. We upsample
     # to the best resolution. We assume that the youngest slice has the
@@ -166,7 +173,9 @@ def _retrieve_grouped_data_from_rrd(
     if twindow[2] == 0:
         raise MKGeneralException("Got no historic metrics")
 
-    return twindow, [ts.bfill_upsample(twindow, shift) for ts, shift in slices]
+    return twindow, [
+        ts.bfill_upsample(twindow, shift, vectorized=vectorized) for ts, shift in slices
+    ]
 
 
 def _data_stats(slices: List[TimeSeriesValues]) -> DataStats:
@@ -190,14 +199,52 @@ def _data_stats(slices: List[TimeSeriesValues]) -> DataStats:
     return descriptors
 
 
+def _data_stats_vectorized(slices: List[TimeSeriesValues]) -> DataStats:
+    """Same as _data_stats, but computed with NumPy
+
+    Used for the batch computation of predictions, where importing NumPy pays off.
+    """
+    import numpy  # pylint: disable=import-outside-toplevel
+
+    num_points = min(len(s) for s in slices)
+    values = numpy.array([s[:num_points] for s in slices], dtype=float)  # None -> nan
+    valid = ~numpy.isnan(values)
+    samples = valid.sum(axis=0)
+    filled = numpy.where(valid, values, 0.0)
+
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        average = filled.sum(axis=0) / samples
+        stdev = numpy.where(
+            samples == 1,
+            numpy.abs(average),
+            numpy.sqrt(numpy.abs((filled**2).sum(axis=0) - average**2 * samples) / (samples - 1)),
+        )
+    minimum = numpy.where(valid, values, numpy.inf).min(axis=0)
+    maximum = numpy.where(valid, values, -numpy.inf).max(axis=0)
+
+    return [[stat[1], stat[2], stat[3], stat[4]] if stat[0] else [None, None, None, None]
+            for stat in zip(
+                samples.tolist(),
+                average.tolist(),
+                minimum.tolist(),
+                maximum.tolist(),
+                stdev.tolist(),
+            )]
+
+
 def _calculate_data_for_prediction(
     time_windows: _TimeSlices,
-    rrd_datacolumn: RRDColumnFunction,
+    timeseries: List[TimeSeries],
+    vectorized: bool = False,
 ) -> PredictionData:
-    twindow, slices = _retrieve_grouped_data_from_rrd(rrd_datacolumn, time_windows)
+    twindow, slices = _upsample_slices(timeseries, time_windows, vectorized)
+    return _prediction_data(
+        twindow,
+        _data_stats_vectorized(slices) if vectorized else _data_stats(slices),
+    )
 
-    descriptors = _data_stats(slices)
 
+def _prediction_data(twindow: TimeWindow, descriptors: DataStats) -> PredictionData:
     return PredictionData(
         columns=["average", "min", "max", "stdev"],
         points=descriptors,
@@ -207,6 +254,43 @@ def _calculate_data_for_prediction(
     )
 
 
+def _compute_prediction(
+    request: PredictionRequest,
+    now: int,
+    vectorized: bool = False,
+) -> Tuple[PredictionInfo, PredictionData]:
+    """Compute the prediction of the current time group
+
+    The data of all time slices is fetched with a single Livestatus query. The vectorized
+    computation with NumPy is used for the batch computation, where importing NumPy pays off."""
+    period_info = _PREDICTION_PERIODS[request.params["period"]]
+    time_windows = _time_slices(now, int(request.params["horizon"] * 86400), period_info,
+                                request.timegroup)
+
+    data = _calculate_data_for_prediction(
+        time_windows,
+        cmk.utils.prediction.get_rrd_data_of_slices(
+            request.host_name,
+            request.service_description,
+            request.dsname,
+            request.cf,
+            time_windows,
+        ),
+        vectorized,
+    )
+
+    info = PredictionInfo(
+        name=request.timegroup,
+        time=now,
+        range=time_windows[0],
+        cf=request.cf,
+        dsname=request.dsname,
+        slice=period_info.slice,
+        params=request.params,
+    )
+    return info, data
+
+
 def _std_dev(point_line: List[float], average: float) -> float:
     samples = len(point_line)
     # In the case of a single data-point an unbiased standard deviation is
@@ -266,35 +350,38 @@ def get_levels(
     prediction_store = PredictionStore(hostname, service_description, dsname)
     prediction_store.clean_prediction_files(timegroup)
 
+    request = PredictionRequest(
+        host_name=hostname,
+        service_description=service_description,
+        dsname=dsname,
+        cf=cf,
+        timegroup=timegroup,
+        params=params,
+    )
+
     data_for_pred: Optional[PredictionData] = None
+    last_info = prediction_store.get_info(timegroup)
     if _is_prediction_up_to_date(
-            last_info=prediction_store.get_info(timegroup),
+            last_info=last_info,
             timegroup=timegroup,
             params=params,
     ):
         data_for_pred = prediction_store.get_data(timegroup)
 
+    elif (last_info is not None and last_info.slice == period_info.slice and
+          prediction_store.request_prediction(request, now) < _PREDICTION_REQUEST_TIMEOUT):
+        # The new prediction is computed out of band (see compute_requested_predictions).
+        # Meanwhile the previous one is good enough.
+        logger.log(VERBOSE, "Requested prediction data for time group %s", timegroup)
+        data_for_pred = prediction_store.get_data(timegroup)
+
     if data_for_pred is None:
         logger.log(VERBOSE, "Calculating prediction data for time group %s", timegroup)
         prediction_store.clean_prediction_files(timegroup, force=True)
 
-        time_windows = _time_slices(now, int(params["horizon"] * 86400), period_info, timegroup)
-
-        rrd_datacolumn = cmk.utils.prediction.rrd_datacolum(hostname, service_description, dsname,
-                                                            cf)
-
-        data_for_pred = _calculate_data_for_prediction(time_windows, rrd_datacolumn)
-
-        info = PredictionInfo(
-            name=timegroup,
-            time=now,
-            range=time_windows[0],
-            cf=cf,
-            dsname=dsname,
-            slice=period_info.slice,
-            params=params,
-        )
+        info, data_for_pred = _compute_prediction(request, now)
         prediction_store.save_predictions(info, data_for_pred)
+        prediction_store.remove_prediction_request(timegroup)
 
     # Find reference value in data_for_pred
     index = int(rel_time / data_for_pred.step)
@@ -308,3 +395,54 @@ def get_levels(
         levels_upper_lower_bound=params.get("levels_upper_min"),
         levels_factor=levels_factor,
     )
+
+
+def compute_requested_predictions(*, workers: int = 4) -> int:
+    """Compute the predictions which have been requested by the checks
+
+    The predictions of the services are computed in parallel. Requests which do not match the
+    current time group anymore are dropped, the check will renew them. Returns the number of
+    computed predictions.
+    """
+    requests = list(cmk.utils.prediction.pending_prediction_requests())
+    if not requests:
+        return 0
+
+    now = int(time.time())
+    vectorized = cmk.utils.prediction.vectorization_available()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(
+            executor.map(lambda request: _handle_prediction_request(request, now, vectorized),
+                         requests))
+
+
+def _handle_prediction_request(
+    request: PredictionRequest,
+    now: int,
+    vectorized: bool,
+) -> bool:
+    prediction_store = PredictionStore(request.host_name, request.service_description,
+                                       request.dsname)
+    try:
+        timegroup = _PREDICTION_PERIODS[request.params["period"]].groupby(now)[0]
+        if timegroup != request.timegroup or _is_prediction_up_to_date(
+                last_info=prediction_store.get_info(timegroup),
+                timegroup=timegroup,
+                params=request.params,
+        ):
+            prediction_store.remove_prediction_request(request.timegroup)
+            return False
+
+        info, data_for_pred = _compute_prediction(request, now, vectorized)
+    except Exception as e:
+        if cmk.utils.debug.enabled():
+            raise
+        # The request is kept and retried with the next run
+        logger.warning("Cannot compute prediction of %s/%s/%s: %s", request.host_name,
+                       request.service_description, request.dsname, e)
+        return False
+
+    prediction_store.clean_prediction_files(timegroup, force=True)
+    prediction_store.save_predictions(info, data_for_pred)
+    prediction_store.remove_prediction_request(timegroup)
+    return True
@@ -52,11 +52,15 @@ Cache hierarchy
 
 import abc
 import copy
+import hashlib
+import json
 import logging
+import pickle
 from pathlib import Path
 from typing import (
     Any,
     Callable,
+    Dict,
     Final,
     Generic,
     Iterator,
@@ -84,6 +88,7 @@ __all__ = [
     "ABCRawDataSection",
     "FileCache",
     "FileCacheFactory",
+    "ParseResultStore",
     "PersistedSections",
     "SectionStore",
     "TRawDataSection",
@@ -201,6 +206,65 @@ class SectionStore(Generic[TRawDataSection]):
         return persisted_sections
 
 
+class ParseResultStore:
+    """Persist parse results of sections across check cycles.
+
+    The entries are keyed by the section name and a digest of the raw
+    section.  A parse result may only be reused by the caller if the digest
+    of the current raw section matches the stored one.
+
+    The parse results are stored pickled.  Unpickling them yields a fresh
+    object every time, so the callers may modify it.
+
+    """
+    def __init__(
+        self,
+        path: Union[str, Path],
+        *,
+        logger: logging.Logger,
+    ) -> None:
+        super().__init__()
+        self.path: Final = Path(path)
+        self._logger: Final = logger
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.path!r}, logger={self._logger!r})"
+
+    @staticmethod
+    def digest(raw_section: ABCRawDataSection) -> str:
+        serialized = json.dumps(raw_section, separators=(",", ":"), default=_serialize_bytes)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def store(self, parse_results: Mapping[SectionName, Tuple[str, bytes]]) -> None:
+        if not parse_results:
+            self._logger.debug("No parse results")
+            self.path.unlink(missing_ok=True)
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        serialized = {str(section_name): entry for section_name, entry in parse_results.items()}
+        _store.save_bytes_to_file(self.path, pickle.dumps(serialized))
+        self._logger.debug("Stored parse results: %s", ", ".join(map(str, parse_results)))
+
+    def load(self) -> MutableMapping[SectionName, Tuple[str, bytes]]:
+        raw = _store.load_bytes_from_file(self.path)
+        if not raw:
+            return {}
+
+        try:
+            serialized = pickle.loads(raw)
+        except Exception as exc:
+            self._logger.debug("Failed to load parse results: %s", exc)
+            return {}
+
+        return {SectionName(section_name): entry for section_name, entry in serialized.items()}
+
+
+def _serialize_bytes(value: bytes) -> Dict[str, str]:
+    # SNMP sections may contain binary values, which JSON does not know about.
+    return {"bytes": value.hex()}
+
+
 TFileCache = TypeVar("TFileCache", bound="FileCache")
 
 
@@ -16,7 +16,7 @@ from cmk.utils.bi.bi_packs import BIAggregationPacks
 from cmk.utils.bi.bi_data_fetcher import BIStatusFetcher
 from cmk.utils.bi.bi_compiler import BICompiler
 from cmk.utils.bi.bi_lib import SitesCallback, BIStates, NodeResultBundle
-from cmk.utils.bi.bi_computer import BIComputer, BIAggregationFilter
+from cmk.utils.bi.bi_computer import BIComputer, BIAggregationFilter, BIResultCache
 from cmk.utils.bi.bi_trees import BICompiledRule
 
 from cmk.gui.exceptions import MKConfigError
@@ -935,13 +935,22 @@ def singlehost_table(view, columns, query, only_sites, limit, all_active_filters
     return rows
 
 
+# The results of the aggregation branches are kept between the requests of this process
+_bi_result_cache = BIResultCache()
+
+
 class BIManager:
     def __init__(self):
         sites_callback = SitesCallback(cmk.gui.sites.states, bi_livestatus_query)
         self.compiler = BICompiler(self.bi_configuration_file(), sites_callback)
         self.compiler.load_compiled_aggregations()
         self.status_fetcher = BIStatusFetcher(sites_callback)
-        self.computer = BIComputer(self.compiler.compiled_aggregations, self.status_fetcher)
+
+        compilation_status = self.compiler.get_compilation_status()
+        _bi_result_cache.set_compilation_timestamp(
+            None if compilation_status is None else compilation_status["timestamp"])
+        self.computer = BIComputer(self.compiler.compiled_aggregations, self.status_fetcher,
+                                   _bi_result_cache)
 
     @classmethod
     def bi_configuration_file(cls) -> str:
@@ -105,7 +105,8 @@ g: Any = LocalProxy(partial(_lookup_app_object, "g"))
 
 class _PrependURLFilter(logging.Filter):
     def filter(self, record):
-        if record.levelno >= logging.ERROR:
+        # Worker threads started during a request log without the request context
+        if record.levelno >= logging.ERROR and _request_ctx_stack.top is not None:
             record.msg = "%s %s" % (request.requested_url, record.msg)
         return True
 
@@ -14,7 +14,7 @@ import livestatus
 import cmk.utils.version as cmk_version
 from cmk.gui.plugins.metrics.utils import check_metrics, reverse_translate_metric_name
 import cmk.gui.plugins.metrics.timeseries as ts
-from cmk.utils.prediction import livestatus_lql, TimeSeries
+from cmk.utils.prediction import livestatus_lql, TimeSeries, vectorization_available
 from cmk.gui.i18n import _
 from cmk.gui.exceptions import MKGeneralException
 import cmk.gui.sites as sites
@@ -53,6 +53,7 @@ def align_and_resample_rrds(rrd_data, cf):
     start_time = None
     end_time = None
     step = None
+    vectorized = vectorization_available()
 
     for spec, rrddata in rrd_data.items():
         spec_title = "%s/%s/%s" % (spec[1], spec[2], spec[3])  # host/service/perfvar
@@ -64,9 +65,13 @@ def align_and_resample_rrds(rrd_data, cf):
         else:
             if (start_time, end_time, step) != rrddata.twindow:
                 if step >= rrddata.twindow[2]:
-                    rrddata.values = rrddata.downsample((start_time, end_time, step), spec[4] or cf)
+                    rrddata.values = rrddata.downsample((start_time, end_time, step),
+                                                        spec[4] or cf,
+                                                        vectorized=vectorized)
                 elif step < rrddata.twindow[2]:
-                    rrddata.values = rrddata.bfill_upsample((start_time, end_time, step), 0)
+                    rrddata.values = rrddata.bfill_upsample((start_time, end_time, step),
+                                                            0,
+                                                            vectorized=vectorized)
 
 
 # The idea is to omit the empty last step of graphs which are showing the
@@ -38,7 +38,7 @@ import shutil
 import sys
 import time
 from pathlib import Path
-from typing import Optional, IO, Union, Dict, List, Set, Type, Tuple as _Tuple, Iterator
+from typing import Any, Optional, IO, Union, Dict, List, Set, Type, Tuple as _Tuple, Iterator
 
 # docs: http://www.python-ldap.org/doc/html/index.html
 import ldap  # type: ignore[import]
@@ -149,6 +149,25 @@ class MKLDAPException(MKGeneralException):
 DistinguishedName = str
 GroupMemberships = Dict[DistinguishedName, Dict[str, Union[str, List[str]]]]
 
+# Keep the filters of the batched queries reasonably small
+_FILTER_BATCH_SIZE = 100
+
+# Initial change marker used with modifyTimestamp in case no object has been found
+_EPOCH_TIMESTAMP = "19700101000000Z"
+
+
+def _chunks(items: List[str], size: int) -> Iterator[List[str]]:
+    for index in range(0, len(items), size):
+        yield items[index:index + size]
+
+
+def _normalize_dn(dn: DistinguishedName) -> DistinguishedName:
+    try:
+        return ldap.dn.dn2str(ldap.dn.str2dn(dn)).lower()
+    except ldap.DECODING_ERROR:
+        return dn.lower()
+
+
 #.
 #   .--UserConnector-------------------------------------------------------.
 #   | _   _                ____                            _               |
@@ -764,11 +783,16 @@ class LDAPUserConnector(UserConnector):
         return (dn.replace('\\', '\\\\'), user_id)
 
     def get_users(self, add_filter=''):
+        return self._get_users(add_filter)
+
+    def _get_users(self, add_filter='', extra_columns=None, only_ids=False):
         user_id_attr = self._user_id_attr()
 
         columns = [
             user_id_attr,  # needed in all cases as uniq id
-        ] + self.needed_attributes()
+        ]
+        if not only_ids:
+            columns += self.needed_attributes() + (extra_columns or [])
 
         filt = self.ldap_filter('users')
 
@@ -901,7 +925,9 @@ class LDAPUserConnector(UserConnector):
 
     # Nested querying is more complicated. We have no option to simply do a query for group objects
     # to make them resolve the memberships here. So we need to query all users with the nested
-    # memberof filter to get all group memberships of that group. We need one query for each group.
+    # memberof filter to get all group memberships of that group. To reduce the number of queries,
+    # the direct members of several groups are looked up with a single query. The nesting is then
+    # resolved level by level.
     def _get_nested_group_memberships(self, filters: List[str], filt_attr: str) -> GroupMemberships:
         groups: GroupMemberships = {}
 
@@ -909,82 +935,134 @@ class LDAPUserConnector(UserConnector):
         # query instead of one for groups and one for users below when searching for the members.
         base_dn = self._group_and_user_base_dn()
 
-        for filter_val in filters:
-            matched_groups = {}
-
-            # The memberof query below is only possible when knowing the DN of groups. We need
-            # to look for the DN when the caller gives us CNs (e.g. when using the the groups
-            # to contact groups plugin).
-            if filt_attr == 'cn':
-                result = self._ldap_search(
-                    self.get_group_dn(), '(&%s(cn=%s))' % (self.ldap_filter('groups'), filter_val),
-                    ['dn', 'cn'], self._config['group_scope'])
-                if not result:
-                    continue  # Skip groups which can not be found
-
-                for dn, attrs in result:
+        matched_groups: Dict[DistinguishedName, Optional[str]] = {}
+
+        # The memberof query below is only possible when knowing the DN of groups. We need
+        # to look for the DN when the caller gives us CNs (e.g. when using the the groups
+        # to contact groups plugin).
+        if filt_attr == 'cn':
+            for filter_vals in _chunks(filters, _FILTER_BATCH_SIZE):
+                for dn, attrs in self._ldap_search(
+                        self.get_group_dn(), '(&%s(|%s))' %
+                    (self.ldap_filter('groups'), ''.join('(cn=%s)' % f for f in filter_vals)),
+                    ['dn', 'cn'], self._config['group_scope']):
                     matched_groups[dn] = attrs["cn"][0]
-            else:
-                # in case of asking with DNs in nested mode, the resulting objects have the
-                # cn set to None for all objects. We do not need it in that case.
-                dn = filter_val
+        else:
+            # in case of asking with DNs in nested mode, the resulting objects have the
+            # cn set to None for all objects. We do not need it in that case.
+            for dn in filters:
                 matched_groups[dn] = None
 
-            # Now lookup the memberships. Previously we used the filter "memberOf:1.2.840.113556.1.4.1941:"
-            # here which seemed to be a performance problem. Resolving the nesting involves more single
-            # queries but performs much better.
-            for dn, cn in matched_groups.items():
-                # Try to get members from group cache
-                try:
-                    groups[dn] = self._group_cache[True][dn]
-                    continue
-                except KeyError:
-                    pass
-
-                # In case we don't have the cn we need to fetch it. It may be needed, e.g. by the contact group
-                # sync plugin
-                if cn is None:
-                    group = self._ldap_search(dn,
-                                              filt="(objectclass=group)",
-                                              columns=['cn'],
-                                              scope='base')
-                    if group:
-                        cn = group[0][1]["cn"][0]
-
-                filt = '(memberof=%s)' % dn
-                groups[dn] = {
-                    'members': [],
-                    'cn': cn,
-                }
-
-                members = groups[dn]['members']
-                assert isinstance(members, list)
-
-                # Register the group construct, collect the members later. This way we can also
-                # catch the case where a group refers to itself, which is prevented by some LDAP
-                # editing tools, like "Active Directory Users & Computers", but can somehow be
-                # configured, e.g. when configuring universal distribution lists using ADSIEdit
-                # it was possible to configure something like this at least in older directories.
-                self._group_cache[True][dn] = groups[dn]
+        nested_cache = self._group_cache[True]
+        for dn, cn in matched_groups.items():
+            if dn in nested_cache:
+                continue
 
-                sub_group_filters = []
-                for obj_dn, obj in self._ldap_search(base_dn, filt, ['dn', 'objectclass'], 'sub'):
-                    if "user" in obj['objectclass']:
-                        members.append(obj_dn)
+            # In case we don't have the cn we need to fetch it. It may be needed, e.g. by the
+            # contact group sync plugin
+            if cn is None:
+                group = self._ldap_search(dn,
+                                          filt="(objectclass=group)",
+                                          columns=['cn'],
+                                          scope='base')
+                if group:
+                    cn = group[0][1]["cn"][0]
+            matched_groups[dn] = cn
+
+        self._resolve_nested_group_members(
+            {dn: cn for dn, cn in matched_groups.items() if dn not in nested_cache},
+            base_dn,
+        )
 
-                    elif "group" in obj['objectclass']:
-                        sub_group_filters.append(obj_dn)
+        for dn in matched_groups:
+            groups[dn] = nested_cache[dn]
+        return groups
 
-                # TODO: This could be optimized by first collecting all sub groups of all searched
-                # groups, then collecting them all together
-                for _sub_group_dn, sub_group in self.get_group_memberships(sub_group_filters,
-                                                                           filt_attr='dn',
-                                                                           nested=True).items():
-                    members += sub_group["members"]
+    def _resolve_nested_group_members(self, group_cns: Dict[DistinguishedName, Optional[str]],
+                                      base_dn: DistinguishedName) -> None:
+        """Add the given groups together with all their sub groups to the nested group cache"""
+        nested_cache = self._group_cache[True]
+
+        direct_members: Dict[DistinguishedName, _Tuple[List[DistinguishedName],
+                                                       List[DistinguishedName]]] = {}
+        pending = dict(group_cns)
+        while pending:
+            sub_group_cns: Dict[DistinguishedName, Optional[str]] = {}
+            for group_dns in _chunks(list(pending), _FILTER_BATCH_SIZE):
+                for group_dn, (users, sub_groups) in self._get_direct_members(group_dns,
+                                                                              base_dn).items():
+                    direct_members[group_dn] = (users, list(sub_groups))
+                    sub_group_cns.update(sub_groups)
+
+            for dn, cn in pending.items():
+                nested_cache[dn] = {'cn': cn, 'members': []}
+
+            pending = {
+                dn: cn
+                for dn, cn in sub_group_cns.items()
+                if dn not in nested_cache and dn not in direct_members
+            }
 
-                members.sort()
+        # Now collect the members of the sub groups. Self references and loops, which are
+        # prevented by some LDAP editing tools, like "Active Directory Users & Computers", but
+        # can somehow be configured, e.g. when configuring universal distribution lists using
+        # ADSIEdit, are handled by never visiting a group twice.
+        for group_dn in direct_members:
+            members: Set[DistinguishedName] = set()
+            visited = {group_dn}
+            stack = [group_dn]
+            while stack:
+                dn = stack.pop()
+                if dn != group_dn and dn not in direct_members:
+                    members.update(nested_cache[dn]['members'])  # resolved earlier
+                    continue
+                users, sub_groups = direct_members[dn]
+                members.update(users)
+                for sub_group_dn in sub_groups:
+                    if sub_group_dn not in visited:
+                        visited.add(sub_group_dn)
+                        stack.append(sub_group_dn)
+            nested_cache[group_dn]['members'] = sorted(members)
+
+    def _get_direct_members(
+        self, group_dns: List[DistinguishedName], base_dn: DistinguishedName
+    ) -> Dict[DistinguishedName, _Tuple[List[DistinguishedName], Dict[DistinguishedName,
+                                                                      Optional[str]]]]:
+        """Return the users and sub groups (with their cn) which are direct members of the groups"""
+        result: Dict[DistinguishedName,
+                     _Tuple[List[DistinguishedName],
+                            Dict[DistinguishedName,
+                                 Optional[str]]]] = {dn: ([], {}) for dn in group_dns}
+        normalized_dns = {_normalize_dn(dn): dn for dn in group_dns}
+
+        filt = '(|%s)' % ''.join('(memberof=%s)' % dn for dn in group_dns)
+        for obj_dn, obj in self._ldap_search(base_dn, filt, ['dn', 'objectclass', 'cn', 'memberof'],
+                                             'sub'):
+            if len(group_dns) == 1:
+                member_of = group_dns
+            else:
+                member_of = [
+                    normalized_dns[normalized_dn]
+                    for normalized_dn in map(_normalize_dn, obj.get('memberof', []))
+                    if normalized_dn in normalized_dns
+                ]
+                if not member_of:
+                    # The memberof attribute is not available (e.g. because AD only returns a
+                    # range of it for objects being member of many groups). Fall back to one
+                    # query per group.
+                    result = {}
+                    for dn in group_dns:
+                        result.update(self._get_direct_members([dn], base_dn))
+                    return result
+
+            for group_dn in member_of:
+                users, sub_groups = result[group_dn]
+                if "user" in obj['objectclass']:
+                    users.append(obj_dn)
+                elif "group" in obj['objectclass']:
+                    sub_groups[obj_dn] = obj["cn"][0] if obj.get("cn") else None
 
-        return groups
+        return result
 
     def _group_and_user_base_dn(self):
         user_dn = ldap.dn.str2dn(self._get_user_dn())
@@ -1107,7 +1185,10 @@ class LDAPUserConnector(UserConnector):
         self._logger.info('SYNC STARTED')
         self._logger.info('  SYNC PLUGINS: %s' % ', '.join(self._config['active_plugins'].keys()))
 
-        ldap_users = self.get_users()
+        if self._delta_sync_enabled() and not only_username:
+            ldap_users, users_to_sync, sync_cache = self._get_users_for_delta_sync()
+        else:
+            ldap_users, users_to_sync, sync_cache = self.get_users(), None, None
 
         users = load_users_func(lock=True)
 
@@ -1134,6 +1215,9 @@ class LDAPUserConnector(UserConnector):
         has_changed_passwords = False
         profiles_to_synchronize = {}
         for user_id, ldap_user in ldap_users.items():
+            if users_to_sync is not None and user_id not in users_to_sync and user_id in users:
+                continue  # Not changed in LDAP since the last sync
+
             mode_create, user = load_user(user_id)
             user_connection_id = cleanup_connection_id(user.get('connector'))
 
@@ -1229,8 +1313,212 @@ class LDAPUserConnector(UserConnector):
         else:
             release_users_lock()
 
+        if sync_cache is not None:
+            sync_cache["group_cache"] = self._group_cache
+            sync_cache["group_search_cache"] = self._group_search_cache
+            self._save_sync_cache(sync_cache,
+                                  with_users=users_to_sync is None or bool(users_to_sync))
+
         self._set_last_sync_time()
 
+    # The delta sync only fetches the users which have been changed since the last sync. The
+    # changes are detected using the uSNChanged attribute of the objects in Active Directory
+    # and the modifyTimestamp attribute with other directories. The users fetched during the
+    # last syncs and the group memberships are kept in the sync cache. In case a group has been
+    # changed, all users are synchronized using the cached user objects. The IDs of all users
+    # matching the user filter are fetched with each sync to remove the users which have been
+    # deleted, moved or disabled (in case the filter excludes them) from the cached users. The
+    # DNs of all groups are fetched to find deleted groups.
+    def _delta_sync_enabled(self) -> bool:
+        return "delta_sync" in self._config
+
+    def _get_users_for_delta_sync(
+            self) -> _Tuple[Dict[str, Dict], Optional[Set[str]], Optional[Dict[str, Any]]]:
+        """Return the LDAP users, the IDs of the users to sync and the new sync cache
+
+        The IDs of the users to sync are None in case all users need to be synchronized. They
+        include the IDs of the removed users. The sync cache is None in case no delta sync is
+        possible for the next sync.
+        """
+        marker_attr = self._change_marker_attr()
+        server = ""
+        usn: Optional[int] = None
+        if self.is_active_directory():
+            server_state = self._get_server_change_state()
+            if server_state is None:
+                return self.get_users(), None, None
+            server, usn = server_state
+
+        sync_cache = self._load_sync_cache()
+        if (sync_cache.get("server") != server or sync_cache.get("user_marker") is None or
+                sync_cache.get("group_marker") is None or
+                time.time() - sync_cache.get("last_full_sync", 0) >=
+                self._config["delta_sync"]["full_sync_interval"]):
+            self._logger.info('  FULL SYNC')
+            ldap_users = self._get_users(extra_columns=[marker_attr])
+            user_marker = self._pop_change_marker(ldap_users)
+            return ldap_users, None, {
+                "server": server,
+                "last_full_sync": time.time(),
+                "user_marker": usn if usn is not None else (user_marker or _EPOCH_TIMESTAMP),
+                "group_marker": usn if usn is not None else
+                                (self._find_changed_groups(None)[1] or _EPOCH_TIMESTAMP),
+                "group_dns": self._get_group_dns(),
+                "users": ldap_users,
+            }
+
+        self._logger.info('  DELTA SYNC')
+        groups_changed, group_marker = self._find_changed_groups(sync_cache["group_marker"])
+        # Deleted groups are not found by the query for the changed groups
+        group_dns = self._get_group_dns()
+        groups_changed |= group_dns != sync_cache.get("group_dns")
+
+        removed_user_ids: Set[str] = set()
+        if groups_changed and self._config.get('user_filter_group'):
+            # The set of users depends on the members of the filter group
+            changed_users = self._get_users(extra_columns=[marker_attr])
+            ldap_users = dict(changed_users)
+        else:
+            ldap_users = sync_cache["users"]
+            changed_users = self._get_users(
+                add_filter=self._changed_since_filter(sync_cache["user_marker"]),
+                extra_columns=[marker_attr],
+            )
+            ldap_users.update(changed_users)
+
+            # Users which have been deleted, moved out of the user base DN or which do not match
+            # the user filter anymore (e.g. disabled users) are not found by the query for the
+            # changed users. Users created after the query above are fetched by the next sync.
+            existing_user_ids = self._get_users(only_ids=True)
+            removed_user_ids = {
+                user_id for user_id in ldap_users if user_id not in existing_user_ids
+            }
+            for user_id in removed_user_ids:
+                del ldap_users[user_id]
+        user_marker = self._pop_change_marker(changed_users)
+
+        self._logger.info('  CHANGED USERS: %d, REMOVED USERS: %d, CHANGED GROUPS: %s' %
+                          (len(changed_users), len(removed_user_ids), groups_changed))
+
+        if not groups_changed:
+            self._group_cache.update(sync_cache.get("group_cache", {}))
+            self._group_search_cache.update(sync_cache.get("group_search_cache", {}))
+
+        sync_cache.update({
+            "group_dns": group_dns,
+            "users": ldap_users,
+            "user_marker": usn if usn is not None else (user_marker or sync_cache["user_marker"]),
+            "group_marker": usn if usn is not None else
+                            (group_marker or sync_cache["group_marker"]),
+        })
+        return (ldap_users, None if groups_changed else set(changed_users) | removed_user_ids,
+                sync_cache)
+
+    def _change_marker_attr(self) -> str:
+        return 'usnchanged' if self.is_active_directory() else 'modifytimestamp'
+
+    def _changed_since_filter(self, marker: Union[int, str]) -> str:
+        if self.is_active_directory():
+            # The marker is the highest USN of the previous sync
+            return '(usnchanged>=%d)' % (int(marker) + 1)
+        # The timestamps have a resolution of seconds. Objects changed in the same second
+        # as the last change seen are synchronized again.
+        return '(modifytimestamp>=%s)' % marker
+
+    def _get_server_change_state(self) -> Optional[_Tuple[str, int]]:
+        """Return the identity and the highest committed USN of the AD domain controller
+
+        The USNs are local to each domain controller, so they can only be compared when
+        talking to the same server.
+        """
+        try:
+            self.connect()
+            assert self._ldap_obj is not None
+            self._num_queries += 1
+            result = self._ldap_obj.search_s('', ldap.SCOPE_BASE, '(objectclass=*)',
+                                             ['dsServiceName', 'highestCommittedUSN'])
+            attrs = {
+                ensure_str(key).lower(): ensure_str(val[0]) for key, val in result[0][1].items()
+            }
+            return attrs['dsservicename'], int(attrs['highestcommittedusn'])
+        except (ldap.LDAPError, MKLDAPException, LookupError, ValueError) as e:
+            self._logger.info('  Failed to get the change state of the server: %s' % e)
+            return None
+
+    def _pop_change_marker(self, ldap_users: Dict[str, Dict]) -> Optional[str]:
+        """Remove the change marker attribute from the users and return the highest value"""
+        marker_attr = self._change_marker_attr()
+        markers = [
+            ldap_user.pop(marker_attr)[0]
+            for ldap_user in ldap_users.values()
+            if ldap_user.get(marker_attr)
+        ]
+        return max(markers, key=self._marker_sort_key) if markers else None
+
+    def _marker_sort_key(self, marker: str) -> Union[int, str]:
+        return int(marker) if self.is_active_directory() else marker
+
+    def _find_changed_groups(self, marker: Optional[Union[int,
+                                                          str]]) -> _Tuple[bool, Optional[str]]:
+        """Find the groups changed since the given marker (all groups in case of None)
+
+        All groups below the common base of the users and groups are respected, because
+        nested groups may be located outside of the group base DN. Returns whether or not a
+        group has been changed together with the highest change marker found.
+        """
+        if not self.has_group_base_dn_configured():
+            return False, None
+
+        base_dn = self._group_changes_base_dn()
+        marker_attr = self._change_marker_attr()
+        filt = self.ldap_filter('groups')
+        if marker is not None:
+            filt = '(&%s%s)' % (filt, self._changed_since_filter(marker))
+
+        markers = [
+            obj[marker_attr][0]
+            for _dn, obj in self._ldap_search(base_dn, filt, [marker_attr], 'sub')
+            if obj.get(marker_attr)
+        ]
+        return bool(markers), max(markers, key=self._marker_sort_key) if markers else None
+
+    def _get_group_dns(self) -> List[DistinguishedName]:
+        if not self.has_group_base_dn_configured():
+            return []
+        return sorted(dn for dn, _obj in self._ldap_search(
+            self._group_changes_base_dn(), self.ldap_filter('groups'), ['dn'], 'sub'))
+
+    def _group_changes_base_dn(self) -> DistinguishedName:
+        try:
+            return self._group_and_user_base_dn()
+        except MKLDAPException:
+            return self.get_group_dn()
+
+    # The change markers are updated with each sync. The users and group memberships are kept
+    # in a separate file, which is only written in case they have been changed.
+    _SYNC_STATE_KEYS = ["server", "last_full_sync", "user_marker", "group_marker"]
+
+    def _sync_cache_filepath(self) -> Path:
+        return self._ldap_caches_filepath() / ("sync_cache.%s" % self.id())
+
+    def _sync_state_filepath(self) -> Path:
+        return self._ldap_caches_filepath() / ("sync_state.%s" % self.id())
+
+    def _load_sync_cache(self) -> Dict[str, Any]:
+        sync_cache = store.load_object_from_file(self._sync_cache_filepath(), default={})
+        sync_cache.update(store.load_object_from_file(self._sync_state_filepath(), default={}))
+        return sync_cache
+
+    def _save_sync_cache(self, sync_cache: Dict[str, Any], with_users: bool = True) -> None:
+        store.makedirs(self._ldap_caches_filepath())
+        if with_users:
+            store.save_object_to_file(
+                self._sync_cache_filepath(),
+                {k: v for k, v in sync_cache.items() if k not in self._SYNC_STATE_KEYS})
+        store.save_object_to_file(
+            self._sync_state_filepath(),
+            {k: v for k, v in sync_cache.items() if k in self._SYNC_STATE_KEYS})
+
     def _find_changed_user_keys(self, keys, user, new_user):
         changed = {}
         for key in keys:
@@ -1339,7 +1627,7 @@ class LDAPConnectionValuespec(Transform):
                 (_("Users"), [key for key, _vs in user_elements]),
                 (_("Groups"), [key for key, _vs in group_elements]),
                 (_("Attribute Sync Plugins"), ["active_plugins"]),
-                (_("Other"), ["cache_livetime"]),
+                (_("Other"), ["cache_livetime", "delta_sync"]),
             ],
             render="form",
             form_narrow=True,
@@ -1360,6 +1648,7 @@ class LDAPConnectionValuespec(Transform):
                 'group_member',
                 'suffix',
                 'create_only_on_login',
+                'delta_sync',
             ],
             validate=self._validate_ldap_connection,
         )
@@ -1750,6 +2039,30 @@ class LDAPConnectionValuespec(Transform):
                  default_value=300,
                  display=["days", "hours", "minutes"],
              )),
+            ("delta_sync",
+             Dictionary(
+                 title=_('Delta synchronization'),
+                 help=_(
+                     'When enabled, the regular synchronizations only fetch the users which have '
+                     'been changed in the directory since the previous synchronization. The users '
+                     'and group memberships fetched before are kept in a local cache. Changes are '
+                     'detected using the attribute <tt>uSNChanged</tt> with Active Directory and '
+                     '<tt>modifyTimestamp</tt> with other directories. To find the users and '
+                     'groups which have been deleted, moved or do not match the configured filters '
+                     'anymore, the names of all users and groups are fetched with each '
+                     'synchronization. In addition, full synchronizations are executed in the '
+                     'configured interval.'),
+                 elements=[
+                     ("full_sync_interval",
+                      Age(
+                          title=_('Full synchronization interval'),
+                          minvalue=300,
+                          default_value=86400,
+                          display=["days", "hours", "minutes"],
+                      )),
+                 ],
+                 optional_keys=[],
+             )),
         ]
 
         return other_elements
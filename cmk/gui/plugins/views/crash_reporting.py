@@ -26,8 +26,8 @@ from cmk.gui.plugins.views import (
     Painter,
     paint_age,
     sorter_registry,
-    Sorter,
-    cmp_simple_number,
+    SortKeySorter,
+    sort_key_simple_number,
 )
 
 from cmk.gui.permissions import (
@@ -263,7 +263,7 @@ class PainterCrashException(Painter):
 
 
 @sorter_registry.register
-class SorterCrashTime(Sorter):
+class SorterCrashTime(SortKeySorter):
     @property
     def ident(self):
         return "crash_time"
@@ -276,8 +276,8 @@ class SorterCrashTime(Sorter):
     def columns(self):
         return ['crash_time']
 
-    def cmp(self, r1, r2):
-        return cmp_simple_number("crash_time", r1, r2)
+    def sort_key(self, row):
+        return sort_key_simple_number("crash_time", row)
 
 
 PermissionActionDeleteCrashReport = permission_registry.register(
@@ -14,23 +14,27 @@ from cmk.gui.i18n import _
 
 from cmk.gui.plugins.views import (
     sorter_registry,
-    Sorter,
+    SortKeySorter,
     declare_simple_sorter,
     declare_1to1_sorter,
     cmp_num_split,
-    cmp_custom_variable,
     cmp_simple_number,
     cmp_simple_string,
     cmp_service_name_equiv,
     cmp_string_list,
     cmp_ip_address,
-    compare_ips,
     get_tag_groups,
     get_labels,
     get_perfdata_nth_value,
 )
 from cmk.gui.valuespec import ValueSpec
-from cmk.gui.plugins.views.utils import DerivedColumnsSorter, cmp_insensitive_string
+from cmk.gui.plugins.views.utils import (
+    DerivedColumnsSorter,
+    get_custom_var,
+    sort_key_insensitive_string,
+    sort_key_num_split,
+    split_ip,
+)
 from cmk.gui.type_defs import Row
 from cmk.gui.sites import get_site_config
 from cmk.gui.valuespec import (
@@ -61,7 +65,7 @@ def cmp_host_state_equiv(r):
 
 
 @sorter_registry.register
-class SorterSvcstate(Sorter):
+class SorterSvcstate(SortKeySorter):
     @property
     def ident(self):
         return "svcstate"
@@ -74,13 +78,12 @@ class SorterSvcstate(Sorter):
     def columns(self):
         return ['service_state', 'service_has_been_checked']
 
-    def cmp(self, r1, r2):
-        return (cmp_state_equiv(r1) > cmp_state_equiv(r2)) - (cmp_state_equiv(r1) <
-                                                              cmp_state_equiv(r2))
+    def sort_key(self, row):
+        return cmp_state_equiv(row)
 
 
 @sorter_registry.register
-class SorterHoststate(Sorter):
+class SorterHoststate(SortKeySorter):
     @property
     def ident(self):
         return "hoststate"
@@ -93,13 +96,12 @@ class SorterHoststate(Sorter):
     def columns(self):
         return ['host_state', 'host_has_been_checked']
 
-    def cmp(self, r1, r2):
-        return (cmp_host_state_equiv(r1) > cmp_host_state_equiv(r2)) - (cmp_host_state_equiv(r1) <
-                                                                        cmp_host_state_equiv(r2))
+    def sort_key(self, row):
+        return cmp_host_state_equiv(row)
 
 
 @sorter_registry.register
-class SorterSiteHost(Sorter):
+class SorterSiteHost(SortKeySorter):
     @property
     def ident(self):
         return "site_host"
@@ -112,13 +114,12 @@ class SorterSiteHost(Sorter):
     def columns(self):
         return ['site', 'host_name']
 
-    def cmp(self, r1, r2):
-        return (r1["site"] > r2["site"]) - (r1["site"] < r2["site"]) or cmp_num_split(
-            "host_name", r1, r2)
+    def sort_key(self, row):
+        return row["site"], sort_key_num_split("host_name", row)
 
 
 @sorter_registry.register
-class SorterHostName(Sorter):
+class SorterHostName(SortKeySorter):
     @property
     def ident(self):
         return "host_name"
@@ -131,12 +132,12 @@ class SorterHostName(Sorter):
     def columns(self):
         return ['host_name']
 
-    def cmp(self, r1, r2):
-        return cmp_num_split("host_name", r1, r2)
+    def sort_key(self, row):
+        return sort_key_num_split("host_name", row)
 
 
 @sorter_registry.register
-class SorterSitealias(Sorter):
+class SorterSitealias(SortKeySorter):
     @property
     def ident(self):
         return "sitealias"
@@ -149,21 +150,18 @@ class SorterSitealias(Sorter):
     def columns(self):
         return ['site']
 
-    def cmp(self, r1, r2):
-        return (get_site_config(r1["site"])["alias"] > get_site_config(r2["site"])["alias"]) - (
-            get_site_config(r1["site"])["alias"] < get_site_config(r2["site"])["alias"])
+    def sort_key(self, row):
+        return get_site_config(row["site"])["alias"]
 
 
-class ABCTagSorter(Sorter, metaclass=abc.ABCMeta):
+class ABCTagSorter(SortKeySorter, metaclass=abc.ABCMeta):
     @property
     @abc.abstractmethod
     def object_type(self):
         raise NotImplementedError()
 
-    def cmp(self, r1, r2):
-        tag_groups_1 = sorted(get_tag_groups(r1, self.object_type).items())
-        tag_groups_2 = sorted(get_tag_groups(r2, self.object_type).items())
-        return (tag_groups_1 > tag_groups_2) - (tag_groups_1 < tag_groups_2)
+    def sort_key(self, row):
+        return sorted(get_tag_groups(row, self.object_type).items())
 
 
 @sorter_registry.register
@@ -204,16 +202,14 @@ class SorterServiceTags(ABCTagSorter):
         return ["service_tags"]
 
 
-class ABCLabelSorter(Sorter, metaclass=abc.ABCMeta):
+class ABCLabelSorter(SortKeySorter, metaclass=abc.ABCMeta):
     @property
     @abc.abstractmethod
     def object_type(self):
         raise NotImplementedError()
 
-    def cmp(self, r1, r2):
-        labels_1 = sorted(get_labels(r1, self.object_type).items())
-        labels_2 = sorted(get_labels(r2, self.object_type).items())
-        return (labels_1 > labels_2) - (labels_1 < labels_2)
+    def sort_key(self, row):
+        return sorted(get_labels(row, self.object_type).items())
 
 
 @sorter_registry.register
@@ -255,7 +251,7 @@ class SorterServiceLabels(ABCTagSorter):
 
 
 @sorter_registry.register
-class SorterServicelevel(Sorter):
+class SorterServicelevel(SortKeySorter):
     @property
     def ident(self):
         return "servicelevel"
@@ -268,8 +264,8 @@ class SorterServicelevel(Sorter):
     def columns(self):
         return ['custom_variables']
 
-    def cmp(self, r1, r2):
-        return cmp_custom_variable(r1, r2, 'EC_SL', cmp_simple_number)
+    def sort_key(self, row):
+        return get_custom_var(row, 'EC_SL')
 
 
 def cmp_service_name(column, r1, r2):
@@ -278,8 +274,13 @@ def cmp_service_name(column, r1, r2):
             cmp_num_split(column, r1, r2))
 
 
+def sort_key_service_name(column, row):
+    return cmp_service_name_equiv(row[column]), sort_key_num_split(column, row)
+
+
 #                      name                      title                              column                       sortfunction
-declare_simple_sorter("svcdescr", _("Service description"), "service_description", cmp_service_name)
+declare_simple_sorter("svcdescr", _("Service description"), "service_description", cmp_service_name,
+                      sort_key_service_name)
 declare_simple_sorter("svcdispname", _("Service alternative display name"), "service_display_name",
                       cmp_simple_string)
 declare_simple_sorter("svcoutput", _("Service plugin output"), "service_plugin_output",
@@ -322,7 +323,7 @@ declare_1to1_sorter("svc_staleness", cmp_simple_number)
 declare_1to1_sorter("svc_servicelevel", cmp_simple_number)
 
 
-class PerfValSorter(Sorter):
+class PerfValSorter(SortKeySorter):
     _num = 0
 
     @property
@@ -337,11 +338,8 @@ class PerfValSorter(Sorter):
     def columns(self):
         return ['service_perf_data']
 
-    def cmp(self, r1, r2):
-        return ((utils.savefloat(get_perfdata_nth_value(r1, self._num - 1, True)) > utils.savefloat(
-            get_perfdata_nth_value(r2, self._num - 1, True))) -
-                (utils.savefloat(get_perfdata_nth_value(r1, self._num - 1, True)) < utils.savefloat(
-                    get_perfdata_nth_value(r2, self._num - 1, True))))
+    def sort_key(self, row):
+        return utils.savefloat(get_perfdata_nth_value(row, self._num - 1, True))
 
 
 @sorter_registry.register
@@ -431,7 +429,7 @@ declare_1to1_sorter("host_servicelevel", cmp_simple_number)
 
 
 @sorter_registry.register
-class SorterCustomHostVariable(DerivedColumnsSorter):
+class SorterCustomHostVariable(DerivedColumnsSorter, SortKeySorter):
     _variable_name: Optional[str] = None
 
     @property
@@ -468,23 +466,18 @@ class SorterCustomHostVariable(DerivedColumnsSorter):
             optional_keys=[],
         )
 
-    def cmp(self, r1: Row, r2: Row) -> int:
+    def sort_key(self, row: Row) -> Tuple[str, str]:
         if self._variable_name is None:
-            return 0
-        variable_name = self._variable_name.upper()  # outwit mypy
-
-        def _get_value(row: Row) -> str:
-            try:
-                index = row['host_custom_variable_names'].index(variable_name)
-            except ValueError:
-                return ''
-            return row['host_custom_variable_values'][index]
-
-        return cmp_insensitive_string(_get_value(r1), _get_value(r2))
+            return "", ""
+        try:
+            index = row['host_custom_variable_names'].index(self._variable_name.upper())
+        except ValueError:
+            return "", ""
+        return sort_key_insensitive_string(row['host_custom_variable_values'][index])
 
 
 @sorter_registry.register
-class SorterHostIpv4Address(Sorter):
+class SorterHostIpv4Address(SortKeySorter):
     @property
     def ident(self):
         return "host_ipv4_address"
@@ -497,17 +490,14 @@ class SorterHostIpv4Address(Sorter):
     def columns(self):
         return ['host_custom_variable_names', 'host_custom_variable_values']
 
-    def cmp(self, r1, r2):
-        def get_address(row):
-            custom_vars = dict(
-                zip(row["host_custom_variable_names"], row["host_custom_variable_values"]))
-            return custom_vars.get("ADDRESS_4", "")
-
-        return compare_ips(get_address(r1), get_address(r2))
+    def sort_key(self, row):
+        custom_vars = dict(
+            zip(row["host_custom_variable_names"], row["host_custom_variable_values"]))
+        return split_ip(custom_vars.get("ADDRESS_4", ""))
 
 
 @sorter_registry.register
-class SorterNumProblems(Sorter):
+class SorterNumProblems(SortKeySorter):
     @property
     def ident(self):
         return "num_problems"
@@ -520,13 +510,9 @@ class SorterNumProblems(Sorter):
     def columns(self):
         return ['host_num_services', 'host_num_services_ok', 'host_num_services_pending']
 
-    def cmp(self, r1, r2):
-        return ((r1["host_num_services"] - r1["host_num_services_ok"] -
-                 r1["host_num_services_pending"] > r2["host_num_services"] -
-                 r2["host_num_services_ok"] - r2["host_num_services_pending"]) -
-                (r1["host_num_services"] - r1["host_num_services_ok"] -
-                 r1["host_num_services_pending"] < r2["host_num_services"] -
-                 r2["host_num_services_ok"] - r2["host_num_services_pending"]))
+    def sort_key(self, row):
+        return (row["host_num_services"] - row["host_num_services_ok"] -
+                row["host_num_services_pending"])
 
 
 # Hostgroup
@@ -600,7 +586,11 @@ def log_what(t):
     return 0
 
 
-declare_1to1_sorter("log_what", cmp_log_what)
+def sort_key_log_what(col, row):
+    return log_what(row[col])
+
+
+declare_1to1_sorter("log_what", cmp_log_what, key_func=sort_key_log_what)
 
 
 def get_day_start_timestamp(t):
@@ -618,7 +608,12 @@ def cmp_date(column, r1, r2):
     return (r2_date > r1_date) - (r2_date < r1_date)
 
 
-declare_1to1_sorter("log_date", cmp_date)
+def sort_key_date(column, row):
+    # Newest day first
+    return -get_day_start_timestamp(row[column])[0]
+
+
+declare_1to1_sorter("log_date", cmp_date, key_func=sort_key_date)
 
 # Alert statistics
 declare_simple_sorter("alerts_ok", _("Number of recoveries"), "log_alerts_ok", cmp_simple_number)
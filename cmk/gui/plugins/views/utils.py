@@ -79,6 +79,7 @@ from cmk.gui.type_defs import (
     SingleInfos,
     SorterFunction,
     SorterName,
+    SortKeyFunction,
     ViewSpec,
     Visual,
     VisualContext,
@@ -1062,6 +1063,18 @@ class Sorter(metaclass=abc.ABCMeta):
         one service, etc."""
         raise NotImplementedError()
 
+    def sort_key(self, row: Dict) -> Any:
+        """Optional addition to cmp: Return a key of the row which
+        orders the rows in the same way as cmp does
+
+        The key is computed once per row, which is much faster than
+        calling cmp for each comparison of two rows."""
+        raise NotImplementedError()
+
+    @property
+    def has_sort_key(self) -> bool:
+        return type(self).sort_key is not Sorter.sort_key
+
     @property
     def _args(self) -> Optional[List]:
         """Optional list of arguments for the cmp function"""
@@ -1074,6 +1087,17 @@ class Sorter(metaclass=abc.ABCMeta):
         return False
 
 
+class SortKeySorter(Sorter):
+    """A sorter which only needs to implement sort_key, cmp compares the keys"""
+    @abc.abstractmethod
+    def sort_key(self, row: Dict) -> Any:
+        raise NotImplementedError()
+
+    def cmp(self, r1: Dict, r2: Dict) -> int:
+        k1, k2 = self.sort_key(r1), self.sort_key(r2)
+        return (k1 > k2) - (k1 < k2)
+
+
 class DerivedColumnsSorter(Sorter):
     """
     Can be used to transfer an additional parameter to the Sorter instance.
@@ -1128,16 +1152,18 @@ sorter_registry = SorterRegistry()
 # Kept for pre 1.6 compatibility. But also the inventory.py uses this to
 # register some painters dynamically
 def register_sorter(ident: str, spec: Dict[str, Any]) -> None:
-    cls = type(
-        "LegacySorter%s" % str(ident).title(), (Sorter,), {
-            "_ident": ident,
-            "_spec": spec,
-            "ident": property(lambda s: s._ident),
-            "title": property(lambda s: s._spec["title"]),
-            "columns": property(lambda s: s._spec["columns"]),
-            "load_inv": property(lambda s: s._spec.get("load_inv", False)),
-            "cmp": spec["cmp"],
-        })
+    attributes = {
+        "_ident": ident,
+        "_spec": spec,
+        "ident": property(lambda s: s._ident),
+        "title": property(lambda s: s._spec["title"]),
+        "columns": property(lambda s: s._spec["columns"]),
+        "load_inv": property(lambda s: s._spec.get("load_inv", False)),
+        "cmp": spec["cmp"],
+    }
+    if "sort_key" in spec:
+        attributes["sort_key"] = spec["sort_key"]
+    cls = type("LegacySorter%s" % str(ident).title(), (Sorter,), attributes)
     sorter_registry.register(cls)
 
 
@@ -1435,18 +1461,27 @@ def paint_nagiosflag(row: Row, field: ColumnName, bold_if_nonzero: bool) -> Cell
             html.render_span(_("yes") if nonzero else _("no")))
 
 
-def declare_simple_sorter(name: str, title: str, column: ColumnName, func: SorterFunction) -> None:
-    register_sorter(name, {
+def declare_simple_sorter(name: str,
+                          title: str,
+                          column: ColumnName,
+                          func: SorterFunction,
+                          key_func: Optional[SortKeyFunction] = None) -> None:
+    spec: Dict[str, Any] = {
         "title": title,
         "columns": [column],
         "cmp": lambda self, r1, r2: func(column, r1, r2)
-    })
+    }
+    key_func = key_func or _sort_key_functions.get(func)
+    if key_func is not None:
+        spec["sort_key"] = _sort_key_method(key_func, column)
+    register_sorter(name, spec)
 
 
 def declare_1to1_sorter(painter_name: PainterName,
                         func: SorterFunction,
                         col_num: int = 0,
-                        reverse: bool = False) -> PainterName:
+                        reverse: bool = False,
+                        key_func: Optional[SortKeyFunction] = None) -> PainterName:
     painter = painter_registry[painter_name]()
 
     if not reverse:
@@ -1454,14 +1489,24 @@ def declare_1to1_sorter(painter_name: PainterName,
     else:
         cmp_func = lambda self, r1, r2: func(painter.columns[col_num], r2, r1)
 
-    register_sorter(painter_name, {
+    spec: Dict[str, Any] = {
         "title": painter.title,
         "columns": painter.columns,
         "cmp": cmp_func,
-    })
+    }
+    # Keys can not be reversed in general, the reverse sorters are left to cmp
+    key_func = key_func or _sort_key_functions.get(func)
+    if key_func is not None and not reverse:
+        spec["sort_key"] = _sort_key_method(key_func, painter.columns[col_num])
+
+    register_sorter(painter_name, spec)
     return painter_name
 
 
+def _sort_key_method(key_func: SortKeyFunction, column: ColumnName) -> Callable[[Sorter, Row], Any]:
+    return lambda self, row: key_func(column, row)
+
+
 def cmp_simple_number(column: ColumnName, r1: Row, r2: Row) -> int:
     v1 = r1[column]
     v2 = r2[column]
@@ -1516,17 +1561,52 @@ def cmp_ip_address(column: ColumnName, r1: Row, r2: Row) -> int:
 
 
 def compare_ips(ip1: str, ip2: str) -> int:
-    def split_ip(ip: str) -> Tuple:
-        try:
-            return tuple(int(part) for part in ip.split('.'))
-        except ValueError:
-            # Make hostnames comparable with IPv4 address representations
-            return (255, 255, 255, 255, ip)
-
     v1, v2 = split_ip(ip1), split_ip(ip2)
     return (v1 > v2) - (v1 < v2)
 
 
+def split_ip(ip: str) -> Tuple:
+    try:
+        return tuple(int(part) for part in ip.split('.'))
+    except ValueError:
+        # Make hostnames comparable with IPv4 address representations
+        return (255, 255, 255, 255, ip)
+
+
+# Sort keys ordering the rows like the cmp functions above
+def sort_key_simple_number(column: ColumnName, row: Row) -> Any:
+    return row[column]
+
+
+def sort_key_num_split(column: ColumnName, row: Row) -> Tuple:
+    return cmk.gui.utils.key_num_split(row[column].lower())
+
+
+def sort_key_simple_string(column: ColumnName, row: Row) -> Tuple[str, str]:
+    return sort_key_insensitive_string(row.get(column, ''))
+
+
+def sort_key_insensitive_string(value: str) -> Tuple[str, str]:
+    return value.lower(), value
+
+
+def sort_key_string_list(column: ColumnName, row: Row) -> Tuple[str, str]:
+    return sort_key_insensitive_string(''.join(row.get(column, [])))
+
+
+def sort_key_ip_address(column: ColumnName, row: Row) -> Tuple:
+    return split_ip(row.get(column, ''))
+
+
+_sort_key_functions: Dict[SorterFunction, SortKeyFunction] = {
+    cmp_simple_number: sort_key_simple_number,
+    cmp_num_split: sort_key_num_split,
+    cmp_simple_string: sort_key_simple_string,
+    cmp_string_list: sort_key_string_list,
+    cmp_ip_address: sort_key_ip_address,
+}
+
+
 def get_custom_var(row: Row, key: str) -> str:
     return row["custom_variables"].get(key, "")
 
@@ -12,7 +12,7 @@ from cmk.gui.globals import request
 from cmk.gui.exceptions import MKGeneralException
 from cmk.gui.plugins.views import (
     sorter_registry,
-    Sorter,
+    SortKeySorter,
     painter_registry,
     Painter,
 )
@@ -147,11 +147,6 @@ class PainterWatoFolderPlain(Painter):
         return paint_wato_folder(row, "plain")
 
 
-def cmp_wato_folder(r1: Row, r2: Row, how: str) -> int:
-    return ((_get_wato_folder_text(r1, how) > _get_wato_folder_text(r2, how)) -
-            (_get_wato_folder_text(r1, how) < _get_wato_folder_text(r2, how)))
-
-
 # NOTE: The funny str() call is only necessary because of the broken typing of
 # get_wato_folder().
 def _get_wato_folder_text(r: Row, how: str) -> str:
@@ -159,7 +154,7 @@ def _get_wato_folder_text(r: Row, how: str) -> str:
 
 
 @sorter_registry.register
-class SorterWatoFolderAbs(Sorter):
+class SorterWatoFolderAbs(SortKeySorter):
     @property
     def ident(self):
         return "wato_folder_abs"
@@ -172,12 +167,12 @@ class SorterWatoFolderAbs(Sorter):
     def columns(self):
         return ['host_filename']
 
-    def cmp(self, r1, r2):
-        return cmp_wato_folder(r1, r2, 'abs')
+    def sort_key(self, row):
+        return _get_wato_folder_text(row, 'abs')
 
 
 @sorter_registry.register
-class SorterWatoFolderRel(Sorter):
+class SorterWatoFolderRel(SortKeySorter):
     @property
     def ident(self):
         return "wato_folder_rel"
@@ -190,12 +185,12 @@ class SorterWatoFolderRel(Sorter):
     def columns(self):
         return ['host_filename']
 
-    def cmp(self, r1, r2):
-        return cmp_wato_folder(r1, r2, 'rel')
+    def sort_key(self, row):
+        return _get_wato_folder_text(row, 'rel')
 
 
 @sorter_registry.register
-class SorterWatoFolderPlain(Sorter):
+class SorterWatoFolderPlain(SortKeySorter):
     @property
     def ident(self):
         return "wato_folder_plain"
@@ -208,5 +203,5 @@ class SorterWatoFolderPlain(Sorter):
     def columns(self):
         return ['host_filename']
 
-    def cmp(self, r1, r2):
-        return cmp_wato_folder(r1, r2, 'plain')
+    def sort_key(self, row):
+        return _get_wato_folder_text(row, 'plain')
@@ -2479,6 +2479,34 @@ class ConfigVariableCheckMKPerfdataWithTimes(ConfigVariable):
         )
 
 
+@config_variable_registry.register
+class ConfigVariableValueStoreBackend(ConfigVariable):
+    def group(self):
+        return ConfigVariableGroupCheckExecution
+
+    def domain(self):
+        return ConfigDomainCore
+
+    def ident(self):
+        return "value_store_backend"
+
+    def valuespec(self):
+        return DropdownChoice(
+            title=_("Storage of counters and other values of checks"),
+            help=_("Many checks keep values like counters between two check executions. By "
+                   "default they are stored in one file per host, which is read and rewritten "
+                   "after each check of the host. Alternatively they can be kept in one "
+                   "database for all hosts, which is memory-mapped. Only the values changed by "
+                   "the check of a host are written to it, in one transaction at the end of the "
+                   "check. Changing this setting discards the stored values, so rates can not be "
+                   "computed in the next check cycle."),
+            choices=[
+                ("files", _("One file per host")),
+                ("shared", _("Shared database of all hosts")),
+            ],
+        )
+
+
 @config_variable_registry.register
 class ConfigVariableUseDNSCache(ConfigVariable):
     def group(self):
@@ -2742,6 +2770,32 @@ class ConfigVariableInventoryCheckAutotrigger(ConfigVariable):
         )
 
 
+@config_variable_registry.register
+class ConfigVariableAutodiscoveryMaxProcesses(ConfigVariable):
+    def group(self):
+        return ConfigVariableGroupServiceDiscovery
+
+    def domain(self):
+        return ConfigDomainCore
+
+    def ident(self):
+        return "autodiscovery_max_processes"
+
+    def valuespec(self):
+        return Integer(
+            title=_("Parallel automatic service discovery"),
+            unit=_("processes"),
+            minvalue=1,
+            help=_("The hosts which have been marked for automatic rediscovery by the "
+                   "<a href='%s'>Periodic Service Discovery</a> are discovered every five "
+                   "minutes for at most two minutes. Hosts which could not be processed within "
+                   "this time are discovered during the next run. With a large number of "
+                   "marked hosts you can increase the number of hosts that are discovered at "
+                   "the same time. The monitoring core is reloaded only once after all hosts "
+                   "have been processed.") % "wato.py?mode=edit_ruleset&varname=periodic_discovery",
+        )
+
+
 #.
 #   .--Rulesets------------------------------------------------------------.
 #   |                ____        _                _                        |
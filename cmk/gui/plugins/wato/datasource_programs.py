@@ -701,6 +701,15 @@ def _valuespec_generic_metrics_prometheus():
                  ("http", "HTTP"),
                  ("https", "HTTPS"),
              ])),
+            ("max_workers",
+             Integer(
+                 title=_("Number of concurrent queries"),
+                 help=_("Independent PromQL queries are sent to the Prometheus server "
+                        "concurrently using up to this number of connections. Identical "
+                        "queries are only sent once."),
+                 minvalue=1,
+                 default_value=4,
+             )),
             ("exporter",
              ListOf(
                  CascadingDropdown(choices=[
@@ -966,7 +975,7 @@ def _valuespec_generic_metrics_prometheus():
              )),
         ],
         title=_("Prometheus"),
-        optional_keys=["auth_basic"],
+        optional_keys=["auth_basic", "max_workers"],
     )
 
 
@@ -1152,6 +1161,15 @@ def _valuespec_special_agents_vsphere():
                  ],
                  default_value="underscore",
              )),
+            ("max_workers",
+             Integer(
+                 title=_("Number of concurrent connections"),
+                 help=_("The performance counters of the host systems are queried using up "
+                        "to this number of concurrent connections. Increasing this value "
+                        "speeds up the agent on vCenters with many host systems."),
+                 minvalue=1,
+                 default_value=4,
+             )),
         ],
         optional_keys=[
             "tcp_port",
@@ -1159,6 +1177,7 @@ def _valuespec_special_agents_vsphere():
             "vm_pwr_display",
             "host_pwr_display",
             "vm_piggyname",
+            "max_workers",
         ],
         ignored_keys=["use_pysphere"],
     ),
@@ -2917,8 +2936,17 @@ def _valuespec_special_agents_aws():
              )),
             ("overall_tags",
              _vs_aws_tags(_("Restrict monitoring services by one of these AWS tags"))),
+            ("max_workers",
+             Integer(
+                 title=_("Number of concurrent requests"),
+                 help=_("Fetch the data of several regions and services concurrently. Data "
+                        "which depends on other data, e.g. the CloudWatch metrics of EC2 "
+                        "instances, is fetched as soon as the data it depends on is available."),
+                 minvalue=1,
+                 default_value=4,
+             )),
         ],
-        optional_keys=["overall_tags", "proxy_details"],
+        optional_keys=["overall_tags", "proxy_details", "max_workers"],
     ),
                      forth=_transform_aws)
 
@@ -164,6 +164,120 @@ class ConfigVariableNotificationPluginTimeout(ConfigVariable):
         )
 
 
+@config_variable_registry.register
+class ConfigVariableNotificationSpoolBackend(ConfigVariable):
+    def group(self):
+        return ConfigVariableGroupNotifications
+
+    def domain(self):
+        return ConfigDomainCore
+
+    def ident(self):
+        return "notification_spool_backend"
+
+    def valuespec(self):
+        return DropdownChoice(
+            title=_("Spooling of asynchronously delivered notifications"),
+            help=_("Notifications which are delivered asynchronously are handed over to the "
+                   "notification spooler in one spool file per notification by default. "
+                   "Alternatively they can be stored in a queue (<tt>%s</tt>) which is "
+                   "processed by a pool of worker processes per notification plugin. Failed "
+                   "deliveries are retried with an increasing interval. The notification plugins "
+                   "shipped with Checkmk are executed without starting a new process. "
+                   "Notifications which are forwarded to other sites are always spooled in "
+                   "files.") % site_neutral_path(cmk.utils.paths.var_dir + "/notify/queue.sqlite"),
+            choices=[
+                ("files", _("One spool file per notification")),
+                ("queue", _("Notification queue with worker pool")),
+            ],
+        )
+
+
+@config_variable_registry.register
+class ConfigVariableNotificationSpoolerDefaultWorkers(ConfigVariable):
+    def group(self):
+        return ConfigVariableGroupNotifications
+
+    def domain(self):
+        return ConfigDomainCore
+
+    def ident(self):
+        return "notification_spooler_default_workers"
+
+    def valuespec(self):
+        return Integer(
+            title=_("Notification queue: Worker processes per plugin"),
+            help=_("The number of notifications of each notification plugin which are "
+                   "delivered in parallel from the notification queue."),
+            minvalue=1,
+        )
+
+
+@config_variable_registry.register
+class ConfigVariableNotificationSpoolerPluginWorkers(ConfigVariable):
+    def group(self):
+        return ConfigVariableGroupNotifications
+
+    def domain(self):
+        return ConfigDomainCore
+
+    def ident(self):
+        return "notification_spooler_plugin_workers"
+
+    def valuespec(self):
+        return ListOf(
+            Tuple(elements=[
+                TextInput(title=_("Notification plugin"), allow_empty=False),
+                Integer(title=_("Worker processes"), minvalue=1),
+            ],
+                  orientation="horizontal"),
+            title=_("Notification queue: Worker processes of specific plugins"),
+            help=_("Overrides the number of worker processes for single notification plugins, "
+                   "e.g. to limit the number of concurrent requests to a ticket system. The "
+                   "plugin is specified by the name of its script, e.g. <tt>mail</tt>."),
+        )
+
+
+@config_variable_registry.register
+class ConfigVariableNotificationSpoolerMaxAttempts(ConfigVariable):
+    def group(self):
+        return ConfigVariableGroupNotifications
+
+    def domain(self):
+        return ConfigDomainCore
+
+    def ident(self):
+        return "notification_spooler_max_attempts"
+
+    def valuespec(self):
+        return Integer(
+            title=_("Notification queue: Maximum delivery attempts"),
+            help=_("Notifications whose plugin fails temporarily (exit code 1) are retried "
+                   "until this number of attempts has been reached."),
+            minvalue=1,
+        )
+
+
+@config_variable_registry.register
+class ConfigVariableNotificationSpoolerRetryInterval(ConfigVariable):
+    def group(self):
+        return ConfigVariableGroupNotifications
+
+    def domain(self):
+        return ConfigDomainCore
+
+    def ident(self):
+        return "notification_spooler_retry_interval"
+
+    def valuespec(self):
+        return Age(
+            title=_("Notification queue: Retry interval"),
+            help=_("The time until the first retry of a failed delivery. The interval is "
+                   "doubled with each attempt, up to one hour."),
+            minvalue=1,
+        )
+
+
 @config_variable_registry.register
 class ConfigVariableNotificationLogging(ConfigVariable):
     def group(self):
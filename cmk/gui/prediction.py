@@ -208,30 +208,26 @@ def get_current_perfdata(host, service, dsname):
 
 # Compute check levels from prediction data and check parameters
 def swap_and_compute_levels(tg_data, tg_info):
-    columns = tg_data["columns"]
+    columns = tg_data.columns
     swapped: Dict[Any, List[Any]] = {c: [] for c in columns}
-    for step in tg_data["points"]:
-        row = dict(zip(columns, step))
+    rows = [dict(zip(columns, step)) for step in tg_data.points]
+    for row in rows:
         for k, v in row.items():
             swapped[k].append(v)
-        if row["average"] is not None and row["stdev"] is not None:
-            upper_0, upper_1, lower_0, lower_1 = prediction.estimate_levels(
-                reference_value=row["average"],
-                stdev=row["stdev"],
-                levels_lower=tg_info.get("levels_lower"),
-                levels_upper=tg_info.get("levels_upper"),
-                levels_upper_lower_bound=tg_info.get("levels_upper_min"),
-                levels_factor=1.0,
-            )
-            swapped.setdefault("upper_warn", []).append(upper_0 or 0)
-            swapped.setdefault("upper_crit", []).append(upper_1 or 0)
-            swapped.setdefault("lower_warn", []).append(lower_0 or 0)
-            swapped.setdefault("lower_crit", []).append(lower_1 or 0)
-        else:
-            swapped.setdefault("upper_warn", []).append(0)
-            swapped.setdefault("upper_crit", []).append(0)
-            swapped.setdefault("lower_warn", []).append(0)
-            swapped.setdefault("lower_crit", []).append(0)
+
+    # Without standard deviation no levels are shown for a point
+    levels = prediction.estimate_levels_of_points(
+        reference_values=[None if row["stdev"] is None else row["average"] for row in rows],
+        stdevs=[row["stdev"] for row in rows],
+        levels_lower=tg_info.get("levels_lower"),
+        levels_upper=tg_info.get("levels_upper"),
+        levels_upper_lower_bound=tg_info.get("levels_upper_min"),
+        levels_factor=1.0,
+    )
+    for point_levels in levels:
+        for name, value in zip(["upper_warn", "upper_crit", "lower_warn", "lower_crit"],
+                               point_levels):
+            swapped.setdefault(name, []).append(value or 0)
 
     return swapped
 
@@ -525,7 +525,11 @@ def get_site_config(site_id: SiteId) -> SiteConfiguration:
 
 
 def site_is_local(site_id: SiteId) -> bool:
-    family_spec, address_spec = get_site_config(site_id)["socket"]
+    return site_config_is_local(get_site_config(site_id))
+
+
+def site_config_is_local(site_config: SiteConfiguration) -> bool:
+    family_spec, address_spec = site_config["socket"]
     return _is_local_socket_spec(family_spec, address_spec)
 
 
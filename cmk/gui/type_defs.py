@@ -96,6 +96,7 @@ ViewSpec = Dict[str, Any]
 AllViewSpecs = Dict[Tuple[UserId, ViewName], ViewSpec]
 PermittedViewSpecs = Dict[ViewName, ViewSpec]
 SorterFunction = Callable[[ColumnName, Row, Row], int]
+SortKeyFunction = Callable[[ColumnName, Row], Any]
 FilterHeader = str
 
 # Configuration related
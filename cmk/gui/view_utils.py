@@ -109,8 +109,12 @@ def row_limit_exceeded(row_count: int, limit: Optional[int]) -> bool:
     return limit is not None and row_count >= limit + 1
 
 
-def query_limit_exceeded_warn(limit: Optional[int], user_config: LoggedInUser) -> None:
-    """Compare query reply against limits, warn in the GUI about incompleteness"""
+def query_limit_exceeded_warn(limit: Optional[int],
+                              user_config: LoggedInUser,
+                              offer_paging: bool = False) -> None:
+    """Compare query reply against limits, warn in the GUI about incompleteness
+
+    With offer_paging the unlimited query may also be shown page by page."""
     text = HTML(_("Your query produced more than %d results. ") % limit)
 
     if request.get_ascii_input("limit",
@@ -123,6 +127,10 @@ def query_limit_exceeded_warn(limit: Optional[int], user_config: LoggedInUser) -
         text += html.render_a(_('Repeat query without limit.'),
                               target="_self",
                               href=makeuri(request, [("limit", "none")]))
+        if offer_paging:
+            text += " " + html.render_a(_('Show all results page by page.'),
+                                        target="_self",
+                                        href=makeuri(request, [("limit", "none"), ("page", 1)]))
 
     text += escaping.escape_html_permissive(
         " " + _("<b>Note:</b> the shown results are incomplete and do not reflect the sort order."))
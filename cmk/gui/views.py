@@ -311,6 +311,8 @@ class View:
         self.spec = view_spec
         self.context = context
         self._row_limit: Optional[int] = None
+        self._page: Optional[int] = None
+        self.has_next_page = False
         self._only_sites: Optional[List[SiteId]] = None
         self._user_sorters: Optional[List[SorterSpec]] = None
         self._want_checkboxes: bool = False
@@ -407,6 +409,17 @@ class View:
     def row_limit(self, row_limit: Optional[int]) -> None:
         self._row_limit = row_limit
 
+    @property
+    def page(self) -> Optional[int]:
+        """The page of rows to show (starting with 1)
+
+        Only used for views without row limit. None shows all rows at once."""
+        return self._page
+
+    @page.setter
+    def page(self, page: Optional[int]) -> None:
+        self._page = page
+
     @property
     def only_sites(self) -> Optional[List[SiteId]]:
         """Optional list of sites to query instead of all sites
@@ -715,12 +728,14 @@ class GUIViewRenderer(ABCViewRenderer):
                         len(rows),
                         row_limit,
                 ):
-                    cmk.gui.view_utils.query_limit_exceeded_warn(row_limit, user)
+                    cmk.gui.view_utils.query_limit_exceeded_warn(row_limit, user, offer_paging=True)
                     del rows[row_limit:]
                     self.view.process_tracking.amount_rows_after_limit = len(rows)
 
             layout.render(rows, view_spec, self.view.group_cells, self.view.row_cells, num_columns,
                           show_checkboxes and not html.do_actions())
+            if display_options.enabled(display_options.W):
+                _show_page_navigation(self.view)
             row_info = "%d %s" % (row_count, _("row") if row_count == 1 else _("rows"))
             if show_checkboxes:
                 selected = _filter_selected_rows(
@@ -897,13 +912,15 @@ class GUIViewRenderer(ABCViewRenderer):
         yield PageMenuEntry(
             title=_("Export CSV"),
             icon_name="download_csv",
-            item=make_simple_link(makeuri(request, [("output_format", "csv_export"), *filters])),
+            item=make_simple_link(
+                makeuri(request, [("output_format", "csv_export"), *filters], delvars=["page"])),
         )
 
         yield PageMenuEntry(
             title=_("Export JSON"),
             icon_name="download_json",
-            item=make_simple_link(makeuri(request, [("output_format", "json_export"), *filters])),
+            item=make_simple_link(
+                makeuri(request, [("output_format", "json_export"), *filters], delvars=["page"])),
         )
 
     def _page_menu_entries_export_reporting(self, rows: Rows) -> Iterator[PageMenuEntry]:
@@ -920,7 +937,8 @@ class GUIViewRenderer(ABCViewRenderer):
         yield PageMenuEntry(
             title=_("This view as PDF"),
             icon_name="report",
-            item=make_simple_link(makeuri(request, filters, filename="report_instant.py")),
+            item=make_simple_link(
+                makeuri(request, filters, filename="report_instant.py", delvars=["page"])),
         )
 
         # Link related reports
@@ -1810,6 +1828,7 @@ def page_view():
 
         view = View(view_name, view_spec, context)
         view.row_limit = get_limit()
+        view.page = get_page() if view.row_limit is None else None
 
         view.only_sites = visuals.get_only_sites_from_context(context)
 
@@ -1909,6 +1928,7 @@ def _process_regular_view(view_renderer: ABCViewRenderer) -> None:
             view_renderer.view,
             all_active_filters,
             only_count=False,
+            only_shown_rows=html.output_format == "html",
         )
 
     if html.output_format != "html":
@@ -1993,9 +2013,20 @@ def get_row_count(view: View) -> int:
 
 def _get_view_rows(view: View,
                    all_active_filters: List[Filter],
-                   only_count: bool = False) -> _Tuple[int, Rows]:
+                   only_count: bool = False,
+                   only_shown_rows: bool = False) -> _Tuple[int, Rows]:
+    """Fetch, sort and filter the rows of the view
+
+    The rows are joined with additional information (see _add_row_information) after sorting
+    and filtering if possible, so only the rows which are shown need to be joined."""
+    filterheaders = "".join(get_livestatus_filter_headers(view.context, all_active_filters))
+    add_information_first = _is_row_information_needed_for_sorting(view, all_active_filters)
+
     with CPUTracker() as fetch_rows_tracker:
-        rows, unfiltered_amount_of_rows = _fetch_view_rows(view, all_active_filters, only_count)
+        rows, unfiltered_amount_of_rows = _fetch_view_rows(view, all_active_filters, filterheaders,
+                                                           only_count)
+        if add_information_first:
+            _add_row_information(view, rows, filterheaders, all_active_filters)
 
     # Sorting - use view sorters and URL supplied sorters
     _sort_data(view, rows, view.sorters)
@@ -2007,24 +2038,53 @@ def _get_view_rows(view: View,
 
     view.process_tracking.amount_unfiltered_rows = unfiltered_amount_of_rows
     view.process_tracking.amount_filtered_rows = len(rows)
-    view.process_tracking.duration_fetch_rows = fetch_rows_tracker.duration
+
+    if view.page is not None:
+        first_row = (view.page - 1) * config.soft_query_limit
+        view.has_next_page = len(rows) > first_row + config.soft_query_limit
+        rows = rows[first_row:first_row + config.soft_query_limit]
+    elif only_shown_rows and (row_limit := _query_row_limit(view, all_active_filters)) is not None:
+        # Keep one row more than shown to detect an exceeded limit
+        del rows[row_limit + 1:]
+
+    duration_fetch_rows = fetch_rows_tracker.duration
+    if not add_information_first and not only_count:
+        with CPUTracker() as add_information_tracker:
+            _add_row_information(view, rows, filterheaders, all_active_filters)
+        duration_fetch_rows += add_information_tracker.duration
+
+    view.process_tracking.duration_fetch_rows = duration_fetch_rows
     view.process_tracking.duration_filter_rows = filter_rows_tracker.duration
 
     return unfiltered_amount_of_rows, rows
 
 
-def _fetch_view_rows(view: View, all_active_filters: List[Filter],
-                     only_count: bool) -> _Tuple[Rows, int]:
-    """Fetches the view rows from livestatus
+def _query_row_limit(view: View, all_active_filters: List[Filter]) -> Optional[int]:
+    # We test for limit here and not inside view.row_limit, because view.row_limit is used
+    # for rendering limits.
+    if view.datasource.ignore_limit:
+        return None
+    if view.page is not None:
+        # Without sorters the rows are shown in the order they are delivered by Livestatus,
+        # so the rows of the following pages need not be fetched. The additional row tells
+        # whether there is a next page. This does not work in case rows are dropped by the
+        # non-Livestatus filters, the page would be incomplete.
+        if view.sorters or _uses_table_filters(view, all_active_filters):
+            return None
+        return view.page * config.soft_query_limit + 1
+    return view.row_limit
 
-    Besides gathering the information from livestatus it also joins the rows with other information.
-    For the moment this is:
 
-    - Livestatus table joining (e.g. Adding service row info to host rows (For join painters))
-    - Add HW/SW inventory data when needed
-    - Add SLA data when needed
-    """
-    filterheaders = "".join(get_livestatus_filter_headers(view.context, all_active_filters))
+def _uses_table_filters(view: View, all_active_filters: List[Filter]) -> bool:
+    """Whether one of the filters in use filters the rows after fetching them (filter_table)"""
+    return any(
+        type(filt).filter_table is not Filter.filter_table and view.context.get(filt.ident)
+        for filt in all_active_filters)
+
+
+def _fetch_view_rows(view: View, all_active_filters: List[Filter], filterheaders: str,
+                     only_count: bool) -> _Tuple[Rows, int]:
+    """Fetches the view rows from livestatus"""
     headers = filterheaders + view.spec.get("add_headers", "")
 
     # Fetch data. Some views show data only after pressing [Search]
@@ -2034,14 +2094,14 @@ def _fetch_view_rows(view: View, all_active_filters: List[Filter],
             all_active_filters,
             view,
         )
-        # We test for limit here and not inside view.row_limit, because view.row_limit is used
-        # for rendering limits.
-        query_row_limit = None if view.datasource.ignore_limit else view.row_limit
-        row_data: Union[Rows,
-                        _Tuple[Rows,
-                               int]] = view.datasource.table.query(view, columns, headers,
-                                                                   view.only_sites, query_row_limit,
-                                                                   all_active_filters)
+        row_data: Union[Rows, _Tuple[Rows, int]] = view.datasource.table.query(
+            view,
+            columns,
+            headers,
+            view.only_sites,
+            _query_row_limit(view, all_active_filters),
+            all_active_filters,
+        )
 
         if isinstance(row_data, tuple):
             rows, unfiltered_amount_of_rows = row_data
@@ -2049,20 +2109,38 @@ def _fetch_view_rows(view: View, all_active_filters: List[Filter],
             rows = row_data
             unfiltered_amount_of_rows = len(row_data)
 
-        # Now add join information, if there are join columns
-        if view.join_cells:
-            _do_table_join(view, rows, filterheaders, view.sorters)
+        return rows, unfiltered_amount_of_rows
+    return [], 0
 
-        # If any painter, sorter or filter needs the information about the host's
-        # inventory, then we load it and attach it as column "host_inventory"
-        if _is_inventory_data_needed(view, all_active_filters):
-            _add_inventory_data(rows)
 
-        if not cmk_version.is_raw_edition():
-            _add_sla_data(view, rows)
+def _add_row_information(view: View, rows: Rows, filterheaders: str,
+                         all_active_filters: List[Filter]) -> None:
+    """Joins the rows with other information
 
-        return rows, unfiltered_amount_of_rows
-    return [], 0
+    For the moment this is:
+
+    - Livestatus table joining (e.g. Adding service row info to host rows (For join painters))
+    - Add HW/SW inventory data when needed
+    - Add SLA data when needed
+    """
+    # Now add join information, if there are join columns
+    if view.join_cells:
+        _do_table_join(view, rows, filterheaders, view.sorters)
+
+    # If any painter, sorter or filter needs the information about the host's
+    # inventory, then we load it and attach it as column "host_inventory"
+    if _is_inventory_data_needed(view, all_active_filters):
+        _add_inventory_data(rows)
+
+    if not cmk_version.is_raw_edition():
+        _add_sla_data(view, rows)
+
+
+def _is_row_information_needed_for_sorting(view: View, all_active_filters: List[Filter]) -> bool:
+    """Whether the sorters or the non-Livestatus filters need the joined information"""
+    if any(entry.join_key or entry.sorter.load_inv for entry in view.sorters):
+        return True
+    return any(filt.need_inventory(view.context.get(filt.ident, {})) for filt in all_active_filters)
 
 
 def _show_view(view_renderer: ABCViewRenderer, unfiltered_amount_of_rows: int, rows: Rows) -> None:
@@ -2393,6 +2471,32 @@ def get_limit() -> Optional[int]:
     return config.soft_query_limit
 
 
+def get_page() -> Optional[int]:
+    """Which page of the rows should be shown? None shows all rows at once
+
+    Exports always contain all rows."""
+    if html.output_format != "html":
+        return None
+    page = request.get_integer_input("page")
+    if page is None:
+        return None
+    return max(page, 1)
+
+
+def _show_page_navigation(view: View) -> None:
+    if view.page is None:
+        return
+    html.open_div(class_="page_navigation")
+    if view.page > 1:
+        html.a(_("Previous page"), href=makeuri(request, [("page", view.page - 1)]))
+        html.nbsp()
+    html.write_text(_("Page %d") % view.page)
+    if view.has_next_page:
+        html.nbsp()
+        html.a(_("Next page"), href=makeuri(request, [("page", view.page + 1)]))
+    html.close_div()
+
+
 def _link_to_folder_by_path(path: str) -> str:
     """Return an URL to a certain WATO folder when we just know its path"""
     return makeuri_contextless(
@@ -2921,10 +3025,44 @@ def page_menu_entries_host_setup(host_name) -> Iterator[PageMenuEntry]:
 
 
 def _sort_data(view: View, data: 'Rows', sorters: List[SorterEntry]) -> None:
-    """Sort data according to list of sorters."""
+    """Sort data according to list of sorters.
+
+    Consecutive sorters providing sort keys and sorting in the same direction are
+    combined into a composite key, which is computed once per row. Only the
+    sorters implementing nothing but cmp are sorted by comparing pairs of rows.
+    As Python's sort is stable, the groups of sorters are applied one after
+    another, starting with the least significant one."""
     if not sorters:
         return
 
+    groups: List[_Tuple[bool, bool, List[SorterEntry]]] = []
+    for entry in sorters:
+        use_key = entry.sorter.has_sort_key
+        reverse = bool(entry.negate) if use_key else False
+        if groups and groups[-1][:2] == (use_key, reverse):
+            groups[-1][2].append(entry)
+        else:
+            groups.append((use_key, reverse, [entry]))
+
+    for use_key, reverse, entries in reversed(groups):
+        if use_key:
+            data.sort(key=_composite_sort_key(entries), reverse=reverse)
+        else:
+            data.sort(key=functools.cmp_to_key(_multisort(entries)))
+
+
+def _composite_sort_key(sorters: List[SorterEntry]) -> Callable[[Row], _Tuple]:
+    def sort_key(entry: SorterEntry, row: Row) -> Any:
+        if not entry.join_key:
+            return entry.sorter.sort_key(row)
+        # Sorter for join column, use JOIN info. Rows without it come first.
+        join_row = row["JOIN"].get(entry.join_key)
+        return (False,) if join_row is None else (True, entry.sorter.sort_key(join_row))
+
+    return lambda row: tuple(sort_key(entry, row) for entry in sorters)
+
+
+def _multisort(sorters: List[SorterEntry]) -> Callable[[Row, Row], int]:
     # Handle case where join columns are not present for all rows
     def safe_compare(compfunc: Callable[[Row, Row], int], row1: Row, row2: Row) -> int:
         if row1 is None and row2 is None:
@@ -2949,7 +3087,7 @@ def _sort_data(view: View, data: 'Rows', sorters: List[SorterEntry]) -> None:
                 return c
         return 0  # equal
 
-    data.sort(key=functools.cmp_to_key(multisort))
+    return multisort
 
 
 def sorters_of_datasource(ds_name: str) -> Mapping[str, Sorter]:
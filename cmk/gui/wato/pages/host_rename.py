@@ -505,6 +505,7 @@ def render_renaming_actions(action_counts):
         "favorites": _("Favorite entry of user"),
         "cache": _("Cached output of monitoring agent"),
         "counters": _("File with performance counter"),
+        "parse-results": _("Stored parse results of sections"),
         "agent": _("Baked host specific agent"),
         "agent_deployment": _("Agent deployment status"),
         "piggyback-load": _("Piggyback information from other host"),
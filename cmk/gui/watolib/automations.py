@@ -33,7 +33,7 @@ import cmk.gui.hooks as hooks
 from cmk.gui.utils.urls import urlencode_vars
 from cmk.gui.i18n import _
 from cmk.gui.log import logger
-from cmk.gui.sites import site_is_local, get_site_config
+from cmk.gui.sites import site_config_is_local, get_site_config
 import cmk.gui.utils.escaping as escaping
 from cmk.gui.watolib.sites import SiteManagementFactory
 from cmk.gui.watolib.utils import mk_repr
@@ -61,12 +61,23 @@ def check_mk_automation(siteid: SiteId,
                         stdin_data: Optional[str] = None,
                         timeout: Optional[int] = None,
                         sync: bool = True,
-                        non_blocking_http: bool = False) -> Any:
+                        non_blocking_http: bool = False,
+                        site_config: Optional[SiteConfiguration] = None,
+                        debug: Optional[bool] = None) -> Any:
+    """Execute the automation on the given site
+
+    The configuration of the site and the debug flag are taken from the current request unless
+    they are given. Threads without request context have to resolve them beforehand. These
+    threads can not execute the "restart" and "reload" commands, which call the GUI hooks."""
     if args is None:
         args = []
+    if site_config is None:
+        site_config = get_site_config(siteid)
+    if debug is None:
+        debug = config.debug
 
-    if not siteid or site_is_local(siteid):
-        return check_mk_local_automation(command, args, indata, stdin_data, timeout)
+    if not siteid or site_config_is_local(site_config):
+        return check_mk_local_automation(command, args, indata, stdin_data, timeout, debug=debug)
 
     return check_mk_remote_automation(
         site_id=siteid,
@@ -77,6 +88,8 @@ def check_mk_automation(siteid: SiteId,
         timeout=timeout,
         sync=sync,
         non_blocking_http=non_blocking_http,
+        site_config=site_config,
+        debug=debug,
     )
 
 
@@ -84,9 +97,12 @@ def check_mk_local_automation(command: str,
                               args: Optional[Sequence[str]] = None,
                               indata: Any = "",
                               stdin_data: Optional[str] = None,
-                              timeout: Optional[int] = None) -> Any:
+                              timeout: Optional[int] = None,
+                              debug: Optional[bool] = None) -> Any:
     if args is None:
         args = []
+    if debug is None:
+        debug = config.debug
     new_args = [ensure_str(a) for a in args]
 
     if stdin_data is None:
@@ -121,7 +137,7 @@ def check_mk_local_automation(command: str,
                              close_fds=True,
                              encoding="utf-8")
     except Exception as e:
-        raise _local_automation_failure(command=command, cmdline=cmd, exc=e)
+        raise _local_automation_failure(command=command, cmdline=cmd, debug=debug, exc=e)
 
     assert p.stdin is not None
     assert p.stdout is not None
@@ -143,6 +159,7 @@ def check_mk_local_automation(command: str,
                           (subprocess.list2cmdline(cmd), exitcode))
         raise _local_automation_failure(command=command,
                                         cmdline=cmd,
+                                        debug=debug,
                                         code=exitcode,
                                         out=outdata,
                                         err=errdata)
@@ -154,11 +171,15 @@ def check_mk_local_automation(command: str,
     try:
         return ast.literal_eval(outdata)
     except SyntaxError as e:
-        raise _local_automation_failure(command=command, cmdline=cmd, out=outdata, exc=e)
+        raise _local_automation_failure(command=command,
+                                        cmdline=cmd,
+                                        debug=debug,
+                                        out=outdata,
+                                        exc=e)
 
 
-def _local_automation_failure(command, cmdline, code=None, out=None, err=None, exc=None):
-    call = subprocess.list2cmdline(cmdline) if config.debug else command
+def _local_automation_failure(command, cmdline, debug, code=None, out=None, err=None, exc=None):
+    call = subprocess.list2cmdline(cmdline) if debug else command
     msg = "Error running automation call <tt>%s</tt>" % call
     if code:
         msg += " (exit code %d)" % code
@@ -182,8 +203,10 @@ def check_mk_remote_automation(site_id: SiteId,
                                stdin_data: Optional[str] = None,
                                timeout: Optional[int] = None,
                                sync: bool = True,
-                               non_blocking_http: bool = False) -> Any:
-    site = get_site_config(site_id)
+                               non_blocking_http: bool = False,
+                               site_config: Optional[SiteConfiguration] = None,
+                               debug: Optional[bool] = None) -> Any:
+    site = get_site_config(site_id) if site_config is None else site_config
     if "secret" not in site:
         raise MKGeneralException(
             _("Cannot connect to site \"%s\": The site is not logged in") %
@@ -201,11 +224,11 @@ def check_mk_remote_automation(site_id: SiteId,
         # This will start a background job process on the remote site to execute the automation
         # asynchronously. It then polls the remote site, waiting for completion of the job.
         return _do_check_mk_remote_automation_in_background_job(
-            site_id, CheckmkAutomationRequest(command, args, indata, stdin_data, timeout))
+            site, CheckmkAutomationRequest(command, args, indata, stdin_data, timeout), debug)
 
     # Synchronous execution of the actual remote command in a single blocking HTTP request
     return do_remote_automation(
-        get_site_config(site_id),
+        site,
         "checkmk-automation",
         [
             ("automation", command),  # The Checkmk automation command
@@ -213,7 +236,8 @@ def check_mk_remote_automation(site_id: SiteId,
             ("indata", mk_repr(indata)),  # The input data
             ("stdin_data", mk_repr(stdin_data)),  # The input data for stdin
             ("timeout", mk_repr(timeout)),  # The timeout
-        ])
+        ],
+        debug=debug)
 
 
 # If the site is not up-to-date, synchronize it first.
@@ -273,7 +297,7 @@ def call_hook_activate_changes():
         hooks.call("activate-changes", cmk.gui.watolib.hosts_and_folders.collect_all_hosts())
 
 
-def do_remote_automation(site, command, vars_, files=None, timeout=None):
+def do_remote_automation(site, command, vars_, files=None, timeout=None, debug=None):
     auto_logger.info("RUN [%s]: %s", site, command)
     auto_logger.debug("VARS: %r", vars_)
 
@@ -282,8 +306,10 @@ def do_remote_automation(site, command, vars_, files=None, timeout=None):
     if not secret:
         raise MKAutomationException(_("You are not logged into the remote site."))
 
+    if debug is None:
+        debug = config.debug
     url = (base_url + "automation.py?" + urlencode_vars([("command", command), ("secret", secret),
-                                                         ("debug", config.debug and '1' or '')]))
+                                                         ("debug", debug and '1' or '')]))
 
     response = get_url(url,
                        site.get('insecure', False),
@@ -403,22 +429,23 @@ CheckmkAutomationGetStatusResponse = NamedTuple("CheckmkAutomationGetStatusRespo
 # calls but have been implemented individually. Does it make sense to refactor them to use this?
 # - Service discovery of a single host (cmk.gui.wato.pages.services._get_check_table)
 # - Fetch agent / SNMP output (cmk.gui.wato.pages.fetch_agent_output.FetchAgentOutputBackgroundJob)
-def _do_check_mk_remote_automation_in_background_job(
-        site_id: SiteId, automation_request: CheckmkAutomationRequest) -> Any:
+def _do_check_mk_remote_automation_in_background_job(site_config: SiteConfiguration,
+                                                     automation_request: CheckmkAutomationRequest,
+                                                     debug: Optional[bool] = None) -> Any:
     """Execute the automation in a background job on the remote site
 
     It starts the background job using one call. It then polls the remote site, waiting for
     completion of the job."""
-    site_config = get_site_config(site_id)
-
-    job_id = _start_remote_automation_job(site_config, automation_request)
+    job_id = _start_remote_automation_job(site_config, automation_request, debug)
 
     auto_logger.info("Waiting for job completion")
     result = None
     while True:
-        raw_response = do_remote_automation(site_config, "checkmk-remote-automation-get-status", [
-            ("request", repr(job_id)),
-        ])
+        raw_response = do_remote_automation(site_config,
+                                            "checkmk-remote-automation-get-status", [
+                                                ("request", repr(job_id)),
+                                            ],
+                                            debug=debug)
         response = CheckmkAutomationGetStatusResponse(*raw_response)
         auto_logger.debug("Job status: %r", response)
 
@@ -431,11 +458,14 @@ def _do_check_mk_remote_automation_in_background_job(
 
 
 def _start_remote_automation_job(site_config: SiteConfiguration,
-                                 automation_request: CheckmkAutomationRequest) -> str:
+                                 automation_request: CheckmkAutomationRequest,
+                                 debug: Optional[bool] = None) -> str:
     auto_logger.info("Starting remote automation in background job")
-    job_id = do_remote_automation(site_config, "checkmk-remote-automation-start", [
-        ("request", repr(tuple(automation_request))),
-    ])
+    job_id = do_remote_automation(site_config,
+                                  "checkmk-remote-automation-start", [
+                                      ("request", repr(tuple(automation_request))),
+                                  ],
+                                  debug=debug)
 
     auto_logger.info("Started background job: %s", job_id)
     return job_id
@@ -525,12 +555,18 @@ def execute_automation_discovery(*,
                                  site_id: SiteId,
                                  args: Sequence[str],
                                  timeout=None,
-                                 non_blocking_http=False) -> AutomationDiscoveryResponse:
+                                 non_blocking_http=False,
+                                 sync=True,
+                                 site_config=None,
+                                 debug=None) -> AutomationDiscoveryResponse:
     raw_response = check_mk_automation(site_id,
                                        "inventory",
                                        args,
                                        timeout=timeout,
-                                       non_blocking_http=True)
+                                       sync=sync,
+                                       non_blocking_http=True,
+                                       site_config=site_config,
+                                       debug=debug)
     # This automation may be executed agains 1.6 remote sites. Be compatible to old structure
     # (counts, failed_hosts).
     if isinstance(raw_response, tuple) and len(raw_response) == 2:
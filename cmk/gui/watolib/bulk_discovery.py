@@ -4,13 +4,17 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
-from typing import NamedTuple, List
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Counter, Deque, Dict, NamedTuple, List
+
+from livestatus import SiteConfiguration
 
 import cmk.utils.store as store
 from cmk.utils.type_defs import DiscoveryResult
 
 from cmk.gui.i18n import _
-from cmk.gui.globals import request
+from cmk.gui.globals import config, request
 from cmk.gui.valuespec import (
     Checkbox,
     Dictionary,
@@ -20,8 +24,13 @@ from cmk.gui.valuespec import (
 )
 from cmk.gui.valuespec import ValueSpec
 
+from cmk.gui.sites import get_site_config, site_is_local
 from cmk.gui.watolib.hosts_and_folders import Folder
-from cmk.gui.watolib.automations import execute_automation_discovery, AutomationDiscoveryResponse
+from cmk.gui.watolib.automations import (
+    execute_automation_discovery,
+    AutomationDiscoveryResponse,
+    sync_changes_before_remote_automation,
+)
 from cmk.gui.watolib.changes import add_service_change
 import cmk.gui.gui_background_job as gui_background_job
 from cmk.gui.watolib.wato_background_job import WatoBackgroundJob
@@ -109,6 +118,9 @@ def vs_bulk_discovery(render_form=False, include_subfolders=True):
 @gui_background_job.job_registry.register
 class BulkDiscoveryBackgroundJob(WatoBackgroundJob):
     job_prefix = "bulk_discovery"
+    # Number of tasks (automation calls) executed at the same time, in total and per remote site
+    max_concurrent_tasks = 8
+    max_concurrent_tasks_per_remote_site = 2
 
     @classmethod
     def gui_title(cls):
@@ -129,8 +141,7 @@ class BulkDiscoveryBackgroundJob(WatoBackgroundJob):
         self._initialize_statistics(num_hosts_total=sum(len(task.host_names) for task in tasks),)
         job_interface.send_progress_update(_("Bulk discovery started..."))
 
-        for task in tasks:
-            self._bulk_discover_item(task, mode, do_scan, error_handling, job_interface)
+        self._bulk_discover_tasks(tasks, mode, do_scan, error_handling, job_interface)
 
         job_interface.send_progress_update(_("Bulk discovery finished."))
 
@@ -161,24 +172,87 @@ class BulkDiscoveryBackgroundJob(WatoBackgroundJob):
         self._num_host_labels_total = 0
         self._num_host_labels_added = 0
 
-    def _bulk_discover_item(self, task, mode, do_scan, error_handling, job_interface):
-
-        try:
-            response = self._execute_discovery(task, mode, do_scan, error_handling)
-            self._process_discovery_results(task, job_interface, response)
-        except Exception:
-            self._num_hosts_failed += len(task.host_names)
-            if task.site_id:
-                msg = _("Error during discovery of %s on site %s") % \
-                    (", ".join(task.host_names), task.site_id)
-            else:
-                msg = _("Error during discovery of %s") % (", ".join(task.host_names))
-            self._logger.exception(msg)
+    def _bulk_discover_tasks(self, tasks, mode, do_scan, error_handling, job_interface):
+        """Execute the automation calls of the tasks concurrently
 
+        Only the automation calls are executed in the worker threads. The results are processed
+        here as soon as a task is finished, because updating the WATO configuration and
+        recording the changes needs the context of the current request and user. For the same
+        reason the site configurations and the debug flag are looked up here and handed over to
+        the worker threads."""
+        timeout = request.request_timeout - 2
+        debug = config.debug
+        site_configs: Dict[str, SiteConfiguration] = {}
+        queued_tasks: Dict[str, Deque[DiscoveryTask]] = {}
+        for task in tasks:
+            queued_tasks.setdefault(task.site_id, deque()).append(task)
+        synced_sites = set()
+        running_tasks: Dict[Future, DiscoveryTask] = {}
+        running_per_site: Counter[str] = Counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_tasks) as executor:
+            while queued_tasks or running_tasks:
+                for site_id in list(queued_tasks):
+                    site_queue = queued_tasks[site_id]
+                    while (site_queue and len(running_tasks) < self.max_concurrent_tasks and
+                           self._may_start_task(site_id, running_per_site[site_id])):
+                        task = site_queue.popleft()
+                        try:
+                            if site_id not in synced_sites:
+                                self._prepare_site(site_id)
+                                synced_sites.add(site_id)
+                                site_configs[site_id] = get_site_config(site_id)
+                        except Exception:
+                            self._task_failed(task)
+                            continue
+
+                        future = executor.submit(self._execute_discovery, task, mode, do_scan,
+                                                 error_handling, timeout, site_configs[site_id],
+                                                 debug)
+                        running_tasks[future] = task
+                        running_per_site[site_id] += 1
+
+                    if not site_queue:
+                        del queued_tasks[site_id]
+
+                if not running_tasks:
+                    continue
+
+                done, _not_done = wait(running_tasks, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running_tasks.pop(future)
+                    running_per_site[task.site_id] -= 1
+                    try:
+                        self._process_discovery_results(task, job_interface, future.result())
+                    except Exception:
+                        self._task_failed(task)
+                        continue
+                    self._num_hosts_processed += len(task.host_names)
+
+    def _may_start_task(self, site_id, num_running: int) -> bool:
+        if not site_id or site_is_local(site_id):
+            return True
+        return num_running < self.max_concurrent_tasks_per_remote_site
+
+    def _prepare_site(self, site_id):
+        # Pending changes are synchronized once per remote site before the first automation
+        # call. This can not be done in the worker threads, which are missing the request context.
+        if site_id and not site_is_local(site_id):
+            sync_changes_before_remote_automation(site_id)
+
+    def _task_failed(self, task):
+        self._num_hosts_failed += len(task.host_names)
+        if task.site_id:
+            msg = _("Error during discovery of %s on site %s") % \
+                (", ".join(task.host_names), task.site_id)
+        else:
+            msg = _("Error during discovery of %s") % (", ".join(task.host_names))
+        self._logger.exception(msg)
         self._num_hosts_processed += len(task.host_names)
 
-    def _execute_discovery(self, task, mode, do_scan,
-                           error_handling) -> AutomationDiscoveryResponse:
+    def _execute_discovery(self, task, mode, do_scan, error_handling, timeout,
+                           site_config: SiteConfiguration,
+                           debug: bool) -> AutomationDiscoveryResponse:
         arguments = [mode] + task.host_names
 
         if do_scan:
@@ -186,12 +260,13 @@ class BulkDiscoveryBackgroundJob(WatoBackgroundJob):
         if not error_handling:
             arguments = ["@raiseerrors"] + arguments
 
-        timeout = request.request_timeout - 2
-
         return execute_automation_discovery(site_id=task.site_id,
                                             args=arguments,
                                             timeout=timeout,
-                                            non_blocking_http=True)
+                                            non_blocking_http=True,
+                                            sync=False,
+                                            site_config=site_config,
+                                            debug=debug)
 
     def _process_discovery_results(self, task, job_interface,
                                    response: AutomationDiscoveryResponse) -> None:
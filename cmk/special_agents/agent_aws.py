@@ -9,6 +9,7 @@ Special agent for monitoring Amazon web services (AWS) with Check_MK.
 
 import abc
 import argparse
+import concurrent.futures
 import errno
 import hashlib
 import json
@@ -16,7 +17,7 @@ import logging
 from pathlib import Path
 import sys
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, NamedTuple, Set, Tuple, Union, Callable, Optional
+from typing import Any, Dict, List, NamedTuple, Sequence, Set, Tuple, Union, Callable, Optional
 
 import boto3  # type: ignore[import]
 import botocore  # type: ignore[import]
@@ -154,6 +155,16 @@ AWSStrings = Union[bytes, str]
 #   |                              |_|                                     |
 #   '----------------------------------------------------------------------'
 
+# A single GetMetricData call can include up to 500 MetricDataQuery structures
+_MAX_METRIC_DATA_QUERIES = 500
+
+# Throttled or otherwise failed API calls are retried with exponential backoff by botocore.
+# This becomes important as soon as we fetch several regions and sections concurrently.
+_RETRY_CONFIG = {
+    'max_attempts': 10,
+    'mode': 'standard',
+}
+
 
 def _chunks(list_, length=100):
     return [list_[i:i + length] for i in range(0, len(list_), length)]
@@ -303,6 +314,10 @@ class ResultDistributor:
     def __init__(self):
         self._colleagues = []
 
+    @property
+    def colleagues(self):
+        return self._colleagues
+
     def add(self, colleague):
         self._colleagues.append(colleague)
 
@@ -456,6 +471,11 @@ class AWSSection(DataCache):
                 f"10, 30, 60 in case of high resolution.")
         return period
 
+    @property
+    def colleagues(self):
+        """The sections which receive the computed content of this section"""
+        return self._distributor.colleagues
+
     def _send(self, content):
         self._distributor.distribute(self, content)
 
@@ -648,11 +668,10 @@ class AWSSectionCloudwatch(AWSSection):
         if not metric_specs:
             return []
 
-        # A single GetMetricData call can include up to 100 MetricDataQuery structures
         # There's no pagination for this operation:
         # self._client.can_paginate('get_metric_data') = False
         raw_content = []
-        for chunk in _chunks(metric_specs):
+        for chunk in _chunks(metric_specs, length=_MAX_METRIC_DATA_QUERIES):
             if not chunk:
                 continue
             response = self._client.get_metric_data(
@@ -3937,20 +3956,31 @@ class LambdaCloudwatch(AWSSectionCloudwatch):
 
 
 class AWSSections(abc.ABC):
-    def __init__(self, hostname, session, debug=False, config=None):
+    def __init__(self, hostname, session, debug=False, config=None, clients=None):
         self._hostname = hostname
         self._session = session
         self._debug = debug
         self._sections = []
+        self._section_results: Dict[int, AWSSectionResults] = {}
+        self._section_exceptions: Dict[int, Exception] = {}
         self.config = config
+        # Clients may be shared by all AWSSections of the same region
+        self._clients = {} if clients is None else clients
+
+    @property
+    def sections(self):
+        return self._sections
 
     @abc.abstractmethod
     def init_sections(self, services, region, config, s3_limits_distributor=None):
         pass
 
     def _init_client(self, client_key):
+        if client_key in self._clients:
+            return self._clients[client_key]
+
         try:
-            return self._session.client(client_key, config=self.config)
+            client = self._session.client(client_key, config=self.config)
         except (ValueError, botocore.exceptions.ClientError,
                 botocore.exceptions.UnknownServiceError) as e:
             # If region name is not valid we get a ValueError
@@ -3963,22 +3993,41 @@ class AWSSections(abc.ABC):
             logging.info("Invalid region name or client key %s: %s", client_key, e)
             raise
 
+        self._clients[client_key] = client
+        return client
+
     def run(self, use_cache=True):
+        for section in self._sections:
+            self.run_section(section, use_cache=use_cache)
+        self.write_results()
+
+    def run_section(self, section, use_cache=True):
+        try:
+            section_result = section.run(use_cache=use_cache)
+        except AssertionError as e:
+            logging.info(e)
+            if self._debug:
+                raise
+        except Exception as e:
+            logging.info("%s: %s", section.__class__.__name__, e)
+            if self._debug:
+                raise
+            self._section_exceptions[id(section)] = e
+        else:
+            self._section_results[id(section)] = section_result
+
+    def write_results(self):
+        """Write the results of all sections which have been run
+
+        The output only depends on the order of the registered sections, not on the
+        order in which the sections have been run.
+        """
         exceptions = []
         results: Dict[Tuple[str, float, float], str] = {}
         for section in self._sections:
-            try:
-                section_result = section.run(use_cache=use_cache)
-            except AssertionError as e:
-                logging.info(e)
-                if self._debug:
-                    raise
-            except Exception as e:
-                logging.info("%s: %s", section.__class__.__name__, e)
-                if self._debug:
-                    raise
-                exceptions.append(e)
-            else:
+            if (exception := self._section_exceptions.get(id(section))) is not None:
+                exceptions.append(exception)
+            if (section_result := self._section_results.get(id(section))) is not None:
                 results.setdefault(
                     (section.name, section_result.cache_timestamp, section.cache_interval),
                     section_result.results)
@@ -4357,6 +4406,45 @@ class AWSSectionsGeneric(AWSSections):
             self._sections.append(lambda_cloudwatch)
 
 
+def run_sections_concurrently(aws_sections: Sequence[AWSSections], use_cache: bool,
+                              max_workers: int) -> None:
+    """Run the sections of all regions in a pool of worker threads
+
+    A section is started as soon as all sections it receives contents from are done (see
+    the overview of sections and dependencies above). This also holds across regions, see
+    ResultDistributorS3Limits. The results are written in the same order as if the
+    sections were run one after another.
+    """
+    pending = [(sections, section) for sections in aws_sections for section in sections.sections]
+    senders: Dict[int, Set[int]] = {id(section): set() for _sections, section in pending}
+    for _sections, section in pending:
+        for colleague in section.colleagues:
+            if id(colleague) in senders and colleague.name != section.name:
+                senders[id(colleague)].add(id(section))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running: Dict[concurrent.futures.Future, int] = {}
+        while pending or running:
+            ready = [
+                (sections, section) for sections, section in pending if not senders[id(section)]
+            ] or ([] if running else pending[:])
+            for sections, section in ready:
+                pending.remove((sections, section))
+                running[executor.submit(sections.run_section, section, use_cache)] = id(section)
+
+            done, _not_done = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                section_id = running.pop(future)
+                # Only raises in debug mode, see AWSSections.run_section
+                future.result()
+                for section_senders in senders.values():
+                    section_senders.discard(section_id)
+
+    for sections in aws_sections:
+        sections.write_results()
+
+
 #.
 #   .--main----------------------------------------------------------------.
 #   |                                       _                              |
@@ -4505,6 +4593,12 @@ def parse_arguments(argv):
     parser.add_argument("--wafv2-cloudfront",
                         action="store_true",
                         help="Also monitor global WAFs in front of CloudFront resources.")
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=1,
+        help="Number of threads used to fetch the sections of all regions concurrently.\n"
+        "Sections depending on the results of other sections are fetched afterwards.")
     parser.add_argument("--hostname", required=True)
 
     for service in AWSServices:
@@ -4738,18 +4832,19 @@ def main(sys_argv=None):
 
     setup_logging(args.debug, args.verbose)
     hostname = args.hostname
-    proxy_config = None
+    client_config = botocore.config.Config(retries=_RETRY_CONFIG)
     if args.proxy_host:
         proxy_user = stdin_args.get('proxy_user') or args.proxy_user
         proxy_password = stdin_args.get('proxy_password') or args.proxy_password
-        proxy_config = botocore.config.Config(proxies={
-            'https': _proxy_address(
-                args.proxy_host,
-                args.proxy_port,
-                proxy_user,
-                proxy_password,
-            )
-        })
+        client_config = client_config.merge(
+            botocore.config.Config(proxies={
+                'https': _proxy_address(
+                    args.proxy_host,
+                    args.proxy_port,
+                    proxy_user,
+                    proxy_password,
+                )
+            }))
 
     aws_config = AWSConfig(hostname, sys_argv, (args.overall_tag_key, args.overall_tag_values))
     for service_key, service_names, service_tags, service_limits in [
@@ -4783,6 +4878,11 @@ def main(sys_argv=None):
     # Special distributor for S3 limits which distributes results across different regions
     s3_limits_distributor = ResultDistributorS3Limits()
 
+    # Sessions and clients are shared by the global and regional sections of a region
+    sessions: Dict[str, Any] = {}
+    clients: Dict[str, Dict[str, Any]] = {}
+    concurrent_sections: List[AWSSections] = []
+
     for aws_services, aws_regions, aws_sections in [
         (global_services, ["us-east-1"], AWSSectionsUSEast),
         (regional_services, args.regions, AWSSectionsGeneric),
@@ -4791,18 +4891,26 @@ def main(sys_argv=None):
             continue
         for region in aws_regions:
             try:
-                if args.assume_role:
-                    session = sts_assume_role(access_key_id, secret_access_key, args.role_arn,
-                                              args.external_id, region)
-                else:
-                    session = create_session(access_key_id, secret_access_key, region)
-
-                sections = aws_sections(hostname, session, debug=args.debug, config=proxy_config)
+                if region not in sessions:
+                    if args.assume_role:
+                        sessions[region] = sts_assume_role(access_key_id, secret_access_key,
+                                                           args.role_arn, args.external_id, region)
+                    else:
+                        sessions[region] = create_session(access_key_id, secret_access_key, region)
+
+                sections = aws_sections(hostname,
+                                        sessions[region],
+                                        debug=args.debug,
+                                        config=client_config,
+                                        clients=clients.setdefault(region, {}))
                 sections.init_sections(aws_services,
                                        region,
                                        aws_config,
                                        s3_limits_distributor=s3_limits_distributor)
-                sections.run(use_cache=use_cache)
+                if args.max_workers > 1:
+                    concurrent_sections.append(sections)
+                else:
+                    sections.run(use_cache=use_cache)
             except AwsAccessError as ae:
                 # can not access AWS, retreat
                 sys.stdout.write("<<<aws_exceptions>>>\n")
@@ -4816,6 +4924,19 @@ def main(sys_argv=None):
                 has_exceptions = True
                 if args.debug:
                     raise
+
+    if concurrent_sections:
+        try:
+            run_sections_concurrently(concurrent_sections, use_cache, args.max_workers)
+        except AssertionError:
+            if args.debug:
+                raise
+        except Exception as e:
+            logging.info(e)
+            has_exceptions = True
+            if args.debug:
+                raise
+
     if has_exceptions:
         return 1
     return 0
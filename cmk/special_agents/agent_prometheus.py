@@ -9,11 +9,25 @@ Special agent for monitoring Prometheus with Checkmk.
 import ast
 import sys
 import argparse
+import concurrent.futures
 import json
 import time
 import logging
 import traceback
-from typing import List, Dict, Any, Mapping, DefaultDict, Optional, Iterator, Tuple, Callable, Union
+from typing import (
+    List,
+    Dict,
+    Any,
+    Mapping,
+    DefaultDict,
+    Optional,
+    Iterable,
+    Iterator,
+    Tuple,
+    Callable,
+    Counter,
+    Union,
+)
 from collections import OrderedDict, defaultdict
 from cmk.special_agents.utils.request_helper import (
     create_api_connect_session,
@@ -23,6 +37,7 @@ from cmk.special_agents.utils.request_helper import (
 import math
 from urllib.parse import quote
 import requests
+from requests.adapters import HTTPAdapter
 
 PromQLMetric = Dict[str, Any]
 
@@ -130,6 +145,7 @@ class NodeExporter:
             self, promql_list: List[Tuple[str, str]]) -> Dict[str, Dict[str, FilesystemInfo]]:
         result: Dict[str, Dict[str, FilesystemInfo]] = {}
 
+        self.api_client.prefetch_promql_queries(query for _entity, query in promql_list)
         for entity_name, promql_query in promql_list:
             for mountpoint_info in self.api_client.perform_multi_result_promql(
                     promql_query).promql_metrics:
@@ -188,6 +204,7 @@ class NodeExporter:
             diskstat_list: List[Tuple[str,
                                       str]]) -> Dict[str, Dict[str, Dict[str, Union[int, str]]]]:
         result: Dict[str, Dict[str, Dict[str, Union[int, str]]]] = {}
+        self.api_client.prefetch_promql_queries(query for _entity, query in diskstat_list)
         for entity_name, promql_query in diskstat_list:
             for node_info in self.api_client.perform_multi_result_promql(
                     promql_query).promql_metrics:
@@ -256,6 +273,7 @@ class NodeExporter:
 
     def _generate_memory_stats(self, promql_list: List[Tuple[str, str]]) -> Dict[str, List[str]]:
         result: Dict[str, List[str]] = {}
+        self.api_client.prefetch_promql_queries(query for _entity, query in promql_list)
         for entity_name, promql_query in promql_list:
             promql_result = self.api_client.perform_multi_result_promql(promql_query).promql_metrics
             for node_element in promql_result:
@@ -293,6 +311,7 @@ class NodeExporter:
             self, kernel_list: List[Tuple[str, str]]) -> Dict[str, Dict[str, Dict[str, int]]]:
         result: Dict[str, Dict[str, Dict[str, int]]] = {}
 
+        self.api_client.prefetch_promql_queries(query for _entity, query in kernel_list)
         for entity_name, promql_query in kernel_list:
             for device_info in self.api_client.perform_multi_result_promql(
                     promql_query).promql_metrics:
@@ -418,8 +437,11 @@ class CAdvisorExporter:
 
         result: Dict[str, Dict[str, Union[str, Dict[str, str]]]] = {}
         associations = {}
-        for memory_stat, promql_query in memory_info:
-            promql_query = promql_query.replace("{namespace_filter}", self._namespace_query_part())
+        memory_queries = [(memory_stat,
+                           promql_query.replace("{namespace_filter}", self._namespace_query_part()))
+                          for memory_stat, promql_query in memory_info]
+        self.api_client.prefetch_promql_queries(query for _stat, query in memory_queries)
+        for memory_stat, promql_query in memory_queries:
             for pod_memory_info in self.api_client.query_promql(promql_query):
                 pod_name = self._pod_name(pod_memory_info.labels)
                 pod = result.setdefault(pod_name, {})
@@ -537,6 +559,9 @@ class CAdvisorExporter:
 
         result = []
         group_element = "name" if group_element in ("name", "container") else "pod, namespace"
+        self.api_client.prefetch_promql_queries(
+            self._prepare_query(entity_promql, group_element)
+            for entity_promql in entity_info.values())
         for entity_name, entity_promql in entity_info.items():
             promql_result = self.api_client.query_promql(
                 self._prepare_query(entity_promql, group_element))
@@ -599,6 +624,7 @@ class KubeStateExporter:
             ("requests", "cpu", "sum(kube_pod_container_resource_requests_cpu_cores)"),
             ("requests", "memory", "sum(kube_pod_container_resource_requests_memory_bytes)"),
         ]
+        self.api_client.prefetch_promql_queries(query for _family, _type, query in resources_list)
         result: Dict[str, Dict[str, Any]] = {}
         for resource_family, resource_type, promql_query in resources_list:
             for cluster_info in self.api_client.query_promql(promql_query):
@@ -681,6 +707,7 @@ class KubeStateExporter:
             "MemoryPressure": 'kube_node_status_condition{condition="MemoryPressure"}',
             "Ready": 'kube_node_status_condition{condition="Ready"}',
         }
+        self.api_client.prefetch_promql_queries(node_conditions_info.values())
         result: Dict[str, Dict[str, Any]] = {}
         for entity_name, promql_query in node_conditions_info.items():
             # node_result: Dict[str, Dict[str, Any]] = {}
@@ -712,6 +739,7 @@ class KubeStateExporter:
         ]
 
         node_valid_limits = self._nodes_limits()
+        self.api_client.prefetch_promql_queries(query for _family, _type, query in resources_list)
         result: Dict[str, Dict[str, Any]] = {}
         for resource_family, resource_type, promql_query in resources_list:
             for node_info in self.api_client.query_promql(promql_query):
@@ -739,6 +767,8 @@ class KubeStateExporter:
             )
         ]
 
+        self.api_client.prefetch_promql_queries(
+            query for _count_type, query in pods_count_expressions)
         node_pods: Dict[str, Dict[str, str]] = {}
         for pod_count_type, promql_query in pods_count_expressions:
             for count_result in self.api_client.query_promql(promql_query):
@@ -773,6 +803,7 @@ class KubeStateExporter:
              "sum by (pod, namespace)(kube_pod_container_status_ready{namespace_filter}) / count by (pod, namespace)(kube_pod_container_status_ready{namespace_filter})"
             ),
         ]
+        self._prefetch_queries(query for _metric, query in pod_conditions_info)
         result = []
         for promql_metric, promql_query in pod_conditions_info:
             promql_result = self._perform_query(promql_query)
@@ -803,6 +834,7 @@ class KubeStateExporter:
                 ("running", "kube_pod_container_status_running{namespace_filter}"),
                 ("ready", "kube_pod_container_status_ready{namespace_filter}"),
                 ("terminated", "kube_pod_container_status_terminated{namespace_filter}")]
+        self._prefetch_queries(query for _condition, query in info)
         pod_container_result = []
         for condition, promql_query in info:
             temp_result: Dict[str, Dict[str, Any]] = {}
@@ -833,11 +865,6 @@ class KubeStateExporter:
     def pod_resources_summary(self) -> List[Dict[str, Dict[str, Any]]]:
         logging.debug("Parsing kube pod resources")
 
-        pods_container_count = {
-            self._pod_name(pod_info.labels): pod_info.value() for pod_info in self._perform_query(
-                "count by (pod, namespace)(kube_pod_container_info{namespace_filter})")
-        }
-
         resources_list = [(
             "requests", "cpu",
             "sum by (pod, namespace)(kube_pod_container_resource_requests_cpu_cores{namespace_filter})"
@@ -849,6 +876,20 @@ class KubeStateExporter:
                           ("limits", "memory",
                            "kube_pod_container_resource_limits_memory_bytes{namespace_filter}")]
 
+        pods_container_count_query = ("count by (pod, namespace)"
+                                      "(kube_pod_container_info{namespace_filter})")
+        self._prefetch_queries([pods_container_count_query] + [
+            query_template % query  #
+            for resource_family, _type, query in resources_list
+            for query_template in (("%s",) if resource_family == "requests" else
+                                   ("sum by (pod, namespace)(%s)", "count by (pod, namespace)(%s)"))
+        ])
+
+        pods_container_count = {
+            self._pod_name(pod_info.labels): pod_info.value()
+            for pod_info in self._perform_query(pods_container_count_query)
+        }
+
         def _process_resources(resource: str, query: str) -> Dict[str, Dict[str, Dict[str, float]]]:
             pod_resources: Dict[str, Dict[str, Dict[str, float]]] = {}
             resource_result = {
@@ -901,6 +942,7 @@ class KubeStateExporter:
             "number_available": "kube_daemonset_status_number_available{namespace_filter}",
             "number_unavailable": "kube_daemonset_status_number_unavailable{namespace_filter}"
         }
+        self._prefetch_queries(daemon_pods_info.values())
         result = []
         for entity_name, promql_query in daemon_pods_info.items():
             piggybacked_services = parse_piggybacked_values(
@@ -952,13 +994,20 @@ class KubeStateExporter:
         return [result]
 
     def _perform_query(self, promql_query):
+        return self.api_client.query_promql(self._apply_namespace_filter(promql_query))
+
+    def _prefetch_queries(self, promql_queries: Iterable[str]) -> None:
+        self.api_client.prefetch_promql_queries(
+            self._apply_namespace_filter(promql_query) for promql_query in promql_queries)
+
+    def _apply_namespace_filter(self, promql_query: str) -> str:
         if "namespace_filter" in promql_query:
             if self.namespace_include_patterns:
                 namespace_detail = f"{{namespace=~'{'|'.join(self.namespace_include_patterns)}'}}"
                 promql_query = promql_query.format(namespace_filter=namespace_detail)
             else:
                 promql_query = promql_query.format(namespace_filter="")
-        return self.api_client.query_promql(promql_query)
+        return promql_query
 
     @staticmethod
     def _retrieve_promql_specific(metrics, entries):
@@ -1413,8 +1462,18 @@ class PrometheusAPI:
     """
     Realizes communication with the Prometheus API
     """
-    def __init__(self, session) -> None:
+    def __init__(self, session, max_workers: int = 1) -> None:
         self.session = session
+        self.max_workers = max_workers
+        if max_workers > 1:
+            # Let the concurrent queries share the connections of one pool
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+        # Raw results of the prefetched PromQL expressions and how often they are still going
+        # to be requested. A result is dropped as soon as it has been consumed that often.
+        self._prefetched_results: Dict[str, List[Dict[str, Any]]] = {}
+        self._pending_requests: Counter[str] = Counter()
         self.scrape_targets_dict = self._connected_scrape_targets()
 
     def scrape_targets_attributes(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
@@ -1446,6 +1505,10 @@ class PrometheusAPI:
                  contains the information of one service including the service metrics
 
         """
+        self.prefetch_promql_queries(metric["promql_query"]
+                                     for service in custom_services
+                                     for metric in service["metric_components"])
+
         result: Dict[str, Dict[str, Any]] = {}
         for service in custom_services:
             # Per default assign resulting service to Prometheus Host
@@ -1506,7 +1569,49 @@ class PrometheusAPI:
             logging.exception(exc)
             return []
 
+    def prefetch_promql_queries(self, promql_expressions: Iterable[str]) -> None:
+        """Query the given PromQL expressions concurrently
+
+        The results are kept for the subsequent calls of query_promql and
+        perform_multi_result_promql, which are expected to request each given expression
+        once. Expressions are only queried once, even if given several times. A result is
+        dropped after it has been requested as often as it was given. Failed queries are not
+        kept: They are sent again when requested, which raises the error as usual.
+        Nothing is done unless more than one worker is configured.
+        """
+        if self.max_workers <= 1:
+            return
+
+        requested = Counter(promql_expressions)
+        pending = [promql for promql in requested if promql not in self._prefetched_results]
+
+        def _query(promql: str) -> Optional[List[Dict[str, Any]]]:
+            try:
+                return self._query_promql_expression(promql)
+            except Exception:
+                return None
+
+        if len(pending) > 1:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for promql, result in zip(pending, executor.map(_query, pending)):
+                    if result is not None:
+                        self._prefetched_results[promql] = result
+
+        for promql, count in requested.items():
+            if promql in self._prefetched_results:
+                self._pending_requests[promql] += count
+
     def _perform_promql_query(self, promql: str) -> List[Dict[str, Any]]:
+        if promql not in self._prefetched_results:
+            return self._query_promql_expression(promql)
+
+        self._pending_requests[promql] -= 1
+        if self._pending_requests[promql] > 0:
+            return self._prefetched_results[promql]
+        del self._pending_requests[promql]
+        return self._prefetched_results.pop(promql)
+
+    def _query_promql_expression(self, promql: str) -> List[Dict[str, Any]]:
         api_query_expression = "query?query=%s" % quote(promql)
         result = self._process_json_request(api_query_expression)["data"]["result"]
         return result
@@ -1981,7 +2086,7 @@ def main(argv=None):
         session = _generate_api_session(_extract_connection_args(config))
         exporter_options = config_args["exporter_options"]
         # default cases always must be there
-        api_client = PrometheusAPI(session)
+        api_client = PrometheusAPI(session, max_workers=config.get("max_workers", 1))
         api_data = ApiData(api_client, exporter_options)
         print(api_data.prometheus_build_section())
         print(api_data.promql_section(config_args["custom_services"]))
@@ -7,16 +7,31 @@
 
 import argparse
 import collections
+import concurrent.futures
+import contextlib
 import datetime
 import errno
 import json
 from pathlib import Path
+import queue
 import re
 import socket
 import sys
 import time
-from typing import Any, Counter, Dict, List
+from typing import (
+    Any,
+    Callable,
+    Counter,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 from xml.dom import minidom  # type: ignore[import]
+import xml.etree.ElementTree as ET
 
 import requests
 import urllib3  # type: ignore[import]
@@ -38,6 +53,8 @@ from cmk.special_agents.utils import vcrtrace
 
 AGENT_TMP_PATH = Path(cmk.utils.paths.tmp_dir, "agents/agent_vsphere")
 
+T = TypeVar("T")
+
 REQUESTED_COUNTERS_KEYS = (
     'disk.numberReadAveraged',
     'disk.numberWriteAveraged',
@@ -975,6 +992,12 @@ def parse_arguments(argv):
         action="store_true",
         help="""If provided, virtual machine snapshots summary service will be generated on the ESX
         host. By default, it will only be created for the vCenter.""")
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=1,
+        help="""Number of concurrent connections used to query the performance counters of
+        the host systems. Default is 1.""")
     parser.add_argument(
         "-H",
         "--hostname",
@@ -1077,10 +1100,29 @@ class ESXConnection:
         self._perf_samples_path = AGENT_TMP_PATH / ("%s.timer" % address)
         self._perf_samples = None
 
+        self._address = address
+        self._port = port
+        self._no_cert_check = opt.no_cert_check
         self._session = ESXSession(address, port, opt.no_cert_check)
+        # Additional sessions for concurrent queries. They share the login cookie of _session.
+        self._idle_sessions: "queue.SimpleQueue[ESXSession]" = queue.SimpleQueue()
         self.system_info = self._fetch_systeminfo()
         self._soap_templates = SoapTemplates(self.system_info)
 
+    @contextlib.contextmanager
+    def _pooled_session(self) -> Iterator[ESXSession]:
+        try:
+            session = self._idle_sessions.get_nowait()
+        except queue.Empty:
+            session = ESXSession(self._address, self._port, self._no_cert_check)
+
+        if "Cookie" in self._session.headers:
+            session.headers["Cookie"] = self._session.headers["Cookie"]
+        try:
+            yield session
+        finally:
+            self._idle_sessions.put(session)
+
     def _fetch_systeminfo(self):
         """Retrieve basic data, which requires no login"""
         system_info = {}
@@ -1115,23 +1157,37 @@ class ESXConnection:
         return system_info
 
     def query_server(self, method, **kwargs):
+        return "".join(self._query_server_responses(self._session, method, **kwargs))
+
+    def query_server_pooled(self, method, parse: Callable[[str], Iterable[T]], **kwargs) -> List[T]:
+        """Query the server using one of the pooled sessions
+
+        This is safe to be called from several threads at once. Unlike query_server, each
+        response is a valid XML document on its own. It is parsed with `parse` as soon as it
+        arrives and dropped afterwards, only the parsed items are returned.
+        """
+        with self._pooled_session() as session:
+            return [
+                item  #
+                for response_text in self._query_server_responses(session, method, **kwargs)
+                for item in parse(response_text)
+            ]
+
+    def _query_server_responses(self, session, method, **kwargs) -> Iterator[str]:
         payload = getattr(self._soap_templates, method) % kwargs
 
-        response_data = []
         while True:
-            response = self._session.postsoap(payload)
-            response_data.append(response.text)
-            self._check_not_authenticated(response_data[-1][:512])
+            response_text = session.postsoap(payload).text
+            self._check_not_authenticated(response_text[:512])
+            yield response_text
             # Look for a <token>0</token> field.
             # If it exists not all data was transmitted and we need to start a
             # ContinueRetrievePropertiesExResponse query...
-            token = re.findall("<token>(.*)</token>", response_data[-1][:512])
+            token = re.findall("<token>(.*)</token>", response_text[:512])
             if not token:
                 break
             payload = self._soap_templates.continuetoken % {"token": token[0]}
 
-        return "".join(response_data)
-
     @property
     def perf_samples(self):
         '''Return and cache the needed number of real-time samples
@@ -1195,15 +1251,102 @@ class ESXConnection:
 #   '----------------------------------------------------------------------'
 
 
-def fetch_available_counters(connection, hostsystems) -> Dict[str, Dict[str, List[str]]]:
-    counters_available_by_host: Dict[str, Dict[str, List[str]]] = {}
-    for host in hostsystems:
-        counter_avail_response = connection.query_server('perfcounteravail', esxhost=host)
-        elements = get_pattern("<counterId>([0-9]*)</counterId><instance>([^<]*)",
-                               counter_avail_response)
+def _local_name(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+def _find_child(element: ET.Element, name: str) -> Optional[ET.Element]:
+    for child in element:
+        if _local_name(child.tag) == name:
+            return child
+    return None
+
 
+def _find_child_text(element: ET.Element, name: str) -> str:
+    child = _find_child(element, name)
+    return "" if child is None else (child.text or "")
+
+
+def _iter_xml_elements(
+    response_text: str,
+    name: str,
+    child_name: Optional[str] = None,
+) -> Iterator[ET.Element]:
+    """Incrementally parse the response and yield all completely parsed elements `name`
+
+    If child_name is given, only elements having such a child are yielded. The yielded
+    elements are cleared after they have been processed by the caller. This way the parse
+    tree does not grow with the size of the response.
+    """
+    parser = ET.XMLPullParser(events=("end",))
+    chunk_size = 65536
+    for offset in range(0, len(response_text), chunk_size):
+        parser.feed(response_text[offset:offset + chunk_size])
+        for _event, element in parser.read_events():
+            if _local_name(element.tag) != name:
+                continue
+            if child_name is not None and _find_child(element, child_name) is None:
+                continue
+            yield element
+            element.clear()
+    parser.close()
+
+
+def _iter_perf_metric_ids(response_text: str) -> Iterator[Tuple[str, str]]:
+    """Yield counter id and instance of all PerfMetricId elements of a
+    QueryAvailablePerfMetric response"""
+    for element in _iter_xml_elements(response_text, "returnval"):
+        yield _find_child_text(element, "counterId"), _find_child_text(element, "instance")
+
+
+def _iter_perf_metric_series(response_text: str) -> Iterator[Tuple[str, str, List[str]]]:
+    """Yield counter id, instance and the sampled values of all PerfMetricSeries elements
+    of a QueryPerf response
+
+    A series looks like this:
+    <value xsi:type="PerfMetricIntSeries">
+      <id><counterId>6</counterId><instance></instance></id>
+      <value>123</value><value>125</value>...
+    </value>
+    """
+    # The samples are <value> elements as well, but they lack the <id> child
+    for element in _iter_xml_elements(response_text, "value", child_name="id"):
+        metric_id = _find_child(element, "id")
+        assert metric_id is not None
+        yield (
+            _find_child_text(metric_id, "counterId"),
+            _find_child_text(metric_id, "instance"),
+            [child.text or "" for child in element if _local_name(child.tag) == "value"],
+        )
+
+
+def _query_hosts_concurrently(connection, method, hosts, opt, parse, **kwargs_by_host):
+    """Query `method` for all hosts, using up to opt.max_workers connections
+
+    The responses are parsed with `parse` by the worker threads, so that only the parsed
+    items of each host are kept. Return them in the order of `hosts`.
+    """
+    def _query(host):
+        return connection.query_server_pooled(
+            method,
+            parse,
+            esxhost=host,
+            **{key: by_host[host] for key, by_host in kwargs_by_host.items()},
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=opt.max_workers) as executor:
+        return list(executor.map(_query, hosts))
+
+
+def fetch_available_counters(connection, hostsystems, opt) -> Dict[str, Dict[str, List[str]]]:
+    counters_available_by_host: Dict[str, Dict[str, List[str]]] = {}
+    hosts = list(hostsystems)
+    for host, metric_ids in zip(
+            hosts,
+            _query_hosts_concurrently(connection, 'perfcounteravail', hosts, opt,
+                                      _iter_perf_metric_ids)):
         data = counters_available_by_host.setdefault(host, {})
-        for counter, instance in elements:
+        for counter, instance in metric_ids:
             data.setdefault(counter, []).append(instance)
 
     return counters_available_by_host
@@ -1256,38 +1399,40 @@ def fetch_extra_interface_counters(connection, opt):
     return net_extra_info
 
 
-def fetch_counters(connection, host, counters_selected):
-    counter_data: List[str] = []
-    for entry, instances in counters_selected:
-        counter_data.extend(
-            "<ns1:metricId><ns1:counterId>%s</ns1:counterId><ns1:instance>%s</ns1:instance>"
-            "</ns1:metricId>" % (entry, instance) for instance in instances)
-
-    response_text = connection.query_server('perfcounterdata',
-                                            esxhost=host,
-                                            counters="".join(counter_data),
-                                            samples=connection.perf_samples)
-
-    # Python regex only supports up to 100 match groups in a regex..
-    # We are only extracting the whole value line and split it later on
-    # This is a perfect candidate for "Catastrophic Backtracking" :)
-    # Someday we should replace all of these get_pattern calls with
-    # one of these new and fancy xml parsers I've heard from
-    elements = get_pattern(
-        "<id><counterId>(.*?)</counterId><instance>(.*?)</instance></id>(%s)" %
-        ("<value>.*?</value>" * connection.perf_samples), response_text)
-    counters_value = []
-    for entry in elements:
-        id_, instance, valuestring = entry
-        values = get_pattern("<value>(.*?)</value>", valuestring)
-        counters_value.append((id_, instance, values))
-
-    return counters_value
+def _counters_request(counters_selected) -> str:
+    return "".join("<ns1:metricId><ns1:counterId>%s</ns1:counterId><ns1:instance>%s</ns1:instance>"
+                   "</ns1:metricId>" % (entry, instance)
+                   for entry, instances in counters_selected
+                   for instance in instances)
+
+
+def fetch_counters(connection, counters_selected_by_host, opt):
+    """Fetch the selected performance counters of all hosts
+
+    Return a dictionary host -> list of (counter id, instance, values).
+    """
+    hosts = list(counters_selected_by_host)
+    # Determine the number of samples only once, before querying concurrently
+    samples = connection.perf_samples
+    counters = {host: _counters_request(counters_selected_by_host[host]) for host in hosts}
+    return dict(
+        zip(
+            hosts,
+            _query_hosts_concurrently(
+                connection,
+                'perfcounterdata',
+                hosts,
+                opt,
+                _iter_perf_metric_series,
+                counters=counters,
+                samples={host: samples for host in hosts},
+            ),
+        ))
 
 
 def get_section_counters(connection, hostsystems, datastores, opt):
     section_lines = []
-    counters_available_by_host = fetch_available_counters(connection, hostsystems)
+    counters_available_by_host = fetch_available_counters(connection, hostsystems, opt)
     counters_available_all = {
         counter  #
         for by_host in counters_available_by_host.values()  #
@@ -1297,19 +1442,20 @@ def get_section_counters(connection, hostsystems, datastores, opt):
     net_extra_info = fetch_extra_interface_counters(connection, opt)
     counters_description = fetch_counters_syntax(connection, counters_available_all)
 
-    for host in hostsystems:
-        counters_avail = counters_available_by_host[host]
-
-        counters_selected = [
-            (id_, instances)
-            for id_, instances in counters_avail.items()
-            if counters_description.get(id_, {}).get("key") in REQUESTED_COUNTERS_KEYS
-        ]
-
-        counters_value = fetch_counters(connection, host, counters_selected)
+    counters_value_by_host = fetch_counters(
+        connection,
+        {
+            host: [(id_, instances)
+                   for id_, instances in counters_available_by_host[host].items()
+                   if counters_description.get(id_, {}).get("key") in REQUESTED_COUNTERS_KEYS
+                  ] for host in hostsystems
+        },
+        opt,
+    )
 
+    for host in hostsystems:
         counters_output = {}
-        for id_, instance, values in counters_value:
+        for id_, instance, values in counters_value_by_host[host]:
             desc = counters_description.get(id_)
             if not desc:
                 continue
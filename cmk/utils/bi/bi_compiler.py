@@ -4,22 +4,29 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import gc
+import multiprocessing
 import pickle
 import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 import cmk
 from pathlib import Path
 from typing import (
     TYPE_CHECKING,
     Dict,
+    Iterator,
     Set,
     Optional,
+    Tuple,
     TypedDict,
     List,
 )
 
 from cmk.utils.log import logger
+from cmk.utils.type_defs import HostName
 from cmk.utils.bi.bi_packs import BIAggregationPacks
-from cmk.utils.bi.bi_searcher import BISearcher
+from cmk.utils.bi.bi_searcher import BISearcher, BISearchReferences
 from cmk.utils.bi.bi_data_fetcher import (
     BIStructureFetcher,
     get_cache_dir,
@@ -32,7 +39,7 @@ from cmk.utils.exceptions import MKGeneralException
 from cmk.utils.i18n import _
 from cmk.utils.bi.bi_trees import BICompiledAggregation
 from cmk.utils.bi.bi_aggregation import BIAggregation
-from cmk.utils.bi.bi_lib import SitesCallback
+from cmk.utils.bi.bi_lib import BIHostData, SitesCallback
 
 from cmk.utils.redis import get_redis_client
 if TYPE_CHECKING:
@@ -45,8 +52,67 @@ class ConfigStatus(TypedDict):
     online_sites: Set[SiteProgramStart]
 
 
+class CompilationStatus(TypedDict):
+    timestamp: float
+    mode: str  # "full" or "incremental"
+    changed_hosts: int
+    compiled_aggregations: int
+    reused_aggregations: int
+    duration_fetch: float
+    duration_compile: float
+    duration_serialize: float
+    duration_lookup: float
+    duration_total: float
+    aggregation_durations: Dict[str, float]
+
+
+class SearchReferences(TypedDict):
+    program_starts: Set[SiteProgramStart]
+    aggregations: Dict[str, BISearchReferences]
+
+
+ChangedHosts = Tuple[Dict[HostName, BIHostData], Dict[HostName, BIHostData]]
+
+# The compiled aggregation, pickled, the references of its searches and the compilation time
+CompilationResult = Tuple[bytes, BISearchReferences, float]
+
+# The compiler whose aggregations are compiled by the forked worker processes
+_worker_compiler: Optional["BICompiler"] = None
+
+
+@contextmanager
+def _paused_garbage_collection() -> Iterator[None]:
+    """The compiled trees consist of a huge number of objects which are kept. Creating them
+    triggers lots of useless runs of the garbage collector."""
+    if not gc.isenabled():
+        yield
+        return
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+
+def _compile_aggregation_in_worker(aggr_id: str) -> CompilationResult:
+    assert _worker_compiler is not None
+    return _worker_compiler.compile_aggregation(aggr_id)
+
+
 class BICompiler:
-    def __init__(self, bi_configuration_file, sites_callback: SitesCallback):
+    """Compiles the BI aggregations and keeps the compiled ones
+
+    By default all aggregations are compiled in the current process. Callers running in a
+    process of their own may pass max_processes to compile large configurations with a pool
+    of forked worker processes. The GUI must not do this: forking its multi threaded web
+    server processes while holding the compilation lock is unsafe."""
+    def __init__(
+        self,
+        bi_configuration_file,
+        sites_callback: SitesCallback,
+        *,
+        max_processes: int = 1,
+    ):
         self._sites_callback = sites_callback
         self._bi_configuration_file = bi_configuration_file
 
@@ -54,10 +120,15 @@ class BICompiler:
         self._compiled_aggregations: Dict[str, BICompiledAggregation] = {}
         self._path_compilation_lock = Path(get_cache_dir(), "compilation.LOCK")
         self._path_compilation_timestamp = Path(get_cache_dir(), "last_compilation")
+        self._path_compilation_status = Path(get_cache_dir(), "compilation_status")
+        self._path_search_references = Path(get_cache_dir(), "search_references")
         self._path_compiled_aggregations = Path(get_cache_dir(), "compiled_aggregations")
         self._path_compiled_aggregations.mkdir(parents=True, exist_ok=True)
 
         self._redis_client: Optional['RedisDecoded'] = None
+        # Compiling an aggregation in a worker process is only worth it for some of them
+        self._max_processes = max_processes
+        self._min_aggregations_per_process = 20
         self._setup()
 
     def _setup(self):
@@ -79,16 +150,23 @@ class BICompiler:
             self._load_compiled_aggregations()
 
     def _load_compiled_aggregations(self) -> None:
-        for path_object in self._path_compiled_aggregations.iterdir():
-            if path_object.is_dir():
-                continue
-            aggr_id = path_object.name
-            if aggr_id.endswith(".new") or aggr_id in self._compiled_aggregations:
-                continue
-
-            self._logger.debug("Loading cached aggregation results %s" % aggr_id)
-            aggr_data = self._load_data(str(path_object))
-            self._compiled_aggregations[aggr_id] = BIAggregation.create_trees_from_schema(aggr_data)
+        with _paused_garbage_collection():
+            for path_object in self._path_compiled_aggregations.iterdir():
+                if path_object.is_dir():
+                    continue
+                aggr_id = path_object.name
+                if aggr_id.endswith(".new") or aggr_id in self._compiled_aggregations:
+                    continue
+
+                self._logger.debug("Loading cached aggregation results %s" % aggr_id)
+                self._compiled_aggregations[aggr_id] = self._load_compiled_aggregation(path_object)
+
+    def _load_compiled_aggregation(self, path: Path) -> BICompiledAggregation:
+        aggr_data = pickle.loads(store.load_bytes_from_file(path))
+        if isinstance(aggr_data, dict):
+            # Written by a previous version, which saved the serialized trees
+            return BIAggregation.create_trees_from_schema(aggr_data)
+        return aggr_data
 
     def _check_compilation_status(self) -> None:
         current_configstatus = self.compute_current_configstatus()
@@ -104,25 +182,7 @@ class BICompiler:
                 self._logger.debug("No compilation required. An other process already compiled it")
                 return
 
-            self.prepare_for_compilation(current_configstatus["online_sites"])
-
-            # Compile the raw tree
-            for aggregation in self._bi_packs.get_all_aggregations():
-                start = time.time()
-                self._compiled_aggregations[aggregation.id] = aggregation.compile(self.bi_searcher)
-                self._logger.debug("Compilation of %s took %f" %
-                                   (aggregation.id, time.time() - start))
-
-            self._verify_aggregation_title_uniqueness(self._compiled_aggregations)
-
-            for aggr_id, aggr in self._compiled_aggregations.items():
-                start = time.time()
-                result = aggr.serialize()
-                self._logger.debug("Schema dump %s took config took %f (%d branches)" %
-                                   (aggr_id, time.time() - start, len(aggr.branches)))
-                self._save_data(self._path_compiled_aggregations.joinpath(aggr_id), result)
-
-            self._generate_part_of_aggregation_lookup(self._compiled_aggregations)
+            self._compile_aggregations(current_configstatus)
 
         known_sites = {kv[0]: kv[1] for kv in current_configstatus.get("known_sites", set())}
         self._cleanup_vanished_aggregations()
@@ -130,6 +190,149 @@ class BICompiler:
         store.save_text_to_file(str(self._path_compilation_timestamp),
                                 str(current_configstatus["configfile_timestamp"]))
 
+    def _compile_aggregations(self, current_configstatus: ConfigStatus) -> None:
+        """Compiles the aggregations affected by changes since the last compilation
+
+        After configuration changes all aggregations are compiled. In case only the structure
+        data of some sites changed, only the aggregations whose searches depend on the added,
+        removed or modified hosts are compiled again. All other aggregations are kept."""
+        start = time.time()
+        online_sites = current_configstatus["online_sites"]
+        previous_references = self._load_search_references(current_configstatus)
+        self._path_search_references.unlink(missing_ok=True)
+        self.prepare_for_compilation(online_sites)
+
+        changed_hosts: Optional[ChangedHosts] = None
+        if previous_references is not None:
+            changed_hosts = self._bi_structure_fetcher.get_changed_hosts(
+                previous_references["program_starts"])
+
+        references: Dict[str, BISearchReferences] = {}
+        if changed_hosts is not None and previous_references is not None:
+            references = previous_references["aggregations"]
+        duration_fetch = time.time() - start
+
+        # Compile the raw tree
+        aggr_ids = [
+            aggregation.id
+            for aggregation in self._bi_packs.get_all_aggregations()
+            if changed_hosts is None or
+            self._compilation_of_aggregation_required(aggregation.id, references, changed_hosts)
+        ]
+        aggregation_durations: Dict[str, float] = {}
+        serialized_aggregations: Dict[str, bytes] = {}
+        with _paused_garbage_collection():
+            for aggr_id, (serialized, aggregation_references,
+                          duration) in self._compile_aggregations_in_processes(aggr_ids):
+                self._compiled_aggregations[aggr_id] = pickle.loads(serialized)
+                serialized_aggregations[aggr_id] = serialized
+                references[aggr_id] = aggregation_references
+                aggregation_durations[aggr_id] = duration
+                self._logger.debug("Compilation of %s took %f" % (aggr_id, duration))
+        duration_compile = time.time() - start - duration_fetch
+
+        if changed_hosts is not None:
+            # The unaffected aggregations have not changed since the last compilation
+            self._load_compiled_aggregations()
+        self._verify_aggregation_title_uniqueness(self._compiled_aggregations)
+
+        serialize_start = time.time()
+        for aggr_id, serialized in serialized_aggregations.items():
+            store.save_bytes_to_file(self._path_compiled_aggregations.joinpath(aggr_id), serialized)
+        duration_serialize = time.time() - serialize_start
+
+        lookup_start = time.time()
+        self._generate_part_of_aggregation_lookup(self._compiled_aggregations)
+        duration_lookup = time.time() - lookup_start
+
+        self._save_data(
+            self._path_search_references,
+            SearchReferences(
+                program_starts=online_sites,
+                aggregations={
+                    aggr_id: aggr_references
+                    for aggr_id, aggr_references in references.items()
+                    if aggr_id in self._compiled_aggregations
+                },
+            ))
+
+        compilation_status = CompilationStatus(
+            timestamp=start,
+            mode="full" if changed_hosts is None else "incremental",
+            changed_hosts=0 if changed_hosts is None else len(changed_hosts[0].keys() |
+                                                              changed_hosts[1].keys()),
+            compiled_aggregations=len(aggregation_durations),
+            reused_aggregations=len(self._compiled_aggregations) - len(aggregation_durations),
+            duration_fetch=duration_fetch,
+            duration_compile=duration_compile,
+            duration_serialize=duration_serialize,
+            duration_lookup=duration_lookup,
+            duration_total=time.time() - start,
+            aggregation_durations=aggregation_durations,
+        )
+        self._logger.debug("Compilation status: %r" % compilation_status)
+        store.save_object_to_file(self._path_compilation_status, compilation_status)
+
+    def _compile_aggregations_in_processes(
+            self, aggr_ids: List[str]) -> Iterator[Tuple[str, CompilationResult]]:
+        """Compiles the aggregations in a pool of worker processes
+
+        The workers are forked from this process, so they share the already loaded configuration
+        and structure data. Each worker compiles a part of the aggregations and returns them
+        pickled. The results are returned in the order of the given aggregations."""
+        processes = min(self._max_processes, len(aggr_ids) // self._min_aggregations_per_process)
+        if processes <= 1:
+            for aggr_id in aggr_ids:
+                yield aggr_id, self.compile_aggregation(aggr_id)
+            return
+
+        global _worker_compiler
+        _worker_compiler = self
+        try:
+            with ProcessPoolExecutor(
+                    max_workers=processes,
+                    mp_context=multiprocessing.get_context("fork"),
+            ) as executor:
+                yield from zip(
+                    aggr_ids,
+                    executor.map(_compile_aggregation_in_worker,
+                                 aggr_ids,
+                                 chunksize=max(1,
+                                               len(aggr_ids) // (processes * 4))))
+        finally:
+            _worker_compiler = None
+
+    def compile_aggregation(self, aggr_id: str) -> CompilationResult:
+        start = time.time()
+        aggregation = self._bi_packs.get_aggregation_mandatory(aggr_id)
+        with _paused_garbage_collection(), \
+                self.bi_searcher.record_references() as aggregation_references:
+            serialized = pickle.dumps(aggregation.compile(self.bi_searcher),
+                                      pickle.HIGHEST_PROTOCOL)
+        return serialized, aggregation_references, time.time() - start
+
+    def _compilation_of_aggregation_required(self, aggr_id: str,
+                                             references: Dict[str, BISearchReferences],
+                                             changed_hosts: ChangedHosts) -> bool:
+        if aggr_id not in references:
+            return True
+        if not self._path_compiled_aggregations.joinpath(aggr_id).exists():
+            return True
+        return any(references[aggr_id].depends_on(hosts) for hosts in changed_hosts)
+
+    def _load_search_references(self,
+                                current_configstatus: ConfigStatus) -> Optional[SearchReferences]:
+        """The search references of the last compilation, in case the configuration is unchanged"""
+        if current_configstatus["configfile_timestamp"] > self._get_compilation_timestamp():
+            return None
+        try:
+            return self._load_data(str(self._path_search_references))
+        except (IOError, EOFError, ValueError, pickle.UnpicklingError, AttributeError):
+            return None
+
+    def get_compilation_status(self) -> Optional[CompilationStatus]:
+        return store.load_object_from_file(self._path_compilation_status, default=None)
+
     def _cleanup_vanished_aggregations(self):
         valid_aggregations = list(self._compiled_aggregations.keys())
         for path_object in self._path_compiled_aggregations.iterdir():
@@ -9,7 +9,12 @@ from typing import NamedTuple, List, Tuple, Set, Dict, Optional, Iterator
 
 import cmk.utils.plugin_registry
 from cmk.utils.type_defs import ServiceName, HostName
-from cmk.utils.bi.bi_lib import RequiredBIElement
+from cmk.utils.bi.bi_lib import (
+    ABCBIStatusFetcher,
+    BIHostSpec,
+    BIHostStatusInfoRow,
+    RequiredBIElement,
+)
 from cmk.utils.bi.bi_trees import BICompiledRule, BICompiledAggregation, NodeResultBundle
 
 BIAggregationFilter = NamedTuple("BIAggregationFilter", [
@@ -49,10 +54,55 @@ class BIComputerPostprocessingRegistry(
 bi_computer_postprocessing_registry = BIComputerPostprocessingRegistry()
 
 
+class BIResultCache:
+    """Keeps the computed results of the aggregation branches
+
+    The result of a branch is stored together with the states of its required hosts. The branch
+    is only computed again once the state of one of these hosts changed or the aggregations have
+    been compiled again.
+    """
+    def __init__(self) -> None:
+        self._compilation_timestamp: Optional[float] = None
+        self._results: Dict[Tuple[str, str],
+                            Tuple[List[BIHostSpec], List[Optional[BIHostStatusInfoRow]],
+                                  Optional[NodeResultBundle]]] = {}
+
+    def set_compilation_timestamp(self, compilation_timestamp: Optional[float]) -> None:
+        if compilation_timestamp != self._compilation_timestamp:
+            self._results.clear()
+            self._compilation_timestamp = compilation_timestamp
+
+    def compute_branches(self, compiled_aggregation: BICompiledAggregation,
+                         branches: List[BICompiledRule],
+                         bi_status_fetcher: ABCBIStatusFetcher) -> List[NodeResultBundle]:
+        if bi_status_fetcher.assumed_states:
+            return compiled_aggregation.compute_branches(branches, bi_status_fetcher)
+
+        results = []
+        for branch in branches:
+            key = (compiled_aggregation.id, branch.properties.title)
+            cached = self._results.get(key)
+            required_hosts = sorted(branch.get_required_hosts()) if cached is None else cached[0]
+            host_states = [bi_status_fetcher.states.get(host) for host in required_hosts]
+            if cached is not None and cached[1] == host_states:
+                result = cached[2]
+            else:
+                result = branch.compute(compiled_aggregation.computation_options, bi_status_fetcher)
+                self._results[key] = (required_hosts, host_states, result)
+
+            if result is not None:
+                results.append(result)
+        return results
+
+
 class BIComputer:
-    def __init__(self, compiled_aggregations, bi_status_fetcher):
+    def __init__(self,
+                 compiled_aggregations,
+                 bi_status_fetcher,
+                 result_cache: Optional[BIResultCache] = None):
         self._compiled_aggregations: Dict[str, BICompiledAggregation] = compiled_aggregations
         self._bi_status_fetcher = bi_status_fetcher
+        self._result_cache = result_cache
         self._legacy_branch_cache = {}
 
     def compute_aggregation_result(
@@ -101,10 +151,17 @@ class BIComputer:
     ) -> List[Tuple[BICompiledAggregation, List[NodeResultBundle]]]:
         results = []
         for compiled_aggregation, branches in required_aggregations:
-            node_result_bundles = compiled_aggregation.compute_branches(
-                branches,
-                self._bi_status_fetcher,
-            )
+            if self._result_cache is None:
+                node_result_bundles = compiled_aggregation.compute_branches(
+                    branches,
+                    self._bi_status_fetcher,
+                )
+            else:
+                node_result_bundles = self._result_cache.compute_branches(
+                    compiled_aggregation,
+                    branches,
+                    self._bi_status_fetcher,
+                )
 
             # Postprocess results. Custom user plugins may add additional information for each node
             node_result_bundles = list(
@@ -71,6 +71,7 @@ class BIStructureFetcher:
         self._sites_callback = sites_callback
         self._hosts: Dict[HostName, BIHostData] = {}
         self._have_sites: Set[SiteId] = set()
+        self._program_starts: Set[SiteProgramStart] = set()
         self._path_lock_structure_cache = Path(get_cache_dir(), "bi_structure_cache.LOCK")
 
         self._site_cache_prefix = "bi_site_cache"
@@ -92,6 +93,7 @@ class BIStructureFetcher:
         return cached_program_starts
 
     def update_data(self, required_program_starts: Set[SiteProgramStart]) -> None:
+        self._program_starts = set(required_program_starts)
         missing_program_starts = required_program_starts - self.get_cached_program_starts()
 
         if missing_program_starts:
@@ -148,15 +150,15 @@ class BIStructureFetcher:
             self._marshal_save_data(str(path), hosts)
 
     def _read_cached_data(self, required_program_starts: Set[SiteProgramStart]) -> None:
-        required_sites = {x[0] for x in required_program_starts}
-        for path_object, (site_id, _timestamp) in self._get_site_data_files():
+        for path_object, (site_id, timestamp) in self._get_site_data_files():
             if site_id in self._have_sites:
                 # This data was already read during the live query
                 continue
 
-            if site_id not in required_sites:
+            if (site_id, timestamp) not in required_program_starts:
                 # The data for this site is no longer required
                 # The site probably got disabled in the distributed monitoring page
+                # or the data is outdated and is about to be cleaned up
                 continue
 
             site_data = self._marshal_load_data(str(path_object))
@@ -189,21 +191,66 @@ class BIStructureFetcher:
         #("name", str),
 
         for host_name, values in hosts.items():
-            site_id, tags, labels, folder, services, children, parents, alias, name = values
-            self._hosts[host_name] = BIHostData(
-                site_id,
-                tags,
-                labels,
-                folder,
-                {x: BIServiceData(*y) for x, y in services.items()},
-                children,
-                parents,
-                alias,
-                name,
-            )
+            self._hosts[host_name] = self._create_host_data(values)
 
         self._have_sites.add(site_id)
 
+    @classmethod
+    def _create_host_data(cls, values) -> BIHostData:
+        site_id, tags, labels, folder, services, children, parents, alias, name = values
+        return BIHostData(
+            site_id,
+            tags,
+            labels,
+            folder,
+            {x: BIServiceData(*y) for x, y in services.items()},
+            children,
+            parents,
+            alias,
+            name,
+        )
+
+    def get_changed_hosts(
+        self, previous_program_starts: Set[SiteProgramStart]
+    ) -> Optional[Tuple[Dict[HostName, BIHostData], Dict[HostName, BIHostData]]]:
+        """Compares the structure data of the previous program starts with the current data
+
+        Returns the previous and the current version of all added, removed and modified hosts.
+        None is returned in case the structure data of a previous program start is missing."""
+        previous_sites = dict(previous_program_starts)
+        current_sites = dict(self._program_starts)
+        previous_hosts: Dict[HostName, BIHostData] = {}
+        current_hosts: Dict[HostName, BIHostData] = {}
+        for site_id in previous_sites.keys() | current_sites.keys():
+            if previous_sites.get(site_id) == current_sites.get(site_id):
+                continue
+
+            try:
+                previous_site_data = self._load_site_data(site_id, previous_sites.get(site_id))
+                current_site_data = self._load_site_data(site_id, current_sites.get(site_id))
+            except (IOError, EOFError, ValueError, TypeError):
+                return None
+
+            for host_name in previous_site_data.keys() | current_site_data.keys():
+                previous_values = previous_site_data.get(host_name)
+                current_values = current_site_data.get(host_name)
+                if previous_values == current_values:
+                    continue
+                if previous_values is not None:
+                    previous_hosts[host_name] = self._create_host_data(previous_values)
+                if current_values is not None:
+                    current_hosts[host_name] = self._create_host_data(current_values)
+
+        return previous_hosts, current_hosts
+
+    def _load_site_data(self, site_id: SiteId, timestamp: Optional[int]) -> Dict:
+        if timestamp is None:
+            return {}
+        return self._marshal_load_data(
+            str(
+                self._path_site_structure_data.joinpath(self._site_data_filename(
+                    site_id, timestamp))))
+
     def cleanup_orphaned_files(self, known_sites: Dict[str, int]) -> None:
         for path_object, (site_id, timestamp) in self._get_site_data_files():
             try:
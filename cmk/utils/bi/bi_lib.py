@@ -414,6 +414,13 @@ class ABCBICompiledNode(metaclass=abc.ABCMeta):
         super().__init__()
         self.required_hosts = []
 
+    def __getstate__(self) -> Dict[str, Any]:
+        # Compiled trees are pickled as they are. The instance cache of required_elements()
+        # can not be pickled and may be outdated after the postprocessing of the compilation.
+        state = self.__dict__.copy()
+        state.pop("required_elements", None)
+        return state
+
     @classmethod
     @abc.abstractmethod
     def type(cls) -> str:
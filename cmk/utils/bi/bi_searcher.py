@@ -4,12 +4,21 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
-from typing import Dict, List, Tuple
+import bisect
+from contextlib import contextmanager
+from typing import cast, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
 
 from cmk.utils.bi.bi_lib import ABCBISearcher, BIHostData, BIHostSearchMatch, BIServiceSearchMatch
 from cmk.utils.regex import regex
 from cmk.utils.rulesets.ruleset_matcher import matches_labels, matches_tag_condition
-from cmk.utils.type_defs import HostName, TaggroupIDToTagCondition
+from cmk.utils.type_defs import (
+    HostName,
+    TagCondition,
+    TagConditionOR,
+    TaggroupID,
+    TaggroupIDToTagCondition,
+    TagID,
+)
 
 #   .--Defines-------------------------------------------------------------.
 #   |                  ____        __ _                                    |
@@ -32,21 +41,182 @@ from cmk.utils.type_defs import HostName, TaggroupIDToTagCondition
 #   +----------------------------------------------------------------------+
 
 
+class BISearchReferences:
+    """The host conditions and hosts a compiled aggregation depends on
+
+    Records the conditions of all host searches and the hosts which have been looked up
+    directly while compiling an aggregation. A host which neither matches one of these
+    conditions nor has been looked up can not change the compiled aggregation.
+    """
+    def __init__(self) -> None:
+        self.host_names: Set[HostName] = set()
+        self.host_conditions: Dict[str, Dict] = {}
+
+    def add_host_conditions(self, conditions: Dict) -> None:
+        host_choice = conditions["host_choice"]
+        if host_choice["type"] == "host_name_regex" and not _is_regex(host_choice["pattern"]):
+            self.host_names.add(host_choice["pattern"])
+            return
+        host_conditions = {
+            key: conditions[key] for key in ["host_choice", "host_tags", "host_labels"]
+        }
+        self.host_conditions.setdefault(repr(host_conditions), host_conditions)
+
+    def depends_on(self, hosts: Dict[HostName, BIHostData]) -> bool:
+        if not self.host_names.isdisjoint(hosts):
+            return True
+
+        bi_searcher = BISearcher()
+        bi_searcher.set_hosts(hosts)
+        return any(
+            bi_searcher.search_hosts(conditions) for conditions in self.host_conditions.values())
+
+
+class _RecordingHosts(Mapping):
+    """Records the direct lookups of hosts during a compilation"""
+    def __init__(self, hosts: Dict[HostName, BIHostData], host_names: Set[HostName]) -> None:
+        self._hosts = hosts
+        self._host_names = host_names
+
+    def __getitem__(self, host_name: HostName) -> BIHostData:
+        self._host_names.add(host_name)
+        return self._hosts[host_name]
+
+    def __contains__(self, host_name: object) -> bool:
+        if isinstance(host_name, str):
+            self._host_names.add(host_name)
+        return host_name in self._hosts
+
+    def __iter__(self) -> Iterator[HostName]:
+        return iter(self._hosts)
+
+    def __len__(self) -> int:
+        return len(self._hosts)
+
+    def values(self):
+        # Iterating over all hosts is not a lookup of single hosts
+        return self._hosts.values()
+
+
+def _is_regex(pattern: str) -> bool:
+    return any(map(lambda x: x in pattern, ["(", ")", "*", "$", "|", "[", "]"]))
+
+
+def _literal_prefix(pattern: str) -> str:
+    """The prefix all host names matching the regex pattern start with"""
+    if "|" in pattern:
+        return ""
+
+    for idx, char in enumerate(pattern):
+        if char in ".^$*+?{}[]()\\":
+            break
+    else:
+        return pattern
+
+    # A quantifier may make the preceding character optional
+    return pattern[:idx - 1] if char in "*?{" else pattern[:idx]
+
+
+class _BIHostIndex:
+    """Inverted indexes of the host tags and labels and the sorted host names
+
+    Used to determine the candidates of a host search before evaluating the conditions on every
+    single host. The hosts are referred to by their position in the list of all hosts.
+    """
+    def __init__(self, hosts: Iterable[BIHostData]) -> None:
+        self.hosts = list(hosts)
+        self._tags: Dict[Tuple[TaggroupID, TagID], Set[int]] = {}
+        self._labels: Dict[Tuple[str, str], Set[int]] = {}
+        for idx, host in enumerate(self.hosts):
+            for tag in host.tags:
+                self._tags.setdefault(tag, set()).add(idx)
+            for label in host.labels.items():
+                self._labels.setdefault(label, set()).add(idx)
+
+        names = sorted((host.name, idx) for idx, host in enumerate(self.hosts))
+        self._names = [name for name, _idx in names]
+        self._name_positions = [idx for _name, idx in names]
+
+    def candidate_hosts(self, conditions: Dict) -> List[BIHostData]:
+        """The hosts which may match the conditions of a host search, in their original order"""
+        candidates: Optional[Set[int]] = None
+        for positions in self._candidates(conditions):
+            candidates = positions if candidates is None else candidates & positions
+        if candidates is None:
+            return self.hosts
+        return [self.hosts[idx] for idx in sorted(candidates)]
+
+    def _candidates(self, conditions: Dict) -> Iterator[Set[int]]:
+        for taggroup_id, tag_condition in conditions["host_tags"].items():
+            tag_ids = self._required_tag_ids(tag_condition)
+            if tag_ids is not None:
+                yield set().union(
+                    *(self._tags.get((taggroup_id, tag_id), set()) for tag_id in tag_ids))
+
+        for label_id, label_value in conditions["host_labels"].items():
+            if not isinstance(label_value, dict):  # Negated conditions do not narrow the hosts
+                yield self._labels.get((label_id, label_value), set())
+
+        host_choice = conditions["host_choice"]
+        if host_choice["type"] == "host_name_regex":
+            prefix = _literal_prefix(host_choice["pattern"])
+            if prefix:
+                start = bisect.bisect_left(self._names, prefix)
+                end = bisect.bisect_left(self._names, prefix + "\U0010ffff", lo=start)
+                yield set(self._name_positions[start:end])
+
+    @staticmethod
+    def _required_tag_ids(tag_condition: TagCondition) -> Optional[List[TagID]]:
+        """One of these tags is required by the condition, None for negated conditions"""
+        if not isinstance(tag_condition, dict):
+            return [tag_condition]
+        if "$or" in tag_condition:
+            return cast(TagConditionOR, tag_condition)["$or"]
+        return None
+
+
 class BISearcher(ABCBISearcher):
+    def __init__(self):
+        super().__init__()
+        self._references: Optional[BISearchReferences] = None
+        self._index: Optional[_BIHostIndex] = None
+
     def set_hosts(self, hosts: Dict[HostName, BIHostData]) -> None:
         self.cleanup()
         self.hosts = hosts
 
+    @contextmanager
+    def record_references(self) -> Iterator[BISearchReferences]:
+        """Records the host conditions and hosts the searches within the context depend on"""
+        references = BISearchReferences()
+        hosts = self.hosts
+        self._references = references
+        self.hosts = _RecordingHosts(hosts, references.host_names)
+        try:
+            yield references
+        finally:
+            self._references = None
+            self.hosts = hosts
+
     def cleanup(self) -> None:
         # Note: Do not call clear() on hosts
         #       This would clear the reference we've got on set_hosts
         self.hosts = {}
+        self._index = None
         self._host_regex_match_cache.clear()
         self._host_regex_miss_cache.clear()
 
+    def _get_index(self) -> _BIHostIndex:
+        # The hosts may have been added to the referenced dict after calling set_hosts
+        if self._index is None or len(self._index.hosts) != len(self.hosts):
+            self._index = _BIHostIndex(self.hosts.values())
+        return self._index
+
     def search_hosts(self, conditions: Dict) -> List[BIHostSearchMatch]:
-        matched_hosts, matched_re_groups = self.filter_host_choice(list(self.hosts.values()),
-                                                                   conditions["host_choice"])
+        if self._references is not None:
+            self._references.add_host_conditions(conditions)
+        matched_hosts, matched_re_groups = self.filter_host_choice(
+            self._get_index().candidate_hosts(conditions), conditions["host_choice"])
         matched_hosts = self.filter_host_tags(matched_hosts, conditions["host_tags"])
         matched_hosts = self.filter_host_labels(matched_hosts, conditions["host_labels"])
         return [BIHostSearchMatch(x, matched_re_groups[x.name]) for x in matched_hosts]
@@ -60,7 +230,7 @@ class BISearcher(ABCBISearcher):
             return hosts, self._host_match_groups(hosts)
 
         if condition["type"] == "host_name_regex":
-            return self.get_host_name_matches(hosts, condition["pattern"])
+            return self._get_host_name_matches(hosts, condition["pattern"])
 
         if condition["type"] == "host_alias_regex":
             return self.get_host_alias_matches(hosts, condition["pattern"])
@@ -75,12 +245,27 @@ class BISearcher(ABCBISearcher):
         hosts: List[BIHostData],
         pattern: str,
     ) -> Tuple[List[BIHostData], Dict]:
+        if self._references is not None:
+            self._references.add_host_conditions({
+                "host_choice": {
+                    "type": "host_name_regex",
+                    "pattern": pattern
+                },
+                "host_tags": {},
+                "host_labels": {},
+            })
+        return self._get_host_name_matches(hosts, pattern)
+
+    def _get_host_name_matches(
+        self,
+        hosts: List[BIHostData],
+        pattern: str,
+    ) -> Tuple[List[BIHostData], Dict]:
 
         if pattern == "(.*)":
             return hosts, self._host_match_groups(hosts)
 
-        is_regex_match = any(map(lambda x: x in pattern, ["(", ")", "*", "$", "|", "[", "]"]))
-        if not is_regex_match:
+        if not _is_regex(pattern):
             host = self.hosts.get(pattern)
             if host:
                 return [host], {pattern: (pattern,)}
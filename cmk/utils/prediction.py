@@ -9,10 +9,10 @@ from contextlib import suppress
 import json
 import logging
 from pathlib import Path
+import threading
 import time
 from typing import (
     Any,
-    Callable,
     Dict,
     Iterable,
     Iterator,
@@ -20,6 +20,8 @@ from typing import (
     Literal,
     NewType,
     Optional,
+    OrderedDict,
+    Sequence,
     Tuple,
 )
 
@@ -30,12 +32,12 @@ from cmk.utils.exceptions import MKGeneralException
 import cmk.utils.debug
 from cmk.utils.log import VERBOSE
 import cmk.utils.paths
+import cmk.utils.store as store
 from cmk.utils.type_defs import Timestamp, Seconds, MetricName, ServiceName, HostName
 
 logger = logging.getLogger("cmk.prediction")
 
 TimeWindow = Tuple[Timestamp, Timestamp, Seconds]
-RRDColumnFunction = Callable[[Timestamp, Timestamp], "TimeSeries"]
 TimeSeriesValue = Optional[float]
 TimeSeriesValues = List[TimeSeriesValue]
 ConsolidationFunctionName = str
@@ -103,6 +105,32 @@ class PredictionData:
         return json.dumps(asdict(self))
 
 
+@dataclass(frozen=True)
+class PredictionRequest:
+    """A prediction to be computed by "cmk --compute-predictions" on behalf of a check"""
+    host_name: HostName
+    service_description: ServiceName
+    dsname: MetricName
+    cf: ConsolidationFunctionName
+    timegroup: Timegroup
+    params: PredictionParameters
+
+    @classmethod
+    def loads(cls, raw: str) -> 'PredictionRequest':
+        data = json.loads(raw)
+        return cls(
+            host_name=HostName(data["host_name"]),
+            service_description=ServiceName(data["service_description"]),
+            dsname=MetricName(data["dsname"]),
+            cf=ConsolidationFunctionName(data["cf"]),
+            timegroup=Timegroup(data["timegroup"]),
+            params=dict(data["params"]),
+        )
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self))
+
+
 def is_dst(timestamp: float) -> bool:
     """Check wether a certain time stamp lies with in daylight saving time (DST)"""
     return bool(time.localtime(timestamp).tm_isdst)
@@ -120,6 +148,15 @@ def rrd_timestamps(twindow: TimeWindow) -> List[Timestamp]:
     return [t + step for t in range(start, end, step)]
 
 
+def vectorization_available() -> bool:
+    """NumPy is only imported by the computations which explicitly ask for it"""
+    try:
+        import numpy  # noqa: F401 # pylint: disable=import-outside-toplevel,unused-import
+    except ImportError:
+        return False
+    return True
+
+
 def aggregation_functions(series: TimeSeriesValues,
                           aggr: Optional[ConsolidationFunctionName]) -> TimeSeriesValue:
     """Aggregate data in series list according to aggr
@@ -183,17 +220,27 @@ class TimeSeries:
     def twindow(self) -> TimeWindow:
         return self.start, self.end, self.step
 
-    def bfill_upsample(self, twindow: TimeWindow, shift: Seconds) -> TimeSeriesValues:
+    def bfill_upsample(self,
+                       twindow: TimeWindow,
+                       shift: Seconds,
+                       *,
+                       vectorized: bool = False) -> TimeSeriesValues:
         """Upsample by backward filling values
 
         twindow : 3-tuple, (start, end, step)
              description of target time interval
+        vectorized : bool
+             compute the positions of the values with NumPy, which pays off for long series
         """
         upsa = []
         i = 0
         start, end, step = twindow
-        current_times = rrd_timestamps(self.twindow)
         if start != self.start or end != self.end or step != self.step:
+            if vectorized and (upsampled := _bfill_upsample_vectorized(
+                    self.values, self.twindow, twindow, shift)) is not None:
+                return upsampled
+
+            current_times = rrd_timestamps(self.twindow)
             for t in range(start, end, step):
                 if t >= current_times[i] + shift:
                     i += 1
@@ -205,20 +252,28 @@ class TimeSeries:
 
     def downsample(self,
                    twindow: TimeWindow,
-                   cf: ConsolidationFunctionName = 'max') -> TimeSeriesValues:
+                   cf: ConsolidationFunctionName = 'max',
+                   *,
+                   vectorized: bool = False) -> TimeSeriesValues:
         """Downsample time series by consolidation function
 
         twindow : 3-tuple, (start, end, step)
              description of target time interval
         cf : str ('max', 'average', 'min')
              consolidation function imitating RRD methods
+        vectorized : bool
+             consolidate the values with NumPy, which pays off for long series
         """
         dwsa = []
         i = 0
         co: TimeSeriesValues = []
         start, end, step = twindow
-        desired_times = rrd_timestamps(twindow)
         if start != self.start or end != self.end or step != self.step:
+            if vectorized and (downsampled := _downsample_vectorized(self.values, self.twindow,
+                                                                     twindow, cf)) is not None:
+                return downsampled
+
+            desired_times = rrd_timestamps(twindow)
             for t, val in self.time_data_pairs():
                 if t > desired_times[i]:
                     dwsa.append(aggregation_functions(co, cf))
@@ -256,6 +311,92 @@ class TimeSeries:
         yield from self.values
 
 
+def _rrd_timestamps_vectorized(twindow: TimeWindow) -> Any:
+    """Same as rrd_timestamps, as NumPy array"""
+    import numpy  # pylint: disable=import-outside-toplevel
+
+    start, end, step = twindow
+    if step == 0:
+        return numpy.array([], dtype=int)
+    return numpy.arange(start, end, step) + step
+
+
+def _bfill_upsample_vectorized(
+    values: TimeSeriesValues,
+    current_twindow: TimeWindow,
+    twindow: TimeWindow,
+    shift: Seconds,
+) -> Optional[TimeSeriesValues]:
+    """Same as TimeSeries.bfill_upsample, but the positions of the values are computed with NumPy
+
+    The loop of bfill_upsample advances by at most one value per target step. In case the target
+    steps skip values or run out of values, the results would differ. None is returned then, and
+    the caller falls back to the loop.
+    """
+    import numpy  # pylint: disable=import-outside-toplevel
+
+    if twindow[2] == 0:
+        return None
+    boundaries = _rrd_timestamps_vectorized(current_twindow) + shift
+    targets = numpy.arange(*twindow)
+    if not len(boundaries) or not len(targets):
+        return None
+
+    indexes = numpy.searchsorted(boundaries, targets, side="right")
+    if (indexes[0] > 1 or (numpy.diff(indexes) > 1).any() or
+            indexes[:-1].max(initial=0) >= len(boundaries) or indexes[-1] >= len(values)):
+        return None
+    return list(map(values.__getitem__, indexes.tolist()))
+
+
+def _downsample_vectorized(
+    values: TimeSeriesValues,
+    current_twindow: TimeWindow,
+    twindow: TimeWindow,
+    cf: Optional[ConsolidationFunctionName],
+) -> Optional[TimeSeriesValues]:
+    """Same as TimeSeries.downsample, but the values are consolidated with NumPy
+
+    Like for _bfill_upsample_vectorized, None is returned in case the consolidation periods are
+    not advanced as by the loop of downsample.
+    """
+    import numpy  # pylint: disable=import-outside-toplevel
+
+    aggr = "max" if cf is None else cf.lower()
+    # Just like time_data_pairs, the values without timestamp are ignored
+    times = _rrd_timestamps_vectorized(current_twindow)[:len(values)]
+    desired_times = _rrd_timestamps_vectorized(twindow)
+    if aggr not in ("average", "max", "min") or not len(times) or not len(desired_times):
+        return None
+
+    periods = numpy.searchsorted(desired_times, times, side="left")
+    if (periods[0] > 1 or (numpy.diff(periods) > 1).any() or
+            periods[:-1].max(initial=0) >= len(desired_times)):
+        return None
+
+    # The values of the period after the last desired time are dropped
+    num_periods = min(int(periods[-1]) + 1, len(desired_times))
+    points = numpy.array(values[:len(times)], dtype=float)  # None -> nan
+    valid = ~numpy.isnan(points) & (periods < num_periods)
+    periods, points = periods[valid], points[valid]
+    counts = numpy.bincount(periods, minlength=num_periods)
+
+    if aggr == "average":
+        # bincount sums up in the order of the values, just like sum()
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            consolidated = numpy.bincount(periods, weights=points, minlength=num_periods) / counts
+    else:
+        consolidated = numpy.zeros(num_periods)
+        if len(points):
+            starts = numpy.flatnonzero(numpy.diff(periods, prepend=-1))
+            reduce = numpy.maximum if aggr == "max" else numpy.minimum
+            consolidated[periods[starts]] = reduce.reduceat(points, starts)
+
+    return [
+        value if count else None for value, count in zip(consolidated.tolist(), counts.tolist())
+    ] + [None] * (len(desired_times) - num_periods)
+
+
 def lq_logic(filter_condition: str, values: List[str], join: str) -> str:
     """JOIN with (Or, And) FILTER_CONDITION the VALUES for a livestatus query"""
     conditions = u"".join(u"%s %s\n" % (filter_condition, livestatus.lqencode(x)) for x in values)
@@ -306,37 +447,78 @@ def get_rrd_data(hostname: HostName,
 
     """
 
+    return _query_rrd_data(
+        hostname,
+        service_description,
+        [_rrddata_column(varname, cf, fromtime, untiltime, max_entries)],
+    )[0]
+
+
+def get_rrd_data_of_slices(
+    hostname: HostName,
+    service_description: ServiceName,
+    varname: MetricName,
+    cf: ConsolidationFunctionName,
+    time_windows: List[Tuple[Timestamp, Timestamp]],
+    max_entries: int = 400,
+    connection: Optional[livestatus.SingleSiteConnection] = None,
+) -> List[TimeSeries]:
+    """Fetch the RRD data of several time ranges of a service with a single query
+
+    Each time range is requested as a separate rrddata column, so the time series are
+    returned in the order of time_windows (see get_rrd_data).
+    """
+    return _query_rrd_data(
+        hostname,
+        service_description,
+        [
+            _rrddata_column(varname, cf, fromtime, untiltime, max_entries)
+            for fromtime, untiltime in time_windows
+        ],
+        connection,
+    )
+
+
+def _rrddata_column(varname: MetricName, cf: ConsolidationFunctionName, fromtime: Timestamp,
+                    untiltime: Timestamp, max_entries: int) -> str:
     step = 1
     rpn = "%s.%s" % (varname, cf.lower())  # "MAX" -> "max"
     point_range = ":".join(
         livestatus.lqencode(str(x)) for x in (fromtime, untiltime, step, max_entries))
-    column = "rrddata:m1:%s:%s" % (rpn, point_range)
+    return "rrddata:m1:%s:%s" % (rpn, point_range)
+
 
-    lql = livestatus_lql([hostname], [column], service_description) + "OutputFormat: python\n"
+def _query_rrd_data(
+    hostname: HostName,
+    service_description: ServiceName,
+    columns: List[str],
+    connection: Optional[livestatus.SingleSiteConnection] = None,
+) -> List[TimeSeries]:
+    lql = livestatus_lql([hostname], columns, service_description) + "OutputFormat: python\n"
 
     try:
-        connection = livestatus.SingleSiteConnection("unix:%s" %
-                                                     cmk.utils.paths.livestatus_unix_socket)
-        response = connection.query_value(lql)
+        if connection is None:
+            connection = livestatus.SingleSiteConnection("unix:%s" %
+                                                         cmk.utils.paths.livestatus_unix_socket)
+        response = connection.query_row(lql)
     except livestatus.MKLivestatusNotFoundError as e:
         if cmk.utils.debug.enabled():
             raise
         raise MKGeneralException("Cannot get historic metrics via Livestatus: %s" % e)
 
-    if response is None:
+    if any(data is None for data in response):
         raise MKGeneralException("Cannot retrieve historic data with Nagios Core")
 
-    return TimeSeries(response)
-
-
-def rrd_datacolum(hostname: HostName, service_description: ServiceName, varname: MetricName,
-                  cf: ConsolidationFunctionName) -> RRDColumnFunction:
-    "Partial helper function to get rrd data"
+    return [TimeSeries(data) for data in response]
 
-    def time_boundaries(fromtime: Timestamp, untiltime: Timestamp) -> TimeSeries:
-        return get_rrd_data(hostname, service_description, varname, cf, fromtime, untiltime)
 
-    return time_boundaries
+# The prediction data last loaded by this process, by file, together with the identity of the file
+# (inode, mtime and size). This spares the keepalive helpers from reading and parsing the data
+# of the predictive levels with every check.
+_PREDICTION_DATA_CACHE_SIZE = 128
+_FileIdentity = Tuple[int, int, int]
+_prediction_data_cache: OrderedDict[Path, Tuple[_FileIdentity, PredictionData]] = OrderedDict()
+_prediction_data_cache_lock = threading.Lock()
 
 
 class PredictionStore:
@@ -370,10 +552,36 @@ class PredictionStore:
         data_for_pred: PredictionData,
     ) -> None:
         self._dir.mkdir(exist_ok=True, parents=True)
-        with self._info_file(info.name).open("w") as fname:
-            fname.write(info.dumps())
-        with self._data_file(info.name).open("w") as fname:
-            fname.write(data_for_pred.dumps())
+        # Replace the files at once. The data file gets a new inode, which invalidates the
+        # cached data, even if the file is rewritten within the resolution of the mtime.
+        for file_path, content in [
+            (self._info_file(info.name), info.dumps()),
+            (self._data_file(info.name), data_for_pred.dumps()),
+        ]:
+            store.ObjectStore(file_path, serializer=store.TextSerializer()).write_obj(content)
+
+    def _request_file(self, timegroup: Timegroup) -> Path:
+        return self._dir / f'{timegroup}.request'
+
+    def request_prediction(self, request: PredictionRequest, now: float) -> float:
+        """Ask for the computation of a prediction and return the age of the request
+
+        A pending request is not replaced, so its age tells how long the check has been waiting.
+        """
+        request_file = self._request_file(request.timegroup)
+        self._dir.mkdir(exist_ok=True, parents=True)
+        try:
+            with request_file.open("x") as fname:
+                fname.write(request.dumps())
+            return 0.0
+        except FileExistsError:
+            with suppress(FileNotFoundError):
+                return max(now - request_file.stat().st_mtime, 0.0)
+        return 0.0
+
+    def remove_prediction_request(self, timegroup: Timegroup) -> None:
+        with suppress(FileNotFoundError):
+            self._request_file(timegroup).unlink()
 
     def clean_prediction_files(self, timegroup: Timegroup, force: bool = False) -> None:
         # In previous versions it could happen that the files were created with 0 bytes of size
@@ -390,8 +598,31 @@ class PredictionStore:
         return None if raw is None else PredictionInfo.loads(raw, name=timegroup)
 
     def get_data(self, timegroup: Timegroup) -> Optional[PredictionData]:
-        raw = self._read_file(self._data_file(timegroup))
-        return None if raw is None else PredictionData.loads(raw)
+        file_path = self._data_file(timegroup)
+        identity: Optional[_FileIdentity] = None
+        with suppress(OSError):
+            stat = file_path.stat()
+            identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        if identity is not None:
+            with _prediction_data_cache_lock:
+                cached = _prediction_data_cache.get(file_path)
+                if cached is not None and cached[0] == identity:
+                    _prediction_data_cache.move_to_end(file_path)
+                    return cached[1]
+
+        raw = self._read_file(file_path)
+        if raw is None:
+            return None
+        data = PredictionData.loads(raw)
+
+        if identity is not None:
+            with _prediction_data_cache_lock:
+                _prediction_data_cache[file_path] = (identity, data)
+                _prediction_data_cache.move_to_end(file_path)
+                while len(_prediction_data_cache) > _PREDICTION_DATA_CACHE_SIZE:
+                    _prediction_data_cache.popitem(last=False)
+        return data
 
     def _read_file(self, file_path: Path) -> Optional[str]:
         try:
@@ -405,6 +636,18 @@ class PredictionStore:
         return None
 
 
+def pending_prediction_requests() -> Iterator[PredictionRequest]:
+    for request_file in Path(cmk.utils.paths.var_dir, "prediction").glob("*/*/*/*.request"):
+        try:
+            yield PredictionRequest.loads(request_file.read_text())
+        except FileNotFoundError:
+            pass  # Has just been handled by the check
+        except (ValueError, KeyError, TypeError):
+            # Either not completely written yet or broken. The check computes the prediction
+            # itself if the request is not handled in time.
+            logger.log(VERBOSE, "Invalid prediction request %s", request_file)
+
+
 def estimate_levels(
     *,
     reference_value: Optional[float],
@@ -442,6 +685,70 @@ def estimate_levels(
     return (estimated_upper_warn, estimated_upper_crit, estimated_lower_warn, estimated_lower_crit)
 
 
+def estimate_levels_of_points(
+    *,
+    reference_values: Sequence[Optional[float]],
+    stdevs: Sequence[Optional[float]],
+    levels_lower: Optional[_LevelsSpec],
+    levels_upper: Optional[_LevelsSpec],
+    levels_upper_lower_bound: Optional[Tuple[float, float]],
+    levels_factor: float,
+) -> List[EstimatedLevels]:
+    """Same as estimate_levels for a series of points, e.g. all points of a prediction
+
+    The levels are computed with NumPy, if it is available."""
+    if not vectorization_available():
+        return [
+            estimate_levels(
+                reference_value=reference_value,
+                stdev=stdev,
+                levels_lower=levels_lower,
+                levels_upper=levels_upper,
+                levels_upper_lower_bound=levels_upper_lower_bound,
+                levels_factor=levels_factor,
+            ) for reference_value, stdev in zip(reference_values, stdevs)
+        ]
+
+    import numpy  # pylint: disable=import-outside-toplevel
+
+    reference = numpy.array(reference_values, dtype=float)  # None -> nan
+    stdev = numpy.array(stdevs, dtype=float)
+    with numpy.errstate(invalid="ignore"):
+        available = ~numpy.isnan(reference) & (reference != 0)
+
+    estimated: List[Optional[List[float]]] = []
+    for levels, sig in [(levels_upper, 1), (levels_lower, -1)]:
+        if not levels:
+            estimated += [None, None]
+            continue
+
+        levels_type, (warn, crit) = levels
+        if levels_type == "absolute":
+            reference_deviation = numpy.full(len(reference), levels_factor, dtype=float)
+        elif levels_type == "relative":
+            reference_deviation = reference / 100.0
+        else:
+            if numpy.isnan(stdev[available]).any():
+                raise TypeError("stdev is None")
+            reference_deviation = stdev
+
+        estimated_warn = reference + sig * warn * reference_deviation
+        estimated_crit = reference + sig * crit * reference_deviation
+        if sig == 1 and levels_upper_lower_bound:
+            estimated_warn = numpy.maximum(levels_upper_lower_bound[0], estimated_warn)
+            estimated_crit = numpy.maximum(levels_upper_lower_bound[1], estimated_crit)
+        estimated += [estimated_warn.tolist(), estimated_crit.tolist()]
+
+    upper_warn, upper_crit, lower_warn, lower_crit = estimated
+    return [(
+        None if upper_warn is None else upper_warn[index],
+        None if upper_crit is None else upper_crit[index],
+        None if lower_warn is None else lower_warn[index],
+        None if lower_crit is None else lower_crit[index],
+    ) if is_available else (None, None, None, None)
+            for index, is_available in enumerate(available.tolist())]
+
+
 def _get_levels_from_params(
     *,
     levels: _LevelsSpec,
@@ -9,13 +9,28 @@ import contextlib
 import json
 import os
 import re
+import select
+import selectors
 import socket
 import ssl
 import threading
 import time
 from io import BytesIO
 from enum import Enum
-from typing import Any, AnyStr, Dict, List, NewType, Optional, Pattern, Set, Tuple, Type, Union
+from typing import (
+    Any,
+    AnyStr,
+    Dict,
+    List,
+    NewType,
+    Optional,
+    Pattern,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 # TODO: Find a better solution for this issue. Astroid 2.x bug prevents us from using NewType :(
 # (https://github.com/PyCQA/pylint/issues/2296)
@@ -59,9 +74,78 @@ class LivestatusTestingError(RuntimeError):
 #   |  Global variables and Exception classes                              |
 #   '----------------------------------------------------------------------'
 
-# TODO: This mechanism does not take different connection options into account
-# Keep a global array of persistant connections
-persistent_connections: Dict[str, socket.socket] = {}
+# Identifies connections that can be used interchangeably: socket URL and the TLS options
+PoolKey = Tuple[str, bool, bool, Optional[str]]
+
+
+class ConnectionPool:
+    """Per process pool of idle persistent Livestatus connections
+
+    A connection is taken out of the pool while it is used by a SingleSiteConnection and only
+    handed back once all responses have been read from it. This way multiple threads never
+    share a socket and a connection is never reused with unread data on it."""
+    def __init__(self, max_idle_per_site: int = 4) -> None:
+        super().__init__()
+        self.max_idle_per_site = max_idle_per_site
+        self._lock = threading.Lock()
+        self._idle: Dict[PoolKey, List[socket.socket]] = {}
+
+    def acquire(self, key: PoolKey) -> Optional[socket.socket]:
+        """Return an idle connection or None in case there is no usable one"""
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                sock = idle.pop()
+                if _is_reusable(sock):
+                    return sock
+                _close_socket(sock)
+        return None
+
+    def release(self, key: PoolKey, sock: socket.socket) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_site:
+                idle.append(sock)
+                return
+        _close_socket(sock)
+
+    def clear(self, key: Optional[PoolKey] = None) -> None:
+        """Close the idle connections of one site or of all sites"""
+        with self._lock:
+            if key is None:
+                idle = [s for sockets in self._idle.values() for s in sockets]
+                self._idle.clear()
+            else:
+                idle = self._idle.pop(key, [])
+        for sock in idle:
+            _close_socket(sock)
+
+
+def _is_reusable(sock: socket.socket) -> bool:
+    """An idle keepalive connection must not have anything to read
+
+    Being readable means that the peer has closed the connection (e.g. because
+    of its keepalive timeout) or that the connection is out of sync."""
+    try:
+        if sock.fileno() == -1:
+            return False
+        if isinstance(sock, ssl.SSLSocket) and sock.pending():
+            return False
+        readable, _writable, _errors = select.select([sock], [], [], 0)
+    except (OSError, ValueError):
+        return False
+    return not readable
+
+
+def _close_socket(sock: socket.socket) -> None:
+    try:
+        sock.close()
+    except OSError:
+        pass
+
+
+# Keep a global pool of persistent connections
+connection_pool = ConnectionPool()
 
 # Regular expression for removing Cache: headers if caching is not allowed
 remove_cache_regex: Pattern = re.compile("\nCache:[^\n]*")
@@ -390,6 +474,9 @@ class SingleSiteConnection(Helpers):
         self.timeout: Optional[int] = None
         self.successful_persistence = False
         self._output_format = LivestatusOutputFormat.PYTHON
+        # Number of queries sent on the current socket whose response has not been read yet
+        self._pending_responses = 0
+        self._recv_buffer = b""
 
         # Whether to establish an encrypted connection
         self.tls = tls
@@ -415,11 +502,18 @@ class SingleSiteConnection(Helpers):
         if self.socket:
             self.socket.settimeout(float(timeout))
 
+    def _pool_key(self) -> PoolKey:
+        return (self.socketurl, self.tls, self.tls_verify, self._tls_ca_file_path)
+
     def connect(self) -> None:
-        if self.persist and self.socketurl in persistent_connections:
-            self.socket = persistent_connections[self.socketurl]
-            self.successful_persistence = True
-            return
+        self._pending_responses = 0
+        self._recv_buffer = b""
+        if self.persist:
+            pooled_socket = connection_pool.acquire(self._pool_key())
+            if pooled_socket is not None:
+                self.socket = pooled_socket
+                self.successful_persistence = True
+                return
 
         self.successful_persistence = False
         family, address = _parse_socket_url(self.socketurl)
@@ -463,9 +557,6 @@ class SingleSiteConnection(Helpers):
                 self.socket = None
                 raise MKLivestatusSocketError("Cannot connect to '%s': %s" % (self.socketurl, e))
 
-        if self.persist:
-            persistent_connections[self.socketurl] = self.socket
-
     # NOTE:
     # The site_name parameter is here to be able to create a mocked socket in the testing
     # framework which fakes the correct site connection. It is never used at runtime here, but
@@ -488,12 +579,30 @@ class SingleSiteConnection(Helpers):
                                     do_handshake_on_connect=False)
 
     def disconnect(self) -> None:
-        self.socket = None
+        """Give up the connection
+
+        Persistent connections are handed back to the connection pool, unless there are
+        unread responses on them."""
+        sock, self.socket = self.socket, None
+        if sock is None or not self.persist:
+            return
+        if self._pending_responses or self._recv_buffer:
+            _close_socket(sock)
+            return
+        connection_pool.release(self._pool_key(), sock)
+
+    def _discard_connection(self) -> None:
+        """Throw away a connection which is broken or out of sync
+
+        The idle connections of the site are most likely affected as well (e.g. in case the
+        site has been restarted), so these are dropped, too."""
+        sock, self.socket = self.socket, None
+        self._pending_responses = 0
+        self._recv_buffer = b""
         if self.persist:
-            try:
-                del persistent_connections[self.socketurl]
-            except KeyError:
-                pass
+            if sock is not None:
+                _close_socket(sock)
+            connection_pool.clear(self._pool_key())
 
     def receive_data(self, size: int) -> bytes:
         if self.socket is None:
@@ -545,13 +654,12 @@ class SingleSiteConnection(Helpers):
             # TODO: Use socket.sendall()
             # socket.send() only works with byte strings
             self.socket.send(query.encode("utf-8") + b"\n\n")
+            self._pending_responses += 1
             if getattr(self.collect_queries, 'active', False):
                 self.collect_queries.queries.append(query)
         except IOError as e:
-            if self.persist:
-                del persistent_connections[self.socketurl]
-                self.successful_persistence = False
-            self.socket = None
+            self.successful_persistence = False
+            self._discard_connection()
 
             if do_reconnect:
                 # Automatically try to reconnect in case of an error, but only once.
@@ -575,35 +683,19 @@ class SingleSiteConnection(Helpers):
             try:
                 length = int(resp[4:15].lstrip())
             except Exception:
-                self.disconnect()
+                self._discard_connection()
                 raise MKLivestatusSocketError(
                     "Malformed output. Livestatus TCP socket might be unreachable or wrong"
                     "encryption settings are used.")
 
             data = self.receive_data(length).decode("utf-8")
+            self._pending_responses -= 1
 
-            if code == "200":
-                try:
-                    if self._output_format == LivestatusOutputFormat.PYTHON:
-                        return ast.literal_eval(data)
-
-                    if self._output_format == LivestatusOutputFormat.JSON:
-                        return json.loads(data)
-
-                    raise MKLivestatusQueryError("Unknown OutputFormat %r" % self._output_format)
-
-                except (ValueError, SyntaxError):
-                    self.disconnect()
-                    raise MKLivestatusSocketError("Malformed output")
-
-            elif code == "404":
-                raise MKLivestatusTableNotFoundError("Not Found (%s): %s" % (code, data.strip()))
-
-            elif code == "502":
-                raise MKLivestatusBadGatewayError(data.strip())
-
-            else:
-                raise MKLivestatusQueryError("%s: %s" % (code, data.strip()))
+            try:
+                return self.parse_response(code, data)
+            except MKLivestatusSocketError:
+                self.disconnect()
+                raise
 
         except (MKLivestatusSocketClosed, IOError) as e:
             # In case of an IO error or the other side having
@@ -643,6 +735,154 @@ class SingleSiteConnection(Helpers):
             # FIXME: ? self.disconnect()
             raise MKLivestatusSocketError("Unhandled exception: %s" % e)
 
+    def parse_response(self, code: str, data: str) -> LivestatusResponse:
+        if code == "200":
+            try:
+                if self._output_format == LivestatusOutputFormat.PYTHON:
+                    return ast.literal_eval(data)
+
+                if self._output_format == LivestatusOutputFormat.JSON:
+                    return json.loads(data)
+
+                raise MKLivestatusQueryError("Unknown OutputFormat %r" % self._output_format)
+
+            except (ValueError, SyntaxError):
+                raise MKLivestatusSocketError("Malformed output")
+
+        elif code == "404":
+            raise MKLivestatusTableNotFoundError("Not Found (%s): %s" % (code, data.strip()))
+
+        elif code == "502":
+            raise MKLivestatusBadGatewayError(data.strip())
+
+        else:
+            raise MKLivestatusQueryError("%s: %s" % (code, data.strip()))
+
+    def send_queries(self, queries: Sequence[str]) -> None:
+        """Send several queries at once without waiting for the responses in between
+
+        Livestatus answers the queries one after another on the keepalive connection. The
+        responses can then be read using receive_responses()."""
+        if self.socket is None:
+            self.connect()
+
+        if self.socket is None:
+            raise MKLivestatusSocketError("Socket to '%s' is not connected" % self.socketurl)
+
+        try:
+            self.socket.sendall(b"".join(query.encode("utf-8") + b"\n\n" for query in queries))
+        except IOError as e:
+            self.successful_persistence = False
+            self._discard_connection()
+            raise MKLivestatusSocketError("RC1:" + str(e))
+
+        self._pending_responses += len(queries)
+        if getattr(self.collect_queries, 'active', False):
+            self.collect_queries.queries.extend(queries)
+
+    def receive_responses(self) -> List[Tuple[str, str]]:
+        """Read the data which is available on the socket
+
+        Returns the status codes and bodies of all responses that have been received
+        completely. It blocks only in case nothing has been received yet, so it is meant to
+        be called once the socket is readable."""
+        if self.socket is None:
+            raise MKLivestatusSocketError("Socket to '%s' is not connected" % self.socketurl)
+
+        self.socket.settimeout(None)
+        packet = self.socket.recv(65536)
+        if not packet:
+            raise MKLivestatusSocketClosed(
+                "Read zero data from socket, nagios server closed connection")
+        chunks = [self._recv_buffer, packet]
+        # Data which is already decrypted is not signalled by select()
+        while isinstance(self.socket, ssl.SSLSocket) and self.socket.pending():
+            chunks.append(self.socket.recv(self.socket.pending()))
+        buf = b"".join(chunks)
+
+        responses = []
+        while len(buf) >= 16:
+            try:
+                length = int(buf[4:15].lstrip())
+            except ValueError:
+                self._discard_connection()
+                raise MKLivestatusSocketError(
+                    "Malformed output. Livestatus TCP socket might be unreachable or wrong"
+                    "encryption settings are used.")
+            if len(buf) < 16 + length:
+                break
+            responses.append((buf[0:3].decode("ascii"), buf[16:16 + length].decode("utf-8")))
+            buf = buf[16 + length:]
+
+        self._recv_buffer = buf
+        self._pending_responses -= len(responses)
+        return responses
+
+    def resend_after_stale_connection(self, retried: bool, received: Sequence[Tuple[str, str]],
+                                      queries: Sequence[Query], add_headers: str) -> bool:
+        """Repeat pipelined queries on a fresh connection, once
+
+        A pooled connection may have been closed by the site in the meantime. This is only
+        recognized when reading from it, so the queries are sent again, unless any response
+        has already been received."""
+        if retried or received or not self.successful_persistence:
+            return False
+        self._discard_connection()
+        try:
+            self.connect()
+            self.send_queries([self.build_query(query, add_headers) for query in queries])
+        except MKLivestatusSocketError:
+            return False
+        return True
+
+    def query_many(self,
+                   queries: Sequence['QueryTypes'],
+                   add_headers: Union[str, bytes] = "") -> List[LivestatusResponse]:
+        """Execute several queries in one round trip
+
+        Returns one response per query. Errors which are not suppressed by the query are
+        raised after all responses have been read."""
+        normalized_add_headers = _ensure_unicode(add_headers)
+        if self.limit is not None:
+            normalized_add_headers += "Limit: %d\n" % self.limit
+        normalized_queries = [Query(q) if not isinstance(q, Query) else q for q in queries]
+        if not normalized_queries:
+            return []
+
+        self.send_queries(
+            [self.build_query(query, normalized_add_headers) for query in normalized_queries])
+
+        raw_responses: List[Tuple[str, str]] = []
+        retried = False
+        while len(raw_responses) < len(normalized_queries):
+            try:
+                raw_responses += self.receive_responses()
+            except (MKLivestatusSocketClosed, IOError) as e:
+                if not self.resend_after_stale_connection(
+                        retried, raw_responses, normalized_queries, normalized_add_headers):
+                    self._discard_connection()
+                    raise MKLivestatusSocketError(str(e))
+                retried = True
+
+        result = []
+        error: Optional[Exception] = None
+        for query, (code, data) in zip(normalized_queries, raw_responses):
+            try:
+                response = self.parse_response(code, data)
+            except query.suppress_exceptions:
+                response = LivestatusResponse([])
+            except Exception as e:
+                error = error or e
+                response = LivestatusResponse([])
+            if self.prepend_site:
+                for row in response:
+                    row.insert(0, b"")
+            result.append(response)
+
+        if error is not None:
+            raise error
+        return result
+
     def set_prepend_site(self, p: bool) -> None:
         self.prepend_site = p
 
@@ -690,9 +930,7 @@ class SingleSiteConnection(Helpers):
         try:
             self.socket.send(command.encode('utf-8') + b"\n\n")
         except IOError as e:
-            self.socket = None
-            if self.persist:
-                del persistent_connections[self.socketurl]
+            self._discard_connection()
             raise MKLivestatusSocketError(str(e))
 
     # Set user to be used in certain authorization domain
@@ -998,13 +1236,7 @@ class MultiSiteConnection(Helpers):
     # of Limit: since all sites are queried in parallel, the Limit: is simply
     # applied to all sites - resulting in possibly more results then Limit requests.
     def query_parallel(self, query: Query, add_headers: str = u"") -> LivestatusResponse:
-        stillalive = []
-        if self.only_sites is not None:
-            connect_to_sites = [c for c in self.connections if c[0] in self.only_sites]
-            # Unused sites are assumed to be alive
-            stillalive.extend([c for c in self.connections if c[0] not in self.only_sites])
-        else:
-            connect_to_sites = self.connections
+        stillalive, connect_to_sites = self._split_sites_to_query()
 
         limit = self.limit
         if limit is not None:
@@ -1052,6 +1284,124 @@ class MultiSiteConnection(Helpers):
         self.connections = stillalive
         return result
 
+    def query_many(self,
+                   queries: Sequence['QueryTypes'],
+                   add_headers: Union[str, bytes] = "") -> List[LivestatusResponse]:
+        """Execute several queries on all sites in one round trip
+
+        All queries are sent to all sites at once, without waiting for the responses in
+        between. The responses are then read from the sites as they arrive, so the total
+        duration is that of the slowest site instead of the sum over all queries. The result
+        contains one response per query, combined over all sites like in query_parallel()."""
+        normalized_add_headers = _ensure_unicode(add_headers)
+        if self.limit is not None:
+            normalized_add_headers += u"Limit: %d\n" % self.limit
+        normalized_queries = [Query(q) if not isinstance(q, Query) else q for q in queries]
+        if not normalized_queries:
+            return []
+
+        stillalive, connect_to_sites = self._split_sites_to_query()
+
+        # First send all queries to all sites
+        selector = selectors.DefaultSelector()
+        for sitename, site, connection in connect_to_sites:
+            try:
+                connection.send_queries([
+                    connection.build_query(query, normalized_add_headers)
+                    for query in normalized_queries
+                ])
+                assert connection.socket is not None
+                selector.register(connection.socket, selectors.EVENT_READ,
+                                  (sitename, site, connection))
+            except LivestatusTestingError:
+                raise
+            except Exception as e:
+                self.deadsites[sitename] = {
+                    "exception": e,
+                    "site": site,
+                }
+
+        # Then read the responses from whichever site is ready
+        raw_responses: Dict[SiteId, List[Tuple[str, str]]] = {}
+        retried: Set[SiteId] = set()
+        while selector.get_map():
+            for key, _events in selector.select():
+                sitename, site, connection = key.data
+                received = raw_responses.setdefault(sitename, [])
+                try:
+                    received += connection.receive_responses()
+                except (MKLivestatusSocketClosed, IOError) as e:
+                    selector.unregister(key.fileobj)
+                    if connection.resend_after_stale_connection(sitename in retried, received,
+                                                                normalized_queries,
+                                                                normalized_add_headers):
+                        retried.add(sitename)
+                        assert connection.socket is not None
+                        selector.register(connection.socket, selectors.EVENT_READ, key.data)
+                        continue
+                    connection.disconnect()
+                    del raw_responses[sitename]
+                    self.deadsites[sitename] = {
+                        "exception": MKLivestatusSocketError(str(e)),
+                        "site": site,
+                    }
+                    continue
+                except LivestatusTestingError:
+                    raise
+                except Exception as e:
+                    selector.unregister(key.fileobj)
+                    connection.disconnect()
+                    del raw_responses[sitename]
+                    self.deadsites[sitename] = {
+                        "exception": e,
+                        "site": site,
+                    }
+                    continue
+
+                if len(received) == len(normalized_queries):
+                    selector.unregister(key.fileobj)
+        selector.close()
+
+        results = [LivestatusResponse([]) for _query in normalized_queries]
+        for sitename, site, connection in connect_to_sites:
+            if sitename not in raw_responses:
+                continue
+            try:
+                site_results = []
+                for query, (code, data) in zip(normalized_queries, raw_responses[sitename]):
+                    try:
+                        site_results.append(connection.parse_response(code, data))
+                    except query.suppress_exceptions:
+                        site_results.append(LivestatusResponse([]))
+            except Exception as e:
+                connection.disconnect()
+                self.deadsites[sitename] = {
+                    "exception": e,
+                    "site": site,
+                }
+                continue
+
+            stillalive.append((sitename, site, connection))
+            for result, response in zip(results, site_results):
+                if self.prepend_site:
+                    for row in response:
+                        row.insert(0, sitename)
+                result += response
+
+        self.connections = stillalive
+        return results
+
+    def _split_sites_to_query(
+        self
+    ) -> Tuple[List[Tuple[SiteId, SiteConfiguration, SingleSiteConnection]], List[Tuple[
+            SiteId, SiteConfiguration, SingleSiteConnection]]]:
+        """Returns the connections which are not queried and the ones to query"""
+        if self.only_sites is None:
+            return [], self.connections
+        # Unused sites are assumed to be alive
+        return ([c for c in self.connections if c[0] not in self.only_sites],
+                [c for c in self.connections if c[0] in self.only_sites])
+
     # TODO: Is this SiteId(...) the way to go? Without this mypy complains about incompatible bytes
     # vs. Optional[SiteId]
     def command(self, command: AnyStr, sitename: Optional[SiteId] = SiteId("local")) -> None:
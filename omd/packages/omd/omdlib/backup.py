@@ -25,12 +25,19 @@
 """Cares about backing up the files of a site"""
 
 import os
+import io
 import sys
+import time
 import errno
 import socket
+import struct
 import tarfile
 import fnmatch
-from typing import cast, List, Tuple, BinaryIO
+import itertools
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import cast, Callable, Deque, Iterator, List, Optional, Set, Tuple, BinaryIO
 
 from omdlib.type_defs import CommandOptions
 from omdlib.contexts import SiteContext
@@ -55,6 +62,34 @@ def backup_site_to_tarfile(site: SiteContext, fh: BinaryIO, mode: str, options:
     tar.close()
 
 
+def parallel_backup_site_to_tarfile(site: SiteContext, fh: BinaryIO, options: CommandOptions,
+                                    verbose: bool, threads: int, compress: bool) -> None:
+    """Create the same backup as backup_site_to_tarfile(), but using multiple threads
+
+    The files are read by a pool of threads and the archive is compressed by another one. The
+    archive is a regular (gzip compressed) tar stream which can be restored as usual."""
+    writer = ParallelGzipWriter(fh, threads) if compress else None
+    try:
+        tar = cast(
+            BackupTarFile,
+            BackupTarFile.open(  # type: ignore[call-arg]
+                fileobj=writer or fh,
+                mode="w|",
+                site=site,
+                verbose=verbose))
+
+        tar.add(site.dir + "/version", site.name + "/version")
+        tar.add_parallel(site.dir, site.name, _get_filter(site, options), threads)
+        tar.close()
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+
+    if writer is not None:
+        writer.close()
+
+
 def get_exclude_patterns(options: CommandOptions) -> List[str]:
     excludes = []
     if "no-rrds" in options or "no-past" in options:
@@ -88,6 +123,11 @@ def get_exclude_patterns(options: CommandOptions) -> List[str]:
 
 def _backup_site_files_to_tarfile(site: SiteContext, tar: 'BackupTarFile',
                                   options: CommandOptions) -> None:
+    tar.add(site.dir, site.name, filter=_get_filter(site, options))
+
+
+def _get_filter(site: SiteContext,
+                options: CommandOptions) -> Callable[[tarfile.TarInfo], Optional[tarfile.TarInfo]]:
     exclude = get_exclude_patterns(options)
     exclude.append("tmp/*")  # Exclude all tmpfs files
 
@@ -109,7 +149,89 @@ def _backup_site_files_to_tarfile(site: SiteContext, tar: 'BackupTarFile',
             for glob_pattern in exclude)
         return None if matches_exclude else tarinfo
 
-    tar.add(site.dir, site.name, filter=filter_files)
+    return filter_files
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _deflate_block(block: bytes, dictionary: bytes, level: int, last: bool) -> bytes:
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    # The sync flush terminates the block at a byte boundary without ending the deflate
+    # stream, so the compressed blocks can simply be concatenated.
+    return compressor.compress(block) + compressor.flush(
+        zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class ParallelGzipWriter:
+    """File object writing a gzip stream, compressing blocks of the data in parallel
+
+    Like pigz does, the data is split into blocks which are compressed independently using
+    the last 32 KB of the previous block as dictionary. The result is a single regular gzip
+    member, which can be read by gzip, the tarfile module and "omd restore"."""
+    block_size = 1024 * 1024
+
+    def __init__(self, fileobj: BinaryIO, threads: int, compresslevel: int = 9) -> None:
+        self._fileobj = fileobj
+        self._threads = threads
+        self._compresslevel = compresslevel
+        self._pending: Deque[Future] = deque()
+        self._buffer = bytearray()
+        self._dictionary = b""
+        self._crc = 0
+        self._size = 0
+        self._aborted = False
+        self._fileobj.write(b"\037\213\010\000" + struct.pack("<L", int(time.time())) + b"\002\377")
+        self._executor = ThreadPoolExecutor(max_workers=threads)
+
+    def write(self, data: bytes) -> int:
+        if self._aborted:
+            return len(data)
+        self._buffer += data
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            self._compress(block, last=False)
+        return len(data)
+
+    def _compress(self, block: bytes, last: bool) -> None:
+        self._crc = zlib.crc32(block, self._crc)
+        self._size += len(block)
+        self._pending.append(
+            self._executor.submit(_deflate_block, block, self._dictionary, self._compresslevel,
+                                  last))
+        self._dictionary = block[-32768:]
+
+        # Keep the compressed blocks in order and limit the memory usage
+        while self._pending and (last or len(self._pending) > 2 * self._threads):
+            self._fileobj.write(self._pending.popleft().result())
+
+    def close(self) -> None:
+        if self._aborted:
+            return
+        try:
+            self._compress(bytes(self._buffer), last=True)
+            self._buffer = bytearray()
+            self._fileobj.write(struct.pack("<LL", self._crc, self._size & 0xffffffff))
+            self._fileobj.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def abort(self) -> None:
+        """Stop the compression without completing the gzip stream, e.g. after an error
+
+        Data written afterwards, e.g. when the tar stream is closed on deletion, is discarded."""
+        self._aborted = True
+        self._buffer = bytearray()
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=True)
 
 
 class BackupTarFile(tarfile.TarFile):
@@ -122,6 +244,7 @@ class BackupTarFile(tarfile.TarFile):
         self._rrdcached_socket_path = self._site.dir + "/tmp/run/rrdcached.sock"
         self._sock = None
         self._sites_path = os.path.realpath("/omd/sites")
+        self._suspended_rrds: Set[str] = set()
 
         super(BackupTarFile, self).__init__(name, mode, fileobj, **kwargs)
 
@@ -154,8 +277,10 @@ class BackupTarFile(tarfile.TarFile):
         # rrdcached works realpath
         rrd_file_path = os.path.join(self._sites_path, tarinfo.name)
 
-        if is_rrd:
+        if is_rrd and rrd_file_path not in self._suspended_rrds:
             self._suspend_rrd_update(rrd_file_path)
+        else:
+            is_rrd = False
 
         try:
             super(BackupTarFile, self).addfile(tarinfo, fileobj)
@@ -163,6 +288,110 @@ class BackupTarFile(tarfile.TarFile):
             if is_rrd:
                 self._resume_rrd_update(rrd_file_path)
 
+    # Limits of the members which are read at once by add_parallel()
+    parallel_batch_size = 1000
+    parallel_batch_bytes = 64 * 1024 * 1024
+
+    def add_parallel(
+        self,
+        name: str,
+        arcname: str,
+        filter: Callable[[tarfile.TarInfo], Optional[tarfile.TarInfo]],  # pylint: disable=redefined-builtin
+        threads: int,
+    ) -> None:
+        """Add a directory tree like add() does, but read the files with a pool of threads
+
+        The members are added in the same order as add() adds them. They are processed in
+        batches: The RRD updates of all RRDs of a batch are suspended and resumed with a single
+        round trip to rrdcached each, while the files of the batch are being read in parallel."""
+        members = self._walk(name, arcname, filter)
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            while True:
+                batch = self._next_batch(members)
+                if not batch:
+                    break
+                self._add_batch(executor, batch)
+
+    def _walk(
+        self,
+        name: str,
+        arcname: str,
+        filter: Callable[[tarfile.TarInfo], Optional[tarfile.TarInfo]]  # pylint: disable=redefined-builtin
+    ) -> Iterator[Tuple[str, tarfile.TarInfo]]:
+        try:
+            tarinfo = self.gettarinfo(name, arcname)
+            if tarinfo is not None:
+                tarinfo = filter(tarinfo)
+            if tarinfo is None:
+                return
+            yield name, tarinfo
+
+            if tarinfo.isdir():
+                for entry in sorted(os.listdir(name)):
+                    yield from self._walk(os.path.join(name, entry), os.path.join(arcname, entry),
+                                          filter)
+        except FileNotFoundError:
+            if arcname == self._site.name:
+                raise
+
+            if self._verbose:
+                sys.stdout.write("Skipping vanished file: %s\n" % arcname)
+
+    def _next_batch(
+            self, members: Iterator[Tuple[str,
+                                          tarfile.TarInfo]]) -> List[Tuple[str, tarfile.TarInfo]]:
+        batch: List[Tuple[str, tarfile.TarInfo]] = []
+        num_bytes = 0
+        for name, tarinfo in itertools.islice(members, self.parallel_batch_size):
+            batch.append((name, tarinfo))
+            num_bytes += tarinfo.size
+            if num_bytes >= self.parallel_batch_bytes:
+                break
+        return batch
+
+    def _add_batch(self, executor: ThreadPoolExecutor, batch: List[Tuple[str,
+                                                                         tarfile.TarInfo]]) -> None:
+        rrds = [
+            os.path.join(self._sites_path, tarinfo.name)
+            for _name, tarinfo in batch
+            if self._is_rrd(tarinfo)
+        ]
+        if rrds and not self._site_stopped and os.path.exists(self._rrdcached_socket_path):
+            self._send_rrdcached_commands(["SUSPEND %s" % path for path in rrds])
+            self._suspended_rrds.update(rrds)
+
+        # Huge files are not read into memory, they are copied by addfile() as usual
+        futures = [
+            executor.submit(_read_file, name)
+            if tarinfo.isreg() and tarinfo.size < self.parallel_batch_bytes else None
+            for name, tarinfo in batch
+        ]
+        try:
+            for (name, tarinfo), future in zip(batch, futures):
+                try:
+                    if future is not None:
+                        data = future.result()
+                        # The file may have been changed while reading it
+                        tarinfo.size = len(data)
+                        self.addfile(tarinfo, io.BytesIO(data))
+                    elif tarinfo.isreg():
+                        with open(name, "rb") as f:
+                            self.addfile(tarinfo, f)
+                    else:
+                        self.addfile(tarinfo)
+                except FileNotFoundError:
+                    if self._verbose:
+                        sys.stdout.write("Skipping vanished file: %s\n" % tarinfo.name)
+        finally:
+            if self._suspended_rrds:
+                self._send_rrdcached_commands(["RESUME %s" % path for path in rrds])
+                self._suspended_rrds.clear()
+
+    def _is_rrd(self, tarinfo: tarfile.TarInfo) -> bool:
+        site_rel_path = tarinfo.name[len(self._site.name) + 1:]
+        return ((site_rel_path.startswith("var/pnp4nagios/perfdata") or
+                 site_rel_path.startswith("var/check_mk/rrd")) and site_rel_path.endswith(".rrd"))
+
     def _suspend_rrd_update(self, path: str) -> None:
         if self._verbose:
             sys.stdout.write("Pausing RRD updates for %s\n" % path)
@@ -179,6 +408,10 @@ class BackupTarFile(tarfile.TarFile):
         self._send_rrdcached_command("RESUMEALL")
 
     def _send_rrdcached_command(self, cmd: str) -> None:
+        self._send_rrdcached_commands([cmd])
+
+    def _send_rrdcached_commands(self, cmds: List[str]) -> None:
+        """Send the commands at once and read the answers afterwards to save round trips"""
         if self._sock is None:
             sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
             try:
@@ -195,12 +428,10 @@ class BackupTarFile(tarfile.TarFile):
 
         try:
             if self._verbose:
-                sys.stdout.write("rrdcached command: %s\n" % cmd)
-            self._sock.sendall(("%s\n" % cmd).encode("utf-8"))
-
-            answer = ""
-            while not answer.endswith("\n"):
-                answer += self._sock.recv(1024).decode("utf-8")
+                for cmd in cmds:
+                    sys.stdout.write("rrdcached command: %s\n" % cmd)
+            self._sock.sendall("".join("%s\n" % cmd for cmd in cmds).encode("utf-8"))
+            answers = self._receive_rrdcached_answers(len(cmds))
         except IOError as e:
             self._sock = None
             if self._verbose:
@@ -210,6 +441,23 @@ class BackupTarFile(tarfile.TarFile):
             self._sock = None
             raise
 
+        for cmd, answer in zip(cmds, answers):
+            self._handle_rrdcached_answer(cmd, answer)
+
+    def _receive_rrdcached_answers(self, num_answers: int) -> List[str]:
+        assert self._sock is not None
+        answers: List[str] = []
+        data = b""
+        while len(answers) < num_answers:
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise IOError("Connection closed by rrdcached")
+            data += chunk
+            *lines, data = data.split(b"\n")
+            answers.extend(line.decode("utf-8") + "\n" for line in lines)
+        return answers
+
+    def _handle_rrdcached_answer(self, cmd: str, answer: str) -> None:
         code, msg = answer.strip().split(" ", 1)
         if code == "-1":
             if self._verbose:
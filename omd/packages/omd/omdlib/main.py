@@ -2747,8 +2747,25 @@ def main_backup(version_info: VersionInfo, site: SiteContext, global_opts: 'Glob
     if "no-compression" not in options:
         tar_mode += "gz"
 
+    threads = 1
+    if "parallel" in options:
+        try:
+            threads = int(cast(str, options["parallel"]))
+        except ValueError:
+            threads = 0
+        if threads < 1:
+            bail_out("The number of threads needs to be a positive integer.")
+
     try:
-        omdlib.backup.backup_site_to_tarfile(site, fh, tar_mode, options, global_opts.verbose)
+        if threads > 1:
+            omdlib.backup.parallel_backup_site_to_tarfile(site,
+                                                          fh,
+                                                          options,
+                                                          global_opts.verbose,
+                                                          threads=threads,
+                                                          compress="no-compression" not in options)
+        else:
+            omdlib.backup.backup_site_to_tarfile(site, fh, tar_mode, options, global_opts.verbose)
     except IOError as e:
         bail_out("Failed to perform backup: %s" % e)
 
@@ -3677,6 +3694,8 @@ commands.append(
         handler=main_backup,
         options=exclude_options + [
             Option("no-compression", None, False, "do not compress tar archive"),
+            Option("parallel", "j", True,
+                   "read the files and compress the archive using ARG threads"),
         ],
         description="Create a backup tarball of a site, writing it to a file or stdout",
         confirm_text="",
@@ -328,3 +328,77 @@ def test_grouping_multiple_groups(
         assert section_name == expected_results_list[results_idx][0]
         for files_idx, single_file in enumerate(files):
             assert single_file == expected_results_list[results_idx][1][files_idx]
+
+
+@pytest.fixture
+def file_tree(tmp_path):
+    for name in ("a.log", "b.txt", ".hidden", "sub/c.log", "sub/deeper/d.log"):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(u"foo")
+    (tmp_path / "link").symlink_to(tmp_path / "sub" / "deeper")
+    # otherwise the directories are too young to be cached
+    for path in (tmp_path, tmp_path / "sub", tmp_path / "sub" / "deeper"):
+        os.utime(str(path), (1000000000, 1000000000))
+    return tmp_path
+
+
+def test_directory_cache(mk_filestats, file_tree, tmp_path_factory, monkeypatch):
+    cache_file = str(tmp_path_factory.mktemp("cache") / "filestats.cache")
+    pattern = str(file_tree)
+    expected = [f.path for f in mk_filestats.PatternIterator([pattern])]
+    assert len(expected) == 5
+
+    directory_cache = mk_filestats.DirectoryCache(cache_file)
+    directory_cache.load()
+    assert [f.path for f in mk_filestats.PatternIterator([pattern], directory_cache)] == expected
+    directory_cache.save()
+
+    listed = []
+    orig_listdir = os.listdir
+    monkeypatch.setattr(os, "listdir", lambda path: listed.append(path) or orig_listdir(path))
+
+    directory_cache = mk_filestats.DirectoryCache(cache_file)
+    directory_cache.load()
+    files = list(mk_filestats.PatternIterator([pattern], directory_cache))
+    assert [f.path for f in files] == expected
+    assert listed == []
+    assert all(isinstance(f, mk_filestats.LazyFileStat) for f in files)
+    assert not any("size" in vars(f) for f in files)
+    assert files[0].size == 3
+
+    (file_tree / "sub" / "e.log").write_text(u"foo")
+    files = list(mk_filestats.PatternIterator([pattern], directory_cache))
+    assert len(files) == 6
+    assert listed == [str(file_tree / "sub")]
+
+
+def test_directory_cache_without_json(mk_filestats, file_tree, tmp_path_factory, monkeypatch):
+    cache_file = tmp_path_factory.mktemp("cache") / "filestats.cache"
+    monkeypatch.setattr(mk_filestats.DirectoryCache, "_import_json", staticmethod(lambda: None))
+    directory_cache = mk_filestats.DirectoryCache(str(cache_file))
+    directory_cache.load()
+    assert len(list(mk_filestats.PatternIterator([str(file_tree)], directory_cache))) == 5
+    directory_cache.save()
+    assert not cache_file.exists()
+
+
+def test_write_output_parallel(mk_filestats, file_tree, capsys):
+    config_sections = [("all %d" % i, {
+        "input_patterns": str(file_tree),
+        "output": "count_only",
+        "filter_regex": ".*\\.log" if i % 2 else ".*",
+    }) for i in range(5)] + [("grouped", {
+        "input_patterns": str(file_tree / "*"),
+        "output": "file_stats",
+        "grouping": [("logs", {
+            "type": "regex",
+            "rule": ".*log",
+        })],
+    })]
+
+    for config_section_name, config in config_sections:
+        mk_filestats.write_output(*mk_filestats.process_config_section(config_section_name, config))
+    expected = capsys.readouterr().out
+
+    mk_filestats.write_output_parallel(config_sections, 3)
+    assert capsys.readouterr().out == expected
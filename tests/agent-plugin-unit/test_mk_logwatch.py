@@ -506,6 +506,79 @@ def test_non_ascii_line_processing(mk_logwatch, tmpdir, monkeypatch, use_specifi
         assert result == expected_result
 
 
+@pytest.mark.parametrize("raw_patterns, expected", [
+    ([u"foo", u"^bar$"], u"(?:foo)|(?:^bar$)"),
+    ([], None),
+    ([u"(a)\\1"], None),
+    ([u"foo(?!bar)"], None),
+    ([u"(?i)foo"], None),
+    ([u"foo\\Z"], None),
+])
+def test_logfile_section_prefilter(mk_logwatch, raw_patterns, expected):
+    section = mk_logwatch.LogfileSection(("file", "file"))
+    section._compiled_patterns = [('C', re.compile(p, re.UNICODE), [], []) for p in raw_patterns]
+    prefilter = section.prefilter
+    assert (prefilter and prefilter.pattern) == expected
+
+
+@pytest.mark.parametrize("error", [re.error("sorry"), AssertionError("sorry")])
+def test_logfile_section_prefilter_compile_error(mk_logwatch, monkeypatch, error):
+    section = mk_logwatch.LogfileSection(("file", "file"))
+    section._compiled_patterns = [
+        ('C', re.compile(u"(%d)" % i, re.UNICODE), [], []) for i in range(101)
+    ]
+
+    def compile_combined(pattern, flags=0):
+        raise error
+
+    monkeypatch.setattr(mk_logwatch.re, "compile", compile_combined)
+    assert section.prefilter is None
+
+
+def test_log_lines_iter_prefilter(mk_logwatch, tmpdir):
+    log_path = os.path.join(str(tmpdir), "testlog")
+    with open(log_path, "wb") as f:
+        f.write(b"a1\nfoo\nb2\nbar\na3\nbaz x\nb4\n")
+
+    # [^x]* spans multiple lines within the block of lines, but must not hide the match in
+    # "baz x"
+    prefilter = re.compile(u"(?:^foo$)|(?:ba[^x]*x)", re.UNICODE | re.MULTILINE)
+    with mk_logwatch.LogLinesIter(log_path, "utf-8", prefilter) as log_iter:
+        assert log_iter.skip_unmatched_lines(10) == 1
+        assert log_iter.next_line_with_hint() == (u"foo\n", True)
+        assert log_iter.next_line_with_hint() == (u"b2\n", False)
+        assert log_iter.next_line_with_hint() == (u"bar\n", True)
+        log_iter.push_back_line(u"bar\n")
+        assert log_iter.get_position() == 10
+        assert log_iter.next_line_with_hint() == (u"bar\n", True)
+        assert log_iter.skip_unmatched_lines(10) == 1
+        assert log_iter.next_line_with_hint() == (u"baz x\n", True)
+        assert log_iter.skip_unmatched_lines(10) == 1
+        assert log_iter.next_line_with_hint() == (None, False)
+        assert log_iter.get_position() == os.stat(log_path).st_size
+
+
+@pytest.mark.parametrize("opt_raw", [{}, {'nocontext': True}, {'nocontext': True, 'maxlines': 3}])
+def test_process_logfile_prefilter(mk_logwatch, monkeypatch, tmpdir, opt_raw):
+    log_path = os.path.join(str(tmpdir), "testlog")
+    with open(log_path, "wb") as f:
+        f.write(b"".join(b"line %d%s\n" % (i, b" ERROR" if i % 4 == 1 else b"") for i in range(20)))
+    monkeypatch.setattr(sys, 'stdout', MockStdout())
+
+    def process(use_prefilter):
+        section = mk_logwatch.LogfileSection((log_path, log_path))
+        section.options.values.update(opt_raw)
+        section._compiled_patterns = [
+            ('C', re.compile(u'ERROR$', re.UNICODE), [], []),
+            ('W', re.compile(u'line 1', re.UNICODE), [], []),
+        ]
+        if not use_prefilter:
+            section._prefilter = None
+        return mk_logwatch.process_logfile(section, {'offset': 0}, False)
+
+    assert process(True) == process(False)
+
+
 class MockStdout(object):  # pylint: disable=useless-object-inheritance
     def isatty(self):
         return False
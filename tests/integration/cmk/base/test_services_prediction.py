@@ -164,9 +164,9 @@ def test_retieve_grouped_data_from_rrd(cfg_setup, utcdate, timezone, params, ref
                                                timegroup)
 
     hostname, service_description, dsname = 'test-prediction', "CPU load", 'load15'
-    rrd_datacolumn = cmk.utils.prediction.rrd_datacolum(hostname, service_description, dsname,
-                                                        "MAX")
-    result = prediction._retrieve_grouped_data_from_rrd(rrd_datacolumn, time_windows)
+    timeseries = cmk.utils.prediction.get_rrd_data_of_slices(hostname, service_description, dsname,
+                                                             "MAX", time_windows)
+    result = prediction._upsample_slices(timeseries, time_windows)
 
     assert result == reference
 
@@ -212,9 +212,9 @@ def test_calculate_data_for_prediction(cfg_setup, utcdate, timezone, params):
                                                timegroup)
 
     hostname, service_description, dsname = 'test-prediction', "CPU load", 'load15'
-    rrd_datacolumn = cmk.utils.prediction.rrd_datacolum(hostname, service_description, dsname,
-                                                        "MAX")
-    data_for_pred = prediction._calculate_data_for_prediction(time_windows, rrd_datacolumn)
+    timeseries = cmk.utils.prediction.get_rrd_data_of_slices(hostname, service_description, dsname,
+                                                             "MAX", time_windows)
+    data_for_pred = prediction._calculate_data_for_prediction(time_windows, timeseries)
 
     expected_reference = _load_expected_result("%s/tests/integration/cmk/base/test-files/%s/%s" %
                                                (repo_path(), timezone, timegroup))
@@ -20,6 +20,7 @@ DEFAULT_AGRS = {
     "host_pwr_display": None,
     "vm_pwr_display": None,
     "snapshots_on_host": False,
+    "max_workers": 1,
     "vm_piggyname": "alias",
     "spaces": "underscore",
     "no_cert_check": False,
@@ -71,6 +72,9 @@ DEFAULT_AGRS = {
     (['--snapshots-on-host'], {
         "snapshots_on_host": True
     }),
+    (['--max-workers', '4'], {
+        "max_workers": 4
+    }),
     (['--vm_piggyname', 'hostname'], {
         "vm_piggyname": "hostname"
     }),
@@ -121,3 +125,79 @@ def test_parse_arguments(argv, expected_non_default_args):
 def test_parse_arguments_invalid(invalid_argv):
     with pytest.raises(SystemExit):
         agent_vsphere.parse_arguments(invalid_argv)
+
+
+PERFCOUNTERAVAIL_RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
+ xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+<soapenv:Body>
+<QueryAvailablePerfMetricResponse xmlns="urn:vim25">
+<returnval><counterId>2</counterId><instance></instance></returnval>
+<returnval><counterId>6</counterId><instance></instance></returnval>
+<returnval><counterId>6</counterId><instance>0</instance></returnval>
+</QueryAvailablePerfMetricResponse>
+</soapenv:Body>
+</soapenv:Envelope>"""
+
+PERFCOUNTERDATA_RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
+ xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+<soapenv:Body>
+<QueryPerfResponse xmlns="urn:vim25">
+<returnval xsi:type="PerfEntityMetric">
+<entity type="HostSystem">%s</entity>
+<sampleInfo><timestamp>2020-11-11T11:11:00Z</timestamp><interval>20</interval></sampleInfo>
+<sampleInfo><timestamp>2020-11-11T11:11:20Z</timestamp><interval>20</interval></sampleInfo>
+<value xsi:type="PerfMetricIntSeries"><id><counterId>2</counterId><instance></instance></id>\
+<value>1000</value><value>2000</value></value>
+<value xsi:type="PerfMetricIntSeries"><id><counterId>6</counterId><instance>0</instance></id>\
+<value>42</value><value>43</value></value>
+</returnval>
+</QueryPerfResponse>
+</soapenv:Body>
+</soapenv:Envelope>"""
+
+
+class FakeESXConnection:
+    perf_samples = 2
+
+    def __init__(self):
+        self.queries = []
+
+    def query_server_pooled(self, method, parse, **kwargs):
+        self.queries.append((method, kwargs))
+        if method == 'perfcounteravail':
+            return list(parse(PERFCOUNTERAVAIL_RESPONSE))
+        return list(parse(PERFCOUNTERDATA_RESPONSE % kwargs["esxhost"]))
+
+
+def test_fetch_available_counters():
+    opt = agent_vsphere.parse_arguments(["--max-workers", "2", "test_host"])
+    assert agent_vsphere.fetch_available_counters(
+        FakeESXConnection(),
+        ["host-1", "host-2"],
+        opt,
+    ) == {
+        "host-1": {
+            "2": [""],
+            "6": ["", "0"],
+        },
+        "host-2": {
+            "2": [""],
+            "6": ["", "0"],
+        },
+    }
+
+
+@pytest.mark.parametrize("max_workers", ["1", "3"])
+def test_fetch_counters(max_workers):
+    opt = agent_vsphere.parse_arguments(["--max-workers", max_workers, "test_host"])
+    connection = FakeESXConnection()
+    hosts = ["host-%d" % i for i in range(5)]
+    assert agent_vsphere.fetch_counters(
+        connection,
+        {host: [("2", [""]), ("6", ["0"])] for host in hosts},
+        opt,
+    ) == {host: [("2", "", ["1000", "2000"]), ("6", "0", ["42", "43"])] for host in hosts}
+    assert sorted(kwargs["esxhost"] for _method, kwargs in connection.queries) == hosts
+    assert {kwargs["samples"] for _method, kwargs in connection.queries} == {2}
@@ -68,6 +68,36 @@ pytestmark = pytest.mark.checks
                 }),
             ),
         ),
+        (
+            {
+                'access_key_id': 'strawberry',
+                'secret_access_key': 'strawberry098',
+                'regions': ['eu-central-1', 'us-east-1'],
+                'services': {
+                    'ec2': {
+                        'selection': 'all',
+                    },
+                },
+                'max_workers': 8,
+            },
+            SpecialAgentConfiguration(
+                [
+                    "--regions",
+                    "eu-central-1",
+                    "us-east-1",
+                    "--services",
+                    "ec2",
+                    "--max-workers",
+                    "8",
+                    "--hostname",
+                    "testhost",
+                ],
+                json.dumps({
+                    'access_key_id': 'strawberry',
+                    'secret_access_key': 'strawberry098',
+                }),
+            ),
+        ),
     ],
 )
 def test_aws_argument_parsing(params, expected_args):
@@ -42,6 +42,16 @@ pytestmark = pytest.mark.checks
         "hostsystem,virtualmachine,datastore,counters", "--direct", "--hostname", "host", "-P",
         "--spaces", "cut", "--vm_piggyname", "alias", "--no-cert-check", "address"
     ]),
+    ({
+        'direct': False,
+        'skip_placeholder_vms': False,
+        'ssl': True,
+        'secret': 'secret',
+        'user': 'username',
+        'infos': ['hostsystem', 'counters'],
+        'max_workers': 4,
+    },
+     ["-u", "username", "-s", "secret", "-i", "hostsystem,counters", "--max-workers", "4", "host"]),
 ])
 def test_vsphere_argument_parsing(params, expected_args):
     """Tests if all required arguments are present."""
@@ -4,6 +4,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import os
 from pathlib import Path
 
 import pytest
@@ -47,3 +48,39 @@ class TestAutodiscoveryQueue:
     def test_cleanup(self, autodiscovery_queue):
         autodiscovery_queue.cleanup(valid_hosts={"lost", "rost"}, logger=lambda x: None)
         assert list(autodiscovery_queue.queued_hosts()) == ['lost']
+
+    def test_queued_oldest_first(self, autodiscovery_queue):
+        os.utime(autodiscovery_queue._dir / "most", (1000, 1000))
+        os.utime(autodiscovery_queue._dir / "lost", (2000, 2000))
+        autodiscovery_queue.add("host")
+        assert list(autodiscovery_queue.queued_hosts()) == ['most', 'lost', 'host']
+
+    def test_len(self, autodiscovery_queue):
+        assert len(autodiscovery_queue) == 2
+        autodiscovery_queue.remove("lost")
+        assert len(autodiscovery_queue) == 1
+
+
+def _fake_discover_marked_host_by_name(host_name, *, autodiscovery_queue, reference_time,
+                                       oldest_queued):
+    autodiscovery_queue.remove(host_name)
+    return host_name == "changed"
+
+
+def test_discover_marked_hosts_concurrently(autodiscovery_queue, monkeypatch):
+    monkeypatch.setattr(discovery, "_discover_marked_host_by_name",
+                        _fake_discover_marked_host_by_name)
+    autodiscovery_queue.add("changed")
+    autodiscovery_queue.add("unchanged")
+
+    results = list(
+        discovery._discover_marked_hosts_concurrently(
+            autodiscovery_queue.queued_hosts(),
+            max_processes=2,
+            autodiscovery_queue=autodiscovery_queue,
+            reference_time=0.,
+            oldest_queued=0.,
+        ))
+
+    assert sorted(results) == [False, False, False, True]
+    assert len(autodiscovery_queue) == 0
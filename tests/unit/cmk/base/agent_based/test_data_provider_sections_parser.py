@@ -6,10 +6,14 @@
 
 from typing import Callable
 
+import logging
+
 import pytest
 
 from cmk.utils.type_defs import SectionName
 
+from cmk.core_helpers.cache import ParseResultStore
+
 from cmk.base import crash_reporting
 from cmk.base.sources.agent import AgentHostSections
 from cmk.base.agent_based.data_provider import SectionsParser
@@ -88,3 +92,75 @@ class TestSectionsParser:
         section = _section("one", lambda x: None)
 
         assert sections_parser.parse(section) is None
+
+
+class TestSectionsParserParseResultStore:
+    @staticmethod
+    def _make_parser(store: ParseResultStore, content) -> SectionsParser:
+        return SectionsParser(
+            host_sections=AgentHostSections(sections={SectionName("one"): content}),
+            parse_result_store=store,
+        )
+
+    @pytest.fixture
+    def store(self, tmp_path) -> ParseResultStore:
+        return ParseResultStore(tmp_path / "parse_results", logger=logging.getLogger("test"))
+
+    @staticmethod
+    def test_pure_section_not_reparsed(store: ParseResultStore) -> None:
+        counter = iter((1, 2))
+        section = _section("one", lambda x: next(counter))._replace(pure_parse_function=True)
+
+        first_parser = TestSectionsParserParseResultStore._make_parser(store, [["a"]])
+        assert (result := first_parser.parse(section)) is not None and result.data == 1
+        first_parser.store_parse_results()
+
+        second_parser = TestSectionsParserParseResultStore._make_parser(store, [["a"]])
+        assert (result := second_parser.parse(section)) is not None and result.data == 1
+
+    @staticmethod
+    def test_pure_section_reparsed_on_change(store: ParseResultStore) -> None:
+        counter = iter((1, 2))
+        section = _section("one", lambda x: next(counter))._replace(pure_parse_function=True)
+
+        first_parser = TestSectionsParserParseResultStore._make_parser(store, [["a"]])
+        _ = first_parser.parse(section)
+        first_parser.store_parse_results()
+
+        second_parser = TestSectionsParserParseResultStore._make_parser(store, [["b"]])
+        assert (result := second_parser.parse(section)) is not None and result.data == 2
+
+    @staticmethod
+    def test_impure_section_always_parsed(store: ParseResultStore) -> None:
+        counter = iter((1, 2))
+        section = _section("one", lambda x: next(counter))
+
+        first_parser = TestSectionsParserParseResultStore._make_parser(store, [["a"]])
+        _ = first_parser.parse(section)
+        first_parser.store_parse_results()
+
+        assert not store.path.exists()
+        second_parser = TestSectionsParserParseResultStore._make_parser(store, [["a"]])
+        assert (result := second_parser.parse(section)) is not None and result.data == 2
+
+    @staticmethod
+    def test_stored_parse_result_not_modified(store: ParseResultStore) -> None:
+        section = _section("one", lambda x: {"items": ["a"]})._replace(pure_parse_function=True)
+
+        for _run in range(2):
+            parser = TestSectionsParserParseResultStore._make_parser(store, [["a"]])
+            assert (result := parser.parse(section)) is not None
+            assert result.data == {"items": ["a"]}
+            # e.g. a check function modifying the parsed data
+            result.data["items"].append("b")
+            parser.store_parse_results()
+
+    @staticmethod
+    def test_unpicklable_parse_result_not_stored(store: ParseResultStore) -> None:
+        section = _section("one", lambda x: lambda: None)._replace(pure_parse_function=True)
+
+        parser = TestSectionsParserParseResultStore._make_parser(store, [["a"]])
+        assert parser.parse(section) is not None
+        parser.store_parse_results()
+
+        assert not store.path.exists()
@@ -107,7 +107,7 @@ def test_create_agent_section_plugin():
     )
 
     assert isinstance(plugin, AgentSectionPlugin)
-    assert len(plugin) == 9
+    assert len(plugin) == 10
     assert plugin.name == SectionName("norris")
     assert plugin.parsed_section_name == ParsedSectionName("chuck")
     assert plugin.parse_function is _parse_dummy
@@ -141,7 +141,7 @@ def test_create_snmp_section_plugin():
     )
 
     assert isinstance(plugin, SNMPSectionPlugin)
-    assert len(plugin) == 11
+    assert len(plugin) == 12
     assert plugin.name == SectionName("norris")
     assert plugin.parsed_section_name == ParsedSectionName("chuck")
     assert plugin.parse_function is _parse_dummy
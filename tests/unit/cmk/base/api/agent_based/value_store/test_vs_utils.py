@@ -18,6 +18,7 @@ from cmk.base.api.agent_based.value_store._utils import (
     _DynamicDiskSyncedMapping,
     _StaticDiskSyncedMapping,
     _ValueStore,
+    SharedValueStore,
     ValueStoreManager,
 )
 
@@ -227,6 +228,64 @@ class Test_ValueStore:
             s_store[2] = "key must be string!"  # type: ignore[index]
 
 
+class TestSharedValueStore:
+    def test_commit(self, tmp_path: Path):
+        path = tmp_path / "value_stores.sqlite"
+        shared_store = SharedValueStore(path)
+        shared_store.update("host1", updated=[(("check1", None, "key"), (23.0, 42))])
+        shared_store.update("host1", updated=[(("check1", None, "other"), 1)])
+
+        # pending changes are visible in this process only
+        assert shared_store.load("host1") == {
+            ("check1", None, "key"): (23.0, 42),
+            ("check1", None, "other"): 1,
+        }
+        assert SharedValueStore(path).load("host1") == {}
+
+        shared_store.commit()
+        assert SharedValueStore(path).load("host1") == {
+            ("check1", None, "key"): (23.0, 42),
+            ("check1", None, "other"): 1,
+        }
+
+        # the pending changes are written before the values of another host are loaded
+        shared_store.update("host1", removed=[("check1", None, "other")])
+        assert shared_store.load("host2") == {}
+        assert SharedValueStore(path).load("host1") == {("check1", None, "key"): (23.0, 42)}
+
+        shared_store.update("host2", updated=[(("check2", "item", "key"), "value")])
+        shared_store.close()
+        assert SharedValueStore(path).load("host2") == {("check2", "item", "key"): "value"}
+
+        assert SharedValueStore(path).remove_host("host2")
+        assert not SharedValueStore(path).remove_host("host2")
+
+    def test_value_store_manager(self, tmp_path: Path):
+        shared_store = SharedValueStore(tmp_path / "value_stores.sqlite")
+        service = (CheckPluginName("unit_test"), "item")
+
+        vsm = ValueStoreManager("test-host", shared_store=shared_store)
+        with vsm.namespace(service):
+            assert vsm.active_service_interface is not None
+            vsm.active_service_interface["key"] = 1
+            vsm.active_service_interface["removed"] = 2
+        vsm.save()
+        # the changes are written at the end of the check of the host
+        assert SharedValueStore(tmp_path / "value_stores.sqlite").load("test-host") == {
+            ("unit_test", "item", "key"): 1,
+            ("unit_test", "item", "removed"): 2,
+        }
+
+        vsm = ValueStoreManager("test-host", shared_store=shared_store)
+        with vsm.namespace(service):
+            assert vsm.active_service_interface is not None
+            assert dict(vsm.active_service_interface) == {"key": 1, "removed": 2}
+            del vsm.active_service_interface["removed"]
+        vsm.save()
+
+        assert shared_store.load("test-host") == {("unit_test", "item", "key"): 1}
+
+
 class TestValueStoreManager:
     @staticmethod
     def test_namespace_context():
@@ -278,3 +278,34 @@ def test_save_autochecks_file(items, expected_content):
         content = f.read()
 
     assert expected_content == content
+
+
+def test_load_raw_autochecks_cached(monkeypatch):
+    autochecks_file = Path(cmk.utils.paths.autochecks_dir, "host.mk")
+    with autochecks_file.open("w", encoding="utf-8") as f:
+        f.write(u"[\n  {'check_plugin_name': 'df', 'item': u'/',"
+                u" 'parameters': {'levels': (80.0, 90.0)}, 'service_labels': {}},\n]\n")
+    expected = [{
+        'check_plugin_name': 'df',
+        'item': u'/',
+        'parameters': {
+            'levels': (80.0, 90.0)
+        },
+        'service_labels': {},
+    }]
+
+    assert autochecks._load_raw_autochecks(path=autochecks_file, check_variables=None) == expected
+    assert autochecks._autochecks_cache_path_for("host").exists()
+
+    monkeypatch.setattr(autochecks.ast, "literal_eval", lambda _content: pytest.fail("parsed"))
+    assert autochecks._load_raw_autochecks(path=autochecks_file, check_variables=None) == expected
+
+    # Changed files are parsed again
+    with autochecks_file.open("a", encoding="utf-8") as f:
+        f.write(u"\n")
+    with pytest.raises(pytest.fail.Exception):
+        autochecks._load_raw_autochecks(path=autochecks_file, check_variables=None)
+
+    autochecks.remove_autochecks_file("host")
+    assert not autochecks._autochecks_cache_path_for("host").exists()
+    assert autochecks._load_raw_autochecks(path=autochecks_file, check_variables=None) == []
@@ -43,3 +43,21 @@ class TestAutomationDiagHost:
     def test_execute(self, hostname, ipaddress, raw_data):
         args = [hostname, "agent", ipaddress, "", "6557", "10", "5", "5", ""]
         assert check_mk.AutomationDiagHost().execute(args) == (0, raw_data)
+
+
+class TestAutomationDeleteHosts:
+    def test_delete_host_files_removes_parse_results(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(check_mk, "var_dir", str(tmp_path))
+        parse_results_dir = tmp_path / "persisted_sections" / "parse_results"
+        for source_type in ("host", "management"):
+            for hostname in ("deleted", "kept"):
+                (parse_results_dir / source_type).mkdir(parents=True, exist_ok=True)
+                (parse_results_dir / source_type / hostname).write_bytes(b"")
+
+        check_mk.AutomationDeleteHosts()._delete_host_files("deleted")
+
+        remaining = parse_results_dir.glob("*/*")
+        assert sorted(p.relative_to(parse_results_dir).as_posix() for p in remaining) == [
+            "host/kept",
+            "management/kept",
+        ]
@@ -345,3 +345,71 @@ def test_compile_delayed_host_check(monkeypatch, config_path):
     assert compiled_file.resolve() != source_file
     with compiled_file.open("rb") as f:
         assert f.read().startswith(importlib.util.MAGIC_NUMBER)
+
+
+def _create_config_scenario(monkeypatch):
+    ts = Scenario()
+    for i in range(10):
+        ts.add_host("host%d" % i)
+    ts.set_option("ipaddresses", {"host%d" % i: "127.0.0.%d" % (i + 1) for i in range(10)})
+    ts.set_option(
+        "host_check_commands",
+        [
+            (("service", "Custom"), [], ["host3", "host5", "host8"], {}),
+            ("agent", [], ["host7"], {}),
+        ],
+    )
+    ts.set_option(
+        "custom_checks",
+        [
+            ({
+                "service_description": "Custom",
+                "command_line": "echo 1",
+            }, [], ["host1", "host3", "host5", "host8"], {}),
+            ({
+                "service_description": "",
+                "command_name": "check-empty",
+            }, [], ["host2", "host6"], {}),
+        ],
+    )
+    # Create the objects in worker processes even for this small number of hosts
+    monkeypatch.setattr(core_nagios, "_MIN_HOSTS_PER_PROCESS", 1)
+    return ts.apply(monkeypatch)
+
+
+def test_create_config_in_processes(monkeypatch):
+    _create_config_scenario(monkeypatch)
+
+    configs = []
+    for max_processes in (1, 3):
+        core_config.initialize_warnings()
+        outfile = io.StringIO()
+        core_nagios.create_config(outfile, None, max_processes=max_processes)
+        configs.append((outfile.getvalue(), core_config.g_configuration_warnings))
+
+    (sequential, sequential_warnings), (parallel, parallel_warnings) = configs
+    assert parallel == sequential
+    assert parallel_warnings == sequential_warnings
+    assert len(parallel_warnings) == 2
+    for number in range(1, 5):
+        assert "check-mk-host-custom-%d\n" % number in parallel
+    assert "check-mk-host-custom-5\n" not in parallel
+
+
+def test_precompile_hostchecks_in_processes(monkeypatch):
+    _create_config_scenario(monkeypatch)
+    monkeypatch.setattr(
+        core_nagios,
+        "_get_needed_plugin_names",
+        lambda c: (set(), {CheckPluginName("uptime")}, set()),
+    )
+
+    config_paths = [VersionedConfigPath(43), VersionedConfigPath(44)]
+    for config_path, max_processes in zip(config_paths, (1, 3)):
+        core_nagios._precompile_hostchecks(config_path, max_processes=max_processes)
+
+    for hostname in ["host%d" % i for i in range(10)]:
+        sequential, parallel = (core_nagios.HostCheckStore.host_check_source_file_path(
+            config_path, hostname) for config_path in config_paths)
+        assert parallel.read_text() == sequential.read_text()
+        assert core_nagios.HostCheckStore.host_check_file_path(config_paths[1], hostname).exists()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=redefined-outer-name
+
+import logging
+import time
+from pathlib import Path
+
+import pytest  # type: ignore[import]
+
+from cmk.base.notification_spooler import NotificationQueue, NotificationSpooler
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = NotificationQueue(tmp_path / "notify" / "queue.sqlite", stale_after=60)
+    yield queue
+    queue.close()
+
+
+def test_queue_claim(queue):
+    queue.enqueue("mail", {"HOSTNAME": "h1"}, now=100)
+    queue.enqueue(None, {"HOSTNAME": "h2"}, now=101)
+    queue.enqueue("slack", {"HOSTNAME": "h3"}, now=200)
+
+    entries = queue.claim(10, now=150)
+    assert [(e.plugin, e.context, e.attempts) for e in entries] == [
+        ("mail", {
+            "HOSTNAME": "h1"
+        }, 0),
+        (None, {
+            "HOSTNAME": "h2"
+        }, 0),
+    ]
+    # Claimed entries are not handed out twice, unless the claim is stale
+    assert queue.claim(10, now=160) == []
+    assert len(queue.claim(10, now=250)) == 3
+
+
+def test_queue_claim_per_plugin(queue):
+    for plugin in ["mail", "mail", "mail", "slack", None]:
+        queue.enqueue(plugin, {"HOSTNAME": "heute"}, now=100)
+
+    assert [e.plugin for e in queue.claim(2, now=100, plugin_limits={"slack": 0})
+           ] == ["mail", "mail", None]
+    # The notifications of plugins without a limit left stay in the queue
+    assert [e.plugin for e in queue.claim(2, now=100)] == ["mail", "slack"]
+
+
+def test_queue_defer_and_remove(queue):
+    queue.enqueue("mail", {"HOSTNAME": "h1"}, now=100)
+    queue.enqueue("mail", {"HOSTNAME": "h2"}, now=100)
+    first, second = queue.claim(10, now=100)
+
+    queue.remove(first.entry_id)
+    queue.defer(second.entry_id, next_attempt=300, error="exit code 1")
+    assert queue.statistics(now=200) == {
+        "queued": 1,
+        "due": 0,
+        "deferred": 1,
+        "oldest_age": 100.0,
+    }
+    assert queue.claim(10, now=200) == []
+
+    retry, = queue.claim(10, now=300)
+    assert retry.entry_id == second.entry_id
+    assert retry.attempts == 1
+
+
+def _deliver(plugin, context):
+    return {"ok": 0, "temporary": 1, "permanent": 2}[plugin]
+
+
+def test_spooler_run(queue):
+    for plugin in ["ok", "ok", "temporary", "permanent", "ok"]:
+        queue.enqueue(plugin, {"HOSTNAME": "heute"})
+
+    statistics = NotificationSpooler(
+        queue,
+        deliver=_deliver,
+        logger=logging.getLogger("test"),
+        default_workers=2,
+        plugin_workers={
+            "permanent": 1
+        },
+        retry_interval=600,
+        poll_interval=0.05,
+    ).run()
+
+    assert statistics.delivered == 3
+    assert statistics.delivered_per_plugin == {"ok": 3}
+    assert statistics.retried == 1
+    assert statistics.failed == 1
+    assert queue.statistics()["queued"] == 1
+    assert queue.statistics()["deferred"] == 1
+    assert queue.claim(10) == []
+
+
+def _deliver_slow_after_fast(plugin, context):
+    # The slow notifications can only be delivered after a fast one has been delivered
+    released = Path(context["RELEASED"])
+    if plugin == "fast":
+        released.touch()
+        return 0
+
+    timeout = time.time() + 5
+    while not released.exists():
+        if time.time() > timeout:
+            return 2
+        time.sleep(0.01)
+    return 0
+
+
+def test_spooler_backlog_of_plugin_does_not_block_others(queue, tmp_path):
+    context = {"RELEASED": str(tmp_path / "released")}
+    for plugin in ["slow"] * 6 + ["fast"] * 2:
+        queue.enqueue(plugin, context)
+
+    statistics = NotificationSpooler(
+        queue,
+        deliver=_deliver_slow_after_fast,
+        logger=logging.getLogger("test"),
+        default_workers=1,
+        poll_interval=0.05,
+    ).run()
+
+    assert statistics.delivered_per_plugin == {"slow": 6, "fast": 2}
+    assert statistics.failed == 0
+
+
+def test_spooler_gives_up_after_max_attempts(queue):
+    queue.enqueue("temporary", {"HOSTNAME": "heute"})
+
+    statistics = NotificationSpooler(
+        queue,
+        deliver=_deliver,
+        logger=logging.getLogger("test"),
+        max_attempts=2,
+        retry_interval=0,
+        poll_interval=0.05,
+    ).run()
+
+    assert statistics.retried == 1
+    assert statistics.failed == 1
+    assert queue.statistics()["queued"] == 0
@@ -53,3 +53,171 @@ def test_os_environment_does_not_override_notification_script_env(monkeypatch):
 ])
 def test_raw_context_from_env_pipe_decoding(environ, expected):
     assert notify.raw_context_from_env(environ) == expected
+
+
+@pytest.mark.parametrize("exit_statement,expected", [
+    ("pass", 0),
+    ("sys.exit(0)", 0),
+    ("sys.exit(2)", 2),
+    ("sys.exit('failed')", 1),
+    ("raise ValueError()", 1),
+])
+def test_call_notification_script_in_process(monkeypatch, tmp_path, exit_statement, expected):
+    monkeypatch.setattr(notify, "_log_to_history", lambda message: None)
+    script = tmp_path / "plugin"
+    script.write_text("import os, sys\n"
+                      "print(os.environ['NOTIFY_HOSTNAME'])\n"
+                      "%s\n" % exit_statement)
+
+    environ = dict(os.environ)
+    assert notify._call_notification_script_in_process("plugin", str(script), {
+        "HOSTNAME": "heute",
+        "HOSTSTATE": "DOWN",
+        "HOSTOUTPUT": "down",
+        "CONTACTNAME": "hh",
+    }) == expected
+    assert dict(os.environ) == environ
+
+
+NOTIFICATION_RULES = [
+    {
+        "description": "all",
+    },
+    {
+        "description": "disabled",
+        "disabled": True,
+    },
+    {
+        "description": "host events",
+        "match_host_event": ["?d"],
+    },
+    {
+        "description": "services",
+        "match_services": ["CPU"],
+    },
+    {
+        "description": "host list",
+        "match_hosts": ["heute", "morgen"],
+    },
+    {
+        "description": "contact groups",
+        "match_contactgroups": ["admins"],
+    },
+    {
+        "description": "event console",
+        "match_ec": {},
+    },
+    {
+        "description": "no event console",
+        "match_ec": False,
+    },
+    {
+        "description": "host labels",
+        "match_hostlabels": {
+            "os": "linux",
+            "env": "prod",
+        },
+    },
+]
+
+
+@pytest.mark.parametrize("context,expected", [
+    (
+        {
+            "WHAT": "HOST",
+            "HOSTNAME": "heute",
+        },
+        ["all", "host events", "host list", "contact groups", "no event console"],
+    ),
+    (
+        {
+            "WHAT": "SERVICE",
+            "HOSTNAME": "gestern",
+            "SERVICECONTACTGROUPNAMES": "all,admins",
+            "EC_ID": "1",
+            "HOSTLABEL_env": "prod",
+        },
+        ["all", "services", "contact groups", "event console", "host labels"],
+    ),
+    (
+        {
+            "WHAT": "SERVICE",
+            "HOSTNAME": "gestern",
+            "SERVICECONTACTGROUPNAMES": "",
+            "HOSTLABEL_env": "test",
+        },
+        ["all", "services", "no event console"],
+    ),
+])
+def test_notification_rule_index(context, expected):
+    index = notify.NotificationRuleIndex(NOTIFICATION_RULES)
+    assert [rule["description"] for rule in index.candidates(context)] == expected
+
+
+def test_bulk_index(monkeypatch, tmp_path):
+    bulkdir = tmp_path / "bulk"
+    monkeypatch.setattr(notify, "notification_bulkdir", str(bulkdir))
+    monkeypatch.setattr(notify, "notification_bulk_index", str(bulkdir / ".index.mk"))
+    monkeypatch.setattr(notify, "_log_to_history", lambda message: None)
+
+    bulk = {"interval": 60, "count": 2, "groupby": ["host"]}
+    for hostname in ["heute", "heute", "morgen"]:
+        notify.do_bulk_notify("mail", {}, {
+            "WHAT": "HOST",
+            "CONTACTNAME": "hh",
+            "HOSTNAME": hostname,
+            "HOSTSTATE": "DOWN",
+            "HOSTOUTPUT": "down",
+        }, bulk)
+
+    bulks = notify.find_bulks(only_ripe=False)
+    assert [(bulk_dir[len(str(bulkdir)):], len(uuids)) for bulk_dir, *_rest, uuids in bulks] == [
+        ("/hh/mail/60,2,host,heute", 2),
+        ("/hh/mail/60,2,host,morgen", 1),
+    ]
+
+    # The bulk index is rebuilt from the bulk directories if it is missing
+    (bulkdir / ".index.mk").unlink()
+    assert [(bulk[0], bulk[-1]) for bulk in notify.find_bulks(only_ripe=False)
+           ] == [(bulk[0], bulk[-1]) for bulk in bulks]
+
+    sent = []
+    monkeypatch.setattr(notify, "call_bulk_notification_script", lambda plugin_name, context_lines:
+                        (sent.append(plugin_name) or 0, []))
+    notify.send_ripe_bulks()
+
+    assert sent == ["mail"]
+    assert [bulk[0] for bulk in notify.find_bulks(only_ripe=False)] == [bulks[1][0]]
+    assert not (bulkdir / "hh" / "mail" / "60,2,host,heute").exists()
+
+
+def test_bulk_index_rescan(monkeypatch, tmp_path):
+    bulkdir = tmp_path / "bulk"
+    monkeypatch.setattr(notify, "notification_bulkdir", str(bulkdir))
+    monkeypatch.setattr(notify, "notification_bulk_index", str(bulkdir / ".index.mk"))
+
+    notify.do_bulk_notify("mail", {}, {
+        "WHAT": "HOST",
+        "CONTACTNAME": "hh",
+        "HOSTNAME": "heute",
+        "HOSTSTATE": "DOWN",
+        "HOSTOUTPUT": "down",
+    }, {
+        "interval": 60,
+        "count": 2,
+        "groupby": ["host"]
+    })
+    # A notification that did not make it into the index and an orphaned bulk directory
+    bulk_dir = bulkdir / "hh" / "mail" / "60,2,host,heute"
+    (bulk_dir / "4ded0fa2-f0cd-4b6a-9812-54374a04069f").write_text("({}, {})\n")
+    orphaned_dir = bulkdir / "hh" / "mail" / "60,2,host,morgen"
+    orphaned_dir.mkdir()
+    os.utime(str(orphaned_dir), (0, 0))
+
+    assert [len(bulk[-1]) for bulk in notify.find_bulks(only_ripe=False)] == [1]
+    assert orphaned_dir.exists()
+
+    monkeypatch.setattr(notify, "notification_bulk_index_rescan_interval", -1)
+    assert [(bulk[0], len(bulk[-1])) for bulk in notify.find_bulks(only_ripe=False)
+           ] == [(str(bulk_dir), 2)]
+    assert not orphaned_dir.exists()
@@ -9,6 +9,9 @@ import time
 from pprint import pprint
 import pytest
 
+import cmk.utils.prediction
+from cmk.utils.prediction import PredictionInfo, PredictionStore, Timegroup, TimeSeries
+
 from cmk.base import prediction
 from testlib import on_time
 
@@ -118,5 +121,85 @@ def test_time_slices(utcdate, timezone, horizon, period_info, timegroup, result)
             pytest.approx([2.0, 2, 2, 2.0]),
         ]),
     ])
-def test_data_stats(slices, result):
-    assert prediction._data_stats(slices) == result
+@pytest.mark.parametrize("data_stats", [
+    prediction._data_stats,
+    prediction._data_stats_vectorized,
+])
+def test_data_stats(data_stats, slices, result):
+    assert data_stats(slices) == result
+
+
+PARAMS = {"period": "hour", "horizon": 2, "levels_upper": ("absolute", (10.0, 20.0))}
+
+
+def _rrd_data_of_slices(hostname, service_description, varname, cf, time_windows):
+    return [
+        TimeSeries([start, end, 3600] + [1.0 + n] * 24)
+        for n, (start, end) in enumerate(time_windows)
+    ]
+
+
+def test_get_levels_requests_prediction(monkeypatch):
+    now = 1543402800
+    store = PredictionStore("predhost", "CPU load", "load15")
+    store.save_predictions(
+        PredictionInfo(
+            name=Timegroup("everyday"),
+            time=now - 2 * 86400,
+            range=(now - 86400, now),
+            cf="MAX",
+            dsname="load15",
+            slice=86400,
+            params=PARAMS,
+        ),
+        prediction._prediction_data((now - 86400, now, 3600), [[5.0, 5.0, 5.0, 0.0]] * 24),
+    )
+    monkeypatch.setattr(cmk.utils.prediction, "get_rrd_data_of_slices", _rrd_data_of_slices)
+
+    with on_time(now, "CET"):
+        # The outdated prediction is used until the requested one has been computed
+        assert prediction.get_levels("predhost", "CPU load", "load15", PARAMS,
+                                     "MAX") == (5.0, (15.0, 25.0, None, None))
+        assert [r.host_name for r in cmk.utils.prediction.pending_prediction_requests()
+               ] == ["predhost"]
+
+        assert prediction.compute_requested_predictions(workers=2) == 1
+        assert list(cmk.utils.prediction.pending_prediction_requests()) == []
+        assert prediction.get_levels("predhost", "CPU load", "load15", PARAMS,
+                                     "MAX") == (1.5, (11.5, 21.5, None, None))
+
+
+def test_get_levels_computes_missing_prediction(monkeypatch):
+    monkeypatch.setattr(cmk.utils.prediction, "get_rrd_data_of_slices", _rrd_data_of_slices)
+
+    with on_time(1543402800, "CET"):
+        assert prediction.get_levels("newhost", "CPU load", "load15", PARAMS,
+                                     "MAX") == (1.5, (11.5, 21.5, None, None))
+    assert list(cmk.utils.prediction.pending_prediction_requests()) == []
+
+
+def test_prediction_store_caches_data():
+    store = PredictionStore("cachehost", "CPU load", "load15")
+    info = PredictionInfo(
+        name=Timegroup("everyday"),
+        time=1543402800,
+        range=(1543316400, 1543402800),
+        cf="MAX",
+        dsname="load15",
+        slice=86400,
+        params=PARAMS,
+    )
+    store.save_predictions(info, prediction._prediction_data((0, 3600, 3600), [[5.0] * 4]))
+
+    data = store.get_data(Timegroup("everyday"))
+    assert data is not None
+    assert store.get_data(Timegroup("everyday")) is data
+
+    # Rewritten files are loaded again, even with the same mtime and size
+    store.save_predictions(info, prediction._prediction_data((0, 3600, 3600), [[6.0] * 4]))
+    new_data = store.get_data(Timegroup("everyday"))
+    assert new_data is not None
+    assert new_data.points == [[6.0] * 4]
+
+    store.clean_prediction_files(Timegroup("everyday"), force=True)
+    assert store.get_data(Timegroup("everyday")) is None
@@ -10,7 +10,7 @@ import logging
 
 from cmk.utils.type_defs import SectionName
 
-from cmk.core_helpers.cache import MaxAge, PersistedSections, SectionStore
+from cmk.core_helpers.cache import MaxAge, ParseResultStore, PersistedSections, SectionStore
 from cmk.core_helpers.type_defs import AgentRawDataSection, Mode
 
 
@@ -55,6 +55,25 @@ class TestSectionStore:
         )), str)
 
 
+class TestParseResultStore:
+    def test_digest(self):
+        digest = ParseResultStore.digest
+        assert digest([["a", "b"]]) == digest([("a", "b")])
+        assert digest([["a", "b"]]) != digest([["a b"]])
+        assert digest([[["1", b"\x00"]]]) != digest([[["1", "\x00"]]])
+
+    def test_store_and_load(self, tmp_path):
+        store = ParseResultStore(tmp_path / "host", logger=logging.getLogger("test"))
+        parse_results = {SectionName("one"): ("digest", b"pickled")}
+
+        store.store(parse_results)
+        assert store.load() == parse_results
+
+        store.store({})
+        assert not store.path.exists()
+        assert store.load() == {}
+
+
 class TestMaxAge:
     def test_repr(self):
         max_age = MaxAge(checking=42, discovery=69, inventory=1337)
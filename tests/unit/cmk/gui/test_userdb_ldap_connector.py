@@ -518,3 +518,97 @@ def test_get_group_memberships_nested(mocked_ldap):
 
     for needed_group_dn, needed_group in needed_groups:
         assert memberships[needed_group_dn] == needed_group
+
+
+def test_get_group_memberships_nested_loop(mocked_ldap):
+    assert mocked_ldap.get_group_memberships(["loop1", "loop3"], nested=True) == {
+        u'cn=loop1,ou=groups,dc=check-mk,dc=org': {
+            'cn': u'loop1',
+            'members': [
+                u"cn=admin,ou=users,dc=check-mk,dc=org",
+                u"cn=härry,ou=users,dc=check-mk,dc=org",
+            ],
+        },
+        u'cn=loop3,ou=groups,dc=check-mk,dc=org': {
+            'cn': u'loop3',
+            'members': [
+                u"cn=admin,ou=users,dc=check-mk,dc=org",
+                u"cn=härry,ou=users,dc=check-mk,dc=org",
+            ],
+        },
+    }
+
+
+@pytest.fixture()
+def delta_sync_ldap(mocked_ldap, monkeypatch):
+    mocked_ldap._config["delta_sync"] = {"full_sync_interval": 86400}
+    monkeypatch.setattr(mocked_ldap, "_get_server_change_state", lambda: ("dc1", 42))
+    # MockLdap does not support the ">=" operator. Treat härry as the only changed object.
+    monkeypatch.setattr(mocked_ldap, "_changed_since_filter",
+                        lambda marker: u"(samaccountname=härry)")
+    return mocked_ldap
+
+
+def test_delta_sync(delta_sync_ldap):
+    ldap_users, users_to_sync, sync_cache = delta_sync_ldap._get_users_for_delta_sync()
+    assert sorted(ldap_users) == ["admin", "härry", "sync-user"]
+    assert users_to_sync is None  # full sync
+    assert sync_cache is not None
+    assert sync_cache["server"] == "dc1"
+    assert sync_cache["user_marker"] == sync_cache["group_marker"] == 42
+
+    delta_sync_ldap._save_sync_cache(sync_cache)
+
+    ldap_users, users_to_sync, sync_cache = delta_sync_ldap._get_users_for_delta_sync()
+    assert sorted(ldap_users) == ["admin", "härry", "sync-user"]
+    assert users_to_sync == {"härry"}
+    assert sync_cache is not None
+
+
+def test_delta_sync_server_changed(delta_sync_ldap, monkeypatch):
+    delta_sync_ldap._save_sync_cache(delta_sync_ldap._get_users_for_delta_sync()[2])
+
+    monkeypatch.setattr(delta_sync_ldap, "_get_server_change_state", lambda: ("dc2", 23))
+    _ldap_users, users_to_sync, sync_cache = delta_sync_ldap._get_users_for_delta_sync()
+    assert users_to_sync is None  # USNs of different servers can not be compared
+    assert sync_cache is not None
+    assert sync_cache["server"] == "dc2"
+
+
+def test_delta_sync_removed_user(delta_sync_ldap):
+    delta_sync_ldap._save_sync_cache(delta_sync_ldap._get_users_for_delta_sync()[2])
+
+    # Deleted users, users moved out of the user base DN and users not matching the user filter
+    # anymore are not found by the query for the changed users
+    delta_sync_ldap._ldap_obj.delete_s("cn=admin,ou=users,dc=check-mk,dc=org")
+
+    ldap_users, users_to_sync, sync_cache = delta_sync_ldap._get_users_for_delta_sync()
+    assert sorted(ldap_users) == ["härry", "sync-user"]
+    assert users_to_sync == {"admin", "härry"}
+    assert sync_cache is not None
+    assert sorted(sync_cache["users"]) == ["härry", "sync-user"]
+
+
+def test_delta_sync_removed_group(delta_sync_ldap):
+    delta_sync_ldap._save_sync_cache(delta_sync_ldap._get_users_for_delta_sync()[2])
+
+    delta_sync_ldap._ldap_obj.delete_s("cn=admins,ou=groups,dc=check-mk,dc=org")
+
+    _ldap_users, users_to_sync, _sync_cache = delta_sync_ldap._get_users_for_delta_sync()
+    assert users_to_sync is None  # all users need to be synchronized
+
+
+def test_delta_sync_cache_only_written_on_changes(delta_sync_ldap, monkeypatch):
+    delta_sync_ldap._save_sync_cache(delta_sync_ldap._get_users_for_delta_sync()[2])
+    cache_mtime = delta_sync_ldap._sync_cache_filepath().stat().st_mtime_ns
+
+    # No user has been changed
+    monkeypatch.setattr(delta_sync_ldap, "_changed_since_filter",
+                        lambda marker: u"(samaccountname=not-existing)")
+    _ldap_users, users_to_sync, sync_cache = delta_sync_ldap._get_users_for_delta_sync()
+    assert users_to_sync == set()
+    assert sync_cache is not None
+    delta_sync_ldap._save_sync_cache(sync_cache, with_users=False)
+
+    assert delta_sync_ldap._sync_cache_filepath().stat().st_mtime_ns == cache_mtime
+    assert delta_sync_ldap._load_sync_cache()["user_marker"] == 42
@@ -8,6 +8,7 @@
 
 from cmk.gui.plugins.visuals.utils import Filter
 import copy
+import functools
 from typing import Any, Dict
 
 import pytest
@@ -2354,6 +2355,58 @@ def test_register_sorter(monkeypatch):
     assert sorter.cmp.__name__ == cmpfunc.__name__
 
 
+class _LegacyStateSorter(cmk.gui.plugins.views.utils.Sorter):
+    ident = "legacy_state"
+    title = "Legacy state"
+    columns = ["service_state"]
+
+    def cmp(self, r1, r2):
+        return (r1["service_state"] > r2["service_state"]) - (r1["service_state"] <
+                                                              r2["service_state"])
+
+
+def _sorting_rows():
+    rows = []
+    for num in range(60):
+        rows.append({
+            "site": "site%d" % (num % 2),
+            "host_name": "host%d" % (num % 11),
+            "service_description": ["Check_MK", "CPU load", "Interface 10", "Interface 2"][num %
+                                                                                            4],
+            "service_state": num % 4,
+            "service_has_been_checked": num % 7 != 0,
+            "JOIN": {} if num % 5 == 0 else {
+                "Uptime": {
+                    "service_description": "Uptime %d" % (num % 3)
+                },
+            },
+        })
+    return rows
+
+
+@pytest.mark.parametrize("sorters", [
+    [("svcstate", True, None), ("site_host", False, None), ("svcdescr", False, None)],
+    [("host_name", False, None), ("svcdescr", True, "Uptime"), ("legacy_state", True, None)],
+    [("legacy_state", False, None), ("svcdescr", False, None), ("svcstate", True, None)],
+])
+def test_sort_data_like_cmp(view, sorters):
+    sorter_entries = [
+        cmk.gui.plugins.views.utils.SorterEntry(
+            sorter=_LegacyStateSorter()
+            if name == "legacy_state" else cmk.gui.plugins.views.sorter_registry[name](),
+            negate=negate,
+            join_key=join_key,
+        ) for name, negate, join_key in sorters
+    ]
+    assert [e.sorter.has_sort_key for e in sorter_entries
+           ] == [name != "legacy_state" for name, _negate, _join_key in sorters]
+
+    rows = _sorting_rows()
+    expected = sorted(rows, key=functools.cmp_to_key(cmk.gui.views._multisort(sorter_entries)))
+    cmk.gui.views._sort_data(view, rows, sorter_entries)
+    assert rows == expected
+
+
 def test_get_needed_regular_columns(view):
     class SomeFilter(Filter):
         def display(self):
@@ -2480,6 +2533,111 @@ def test_gui_view_row_limit(request_context, monkeypatch, mocker, limit, permiss
     assert cmk.gui.views.get_limit() == result
 
 
+def test_view_page_number(view):
+    assert view.page is None
+    view.page = 2
+    assert view.page == 2
+
+
+@pytest.mark.parametrize("page,result", [
+    (None, None),
+    ("1", 1),
+    ("3", 3),
+    ("0", 1),
+])
+def test_gui_view_page(request_context, monkeypatch, page, result):
+    if page is not None:
+        monkeypatch.setitem(html.request._vars, "page", page)
+    assert cmk.gui.views.get_page() == result
+
+
+@pytest.mark.parametrize("output_format", ["csv_export", "json_export", "python"])
+def test_gui_view_page_ignored_for_exports(request_context, monkeypatch, output_format):
+    monkeypatch.setitem(html.request._vars, "page", "3")
+    monkeypatch.setattr(html, "output_format", output_format)
+    assert cmk.gui.views.get_page() is None
+
+
+class _TableFilter(Filter):
+    def __init__(self):
+        super().__init__(ident="table_filter",
+                         title="Table filter",
+                         sort_index=0,
+                         info="host",
+                         htmlvars=["table_filter"],
+                         link_columns=[])
+
+    def display(self, value):
+        pass
+
+    def filter_table(self, context, rows):
+        return [row for row in rows if row["host_name"] != context[self.ident]["table_filter"]]
+
+
+def test_query_row_limit(view, monkeypatch):
+    monkeypatch.setattr(config, "soft_query_limit", 100)
+    view.row_limit = 1000
+    assert cmk.gui.views._query_row_limit(view, []) == 1000
+
+    view.row_limit = None
+    assert cmk.gui.views._query_row_limit(view, []) is None
+
+    # Only the shown pages of unsorted views need to be fetched
+    view.page = 3
+    monkeypatch.setitem(view.spec, "sorters", [])
+    assert cmk.gui.views._query_row_limit(view, [_TableFilter()]) == 301
+
+    # ... unless rows are dropped after fetching them
+    view.context = {"table_filter": {"table_filter": "heute"}}
+    assert cmk.gui.views._query_row_limit(view, [_TableFilter()]) is None
+
+    view.context = {}
+    view.user_sorters = [("site_host", False)]
+    assert cmk.gui.views._query_row_limit(view, []) is None
+
+
+def test_get_view_rows_adds_information_to_shown_rows(view, monkeypatch):
+    monkeypatch.setattr(config, "soft_query_limit", 2)
+    monkeypatch.setattr(cmk_version, "is_raw_edition", lambda: False)
+    monkeypatch.setattr(cmk.gui.views.View, "join_cells", ["join_cell"])
+    monkeypatch.setattr(cmk.gui.views, "_is_inventory_data_needed", lambda *args: True)
+
+    fetched_rows = [{
+        "site": "local",
+        "host_name": host_name,
+    } for host_name in ["e", "heute", "a", "d", "c", "b"]]
+    monkeypatch.setattr(cmk.gui.views, "_fetch_view_rows", lambda *args:
+                        (list(fetched_rows), len(fetched_rows)))
+
+    def _add(key):
+        def _add_to_rows(view, rows, *args):
+            for row in rows:
+                row[key] = row["host_name"]
+
+        return _add_to_rows
+
+    monkeypatch.setattr(cmk.gui.views, "_do_table_join", _add("joined"))
+    monkeypatch.setattr(cmk.gui.views, "_add_inventory_data",
+                        lambda rows: _add("host_inventory")(None, rows))
+    monkeypatch.setattr(cmk.gui.views, "_add_sla_data", _add("sla"))
+
+    view.user_sorters = [("site_host", False)]
+    view.context = {"table_filter": {"table_filter": "heute"}}
+    view.page = 2
+    _unfiltered_amount_of_rows, rows = cmk.gui.views._get_view_rows(view, [_TableFilter()],
+                                                                    only_shown_rows=True)
+
+    assert rows == [{
+        "site": "local",
+        "host_name": host_name,
+        "joined": host_name,
+        "host_inventory": host_name,
+        "sla": host_name,
+    } for host_name in ["c", "d"]]
+    assert view.has_next_page
+    assert [row["host_name"] for row in fetched_rows if "joined" in row] == ["d", "c"]
+
+
 def test_view_only_sites(view):
     assert view.only_sites is None
     view.only_sites = ["unit"]
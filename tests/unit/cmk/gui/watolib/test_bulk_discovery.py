@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import ast
+import threading
+import time
+import urllib.parse
+from collections import Counter
+
+from cmk.utils.type_defs import AutomationDiscoveryResponse, DiscoveryResult
+
+from cmk.gui.globals import config
+import cmk.gui.watolib.automations as automations
+import cmk.gui.watolib.bulk_discovery as bulk_discovery
+from cmk.gui.watolib.bulk_discovery import (
+    BulkDiscoveryBackgroundJob,
+    DiscoveryHost,
+    DiscoveryTask,
+    get_tasks,
+)
+
+
+def test_get_tasks():
+    assert get_tasks(
+        [
+            DiscoveryHost("remote", "folder", "host3"),
+            DiscoveryHost("local", "folder", "host1"),
+            DiscoveryHost("local", "folder", "host2"),
+            DiscoveryHost("local", "other", "host4"),
+        ],
+        bulk_size=2,
+    ) == [
+        DiscoveryTask("local", "folder", ["host1", "host2"]),
+        DiscoveryTask("local", "other", ["host4"]),
+        DiscoveryTask("remote", "folder", ["host3"]),
+    ]
+
+
+class _JobInterface:
+    def __init__(self):
+        self.progress = []
+
+    def send_progress_update(self, info):
+        self.progress.append(info)
+
+
+def test_bulk_discover_tasks_concurrently(monkeypatch):
+    job = BulkDiscoveryBackgroundJob()
+    job.max_concurrent_tasks = 3
+    job.max_concurrent_tasks_per_remote_site = 1
+    monkeypatch.setattr(bulk_discovery, "site_is_local", lambda site_id: site_id == "local")
+    monkeypatch.setattr(job, "_prepare_site", lambda site_id: None)
+
+    lock = threading.Lock()
+    running: Counter = Counter()
+    max_running: Counter = Counter()
+
+    def _execute_discovery(task, mode, do_scan, error_handling, timeout, site_config, debug):
+        with lock:
+            for key in (task.site_id, "total"):
+                running[key] += 1
+                max_running[key] = max(max_running[key], running[key])
+        time.sleep(0.05)
+        with lock:
+            for key in (task.site_id, "total"):
+                running[key] -= 1
+        if task.host_names == ["broken"]:
+            raise Exception("broken")
+        return task.host_names
+
+    processed = []
+    monkeypatch.setattr(job, "_execute_discovery", _execute_discovery)
+    monkeypatch.setattr(job, "_process_discovery_results",
+                        lambda task, job_interface, response: processed.extend(response))
+
+    tasks = [DiscoveryTask("local", "", ["local%d" % i]) for i in range(4)]
+    tasks += [DiscoveryTask("remote", "", ["remote%d" % i]) for i in range(3)]
+    tasks.append(DiscoveryTask("remote", "", ["broken"]))
+
+    job._initialize_statistics(num_hosts_total=len(tasks))
+    job._bulk_discover_tasks(tasks, "new", True, True, _JobInterface())
+
+    assert sorted(processed) == [
+        "local0", "local1", "local2", "local3", "remote0", "remote1", "remote2"
+    ]
+    assert job._num_hosts_failed == 1
+    assert job._num_hosts_processed == len(tasks)
+    assert max_running["remote"] == 1
+    assert max_running["total"] == 3
+
+
+class _Process:
+    def __init__(self, stdout):
+        self.stdin = self
+        self.stdout = self
+        self.stderr = self
+        self._stdout = stdout
+
+    def write(self, data):
+        pass
+
+    def close(self):
+        pass
+
+    def read(self):
+        output, self._stdout = self._stdout, ""
+        return output
+
+    def wait(self):
+        return 0
+
+
+def _discovery_response(host_names, num_new):
+    return AutomationDiscoveryResponse(
+        results={host_name: DiscoveryResult(self_new=num_new) for host_name in host_names})
+
+
+def test_bulk_discover_tasks_executes_automations_in_worker_threads(monkeypatch):
+    monkeypatch.setattr(
+        config._get_current_object(), "sites", {
+            "local": {
+                "socket": ("local", None),
+            },
+            "remote": {
+                "socket": ("tcp", {
+                    "address": ("127.0.0.1", 6557),
+                    "tls": ("plain_text", {}),
+                }),
+                "multisiteurl": "http://remote/remote/check_mk/",
+                "secret": "secret",
+                "replication": "slave",
+            },
+        })
+    monkeypatch.setattr(bulk_discovery, "sync_changes_before_remote_automation",
+                        lambda site_id: None)
+
+    lock = threading.Lock()
+    worker_threads = set()
+    remote_jobs = {}
+
+    def popen(cmd, **kwargs):
+        with lock:
+            worker_threads.add(threading.current_thread())
+        host_names = cmd[cmd.index("new") + 1:]
+        return _Process(repr(_discovery_response(host_names, 1).serialize()))
+
+    def get_url(url, insecure, auth=None, data=None, files=None, timeout=None):
+        with lock:
+            worker_threads.add(threading.current_thread())
+            command = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)["command"][0]
+            if command == "checkmk-remote-automation-start":
+                job_id = "job%d" % len(remote_jobs)
+                remote_jobs[job_id] = automations.CheckmkAutomationRequest(
+                    *ast.literal_eval(data["request"]))
+                return repr(job_id)
+            assert command == "checkmk-remote-automation-get-status"
+            automation_request = remote_jobs[ast.literal_eval(data["request"])]
+        host_names = automation_request.args[automation_request.args.index("new") + 1:]
+        return repr(({"is_active": False}, _discovery_response(host_names, 2).serialize()))
+
+    monkeypatch.setattr(automations.subprocess, "Popen", popen)
+    monkeypatch.setattr(automations, "get_url", get_url)
+
+    job = BulkDiscoveryBackgroundJob()
+    processed = {}
+    monkeypatch.setattr(
+        job, "_process_discovery_results", lambda task, job_interface, response: processed.update(
+            {h: r.self_new for h, r in response.results.items()}))
+
+    tasks = [DiscoveryTask("local", "", ["local%d" % i]) for i in range(3)]
+    tasks += [DiscoveryTask("remote", "", ["remote%d" % i]) for i in range(3)]
+    job._initialize_statistics(num_hosts_total=len(tasks))
+    job._bulk_discover_tasks(tasks, "new", True, True, _JobInterface())
+
+    assert job._num_hosts_failed == 0
+    assert processed == {
+        "local0": 1,
+        "local1": 1,
+        "local2": 1,
+        "remote0": 2,
+        "remote1": 2,
+        "remote2": 2,
+    }
+    assert worker_threads and threading.current_thread() not in worker_threads
@@ -83,6 +83,7 @@ def test_registered_configvars():
         'apache_process_tuning',
         'archive_orphans',
         'auth_by_http_header',
+        'autodiscovery_max_processes',
         'builtin_icon_visibility',
         'bulk_discovery_default_settings',
         'check_mk_perfdata_with_times',
@@ -131,6 +132,11 @@ def test_registered_configvars():
         'notification_fallback_email',
         'notification_logging',
         'notification_plugin_timeout',
+        'notification_spool_backend',
+        'notification_spooler_default_workers',
+        'notification_spooler_max_attempts',
+        'notification_spooler_plugin_workers',
+        'notification_spooler_retry_interval',
         'page_heading',
         'pagetitle_date_format',
         'password_policy',
@@ -178,6 +184,7 @@ def test_registered_configvars():
         'user_icons_and_actions',
         'user_idle_timeout',
         'user_localizations',
+        'value_store_backend',
         'view_action_defaults',
         'virtual_host_trees',
         'wato_activation_method',
@@ -5,10 +5,17 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import pytest
+from agent_aws_fake_clients import FakeCloudwatchClient
 
 from cmk.special_agents.agent_aws import (
+    AWSConfig,
+    AWSSections,
     AWSSectionsGeneric,
     AWSSectionResult,
+    CloudwatchAlarms,
+    CloudwatchAlarmsLimits,
+    ResultDistributor,
+    run_sections_concurrently,
 )
 
 
@@ -56,3 +63,66 @@ class TestAWSSections:
         generic_section._write_section_results(cached_data)
         section_stdout = capsys.readouterr().out
         assert section_stdout.split('\n')[0] == '<<<aws_costs_and_usage:cached(1606382471,38642)>>>'
+
+
+class FakeSession:
+    def __init__(self):
+        self.created_clients = []
+
+    def client(self, client_key, config=None):
+        self.created_clients.append(client_key)
+        return FakeCloudwatchClient()
+
+
+class FakeCloudwatchAlarmsSections(AWSSections):
+    def init_sections(self, services, region, config, s3_limits_distributor=None):
+        cloudwatch_client = self._init_client('cloudwatch')
+        cloudwatch_alarms_limits_distributor = ResultDistributor()
+        cloudwatch_alarms_limits = CloudwatchAlarmsLimits(cloudwatch_client, region, config,
+                                                          cloudwatch_alarms_limits_distributor)
+        cloudwatch_alarms = CloudwatchAlarms(cloudwatch_client, region, config)
+        cloudwatch_alarms_limits_distributor.add(cloudwatch_alarms)
+        # Register the dependent section first to make sure the order of execution
+        # is determined by the dependencies.
+        self._sections.append(cloudwatch_alarms)
+        self._sections.append(cloudwatch_alarms_limits)
+
+
+def _create_cloudwatch_alarms_sections(session, clients):
+    config = AWSConfig('hostname', [], (None, None))
+    config.add_single_service_config('cloudwatch_alarms', None)
+    aws_sections_list = []
+    for region in ('region-1', 'region-2'):
+        aws_sections = FakeCloudwatchAlarmsSections('hostname', session, clients=clients)
+        aws_sections.init_sections(['cloudwatch_alarms'], region, config)
+        aws_sections_list.append(aws_sections)
+    return aws_sections_list
+
+
+def _section_headers(output):
+    return [line for line in output.splitlines() if line.startswith('<<<')]
+
+
+def test_run_sections_concurrently(capsys):
+    session = FakeSession()
+    aws_sections_list = _create_cloudwatch_alarms_sections(session, {})
+    for aws_sections in aws_sections_list:
+        aws_sections.run(use_cache=False)
+    sequential_output = capsys.readouterr().out
+
+    run_sections_concurrently(
+        _create_cloudwatch_alarms_sections(session, {}),
+        use_cache=False,
+        max_workers=4,
+    )
+    concurrent_output = capsys.readouterr().out
+
+    # The fake clients create random content, so we only compare the section headers
+    assert '<<<aws_cloudwatch_alarms:cached(' in concurrent_output
+    assert _section_headers(concurrent_output) == _section_headers(sequential_output)
+
+
+def test_clients_are_shared():
+    session = FakeSession()
+    _create_cloudwatch_alarms_sections(session, {})
+    assert session.created_clients == ['cloudwatch']
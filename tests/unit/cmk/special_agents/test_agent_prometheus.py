@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=redefined-outer-name
+
+import collections
+import threading
+
+import pytest  # type: ignore[import]
+import requests
+
+from cmk.special_agents.agent_prometheus import PrometheusAPI
+
+
+class _PromQLQueries:
+    """Replaces the PromQL queries against the Prometheus API
+
+    Calls are counted per expression. A barrier makes the queries wait for each other, so
+    they only complete if the given number of them is executed at the same time."""
+    def __init__(self, concurrent_queries=1):
+        self.queries: collections.Counter = collections.Counter()
+        self._lock = threading.Lock()
+        self._barrier = threading.Barrier(concurrent_queries, timeout=5)
+
+    def __call__(self, promql):
+        with self._lock:
+            self.queries[promql] += 1
+        self._barrier.wait()
+        if promql == "broken":
+            raise ValueError("broken")
+        return [{
+            "metric": {
+                "__name__": promql,
+                "instance": "node-1:9100",
+            },
+            "value": [1600000000.0, str(len(promql))],
+        }]
+
+
+@pytest.fixture
+def promql_queries(monkeypatch):
+    def _patch(concurrent_queries=1):
+        queries = _PromQLQueries(concurrent_queries)
+        monkeypatch.setattr(PrometheusAPI, "_connected_scrape_targets", lambda self: {})
+        monkeypatch.setattr(PrometheusAPI, "_query_promql_expression",
+                            lambda self, promql: queries(promql))
+        return queries
+
+    return _patch
+
+
+CUSTOM_SERVICES = [
+    {
+        "service_description": "Service A",
+        "metric_components": [
+            {
+                "metric_label": "Metric 1",
+                "promql_query": "up",
+            },
+            {
+                "metric_label": "Metric 2",
+                "promql_query": "node_load1",
+            },
+        ],
+    },
+    {
+        "service_description": "Service B",
+        "host_name": "piggy",
+        "metric_components": [
+            {
+                "metric_label": "Metric 1",
+                "promql_query": "up",
+            },
+            {
+                "metric_label": "Broken",
+                "promql_query": "broken",
+            },
+        ],
+    },
+]
+
+
+@pytest.mark.parametrize("max_workers, expected_queries", [
+    (1, {
+        "up": 2,
+        "node_load1": 1,
+        "broken": 1,
+    }),
+    (3, {
+        "up": 1,
+        "node_load1": 1,
+        "broken": 2,
+    }),
+])
+def test_perform_specified_promql_queries(promql_queries, max_workers, expected_queries):
+    queries = promql_queries()
+    api_client = PrometheusAPI(requests.Session(), max_workers=max_workers)
+
+    assert api_client.perform_specified_promql_queries(CUSTOM_SERVICES) == {
+        "": {
+            "Service A": {
+                "service_metrics": [
+                    {
+                        "name": None,
+                        "label": "Metric 1",
+                        "promql_query": "up",
+                        "levels": None,
+                        "value": "2",
+                    },
+                    {
+                        "name": None,
+                        "label": "Metric 2",
+                        "promql_query": "node_load1",
+                        "levels": None,
+                        "value": "10",
+                    },
+                ],
+            },
+        },
+        "piggy": {
+            "Service B": {
+                "service_metrics": [{
+                    "name": None,
+                    "label": "Metric 1",
+                    "promql_query": "up",
+                    "levels": None,
+                    "value": "2",
+                }],
+            },
+        },
+    }
+    # Prefetched identical expressions are only queried once, failed ones again when consumed
+    assert queries.queries == expected_queries
+    assert not api_client._prefetched_results
+    assert not api_client._pending_requests
+
+
+def test_prefetch_promql_queries(promql_queries):
+    queries = promql_queries(concurrent_queries=3)
+    api_client = PrometheusAPI(requests.Session(), max_workers=3)
+    expressions = ["metric_%d" % i for i in range(9)]
+
+    api_client.prefetch_promql_queries(expressions + expressions)
+    assert queries.queries == {promql: 1 for promql in expressions}
+
+    assert [
+        result.value() for _repetition in range(2) for promql in expressions
+        for result in api_client.query_promql(promql)
+    ] == [float(len(promql)) for promql in expressions] * 2
+    assert queries.queries == {promql: 1 for promql in expressions}
+    # The results are dropped once they have been consumed
+    assert not api_client._prefetched_results
+    assert not api_client._pending_requests
@@ -6,8 +6,12 @@
 
 # pylint: disable=redefined-outer-name
 
+import copy
+
 import pytest
 from cmk.utils.bi.bi_aggregation import BIAggregation
+from cmk.utils.bi.bi_computer import BIResultCache
+from cmk.utils.bi.bi_trees import BICompiledRule
 from cmk.utils.bi.bi_actions import BICallARuleAction
 import bi_test_data.sample_config as sample_config
 
@@ -64,3 +68,54 @@ def test_compute_aggregation(bi_packs_sample_config, bi_structure_fetcher, bi_se
     assert actual_result.acknowledged == expected_acknowledgment
     assert actual_result.downtime_state == expected_downtime_state
     assert actual_result.in_service_period == expected_service_period
+
+
+def test_compute_aggregation_with_result_cache(bi_packs_sample_config, bi_structure_fetcher,
+                                               bi_searcher, bi_status_fetcher, monkeypatch):
+    bi_structure_fetcher.add_site_data("heute", sample_config.bi_structure_states)
+    bi_searcher.set_hosts(bi_structure_fetcher.hosts)
+    compiled_aggregation = bi_packs_sample_config.get_aggregation("default_aggregation").compile(
+        bi_searcher)
+
+    computed_branches = []
+    compute = BICompiledRule.compute
+
+    def _compute(self, *args, **kwargs):
+        if self in compiled_aggregation.branches:
+            computed_branches.append(self.properties.title)
+        return compute(self, *args, **kwargs)
+
+    def _compute_branches(status_rows):
+        bi_status_fetcher.states = bi_status_fetcher.create_bi_status_data(status_rows)
+        del computed_branches[:]
+        monkeypatch.setattr(BICompiledRule, "compute", _compute)
+        try:
+            return [
+                bundle.actual_result for bundle in result_cache.compute_branches(
+                    compiled_aggregation, compiled_aggregation.branches, bi_status_fetcher)
+            ]
+        finally:
+            monkeypatch.undo()
+
+    result_cache = BIResultCache()
+    results = _compute_branches(sample_config.bi_status_rows)
+    assert results == [
+        bundle.actual_result for bundle in compiled_aggregation.compute_branches(
+            compiled_aggregation.branches, bi_status_fetcher)
+    ]
+    assert len(computed_branches) == 2
+
+    # The states did not change
+    assert _compute_branches(sample_config.bi_status_rows) == results
+    assert computed_branches == []
+
+    # Only the branch of the changed host is computed again
+    status_rows = copy.deepcopy(sample_config.bi_status_rows)
+    status_rows[0][2] = 1
+    _compute_branches(status_rows)
+    assert computed_branches == ["Host heute"]
+
+    # Compiling the aggregations again invalidates all results
+    result_cache.set_compilation_timestamp(1.0)
+    _compute_branches(status_rows)
+    assert len(computed_branches) == 2
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import copy
+
+from cmk.utils.bi import bi_compiler
+from cmk.utils.bi.bi_aggregation import BIAggregation
+from cmk.utils.bi.bi_compiler import BICompiler
+from cmk.utils.bi.bi_lib import SitesCallback
+
+import bi_test_data.sample_config as sample_config
+
+
+def _compile(bi_packs, monkeypatch, program_start, max_processes=1):
+    compiler = BICompiler("",
+                          SitesCallback(lambda: None, lambda: None),
+                          max_processes=max_processes)
+    compiler._bi_packs = bi_packs
+    compiler._min_aggregations_per_process = 1
+    monkeypatch.setattr(compiler, "_generate_part_of_aggregation_lookup", lambda x: None)
+    compiler._compile_aggregations({
+        "configfile_timestamp": 0.0,
+        "known_sites": {("heute", program_start)},
+        "online_sites": {("heute", program_start)},
+    })
+    return compiler
+
+
+def _save_site_data(bi_structure_fetcher, timestamp, hosts):
+    bi_structure_fetcher._marshal_save_data(
+        str(
+            bi_structure_fetcher._path_site_structure_data.joinpath(
+                bi_structure_fetcher._site_data_filename("heute", timestamp))), hosts)
+
+
+def test_incremental_compilation(bi_packs_sample_config, bi_structure_fetcher, bi_searcher,
+                                 monkeypatch):
+    hosts = sample_config.bi_structure_states
+    _save_site_data(bi_structure_fetcher, 1, hosts)
+    compiler = _compile(bi_packs_sample_config, monkeypatch, 1)
+    status = compiler.get_compilation_status()
+    assert status["mode"] == "full"
+    assert status["compiled_aggregations"] == 1
+    serialized = compiler.compiled_aggregations["default_aggregation"].serialize()
+
+    # The structure of the site did not change during the restart
+    _save_site_data(bi_structure_fetcher, 2, hosts)
+    compiler = _compile(bi_packs_sample_config, monkeypatch, 2)
+    status = compiler.get_compilation_status()
+    assert status["mode"] == "incremental"
+    assert status["compiled_aggregations"] == 0
+    assert status["reused_aggregations"] == 1
+    assert compiler.compiled_aggregations["default_aggregation"].serialize() == serialized
+
+    # A new service of a host which is part of the aggregation
+    site_id, tags, labels, folder, services, children, parents, alias, name = hosts["heute"]
+    changed_hosts = dict(hosts)
+    services = dict(services, New=(set(), {}))
+    changed_hosts["heute"] = (site_id, tags, labels, folder, services, children, parents, alias,
+                              name)
+    _save_site_data(bi_structure_fetcher, 3, changed_hosts)
+    compiler = _compile(bi_packs_sample_config, monkeypatch, 3)
+    status = compiler.get_compilation_status()
+    assert status["mode"] == "incremental"
+    assert status["changed_hosts"] == 1
+    assert status["compiled_aggregations"] == 1
+
+    bi_structure_fetcher.add_site_data("heute", changed_hosts)
+    bi_searcher.set_hosts(bi_structure_fetcher.hosts)
+    aggregation = bi_packs_sample_config.get_aggregation("default_aggregation")
+    assert compiler.compiled_aggregations["default_aggregation"].serialize() == aggregation.compile(
+        bi_searcher).serialize()
+
+
+def test_compilation_in_processes(bi_packs_sample_config, bi_structure_fetcher, monkeypatch):
+    disabled_aggregation = copy.deepcopy(
+        sample_config.bi_packs_config["packs"][0]["aggregations"][0])
+    disabled_aggregation["id"] = "disabled_aggregation"
+    disabled_aggregation["computation_options"]["disabled"] = True
+    bi_packs_sample_config.get_pack_mandatory("default").add_aggregation(
+        BIAggregation(disabled_aggregation))
+    _save_site_data(bi_structure_fetcher, 1, sample_config.bi_structure_states)
+
+    compiled_aggregations = []
+    for max_processes in [1, 2]:
+        compiler = _compile(bi_packs_sample_config, monkeypatch, 1, max_processes)
+        assert compiler.get_compilation_status()["compiled_aggregations"] == 2
+        compiled_aggregations.append({
+            aggr_id: compiled_aggregation.serialize()
+            for aggr_id, compiled_aggregation in compiler.compiled_aggregations.items()
+        })
+        compiler._path_search_references.unlink()
+
+    assert list(compiled_aggregations[0]) == ["default_aggregation", "disabled_aggregation"]
+    assert compiled_aggregations[0] == compiled_aggregations[1]
+
+
+def test_compilation_in_process_by_default(bi_packs_sample_config, bi_structure_fetcher,
+                                           monkeypatch):
+    _save_site_data(bi_structure_fetcher, 1, sample_config.bi_structure_states)
+    compiler = BICompiler("", SitesCallback(lambda: None, lambda: None))
+    compiler._bi_packs = bi_packs_sample_config
+    compiler._min_aggregations_per_process = 1
+    monkeypatch.setattr(bi_compiler, "ProcessPoolExecutor", None)
+
+    aggr_ids = ["default_aggregation"] * 4
+    results = compiler._compile_aggregations_in_processes(aggr_ids)
+    assert [aggr_id for aggr_id, _result in results] == aggr_ids
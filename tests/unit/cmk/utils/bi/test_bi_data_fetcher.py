@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import bi_test_data.sample_config as sample_config
+
+
+def _save_site_data(bi_structure_fetcher, site_id, timestamp, hosts):
+    bi_structure_fetcher._marshal_save_data(
+        str(
+            bi_structure_fetcher._path_site_structure_data.joinpath(
+                bi_structure_fetcher._site_data_filename(site_id, timestamp))), hosts)
+
+
+def test_get_changed_hosts(bi_structure_fetcher):
+    hosts = sample_config.bi_structure_states
+    changed_hosts = dict(hosts)
+    changed_hosts["heute_clone"] = hosts["heute_clone"][:7] + ("new_alias", "heute_clone")
+    changed_hosts["new_host"] = hosts["heute"][:8] + ("new_host",)
+    _save_site_data(bi_structure_fetcher, "heute", 1, hosts)
+    _save_site_data(bi_structure_fetcher, "heute", 2, changed_hosts)
+    _save_site_data(bi_structure_fetcher, "gestern", 1, {"gestern": hosts["heute"]})
+    bi_structure_fetcher.update_data({("heute", 2)})
+
+    # Nothing changed since the last compilation
+    assert bi_structure_fetcher.get_changed_hosts({("heute", 2)}) == ({}, {})
+
+    previous_hosts, current_hosts = bi_structure_fetcher.get_changed_hosts({("heute", 1),
+                                                                            ("gestern", 1)})
+    assert set(previous_hosts) == {"heute_clone", "gestern"}
+    assert previous_hosts["heute_clone"].alias == "heute_clone_alias"
+    assert set(current_hosts) == {"heute_clone", "new_host"}
+    assert current_hosts["heute_clone"].alias == "new_alias"
+
+    # The structure data of the previous program start is not available anymore
+    assert bi_structure_fetcher.get_changed_hosts({("heute", 0)}) is None
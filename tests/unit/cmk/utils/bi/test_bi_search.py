@@ -13,6 +13,7 @@ from cmk.utils.bi.bi_search import (
     BIServiceSearch,
     BIFixedArgumentsSearch,
 )
+from cmk.utils.bi.bi_searcher import _literal_prefix
 
 
 def test_empty_search(bi_searcher):
@@ -180,3 +181,85 @@ def test_service_search(service_regex, host_regex, expected_matches,
     search = BIServiceSearch(schema_config)
     results = search.execute({}, bi_searcher_with_sample_config)
     assert len(results) == expected_matches
+
+
+def test_search_references(bi_searcher_with_sample_config):
+    schema_config = BIHostSearch.schema()().dump(
+        {"conditions": {
+            "host_tags": {
+                "clone-tag": "clone-tag"
+            }
+        }})
+    with bi_searcher_with_sample_config.record_references() as references:
+        results = BIHostSearch(schema_config).execute({}, bi_searcher_with_sample_config)
+    assert {x["$HOSTNAME$"] for x in results} == {"heute_clone"}
+
+    hosts = bi_searcher_with_sample_config.hosts
+    assert references.depends_on({"heute_clone": hosts["heute_clone"]})
+    # Changes of hosts which do not match the search do not change the result
+    assert not references.depends_on({"heute": hosts["heute"]})
+    assert references.depends_on({"heute": hosts["heute"]._replace(tags=hosts["heute_clone"].tags)})
+
+
+def test_search_references_of_host_lookups(bi_searcher_with_sample_config):
+    with bi_searcher_with_sample_config.record_references() as references:
+        bi_searcher_with_sample_config.get_host_name_matches(
+            list(bi_searcher_with_sample_config.hosts.values()), "heute_clone")
+        assert "heute" in bi_searcher_with_sample_config.hosts
+
+    assert references.host_names == {"heute", "heute_clone"}
+    assert references.depends_on({"heute": bi_searcher_with_sample_config.hosts["heute"]})
+
+
+@pytest.mark.parametrize("pattern, prefix", [
+    ("heute", "heute"),
+    ("heute_cl.*", "heute_cl"),
+    ("heute_clone?", "heute_clon"),
+    ("heute\\d+", "heute"),
+    ("(.*)", ""),
+    ("heute|gestern", ""),
+])
+def test_literal_prefix(pattern, prefix):
+    assert _literal_prefix(pattern) == prefix
+
+
+@pytest.mark.parametrize("conditions, expected_hosts", [
+    ({
+        "host_choice": {
+            "type": "host_name_regex",
+            "pattern": "heute.*"
+        },
+        "host_tags": {
+            "clone-tag": {
+                "$or": ["clone-tag", "other"]
+            }
+        },
+        "host_labels": {},
+    }, ["heute_clone"]),
+    ({
+        "host_choice": {
+            "type": "host_name_regex",
+            "pattern": "heute_?.*"
+        },
+        "host_tags": {
+            "clone-tag": {
+                "$ne": "clone-tag"
+            }
+        },
+        "host_labels": {},
+    }, ["heute"]),
+    ({
+        "host_choice": {
+            "type": "all_hosts"
+        },
+        "host_tags": {},
+        "host_labels": {
+            "cmk/check_mk_server": "yes"
+        },
+    }, ["heute"]),
+])
+def test_search_hosts_with_index(bi_searcher_with_sample_config, conditions, expected_hosts):
+    assert [
+        search_match.host.name
+        for search_match in bi_searcher_with_sample_config.search_hosts(conditions)
+    ] == expected_hosts
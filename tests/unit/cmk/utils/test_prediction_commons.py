@@ -55,9 +55,10 @@ def test_rrdtimestamps(twindow, result):
      (300, 400, 10), 300, [25, 25, 25, 25, None, None, None, None, 105, 105]),
     ([0, 120, 40, 25, 65, 105], (330, 410, 10), 300, [25, 65, 65, 65, 65, 105, 105, 105]),
 ])
-def test_time_series_upsampling(rrddata, twindow, shift, upsampled):
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_time_series_upsampling(rrddata, twindow, shift, upsampled, vectorized):
     ts = prediction.TimeSeries(rrddata)
-    assert ts.bfill_upsample(twindow, shift) == upsampled
+    assert ts.bfill_upsample(twindow, shift, vectorized=vectorized) == upsampled
 
 
 @pytest.mark.parametrize("rrddata, twindow, cf, downsampled", [
@@ -71,9 +72,10 @@ def test_time_series_upsampling(rrddata, twindow, shift, upsampled):
     ([10, 45, 5, 15, 20, 25, 30, 35, 40, 45], (10, 40, 10), "average", [17.5, 27.5, 37.5]),
     ([10, 45, 5, 15, 20, 25, 30, None, 40, 45], (10, 40, 10), "average", [17.5, 27.5, 40.]),
 ])
-def test_time_series_downsampling(rrddata, twindow, cf, downsampled):
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_time_series_downsampling(rrddata, twindow, cf, downsampled, vectorized):
     ts = prediction.TimeSeries(rrddata)
-    assert ts.downsample(twindow, cf) == downsampled
+    assert ts.downsample(twindow, cf, vectorized=vectorized) == downsampled
 
 
 def test__get_reference_deviation_absolute():
@@ -165,3 +167,21 @@ def test_estimate_levels(reference_value, reference_deviation, params, levels_fa
         levels_upper_lower_bound=params.get("levels_upper_min"),
         levels_factor=levels_factor,
     ) == result
+
+
+@pytest.mark.parametrize("vectorization_available", [False, True])
+def test_estimate_levels_of_points(monkeypatch, vectorization_available):
+    monkeypatch.setattr(prediction, "vectorization_available", lambda: vectorization_available)
+    assert prediction.estimate_levels_of_points(
+        reference_values=[5, 15, None, 0],
+        stdevs=[2, 2, 1, None],
+        levels_lower=("relative", (10, 20)),
+        levels_upper=("stdev", (2, 4)),
+        levels_upper_lower_bound=(10, 20),
+        levels_factor=1,
+    ) == [
+        (10, 20, 4.5, 4),
+        (19, 23, 13.5, 12),
+        (None, None, None, None),
+        (None, None, None, None),
+    ]
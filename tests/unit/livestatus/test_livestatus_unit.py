@@ -8,7 +8,10 @@
 
 import errno
 import socket
+import socketserver
 import ssl
+import threading
+import time
 from contextlib import closing
 
 import pytest
@@ -212,3 +215,151 @@ def test_local_connection(mock_livestatus):
     live.expect_query("GET status\nColumns: program_start\nColumnHeaders: off")
     with mock_livestatus(expect_status_query=False):
         livestatus.LocalConnection().query_value("GET status\nColumns: program_start")
+
+
+class _LivestatusHandler(socketserver.StreamRequestHandler):
+    """Answers "GET <table>" with [[<site>, <table>]] on a keepalive connection"""
+    def handle(self):
+        self.server.connections += 1  # type: ignore[attr-defined]
+        while True:
+            lines = []
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                if line == b"\n":
+                    break
+                lines.append(line.decode("utf-8").rstrip("\n"))
+
+            table = lines[0].split()[1]
+            time.sleep(self.server.delay)  # type: ignore[attr-defined]
+            if table == "missing":
+                code, body = 404, "Table 'missing' does not exist."
+            else:
+                code, body = 200, repr([[self.server.site, table]])  # type: ignore[attr-defined]
+            self.wfile.write(b"%03d %11d\n%s" % (code, len(body), body.encode("utf-8")))
+            self.wfile.flush()
+            if self.server.close_after_response:  # type: ignore[attr-defined]
+                return
+
+
+@pytest.fixture
+def livestatus_server_factory():
+    servers = []
+
+    def _server(site, delay=0.0):
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _LivestatusHandler)
+        server.daemon_threads = True
+        server.site = site  # type: ignore[attr-defined]
+        server.delay = delay  # type: ignore[attr-defined]
+        server.connections = 0  # type: ignore[attr-defined]
+        server.close_after_response = False  # type: ignore[attr-defined]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield _server
+    livestatus.connection_pool.clear()
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _socketurl(server):
+    return "tcp:127.0.0.1:%d" % server.server_address[1]
+
+
+def test_persistent_connection_is_reused(livestatus_server_factory):
+    server = livestatus_server_factory("heute")
+
+    for _request in range(3):
+        live = livestatus.SingleSiteConnection(_socketurl(server), persist=True)
+        assert live.query("GET hosts\n") == [["heute", "hosts"]]
+        live.disconnect()
+
+    assert live.successfully_persisted()
+    assert server.connections == 1
+
+
+def test_persistent_connection_not_pooled_with_pending_response(livestatus_server_factory):
+    server = livestatus_server_factory("heute")
+
+    live = livestatus.SingleSiteConnection(_socketurl(server), persist=True)
+    live.send_query(live.build_query(livestatus.Query("GET hosts"), ""))
+    live.disconnect()
+
+    live = livestatus.SingleSiteConnection(_socketurl(server), persist=True)
+    assert live.query("GET services\n") == [["heute", "services"]]
+    assert not live.successfully_persisted()
+
+
+def test_single_site_query_many(livestatus_server_factory):
+    server = livestatus_server_factory("heute")
+
+    live = livestatus.SingleSiteConnection(_socketurl(server))
+    assert live.query_many(["GET hosts\n", "GET missing\n", "GET services\n"]) == [
+        [["heute", "hosts"]],
+        [],
+        [["heute", "services"]],
+    ]
+    assert live.query("GET status\n") == [["heute", "status"]]
+    assert server.connections == 1
+
+
+def test_multisite_query_many(livestatus_server_factory):
+    sites = {
+        "slow": livestatus_server_factory("slow", delay=0.2),
+        "fast": livestatus_server_factory("fast"),
+    }
+    live = livestatus.MultiSiteConnection(
+        {site_id: {
+            "socket": _socketurl(server)
+        } for site_id, server in sites.items()})
+    live.set_prepend_site(True)
+
+    before = time.time()
+    result = live.query_many(["GET hosts\n", "GET services\n"])
+    duration = time.time() - before
+
+    assert result == [
+        [["slow", "slow", "hosts"], ["fast", "fast", "hosts"]],
+        [["slow", "slow", "services"], ["fast", "fast", "services"]],
+    ]
+    assert duration < 0.4 + 0.15
+    assert live.dead_sites() == {}
+
+
+def test_multisite_query_many_dead_site(livestatus_server_factory):
+    server = livestatus_server_factory("heute")
+    live = livestatus.MultiSiteConnection({"heute": {"socket": _socketurl(server)}})
+    server.close_after_response = True
+
+    assert live.query_many(["GET hosts\n", "GET services\n"]) == [[], []]
+    assert list(live.dead_sites()) == ["heute"]
+    assert live.alive_sites() == []
+
+
+def test_multisite_query_many_stale_pooled_connection(livestatus_server_factory):
+    server = livestatus_server_factory("heute")
+    site_config = {"heute": {"socket": _socketurl(server), "persist": True}}
+
+    live = livestatus.MultiSiteConnection(site_config)
+    assert live.query("GET hosts\n") == [["heute", "hosts"]]
+    live.disconnect()
+
+    # Let the pooled connection go stale without the pool noticing it
+    pool_key = (_socketurl(server), False, True, None)
+    sock = livestatus.connection_pool.acquire(pool_key)
+    assert sock is not None
+    server.close_after_response = True
+    sock.sendall(b"GET status\nKeepAlive: on\nResponseHeader: fixed16\n\n")
+    assert sock.recv(4096).startswith(b"200")
+    server.close_after_response = False
+    livestatus.connection_pool._idle[pool_key] = [sock]  # pylint: disable=protected-access
+
+    live = livestatus.MultiSiteConnection(site_config)
+    assert live.query_many(["GET hosts\n", "GET services\n"]) == [
+        [["heute", "hosts"]],
+        [["heute", "services"]],
+    ]
+    assert live.dead_sites() == {}
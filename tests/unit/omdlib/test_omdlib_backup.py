@@ -6,6 +6,7 @@
 
 # pylint: disable=redefined-outer-name
 
+import errno
 import tarfile
 from pathlib import Path
 
@@ -91,3 +92,95 @@ def test_backup_site_to_tarfile_vanishing_files(site, tmp_path, monkeypatch):
     with tar_path.open("rb") as backup_tar:
         tar = tarfile.open(fileobj=backup_tar, mode="r:*")
         _sitename, _version = omdlib.backup.get_site_and_version_from_backup(tar)
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_parallel_backup_site_to_tarfile(site, tmp_path, monkeypatch, compress):
+    monkeypatch.setattr(omdlib.backup.BackupTarFile, "parallel_batch_size", 3)
+    for index in range(10):
+        path = Path(site.dir) / ("dir%d" % (index % 3)) / ("file%d" % index)
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b"%d" % index * 100000)
+    Path(site.dir + "/dir0/link").symlink_to("file0")
+    (Path(site.dir) / "tmp").mkdir()
+    (Path(site.dir) / "tmp" / "excluded").touch()
+
+    serial_path = tmp_path / "serial.tar"
+    with serial_path.open("wb") as backup_tar:
+        omdlib.backup.backup_site_to_tarfile(site, backup_tar, mode="w:", options={}, verbose=False)
+
+    parallel_path = tmp_path / "parallel.tar"
+    with parallel_path.open("wb") as backup_tar:
+        omdlib.backup.parallel_backup_site_to_tarfile(site,
+                                                      backup_tar,
+                                                      options={},
+                                                      verbose=False,
+                                                      threads=4,
+                                                      compress=compress)
+
+    def members(path, mode):
+        with path.open("rb") as backup_tar:
+            tar = tarfile.open(fileobj=backup_tar, mode=mode)
+            assert omdlib.backup.get_site_and_version_from_backup(tar) == ("unit", "1.3.3i7.cee")
+            return [(tarinfo.name, tarinfo.type, tarinfo.linkname,
+                     tar.extractfile(tarinfo).read() if tarinfo.isreg() else None)
+                    for tarinfo in tar]
+
+    expected = members(serial_path, "r:*")
+    assert "unit/tmp/excluded" not in [name for name, *_rest in expected]
+    assert members(parallel_path, "r:*") == expected
+    assert members(parallel_path, "r|*") == expected
+
+
+def test_parallel_backup_site_to_tarfile_error(site, tmp_path, monkeypatch):
+    writers = []
+    orig_init = omdlib.backup.ParallelGzipWriter.__init__
+
+    def init(self, *args, **kwargs):
+        orig_init(self, *args, **kwargs)
+        writers.append(self)
+
+    def add_parallel(self, *args, **kwargs):
+        self.fileobj.write(b"x" * 3 * omdlib.backup.ParallelGzipWriter.block_size)
+        raise OSError(errno.EACCES, "Permission denied")
+
+    monkeypatch.setattr(omdlib.backup.ParallelGzipWriter, "__init__", init)
+    monkeypatch.setattr(omdlib.backup.BackupTarFile, "add_parallel", add_parallel)
+
+    with (tmp_path / "backup.tar.gz").open("wb") as backup_tar:
+        with pytest.raises(OSError):
+            omdlib.backup.parallel_backup_site_to_tarfile(site,
+                                                          backup_tar,
+                                                          options={},
+                                                          verbose=False,
+                                                          threads=2,
+                                                          compress=True)
+
+    assert len(writers) == 1
+    assert writers[0]._executor._shutdown
+
+
+def test_send_rrdcached_commands_pipelined(site, tmp_path):
+    class FakeSocket:
+        def __init__(self):
+            self.sent = b""
+            self.answers = [b"0 Suspended\n-1 ", b"No such file or directory\n0 Suspended\n"]
+
+        def sendall(self, data):
+            self.sent += data
+
+        def recv(self, _size):
+            return self.answers.pop(0)
+
+    with (tmp_path / "backup.tar").open("wb") as backup_tar:
+        tar = omdlib.backup.BackupTarFile.open(fileobj=backup_tar,
+                                               mode="w:",
+                                               site=site,
+                                               verbose=False)
+        tar._sock = sock = FakeSocket()
+        tar._send_rrdcached_commands(["SUSPEND /a.rrd", "SUSPEND /b.rrd", "SUSPEND /c.rrd"])
+        tar._sock = None
+        tar.close()
+
+    assert sock.sent == b"SUSPEND /a.rrd\nSUSPEND /b.rrd\nSUSPEND /c.rrd\n"
+    assert sock.answers == []